@@ -0,0 +1,51 @@
+"""
+Rotas administrativas
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from config.database import get_db
+from services.subscription_service import SubscriptionService
+from api.dependencies import get_current_admin_user
+from utils.helpers import ResponseFormatter
+from config.logging_config import logger
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/subscriptions/stats", response_model=dict)
+def get_subscription_stats(
+    current_user = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Estatísticas atuais das assinaturas"""
+    try:
+        stats = SubscriptionService.get_subscription_stats(db)
+        
+        return ResponseFormatter.success(
+            data=stats,
+            message="Estatísticas obtidas com sucesso"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter estatísticas de assinaturas: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
+
+@router.get("/subscriptions/history", response_model=dict)
+def get_subscription_history(
+    days: int = Query(30, ge=1, le=366, description="Quantidade de dias"),
+    status_filter: str = Query("ACTIVE", alias="status", description="Status das assinaturas"),
+    current_user = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Série histórica diária de assinaturas por plano (lida dos snapshots)"""
+    try:
+        history = SubscriptionService.get_snapshot_history(db, days=days, status=status_filter)
+        
+        return ResponseFormatter.success(
+            data=history,
+            message="Histórico obtido com sucesso"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter histórico de assinaturas: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
@@ -0,0 +1,70 @@
+"""
+Rotas de análises
+"""
+from typing import Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+
+from config.database import get_db
+from api.dependencies import get_current_active_user
+from utils.helpers import ResponseFormatter
+from config.logging_config import logger
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/heatmap", response_model=dict)
+def get_earnings_heatmap(
+    data_inicio: Optional[datetime] = Query(None, description="Data inicial"),
+    data_fim: Optional[datetime] = Query(None, description="Data final"),
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """R$/hora e corridas/hora por dia da semana × hora, no fuso do usuário"""
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Data inicial deve ser anterior à data final")
+    
+    # numpy só é carregado quando as análises são usadas
+    from services.analytics_service import AnalyticsService
+    try:
+        heatmap = AnalyticsService.get_earnings_heatmap(
+            db=db,
+            user_id=current_user.id,
+            data_inicio=data_inicio,
+            data_fim=data_fim
+        )
+        
+        return ResponseFormatter.success(
+            data=heatmap,
+            message="Heatmap de ganhos obtido com sucesso"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter heatmap de ganhos: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
+
+@router.get("/periods", response_model=dict)
+def get_period_comparison(
+    granularity: str = Query("week", pattern="^(day|week|month)$", description="Granularidade: day, week ou month"),
+    count: int = Query(8, ge=1, le=500, description="Quantidade de períodos"),
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Receitas, despesas, lucro, corridas e horas de N períodos consecutivos com variação"""
+    from services.analytics_service import AnalyticsService
+    try:
+        comparison = AnalyticsService.get_period_comparison(
+            db=db,
+            user_id=current_user.id,
+            granularity=granularity,
+            count=count
+        )
+        
+        return ResponseFormatter.success(
+            data=comparison,
+            message="Comparação de períodos obtida com sucesso"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter comparação de períodos: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
@@ -14,7 +14,7 @@ from services.user_service import UserService
 from services.category_service import CategoryService
 from api.dependencies import get_current_user, get_current_active_user
 from utils.helpers import ResponseFormatter
-from utils.exceptions import RiderFinanceException
+from utils.exceptions import RiderFinanceException, ConflictError
 from config.logging_config import logger
 from config.settings import settings
 
@@ -139,7 +139,8 @@ def update_profile(
             nome_completo=user_data.nome_completo,
             telefone=user_data.telefone,
             veiculo=user_data.veiculo,
-            data_inicio_atividade=user_data.data_inicio_atividade
+            data_inicio_atividade=user_data.data_inicio_atividade,
+            versao=user_data.versao
         )
         
         # Retornar perfil com totais calculados
@@ -150,6 +151,8 @@ def update_profile(
             message="Perfil atualizado com sucesso"
         )
         
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
     except RiderFinanceException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
@@ -1,6 +1,7 @@
 """
 Rotas de categorias
 """
+from datetime import date
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
@@ -10,7 +11,7 @@ from schemas.category_schemas import CategoryCreate, CategoryUpdate, CategoryRes
 from services.category_service import CategoryService
 from api.dependencies import get_current_active_user
 from utils.helpers import ResponseFormatter
-from utils.exceptions import RiderFinanceException
+from utils.exceptions import RiderFinanceException, ConflictError
 from config.logging_config import logger
 
 router = APIRouter(prefix="/categories", tags=["categories"])
@@ -68,6 +69,38 @@ def create_category(
         logger.error(f"Erro ao criar categoria: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
 
+@router.get("/stats", response_model=dict)
+def get_categories_stats(
+    data_inicio: Optional[date] = Query(None, description="Data inicial (no fuso do usuário)"),
+    data_fim: Optional[date] = Query(None, description="Data final (no fuso do usuário)"),
+    apenas_ativas: bool = Query(True, description="Apenas categorias ativas"),
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Estatísticas de uso de todas as categorias do usuário"""
+    try:
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Data inicial deve ser anterior à final")
+        
+        stats = CategoryService.get_all_usage_stats(
+            db=db,
+            user_id=current_user.id,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            apenas_ativas=apenas_ativas
+        )
+        
+        return ResponseFormatter.success(
+            data=stats,
+            message="Estatísticas obtidas com sucesso"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao obter estatísticas das categorias: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
+
 @router.get("/{category_id}", response_model=dict)
 def get_category(
     category_id: str,
@@ -104,7 +137,8 @@ def update_category(
             user_id=current_user.id,
             nome=category_data.nome,
             icone=category_data.icone,
-            cor=category_data.cor
+            cor=category_data.cor,
+            versao=category_data.versao
         )
         
         return ResponseFormatter.success(
@@ -112,6 +146,8 @@ def update_category(
             message="Categoria atualizada com sucesso"
         )
         
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
     except RiderFinanceException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
@@ -132,6 +168,8 @@ def delete_category(
             message="Categoria removida com sucesso"
         )
         
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
     except RiderFinanceException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
@@ -6,9 +6,11 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from config.database import get_db
+from config.settings import settings
 from models import Usuario
 from services.auth_service import AuthService
-from utils.exceptions import UnauthorizedError, TrialExpiredError
+from services.entitlement_service import EntitlementService
+from utils.exceptions import UnauthorizedError
 
 security = HTTPBearer()
 
@@ -29,17 +31,74 @@ def get_current_user(
         )
 
 def get_current_active_user(
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ) -> Usuario:
-    """Dependency para usuário ativo (verifica trial/pagamento)"""
-    try:
-        AuthService.check_subscription_status(current_user)
-        return current_user
-    except TrialExpiredError:
+    """Dependency para usuário ativo (assinatura, pagamento ou trial válido)"""
+    entitlements = EntitlementService.get_entitlements(db, current_user.id, current_user)
+    if not EntitlementService.is_active(entitlements):
         raise HTTPException(
             status_code=status.HTTP_402_PAYMENT_REQUIRED,
             detail="Período de trial expirado. Assine para continuar usando."
         )
+    return current_user
+
+def get_current_user_with_subscription(
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Usuario:
+    """Dependency para usuário com assinatura ativa (sem contar o trial)"""
+    entitlements = EntitlementService.get_entitlements(db, current_user.id, current_user)
+    if entitlements['status'] not in ('ACTIVE', 'PAID') or not EntitlementService.is_active(entitlements):
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Assinatura ativa necessária para acessar este recurso"
+        )
+    return current_user
+
+def require_plan(minimum_plan: str = "basic"):
+    """Dependency factory para exigir plano mínimo"""
+    def dependency(
+        current_user: Usuario = Depends(get_current_user_with_subscription),
+        db: Session = Depends(get_db)
+    ) -> Usuario:
+        entitlements = EntitlementService.get_entitlements(db, current_user.id, current_user)
+        if not EntitlementService.plan_at_least(entitlements, minimum_plan):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Plano {minimum_plan} ou superior necessário"
+            )
+        return current_user
+    
+    return dependency
+
+def require_feature(feature: str):
+    """Dependency factory para exigir uma funcionalidade do plano"""
+    def dependency(
+        current_user: Usuario = Depends(get_current_active_user),
+        db: Session = Depends(get_db)
+    ) -> Usuario:
+        entitlements = EntitlementService.get_entitlements(db, current_user.id, current_user)
+        if not EntitlementService.has_feature(entitlements, feature):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Funcionalidade não disponível no seu plano"
+            )
+        return current_user
+    
+    return dependency
+
+def get_current_admin_user(
+    current_user: Usuario = Depends(get_current_user)
+) -> Usuario:
+    """Dependency para administradores (e-mails listados em ADMIN_EMAILS)"""
+    admins = {email.lower() for email in settings.ADMIN_EMAILS}
+    if current_user.email.lower() not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
+        )
+    return current_user
 
 def get_current_user_optional(
     credentials: HTTPAuthorizationCredentials = Depends(security),
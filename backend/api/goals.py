@@ -8,12 +8,12 @@ from sqlalchemy.orm import Session
 from config.database import get_db
 from api.dependencies import get_current_user
 from schemas.goal_schemas import (
-    MetaCreate, MetaUpdate, MetaProgressUpdate, MetaResponse,
+    MetaCreate, MetaUpdate, MetaProgressUpdate, MetaProgressBatch, MetaResponse,
     TipoMeta, CategoriaMeta
 )
 from services.goal_service import GoalService
 from utils.helpers import ResponseFormatter
-from utils.exceptions import NotFoundError, ValidationError
+from utils.exceptions import NotFoundError, ValidationError, ConflictError
 from config.logging_config import logger
 
 router = APIRouter(prefix="/goals", tags=["Metas"])
@@ -88,6 +88,43 @@ async def get_user_goals(
         )
 
 
+@router.patch("/progress", response_model=Dict[str, Any])
+async def update_goals_progress(
+    batch: MetaProgressBatch,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Atualizar o progresso de várias metas em uma única transação"""
+    try:
+        metas = GoalService.update_goals_progress(
+            db=db,
+            user_id=current_user.id,
+            items=batch.items
+        )
+        
+        return ResponseFormatter.success(
+            data=metas,
+            message="Progresso das metas atualizado com sucesso"
+        )
+        
+    except NotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Meta não encontrada"
+        )
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Erro ao atualizar progresso em lote: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro interno do servidor"
+        )
+
+
 @router.get("/{goal_id}", response_model=Dict[str, Any])
 async def get_goal(
     goal_id: str,
@@ -190,6 +227,11 @@ async def update_goal(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except ConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Erro ao atualizar meta: {e}")
         raise HTTPException(
@@ -219,6 +261,11 @@ async def delete_goal(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Meta não encontrada"
         )
+    except ConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Erro ao deletar meta: {e}")
         raise HTTPException(
@@ -251,6 +298,11 @@ async def deactivate_goal(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Meta não encontrada"
         )
+    except ConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Erro ao desativar meta: {e}")
         raise HTTPException(
@@ -283,6 +335,11 @@ async def reactivate_goal(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Meta não encontrada"
         )
+    except ConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Erro ao reativar meta: {e}")
         raise HTTPException(
@@ -1,12 +1,12 @@
 """
 Endpoints para pagamentos e assinaturas
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List
 
 from config.database import get_db
-from services.asaas_service import AsaasService
+from services.payment_mirror_service import PaymentMirrorService
 from services.subscription_service import SubscriptionService
 from services.webhook_handler import WebhookHandler
 from schemas.payment_schemas import (
@@ -18,11 +18,14 @@ from schemas.payment_schemas import (
     PlanType
 )
 from utils.auth import get_current_user
+from utils.exceptions import ServiceUnavailableError
 
 router = APIRouter(prefix="/api/payments", tags=["Pagamentos"])
 
-# Instância do serviço Asaas
-asaas_service = AsaasService()
+def get_asaas():
+    """Instância compartilhada do serviço Asaas (httpx carregado no primeiro uso)"""
+    from services.asaas_service import get_asaas_service
+    return get_asaas_service()
 
 @router.get("/plans")
 async def get_available_plans():
@@ -46,7 +49,7 @@ async def create_customer(
             )
         
         # Criar cliente no Asaas
-        customer = await asaas_service.create_customer(customer_data)
+        customer = await get_asaas().create_customer(customer_data)
         
         # Salvar customer_id no usuário
         current_user.asaas_customer_id = customer.id
@@ -57,7 +60,7 @@ async def create_customer(
             "message": "Cliente criado com sucesso"
         }
         
-    except HTTPException:
+    except (HTTPException, ServiceUnavailableError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -81,17 +84,20 @@ async def create_payment(
             )
         
         # Criar cobrança no Asaas
-        payment = await asaas_service.create_payment(payment_data.model_dump())
+        payment = await get_asaas().create_payment(payment_data)
+        
+        # Espelhar localmente para que consultas de status não chamem o Asaas
+        PaymentMirrorService.upsert_payment(db, payment, user_id=current_user.id)
         
         return {
-            "payment_id": payment.get("id"),
-            "status": payment.get("status"),
-            "invoice_url": payment.get("invoiceUrl"),
-            "due_date": payment.get("dueDate"),
-            "pix_qr_code": payment.get("qrCode")
+            "payment_id": payment.id,
+            "status": payment.status,
+            "invoice_url": payment.invoiceUrl,
+            "due_date": payment.dueDate,
+            "pix_qr_code": getattr(payment, "qrCode", None)
         }
         
-    except HTTPException:
+    except (HTTPException, ServiceUnavailableError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -102,23 +108,41 @@ async def create_payment(
 @router.get("/charges/{payment_id}")
 async def get_payment_status(
     payment_id: str,
-    current_user = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
-    """Obter status de pagamento do Asaas"""
+    """Obter status de pagamento (espelho local, revalidado com o Asaas)"""
     try:
-        # Obter status do pagamento
-        payment = await asaas_service.get_payment(payment_id)
+        # Espelho local; Asaas só é consultado em miss ou em segundo plano se estiver velho
+        asaas_service = get_asaas()
+        payment, _ = await PaymentMirrorService.get_payment_status(
+            db,
+            payment_id,
+            asaas_service,
+            schedule_refresh=lambda pid: background_tasks.add_task(
+                PaymentMirrorService.refresh_payment, pid, asaas_service
+            )
+        )
+        
+        # Cobrança sem dono conhecido não é exposta a ninguém
+        if not payment or payment.id_usuario != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Pagamento não encontrado"
+            )
         
         return {
-            "payment_id": payment.get("id"),
-            "status": payment.get("status"),
-            "value": payment.get("value"),
-            "net_value": payment.get("netValue"),
-            "due_date": payment.get("dueDate"),
-            "payment_date": payment.get("paymentDate")
+            "payment_id": payment.id,
+            "status": payment.status,
+            "value": payment.valor,
+            "net_value": payment.valor_liquido,
+            "due_date": payment.data_vencimento,
+            "payment_date": payment.data_pagamento,
+            "synced_at": payment.sincronizado_em.isoformat()
         }
         
-    except HTTPException:
+    except (HTTPException, ServiceUnavailableError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -151,7 +175,7 @@ async def create_subscription(
             )
         
         # Criar assinatura no Asaas
-        asaas_subscription = await asaas_service.create_plan_subscription(
+        asaas_subscription = await get_asaas().create_plan_subscription(
             current_user.asaas_customer_id,
             plan_type,
             billing_type
@@ -168,7 +192,7 @@ async def create_subscription(
         
         return SubscriptionResponse.model_validate(subscription)
         
-    except HTTPException:
+    except (HTTPException, ServiceUnavailableError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -226,14 +250,14 @@ async def cancel_subscription(
         
         # Cancelar no Asaas
         if subscription.asaas_subscription_id:
-            await asaas_service.cancel_subscription(subscription.asaas_subscription_id)
+            await get_asaas().cancel_subscription(subscription.asaas_subscription_id)
         
         # Cancelar localmente
         SubscriptionService.cancel_subscription(db, subscription_id, current_user.id)
         
         return {"message": "Assinatura cancelada com sucesso"}
         
-    except HTTPException:
+    except (HTTPException, ServiceUnavailableError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -245,7 +269,7 @@ async def cancel_subscription(
 async def payment_health_check():
     """Verificar saúde do sistema de pagamentos"""
     try:
-        health = await asaas_service.health_check()
+        health = await get_asaas().health_check()
         return health
         
     except Exception as e:
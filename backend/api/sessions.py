@@ -0,0 +1,89 @@
+"""
+Rotas de sessões de trabalho
+"""
+from typing import Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from config.database import get_db
+from services.session_service import SessionService
+from services.live_session_service import live_hub
+from api.dependencies import get_current_active_user
+from utils.helpers import ResponseFormatter
+from config.logging_config import logger
+
+router = APIRouter(prefix="/sessions", tags=["sessions"])
+
+@router.get("/summary", response_model=dict)
+def get_sessions_summary(
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Resumo das sessões em todo o histórico"""
+    try:
+        summary = SessionService.get_sessions_summary(db, current_user.id)
+        
+        return ResponseFormatter.success(
+            data=summary,
+            message="Resumo de sessões obtido com sucesso"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter resumo de sessões: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
+
+@router.get("/analytics", response_model=dict)
+def get_session_analytics(
+    data_inicio: Optional[datetime] = Query(None, description="Data inicial"),
+    data_fim: Optional[datetime] = Query(None, description="Data final"),
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Análise das sessões: totais, médias, sessão mais longa, horas por dia da semana e plataformas"""
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Data inicial deve ser anterior à data final")
+    
+    try:
+        analytics = SessionService.get_session_analytics(
+            db=db,
+            user_id=current_user.id,
+            data_inicio=data_inicio,
+            data_fim=data_fim
+        )
+        
+        return ResponseFormatter.success(
+            data=analytics,
+            message="Análise de sessões obtida com sucesso"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter análise de sessões: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
+
+@router.get("/live")
+async def stream_active_session(
+    request: Request,
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream (Server-Sent Events) dos totais da sessão ativa
+    
+    Eventos: `sessao` (totais atualizados a cada escrita), `heartbeat` (tempo
+    decorrido, periódico) e `fim` (sessão finalizada ou removida). Substitui o
+    polling de /dashboard/stats durante o turno.
+    """
+    user_id = current_user.id
+    sessao = await run_in_threadpool(SessionService.get_active_session, db, user_id)
+    assinante = live_hub.subscribe(user_id, sessao)
+    if assinante is None:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Limite de conexões ao vivo atingido")
+    
+    return StreamingResponse(
+        live_hub.stream(user_id, assinante, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
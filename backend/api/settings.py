@@ -0,0 +1,58 @@
+"""
+Rotas de configurações do usuário
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from config.database import get_db
+from schemas.settings_schemas import SettingsBulkUpdate
+from services.settings_service import SettingsService
+from api.dependencies import get_current_active_user
+from utils.helpers import ResponseFormatter
+from utils.exceptions import RiderFinanceException
+from config.logging_config import logger
+
+router = APIRouter(prefix="/settings", tags=["settings"])
+
+@router.get("/", response_model=dict)
+def get_settings(
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Obtém todas as configurações do usuário já tipadas"""
+    try:
+        settings_data = SettingsService.get_settings(db, current_user.id)
+        
+        return ResponseFormatter.success(
+            data=settings_data,
+            message="Configurações obtidas com sucesso"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter configurações: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
+
+@router.patch("/", response_model=dict)
+def update_settings(
+    settings_data: SettingsBulkUpdate,
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Cria/atualiza várias configurações de uma vez"""
+    try:
+        updated = SettingsService.bulk_update_settings(
+            db=db,
+            user_id=current_user.id,
+            valores=settings_data.configuracoes
+        )
+        
+        return ResponseFormatter.success(
+            data=updated,
+            message="Configurações atualizadas com sucesso"
+        )
+        
+    except RiderFinanceException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except Exception as e:
+        logger.error(f"Erro ao atualizar configurações: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
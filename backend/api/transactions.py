@@ -8,13 +8,13 @@ from sqlalchemy.orm import Session
 
 from config.database import get_db
 from schemas.transaction_schemas import (
-    TransactionCreate, TransactionUpdate, TransactionResponse,
+    TransactionCreate, TransactionBulkCreate, TransactionUpdate, TransactionResponse,
     TransactionFilters, TransactionSummary, TransactionByCategory, DailyTransaction
 )
 from services.transaction_service import TransactionService
 from api.dependencies import get_current_active_user
 from utils.helpers import ResponseFormatter
-from utils.exceptions import RiderFinanceException
+from utils.exceptions import RiderFinanceException, ConflictError, QuotaExceededError
 from config.logging_config import logger
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
@@ -88,12 +88,41 @@ def create_transaction(
             message="Transação criada com sucesso"
         )
         
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=status.HTTP_402_PAYMENT_REQUIRED, detail=e.message)
     except RiderFinanceException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
         logger.error(f"Erro ao criar transação: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
 
+@router.post("/bulk", response_model=dict)
+def bulk_create_transactions(
+    bulk_data: TransactionBulkCreate,
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Importa transações em lote (tudo ou nada, respeitando a cota do plano)"""
+    try:
+        transactions = TransactionService.bulk_create_transactions(
+            db=db,
+            user_id=current_user.id,
+            items=[item.model_dump() for item in bulk_data.transacoes]
+        )
+        
+        return ResponseFormatter.success(
+            data={"importadas": len(transactions), "ids": [trans.id for trans in transactions]},
+            message="Transações importadas com sucesso"
+        )
+        
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=status.HTTP_402_PAYMENT_REQUIRED, detail=e.message)
+    except RiderFinanceException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    except Exception as e:
+        logger.error(f"Erro ao importar transações: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
+
 @router.get("/{transaction_id}", response_model=dict)
 def get_transaction(
     transaction_id: str,
@@ -133,7 +162,8 @@ def update_transaction(
             descricao=transaction_data.descricao,
             data=transaction_data.data,
             observacoes=transaction_data.observacoes,
-            tags=transaction_data.tags
+            tags=transaction_data.tags,
+            versao=transaction_data.versao
         )
         
         return ResponseFormatter.success(
@@ -141,6 +171,10 @@ def update_transaction(
             message="Transação atualizada com sucesso"
         )
         
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=status.HTTP_402_PAYMENT_REQUIRED, detail=e.message)
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
     except RiderFinanceException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
@@ -161,6 +195,8 @@ def delete_transaction(
             message="Transação removida com sucesso"
         )
         
+    except ConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=e.message)
     except RiderFinanceException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
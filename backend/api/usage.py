@@ -0,0 +1,33 @@
+"""
+Rotas de uso do plano (cotas)
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+
+from config.database import get_db
+from services.usage_service import UsageService
+from api.dependencies import get_current_user
+from utils.helpers import ResponseFormatter
+from config.logging_config import logger
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+@router.get("/", response_model=dict)
+def get_usage(
+    mes: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Mês (YYYY-MM); padrão: mês atual"),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Consumo do mês em cada limite do plano"""
+    try:
+        report = UsageService.get_usage_report(db, current_user.id, mes)
+        
+        return ResponseFormatter.success(
+            data=report,
+            message="Uso obtido com sucesso"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter uso: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor")
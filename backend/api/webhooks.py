@@ -8,47 +8,36 @@ import json
 
 from config.database import get_db
 from services.webhook_handler import WebhookHandler
+from services.webhook_inbox_service import WebhookInboxService
 
 router = APIRouter(prefix="/api/webhooks", tags=["Webhooks"])
 
-@router.post("/asaas/payment")
-async def asaas_payment_webhook(
-    request: Request,
-    db: Session = Depends(get_db)
-):
-    """Webhook para pagamentos do Asaas"""
+async def _receive_webhook(request: Request, db: Session, tipo: str) -> Dict[str, Any]:
+    """Verifica a assinatura, grava o evento no inbox e confirma o recebimento"""
     try:
-        # Obter payload
-        payload = await request.json()
+        # Corpo lido uma única vez: a assinatura é calculada sobre os bytes recebidos
+        raw_payload = await request.body()
         
         # Obter assinatura do header
         signature = request.headers.get('asaas-signature', '')
         
         # Verificar assinatura
-        raw_payload = await request.body()
         if not WebhookHandler.verify_signature(raw_payload.decode(), signature):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Assinatura inválida"
             )
         
-        # Processar webhook
-        success = WebhookHandler.process_payment_webhook(db, payload)
+        payload = json.loads(raw_payload)
         
-        # Log do webhook
-        WebhookHandler.log_webhook(payload, success)
+        # Processamento assíncrono pelos workers do inbox
+        created = WebhookInboxService.enqueue(db, tipo, payload, raw_payload)
         
-        if success:
-            return {"status": "processed"}
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Erro ao processar webhook"
-            )
+        return {"status": "received", "duplicate": not created}
         
     except HTTPException:
         raise
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, UnicodeDecodeError):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Payload JSON inválido"
@@ -59,53 +48,21 @@ async def asaas_payment_webhook(
             detail=f"Erro interno: {str(e)}"
         )
 
+@router.post("/asaas/payment")
+async def asaas_payment_webhook(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Webhook para pagamentos do Asaas"""
+    return await _receive_webhook(request, db, "payment")
+
 @router.post("/asaas/subscription")
 async def asaas_subscription_webhook(
     request: Request,
     db: Session = Depends(get_db)
 ):
     """Webhook para assinaturas do Asaas"""
-    try:
-        # Obter payload
-        payload = await request.json()
-        
-        # Obter assinatura do header
-        signature = request.headers.get('asaas-signature', '')
-        
-        # Verificar assinatura
-        raw_payload = await request.body()
-        if not WebhookHandler.verify_signature(raw_payload.decode(), signature):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Assinatura inválida"
-            )
-        
-        # Processar webhook
-        success = WebhookHandler.process_subscription_webhook(db, payload)
-        
-        # Log do webhook
-        WebhookHandler.log_webhook(payload, success)
-        
-        if success:
-            return {"status": "processed"}
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Erro ao processar webhook"
-            )
-        
-    except HTTPException:
-        raise
-    except json.JSONDecodeError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Payload JSON inválido"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erro interno: {str(e)}"
-        )
+    return await _receive_webhook(request, db, "subscription")
 
 @router.get("/test")
 async def test_webhook():
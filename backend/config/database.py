@@ -1,12 +1,21 @@
 """
 Configuração do banco de dados
 """
-from sqlalchemy import create_engine
+import os
+from datetime import timezone
+from typing import Optional
+
+from sqlalchemy import bindparam, create_engine, inspect, select, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker
 from config.settings import settings
+from config.logging_config import logger
 
 # Importar Base dos modelos
-from models import Base
+from models import Base, VersaoSchema
+
+# Versão do schema esperada pelo código (incrementar ao alterar os modelos)
+SCHEMA_VERSION = 17
 
 # Motor do banco de dados
 engine = create_engine(
@@ -15,7 +24,21 @@ engine = create_engine(
 )
 
 # Sessão local do banco
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: após o commit os objetos continuam com o estado em
+# memória (já completado via RETURNING), sem SELECT extra ao serializar.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+def dispose_engine_after_fork() -> None:
+    """
+    Descarta o pool herdado do processo pai (workers do gunicorn com preload_app)
+
+    close=False: as conexões do pai não são fechadas pelo filho (o socket/arquivo
+    é compartilhado), apenas esquecidas; o worker abre as suas sob demanda.
+    """
+    engine.dispose(close=False)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=dispose_engine_after_fork)
 
 def get_db():
     """Dependency para obter sessão do banco"""
@@ -25,6 +48,160 @@ def get_db():
     finally:
         db.close()
 
-def create_tables():
+def create_tables(bind=None):
     """Cria todas as tabelas do banco"""
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=bind or engine)
+
+def get_schema_version(bind=None) -> Optional[int]:
+    """Versão do schema registrada no banco (None se ainda não existe)"""
+    try:
+        with (bind or engine).connect() as conn:
+            return conn.execute(select(VersaoSchema.versao).where(VersaoSchema.id == 1)).scalar()
+    except DBAPIError:
+        return None
+
+def ensure_schema(bind=None) -> bool:
+    """
+    Verifica a versão do schema com uma única query e só cria as tabelas
+    quando o banco está vazio ou desatualizado. Retorna True se aplicou.
+    """
+    bind = bind or engine
+    anterior = get_schema_version(bind) or 0
+    if anterior >= SCHEMA_VERSION:
+        return False
+
+    create_tables(bind)
+    _add_missing_columns(bind)
+    _create_missing_indexes(bind)
+    _migrate_data(bind, anterior)
+    with bind.begin() as conn:
+        updated = conn.execute(
+            VersaoSchema.__table__.update()
+            .where(VersaoSchema.id == 1)
+            .values(versao=SCHEMA_VERSION)
+        ).rowcount
+        if not updated:
+            conn.execute(VersaoSchema.__table__.insert().values(id=1, versao=SCHEMA_VERSION))
+    return True
+
+def _add_missing_columns(bind) -> None:
+    """Adiciona colunas novas em tabelas já existentes (create_all não altera tabelas)"""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existentes = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existentes:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=bind.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                elif not column.nullable:
+                    logger.warning(f"Coluna {table.name}.{column.name} não nula sem default: adicione manualmente")
+                    continue
+                conn.execute(text(ddl))
+                logger.info(f"Coluna adicionada: {table.name}.{column.name}")
+
+# Limpeza de dados que violariam um índice único novo, executada antes de criá-lo
+_PREPARO_INDICES_UNICOS = {
+    # Mantém a configuração mais recente de cada (usuário, chave)
+    "uq_configuracoes_usuario_chave": """
+        DELETE FROM configuracoes
+        WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY id_usuario, chave
+                    ORDER BY atualizado_em DESC, criado_em DESC
+                ) AS posicao
+                FROM configuracoes
+            ) ranqueadas
+            WHERE posicao = 1
+        )
+    """,
+    # No máximo uma sessão ativa por usuário: mantém a mais recente e fecha as
+    # demais sem duração (sobras da corrida no antigo start_session)
+    "ix_sessoes_trabalho_ativa": """
+        UPDATE sessoes_trabalho
+        SET eh_ativa = false, fim = COALESCE(fim, inicio), total_minutos = COALESCE(total_minutos, 0)
+        WHERE eh_ativa = true AND id NOT IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY id_usuario
+                    ORDER BY inicio DESC, id DESC
+                ) AS posicao
+                FROM sessoes_trabalho
+                WHERE eh_ativa = true
+            ) ranqueadas
+            WHERE posicao = 1
+        )
+    """,
+}
+
+def _create_missing_indexes(bind) -> None:
+    """Cria índices novos em tabelas já existentes"""
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        existentes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existentes:
+                continue
+            preparo = _PREPARO_INDICES_UNICOS.get(index.name)
+            with bind.begin() as conn:
+                if preparo:
+                    afetadas = conn.execute(text(preparo)).rowcount
+                    if afetadas:
+                        logger.warning(f"{afetadas} linhas de {table.name} ajustadas para o índice único {index.name}")
+                index.create(conn)
+
+def _migrate_data(bind, anterior: int = 0) -> None:
+    """
+    Preenche dados derivados de colunas novas em bancos já existentes
+
+    - transacoes.data_local: linhas anteriores à coluna ficam NULL e sumiriam
+      dos filtros por dia local (dashboard, séries diárias, períodos)
+    - sessoes_trabalho.inicio/fim (schema < 16): gravados na hora local do
+      servidor; convertidos para UTC sem fuso, como transacoes.data, e a
+      atribuição de transações às sessões é refeita
+    - uso_mensal (schema < 17): contadores de transações passam a contar o mês
+      de criação em vez do mês da data da transação
+    """
+    from services.transaction_service import TransactionService
+
+    db = sessionmaker(bind=bind)()
+    try:
+        total = TransactionService.rebuild_local_dates(db, only_missing=True)
+        if total:
+            logger.info(f"Migração: data_local preenchida em {total} transações")
+        if anterior < 16:
+            _migrate_session_times_to_utc(db)
+        if anterior < 17:
+            from services.usage_service import UsageService
+            UsageService.rebuild_transaction_usage(db)
+    finally:
+        db.close()
+
+def _migrate_session_times_to_utc(db) -> None:
+    """Converte inicio/fim das sessões da hora local do servidor para UTC (no-op em host UTC)"""
+    from models import SessaoTrabalho
+    from services.session_attribution_service import SessionAttributionService
+
+    def utc(momento):
+        # datetime sem fuso em astimezone() é interpretado na hora local do processo
+        return momento.astimezone(timezone.utc).replace(tzinfo=None) if momento else momento
+
+    alteracoes = []
+    for id_, inicio, fim in db.query(SessaoTrabalho.id, SessaoTrabalho.inicio, SessaoTrabalho.fim).all():
+        if (utc(inicio), utc(fim)) != (inicio, fim):
+            alteracoes.append({"_id": id_, "_inicio": utc(inicio), "_fim": utc(fim)})
+    if not alteracoes:
+        return
+
+    tabela = SessaoTrabalho.__table__
+    db.execute(
+        tabela.update()
+        .where(tabela.c.id == bindparam("_id"))
+        .values(inicio=bindparam("_inicio"), fim=bindparam("_fim")),
+        alteracoes
+    )
+    SessionAttributionService.backfill(db)
+    logger.info(f"Migração: horários de {len(alteracoes)} sessões convertidos para UTC")
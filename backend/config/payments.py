@@ -56,7 +56,19 @@ SUBSCRIPTION_PLANS = {
             'Relatórios simples',
             'Até 500 transações/mês'
         ],
-        'billing_cycle': 'MONTHLY'
+        'billing_cycle': 'MONTHLY',
+        'level': 1,
+        'flags': {
+            'metas_avancadas': False,
+            'relatorios_detalhados': False,
+            'importacao_faturas': False,
+            'multiplos_veiculos': False,
+            'gestao_equipe': False,
+            'api_personalizada': False
+        },
+        'limits': {
+            'transacoes_mes': 500
+        }
     },
     'pro': {
         'name': 'Profissional', 
@@ -70,7 +82,19 @@ SUBSCRIPTION_PLANS = {
             'Importação de faturas automática',
             'Suporte prioritário'
         ],
-        'billing_cycle': 'MONTHLY'
+        'billing_cycle': 'MONTHLY',
+        'level': 2,
+        'flags': {
+            'metas_avancadas': True,
+            'relatorios_detalhados': True,
+            'importacao_faturas': True,
+            'multiplos_veiculos': False,
+            'gestao_equipe': False,
+            'api_personalizada': False
+        },
+        'limits': {
+            'transacoes_mes': None  # ilimitado
+        }
     },
     'premium': {
         'name': 'Premium',
@@ -85,6 +109,21 @@ SUBSCRIPTION_PLANS = {
             'Consultoria financeira',
             'White label'
         ],
-        'billing_cycle': 'MONTHLY'
+        'billing_cycle': 'MONTHLY',
+        'level': 3,
+        'flags': {
+            'metas_avancadas': True,
+            'relatorios_detalhados': True,
+            'importacao_faturas': True,
+            'multiplos_veiculos': True,
+            'gestao_equipe': True,
+            'api_personalizada': True
+        },
+        'limits': {
+            'transacoes_mes': None
+        }
     }
 }
+
+# Plano aplicado durante o período de trial (e para usuários pagos sem assinatura local)
+TRIAL_PLAN = 'basic'
@@ -44,12 +44,69 @@ class Settings(BaseSettings):
     # Timezone
     TIMEZONE: str = "America/Sao_Paulo"
     
+    # Subsistema de pagamentos: rotas /payments e /webhooks, inbox de webhooks e
+    # jobs do Asaas. Desligado, o cliente HTTP do Asaas nem é importado.
+    PAYMENTS_ENABLED: bool = True
+    
     # Asaas (Pagamentos)
     ASAAS_API_KEY: Optional[str] = None
     ASAAS_BASE_URL: str = "https://sandbox.asaas.com/api/v3"
     ASAAS_WEBHOOK_SECRET: Optional[str] = None
     WEBHOOK_BASE_URL: str = "http://localhost:8000"
     
+    # Cliente HTTP do Asaas
+    ASAAS_CONNECT_TIMEOUT: float = 5.0
+    ASAAS_READ_TIMEOUT: float = 15.0
+    ASAAS_MAX_CONNECTIONS: int = 20
+    ASAAS_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    ASAAS_MAX_RETRIES: int = 2
+    ASAAS_RETRY_BACKOFF: float = 0.2
+    ASAAS_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    ASAAS_CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    
+    # Registro de webhooks do Asaas no startup (em segundo plano, um worker por vez)
+    ASAAS_WEBHOOK_SETUP_TIMEOUT_SECONDS: float = 10.0
+    ASAAS_WEBHOOK_SETUP_LOCK_TTL_SECONDS: int = 300
+    
+    # Inbox de webhooks (processamento assíncrono)
+    WEBHOOK_INBOX_WORKERS: int = 2
+    WEBHOOK_INBOX_BATCH_SIZE: int = 50
+    WEBHOOK_INBOX_POLL_SECONDS: float = 1.0
+    WEBHOOK_INBOX_MAX_ATTEMPTS: int = 8
+    WEBHOOK_INBOX_RETRY_BACKOFF_SECONDS: float = 5.0
+    WEBHOOK_INBOX_RETRY_BACKOFF_MAX_SECONDS: float = 3600.0
+    WEBHOOK_INBOX_PROCESSING_TIMEOUT_SECONDS: int = 300
+    
+    # Espelho local de pagamentos (stale-while-revalidate)
+    PAYMENT_MIRROR_TTL_SECONDS: int = 30
+    PAYMENT_MIRROR_MAX_STALE_SECONDS: int = 3600
+    PAYMENT_RECONCILE_INTERVAL_SECONDS: int = 60
+    
+    # Jobs periódicos
+    JOB_RUNNER_TICK_SECONDS: float = 30.0
+    SUBSCRIPTION_EXPIRY_INTERVAL_SECONDS: int = 300
+    SUBSCRIPTION_EXPIRING_NOTICE_INTERVAL_SECONDS: int = 3600
+    SUBSCRIPTION_EXPIRING_NOTICE_DAYS: int = 3
+    SUBSCRIPTION_NOTICE_CHUNK_SIZE: int = 500
+    SUBSCRIPTION_SNAPSHOT_INTERVAL_SECONDS: int = 3600
+    SUBSCRIPTION_STATS_CACHE_SECONDS: int = 60
+    GOAL_RECOMPUTE_INTERVAL_SECONDS: int = 86400
+    SESSION_ATTRIBUTION_INTERVAL_SECONDS: int = 86400
+    
+    # Stream ao vivo da sessão ativa (SSE)
+    LIVE_SESSION_HEARTBEAT_SECONDS: float = 15.0
+    LIVE_SESSION_QUEUE_SIZE: int = 16
+    LIVE_SESSION_MAX_CONNECTIONS: int = 5
+    
+    # Cache das análises (invalidado pela versão dos dados do usuário)
+    ANALYTICS_CACHE_SECONDS: int = 3600
+    
+    # Cache dos direitos de acesso por usuário (entitlements)
+    ENTITLEMENT_CACHE_SECONDS: int = 60
+    
+    # Administração (e-mails com acesso aos endpoints /admin)
+    ADMIN_EMAILS: list = []
+    
     model_config = ConfigDict(
         env_file=".env",
         case_sensitive=True
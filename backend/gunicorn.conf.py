@@ -0,0 +1,77 @@
+"""
+Configuração do gunicorn para produção
+
+Uso (a partir de backend/, onde este arquivo é lido automaticamente):
+    DEBUG=false gunicorn main:app
+
+Modelo de processos:
+- Um master e N workers uvicorn (uvicorn-worker); N = WEB_CONCURRENCY ou o
+  número de núcleos disponíveis para o processo
+- Event loop uvloop e parser httptools quando instalados (uvicorn[standard]);
+  sem eles (ex.: Windows) o worker cai para asyncio/h11
+- preload_app: o app é importado uma vez no master e os workers herdam a
+  memória por copy-on-write. O que é por processo é reiniciado no fork:
+  pool do SQLAlchemy (config/database.py) e caches TTLCache (utils/cache.py)
+- O stream ao vivo da sessão (/sessions/live) é por worker; escritas feitas
+  em outro worker chegam pelo heartbeat, que relê a sessão no banco
+- Os caches de configurações e de direitos de acesso (plano) também são por
+  worker; cada entrada é conferida contra a versão no banco na primeira
+  leitura de cada requisição, então a escrita feita em outro worker (ex.:
+  pagamento confirmado por webhook) vale a partir da requisição seguinte
+- O schema é conferido uma vez no master, antes de criar os workers; com
+  PAYMENTS_ENABLED o cliente do Asaas (httpx), que o app só importa sob
+  demanda, também é carregado no master para ser compartilhado
+
+Reinícios graciosos:
+- HUP: relê esta configuração e troca os workers aos poucos (os antigos
+  terminam as requisições em andamento, até graceful_timeout). Com preload_app
+  o código NÃO é recarregado pelo HUP.
+- Deploy de código novo sem derrubar conexões: USR2 no master (sobe um novo
+  master + workers com o código atual ao lado do antigo), WINCH no master
+  antigo (encerra seus workers) e, confirmado o novo, QUIT no antigo.
+- max_requests com jitter recicla os workers um de cada vez.
+
+Variáveis de ambiente: BIND (padrão 0.0.0.0:8000), WEB_CONCURRENCY,
+GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_MAX_REQUESTS.
+"""
+import os
+
+
+def _cpu_count() -> int:
+    """Núcleos que este processo pode usar (respeita taskset/cpuset)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY") or _cpu_count())
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = None
+errorlog = "-"
+loglevel = "info"
+
+
+def when_ready(server):
+    """Master pronto, antes do primeiro fork: cria/atualiza o schema uma vez"""
+    from config.database import ensure_schema
+    from config.settings import settings
+    if ensure_schema():
+        server.log.info("Schema do banco de dados criado/atualizado")
+    if settings.PAYMENTS_ENABLED:
+        import services.asaas_service  # noqa: F401 (carregado no lifespan de cada worker)
+    server.log.info(f"{workers} workers ({worker_class}), preload_app={preload_app}")
+
+
+def post_fork(server, worker):
+    """Pool do banco e caches já foram reiniciados pelos hooks de fork dos módulos"""
+    server.log.info(f"Worker {worker.pid} iniciado")
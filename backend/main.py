@@ -5,67 +5,80 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
 from contextlib import asynccontextmanager
+import asyncio
 
 from config.settings import settings
-from config.database import create_tables
+from config.database import ensure_schema
 from config.logging_config import logger
 from utils.exceptions import RiderFinanceException
 from utils.helpers import ResponseFormatter
 from utils.middleware import setup_middleware
 
-# Importar routers
+# Importar routers (pagamentos e demo são importados abaixo, conforme as settings)
 from api.auth import router as auth_router
 from api.categories import router as categories_router
 from api.transactions import router as transactions_router
-from api.payments import router as payments_router
-from api.webhooks import router as webhooks_router
 from api.goals import router as goals_router
 from api.dashboard import router as dashboard_router
-from api.demo import router as demo_router
+from api.settings import router as settings_router
+from api.admin import router as admin_router
+from api.usage import router as usage_router
+from api.sessions import router as sessions_router
+from api.analytics import router as analytics_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerencia o ciclo de vida da aplicação"""
     # Startup
     logger.info("Iniciando aplicação Rider Finance")
-    create_tables()
-    logger.info("Tabelas do banco de dados criadas/verificadas")
+    if ensure_schema():
+        logger.info("Schema do banco de dados criado/atualizado")
     
-    # Configurar webhooks do Asaas
-    try:
-        from services.asaas_service import AsaasService
-        from config.payments import PaymentConfig
+    asaas = None
+    webhook_setup = None
+    inbox_workers = []
+    if settings.PAYMENTS_ENABLED:
+        # Cliente HTTP compartilhado do Asaas (pool de conexões do processo)
+        from services.asaas_client import open_asaas_http_client
+        await open_asaas_http_client()
         
-        asaas = AsaasService()
+        from services.asaas_service import get_asaas_service
+        from services.webhook_registration_service import WebhookRegistrationService
+        asaas = get_asaas_service()
         
-        # Criar webhooks se não existirem
-        webhook_url = PaymentConfig.get_webhook_url("asaas/payment")
-        events = [
-            "PAYMENT_CREATED",
-            "PAYMENT_UPDATED", 
-            "PAYMENT_RECEIVED",
-            "PAYMENT_OVERDUE",
-            "PAYMENT_DELETED",
-            "PAYMENT_RESTORED"
-        ]
+        # Configurar webhooks do Asaas em segundo plano (não bloqueia a prontidão)
+        webhook_setup = asyncio.create_task(WebhookRegistrationService.reconcile(
+            asaas,
+            settings.ASAAS_WEBHOOK_SETUP_TIMEOUT_SECONDS,
+            settings.ASAAS_WEBHOOK_SETUP_LOCK_TTL_SECONDS
+        ))
         
-        existing_webhooks = await asaas.get_webhooks()
-        webhook_exists = any(w.get('url') == webhook_url for w in existing_webhooks)
-        
-        if not webhook_exists:
-            await asaas.create_webhook(webhook_url, events)
-            logger.info(f"Webhook criado: {webhook_url}")
-        else:
-            logger.info("Webhooks já configurados")
-            
-    except Exception as e:
-        logger.warning(f"Erro ao configurar webhooks: {str(e)}")
+        # Pool de workers do inbox de webhooks
+        from services.webhook_inbox_service import WebhookInboxService
+        inbox_workers = WebhookInboxService.start_workers(
+            settings.WEBHOOK_INBOX_WORKERS, settings.WEBHOOK_INBOX_POLL_SECONDS
+        )
+    
+    # Jobs periódicos (expiração de assinaturas, avisos, reconciliação de pagamentos)
+    from services.job_runner import build_default_runner
+    scheduler = asyncio.create_task(
+        build_default_runner(asaas).run_forever(settings.JOB_RUNNER_TICK_SECONDS)
+    )
     
     yield
     
     # Shutdown
     logger.info("Encerrando aplicação Rider Finance")
+    if webhook_setup:
+        webhook_setup.cancel()
+    for worker in inbox_workers:
+        worker.cancel()
+    scheduler.cancel()
+    if settings.PAYMENTS_ENABLED:
+        from services.asaas_client import close_asaas_http_client
+        await close_asaas_http_client()
 
 # Criação da aplicação
 app = FastAPI(
@@ -90,9 +103,20 @@ if not settings.DEBUG:
 async def rider_finance_exception_handler(request: Request, exc: RiderFinanceException):
     """Handler para exceções customizadas"""
     logger.warning(f"Exceção da aplicação: {exc.message} - {exc.code}")
+    retry_after = getattr(exc, "retry_after", None)
     return JSONResponse(
-        status_code=400,
-        content=ResponseFormatter.error(exc.message, exc.code, exc.details)
+        status_code=exc.status_code,
+        content=ResponseFormatter.error(exc.message, exc.code, exc.details),
+        headers={"Retry-After": str(retry_after)} if retry_after else None
+    )
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    """Handler para conflito de versão (concorrência otimista)"""
+    logger.warning(f"Conflito de versão: {str(exc)}")
+    return JSONResponse(
+        status_code=409,
+        content=ResponseFormatter.error("Registro alterado por outra requisição", "CONFLICT")
     )
 
 @app.exception_handler(404)
@@ -128,13 +152,24 @@ async def log_requests(request: Request, call_next):
 app.include_router(auth_router, prefix="/api")
 app.include_router(categories_router, prefix="/api")
 app.include_router(transactions_router, prefix="/api")
-app.include_router(payments_router, prefix="/api")
-app.include_router(webhooks_router, prefix="/api")
 app.include_router(goals_router, prefix="/api")
 app.include_router(dashboard_router, prefix="/api")
+app.include_router(settings_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
+app.include_router(usage_router, prefix="/api")
+app.include_router(sessions_router, prefix="/api")
+app.include_router(analytics_router, prefix="/api")
+
+# Pagamentos (Asaas); o cliente HTTP só é carregado no lifespan ou no primeiro uso
+if settings.PAYMENTS_ENABLED:
+    from api.payments import router as payments_router
+    from api.webhooks import router as webhooks_router
+    app.include_router(payments_router, prefix="/api")
+    app.include_router(webhooks_router, prefix="/api")
 
-# Router demo (apenas em desenvolvimento)
+# Router demo (apenas em desenvolvimento; nem é importado em produção)
 if settings.DEBUG:
+    from api.demo import router as demo_router
     app.include_router(demo_router, prefix="/api")
 
 # Rota de health check
@@ -164,6 +199,7 @@ def root():
         message="Bem-vindo à API do Rider Finance"
     )
 
+# Desenvolvimento; em produção: gunicorn main:app (ver gunicorn.conf.py)
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Date, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Date, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import declarative_base, relationship, validates
 from sqlalchemy.sql import func
 from datetime import datetime, timezone
@@ -39,6 +39,13 @@ class Usuario(Base):
     criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     atualizado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
+    # Controle de concorrência otimista: UPDATE ... WHERE versao = :lida. Exposta
+    # em para_dict e devolvida pelo cliente na edição (409 se mudou); os UPDATEs
+    # em lote (Core) incrementam a coluna explicitamente
+    versao = Column(Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {"version_id_col": versao, "eager_defaults": True}
+    
     # Relacionamentos
     categorias = relationship("Categoria", back_populates="usuario", cascade="all, delete-orphan")
     transacoes = relationship("Transacao", back_populates="usuario", cascade="all, delete-orphan")
@@ -84,7 +91,8 @@ class Usuario(Base):
             'status_pagamento': self.status_pagamento,
             'tipo_assinatura': self.tipo_assinatura,
             'trial_termina_em': self.trial_termina_em.isoformat() if self.trial_termina_em else None,
-            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'versao': self.versao
         }
 
 
@@ -105,6 +113,10 @@ class Categoria(Base):
     criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     atualizado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
+    versao = Column(Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {"version_id_col": versao, "eager_defaults": True}
+    
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="categorias")
     transacoes = relationship("Transacao", back_populates="categoria")
@@ -139,7 +151,8 @@ class Categoria(Base):
             'cor': self.cor,
             'eh_padrao': self.eh_padrao,
             'eh_ativa': self.eh_ativa,
-            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'versao': self.versao
         }
 
 
@@ -155,12 +168,18 @@ class Transacao(Base):
     descricao = Column(Text)
     tipo = Column(String(20), nullable=False)  # 'receita' ou 'despesa'
     data = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    # Data no fuso do usuário (fuso_horario), gravada junto com `data`: agrupamentos
+    # e filtros por dia/semana/mês viram range scans em ix_transacoes_usuario_data_local
+    data_local = Column(Date)
     
     # Campos para importação/integração
     origem = Column(String(50))  # 'uber', '99', 'indrive', 'manual', etc
     id_externo = Column(String(100))  # ID da transação na plataforma externa
     plataforma = Column(String(50))  # Plataforma de origem
     
+    # Sessão de trabalho cuja janela [inicio, fim] contém a transação
+    id_sessao = Column(String, ForeignKey("sessoes_trabalho.id"), index=True)
+    
     # Metadados
     observacoes = Column(Text)
     tags = Column(String(500))  # JSON array ou string separada por vírgulas
@@ -169,6 +188,17 @@ class Transacao(Base):
     criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     atualizado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
+    versao = Column(Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {"version_id_col": versao, "eager_defaults": True}
+    
+    __table_args__ = (
+        Index('ix_transacoes_usuario_data_local', 'id_usuario', 'data_local'),
+        # Listagem/busca ordenadas por data e filtros por período em UTC
+        Index('ix_transacoes_usuario_data', 'id_usuario', 'data'),
+        Index('ix_transacoes_categoria_data', 'id_categoria', 'data'),
+    )
+    
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="transacoes")
     categoria = relationship("Categoria", back_populates="transacoes")
@@ -202,13 +232,16 @@ class Transacao(Base):
             'descricao': self.descricao,
             'tipo': self.tipo,
             'data': self.data.isoformat() if self.data else None,
+            'data_local': self.data_local.isoformat() if self.data_local else None,
             'origem': self.origem,
             'id_externo': self.id_externo,
             'plataforma': self.plataforma,
+            'id_sessao': self.id_sessao,
             'observacoes': self.observacoes,
             'tags': self.tags,
             'criado_em': self.criado_em.isoformat() if self.criado_em else None,
-            'nome_categoria': self.categoria.nome if self.categoria else None
+            'nome_categoria': self.categoria.nome if self.categoria else None,
+            'versao': self.versao
         }
 
 
@@ -247,6 +280,15 @@ class SessaoTrabalho(Base):
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="sessoes_trabalho")
     
+    __table_args__ = (
+        # Sessão ativa do usuário: índice parcial só com as linhas eh_ativa
+        # (único: no máximo uma sessão ativa por usuário, como em start_session)
+        Index('ix_sessoes_trabalho_ativa', 'id_usuario', unique=True,
+              sqlite_where=eh_ativa == True, postgresql_where=eh_ativa == True),
+        # Análises por período: WHERE id_usuario = ? AND inicio BETWEEN ...
+        Index('ix_sessoes_trabalho_usuario_inicio', 'id_usuario', 'inicio'),
+    )
+    
     @validates('inicio')
     def validar_inicio(self, key, inicio):
         if not inicio:
@@ -312,6 +354,11 @@ class Meta(Base):
     data_inicio = Column(DateTime, nullable=False)
     data_fim = Column(DateTime)
     
+    # Vínculo com métrica (None = progresso manual); ver services/goal_progress_service.py
+    metrica = Column(String(30))  # 'lucro_liquido', 'receita', 'despesa', 'horas', 'corridas'
+    filtro_categoria = Column(String, ForeignKey("categorias.id"))
+    filtro_plataforma = Column(String(50))
+    
     # Status
     eh_ativa = Column(Boolean, default=True)
     eh_concluida = Column(Boolean, default=False)
@@ -325,9 +372,17 @@ class Meta(Base):
     criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     atualizado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
+    versao = Column(Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {"version_id_col": versao, "eager_defaults": True}
+    
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="metas")
     
+    __table_args__ = (
+        Index('ix_metas_usuario_metrica', 'id_usuario', 'metrica'),
+    )
+    
     @validates('titulo')
     def validar_titulo(self, key, titulo):
         if not titulo or len(titulo.strip()) < 3:
@@ -405,13 +460,42 @@ class Meta(Base):
             'eh_concluida': self.eh_concluida,
             'concluida_em': self.concluida_em.isoformat() if self.concluida_em else None,
             'porcentagem_progresso': self.calcular_porcentagem_progresso(),
-            'lembrete_ativo': self.lembrete_ativo
+            'lembrete_ativo': self.lembrete_ativo,
+            'metrica': self.metrica,
+            'filtro_categoria': self.filtro_categoria,
+            'filtro_plataforma': self.filtro_plataforma,
+            'versao': self.versao
         }
 
 
+def converter_valor_configuracao(valor: str, tipo_dado: str):
+    """Converte o valor textual de uma configuração para o tipo declarado"""
+    if not valor:
+        return None
+    
+    if tipo_dado == 'boolean':
+        return valor.lower() in ['true', '1', 'yes', 'sim']
+    elif tipo_dado == 'number':
+        try:
+            return float(valor) if '.' in valor else int(valor)
+        except ValueError:
+            return 0
+    elif tipo_dado == 'json':
+        try:
+            return json.loads(valor)
+        except json.JSONDecodeError:
+            return {}
+    else:
+        return valor
+
+
 class Configuracao(Base):
     """Modelo de configurações com validações embutidas"""
     __tablename__ = "configuracoes"
+    __table_args__ = (
+        # Índice (e não constraint) para que ensure_schema o crie em tabelas existentes
+        Index('uq_configuracoes_usuario_chave', 'id_usuario', 'chave', unique=True),
+    )
     
     id = Column(String, primary_key=True, default=generate_ulid)
     id_usuario = Column(String, ForeignKey("usuarios.id"), nullable=False)
@@ -449,24 +533,7 @@ class Configuracao(Base):
     
     def obter_valor_tipado(self):
         """Retorna valor convertido para o tipo correto"""
-        if not self.valor:
-            return None
-            
-        if self.tipo_dado == 'boolean':
-            return self.valor.lower() in ['true', '1', 'yes', 'sim']
-        elif self.tipo_dado == 'number':
-            try:
-                return float(self.valor) if '.' in self.valor else int(self.valor)
-            except ValueError:
-                return 0
-        elif self.tipo_dado == 'json':
-            try:
-                import json
-                return json.loads(self.valor)
-            except json.JSONDecodeError:
-                return {}
-        else:
-            return self.valor
+        return converter_valor_configuracao(self.valor, self.tipo_dado)
     
     def para_dict(self):
         return {
@@ -535,12 +602,24 @@ class Assinatura(Base):
     
     # Controle
     cancelada_em = Column(DateTime, nullable=True)
+    aviso_expiracao_em = Column(DateTime, nullable=True)  # último aviso de vencimento próximo
     criado_em = Column(DateTime, default=func.now())
     atualizado_em = Column(DateTime, default=func.now(), onupdate=func.now())
     
+    versao = Column(Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {"version_id_col": versao, "eager_defaults": True}
+    
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="assinaturas")
     
+    __table_args__ = (
+        # Expiração em lote: WHERE status = 'ACTIVE' AND periodo_fim <= agora
+        Index('ix_assinaturas_status_periodo_fim', 'status', 'periodo_fim'),
+        # Assinatura ativa do usuário (entitlements, auth)
+        Index('ix_assinaturas_usuario_status', 'id_usuario', 'status', 'periodo_fim'),
+    )
+    
     @validates('tipo_plano')
     def validate_tipo_plano(self, key, value):
         """Validar tipo do plano"""
@@ -574,4 +653,161 @@ class Assinatura(Base):
         return max(0, delta.days)
     
     def __repr__(self):
-        return f"<Assinatura(id={self.id}, usuario={self.id_usuario}, plano={self.tipo_plano}, status={self.status})>"
\ No newline at end of file
+        return f"<Assinatura(id={self.id}, usuario={self.id_usuario}, plano={self.tipo_plano}, status={self.status})>"
+
+# Status de cobrança que não mudam mais (exceto estornos raros)
+STATUS_PAGAMENTO_FINAIS = ['RECEIVED', 'CONFIRMED', 'RECEIVED_IN_CASH', 'REFUNDED', 'DELETED']
+
+class Pagamento(Base):
+    """Espelho local das cobranças do Asaas (atualizado por webhooks e reconciliação)"""
+    __tablename__ = "pagamentos"
+    
+    id = Column(String(100), primary_key=True)  # ID da cobrança no Asaas (pay_...)
+    id_usuario = Column(String, ForeignKey('usuarios.id'), nullable=True, index=True)
+    
+    # Integração Asaas
+    asaas_customer_id = Column(String(100), index=True)
+    asaas_subscription_id = Column(String(100), index=True)
+    
+    # Dados da cobrança
+    status = Column(String(40), nullable=False)
+    valor = Column(Float)
+    valor_liquido = Column(Float)
+    forma_pagamento = Column(String(30))
+    data_vencimento = Column(String(10))  # YYYY-MM-DD, como retornado pelo Asaas
+    data_pagamento = Column(String(10))
+    invoice_url = Column(String(500))
+    
+    # Controle de sincronização
+    sincronizado_em = Column(DateTime, nullable=False, index=True)
+    criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    atualizado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    
+    @property
+    def eh_final(self) -> bool:
+        """Indica se a cobrança está em um status final"""
+        return self.status in STATUS_PAGAMENTO_FINAIS
+    
+    def para_dict(self):
+        return {
+            'id': self.id,
+            'id_usuario': self.id_usuario,
+            'asaas_customer_id': self.asaas_customer_id,
+            'asaas_subscription_id': self.asaas_subscription_id,
+            'status': self.status,
+            'valor': self.valor,
+            'valor_liquido': self.valor_liquido,
+            'forma_pagamento': self.forma_pagamento,
+            'data_vencimento': self.data_vencimento,
+            'data_pagamento': self.data_pagamento,
+            'invoice_url': self.invoice_url,
+            'sincronizado_em': self.sincronizado_em.isoformat() if self.sincronizado_em else None
+        }
+    
+    def __repr__(self):
+        return f"<Pagamento(id={self.id}, status={self.status})>"
+
+class VersaoSchema(Base):
+    """Versão do schema aplicada ao banco (checagem barata no startup)"""
+    __tablename__ = "versao_schema"
+    
+    id = Column(Integer, primary_key=True, default=1)
+    versao = Column(Integer, nullable=False)
+    aplicado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    def __repr__(self):
+        return f"<VersaoSchema(versao={self.versao})>"
+
+class LockServico(Base):
+    """Lock com expiração para eleger um único worker em tarefas de fundo"""
+    __tablename__ = "locks_servico"
+    
+    nome = Column(String(100), primary_key=True)
+    dono = Column(String(200), nullable=False)
+    expira_em = Column(DateTime, nullable=False)
+    adquirido_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    def __repr__(self):
+        return f"<LockServico(nome={self.nome}, dono={self.dono}, expira_em={self.expira_em})>"
+
+# Estados do inbox de webhooks
+STATUS_WEBHOOK_INBOX = ['PENDING', 'PROCESSING', 'DONE', 'DEAD']
+
+class WebhookInbox(Base):
+    """Inbox append-only de webhooks recebidos (processados de forma assíncrona)"""
+    __tablename__ = "webhook_inbox"
+    
+    id = Column(String, primary_key=True, default=generate_ulid)
+    evento_id = Column(String(200), nullable=False, unique=True)  # ID do evento no Asaas (ou hash do corpo)
+    tipo = Column(String(20), nullable=False)  # payment, subscription
+    evento = Column(String(60))
+    chave_ordenacao = Column(String(100), nullable=False, index=True)  # assinatura (ou cobrança)
+    payload = Column(Text, nullable=False)
+    
+    # Processamento
+    status = Column(String(20), nullable=False, default='PENDING')
+    tentativas = Column(Integer, nullable=False, default=0)
+    proxima_tentativa_em = Column(DateTime, nullable=False)
+    processando_desde = Column(DateTime, nullable=True)
+    ultimo_erro = Column(Text, nullable=True)
+    recebido_em = Column(DateTime, nullable=False)
+    processado_em = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('ix_webhook_inbox_status_proxima', 'status', 'proxima_tentativa_em'),
+    )
+    
+    @validates('status')
+    def validate_status(self, key, status):
+        if status not in STATUS_WEBHOOK_INBOX:
+            raise ValueError(f"Status deve ser um de: {STATUS_WEBHOOK_INBOX}")
+        return status
+    
+    def __repr__(self):
+        return f"<WebhookInbox(id={self.id}, evento={self.evento}, status={self.status})>"
+
+class ExecucaoJob(Base):
+    """Estado persistente dos jobs periódicos (última execução por job)"""
+    __tablename__ = "execucoes_job"
+    
+    nome = Column(String(100), primary_key=True)
+    ultima_execucao_em = Column(DateTime, nullable=True)
+    ultimo_sucesso_em = Column(DateTime, nullable=True)
+    ultima_duracao_ms = Column(Integer, nullable=True)
+    ultimo_resultado = Column(Text, nullable=True)
+    ultimo_erro = Column(Text, nullable=True)
+    execucoes = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ExecucaoJob(nome={self.nome}, ultima_execucao_em={self.ultima_execucao_em})>"
+
+class SnapshotAssinatura(Base):
+    """Contagem diária de assinaturas por plano e status (histórico para o admin)"""
+    __tablename__ = "snapshots_assinaturas"
+    
+    id = Column(String, primary_key=True, default=generate_ulid)
+    data = Column(Date, nullable=False, index=True)
+    tipo_plano = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        UniqueConstraint('data', 'tipo_plano', 'status', name='uq_snapshots_assinaturas_data_plano_status'),
+    )
+    
+    def __repr__(self):
+        return f"<SnapshotAssinatura(data={self.data}, plano={self.tipo_plano}, status={self.status}, total={self.total})>"
+
+class UsoMensal(Base):
+    """Contador de uso por usuário, mês e recurso (cotas dos planos)"""
+    __tablename__ = "uso_mensal"
+    
+    id_usuario = Column(String, ForeignKey('usuarios.id'), primary_key=True)
+    mes = Column(String(7), primary_key=True)  # YYYY-MM
+    recurso = Column(String(50), primary_key=True)  # ex.: transacoes_mes
+    quantidade = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    
+    def __repr__(self):
+        return f"<UsoMensal(usuario={self.id_usuario}, mes={self.mes}, recurso={self.recurso}, quantidade={self.quantidade})>"
@@ -48,6 +48,7 @@ class UserProfile(BaseModel):
     tipo_assinatura: str
     trial_termina_em: Optional[datetime]
     criado_em: datetime
+    versao: int
     # Campos calculados
     total_spent: Optional[float] = 0.0
     total_earned: Optional[float] = 0.0
@@ -60,3 +61,4 @@ class UserUpdate(BaseModel):
     telefone: Optional[str] = Field(None, max_length=20)
     veiculo: Optional[str] = Field(None, max_length=200)
     data_inicio_atividade: Optional[datetime] = Field(None)
+    versao: Optional[int] = Field(None, description="Versão lida pelo cliente (409 se o perfil mudou)")
@@ -32,6 +32,7 @@ class CategoryUpdate(BaseModel):
     nome: Optional[str] = Field(None, min_length=2, max_length=100)
     icone: Optional[str] = None
     cor: Optional[str] = None
+    versao: Optional[int] = Field(None, description="Versão lida pelo cliente (409 se a categoria mudou)")
 
     @field_validator('cor')
     @classmethod
@@ -51,6 +52,7 @@ class CategoryResponse(BaseModel):
     eh_padrao: bool
     eh_ativa: bool
     criado_em: datetime
+    versao: int
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -1,11 +1,11 @@
 """
 Schemas Pydantic para metas/goals
 """
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
-from pydantic import BaseModel, Field, field_validator, ConfigDict, field_serializer
+from pydantic import BaseModel, Field, field_validator, model_validator, ConfigDict, field_serializer
 
 
 class TipoMeta(str, Enum):
@@ -26,6 +26,19 @@ class CategoriaMeta(str, Enum):
     OTHER = "other"
 
 
+class MetricaMeta(str, Enum):
+    """Métricas que atualizam o progresso da meta automaticamente"""
+    LUCRO_LIQUIDO = "lucro_liquido"
+    RECEITA = "receita"
+    DESPESA = "despesa"
+    HORAS = "horas"
+    CORRIDAS = "corridas"
+
+
+# Métricas de sessão não têm categoria de transação
+METRICAS_SEM_CATEGORIA = (MetricaMeta.HORAS, MetricaMeta.CORRIDAS)
+
+
 class StatusMeta(str, Enum):
     """Status de meta disponíveis (alinhados com frontend)"""
     ACTIVE = "active"
@@ -73,6 +86,19 @@ class MetaCreate(MetaBase):
         ge=0, 
         description="Valor atual já economizado"
     )
+    startDate: Optional[datetime] = Field(None, description="Início da janela da meta (padrão: agora)")
+    metric: Optional[MetricaMeta] = Field(None, description="Métrica que atualiza o progresso automaticamente")
+    metricCategoryId: Optional[str] = Field(None, description="Filtrar a métrica por categoria")
+    metricPlatform: Optional[str] = Field(None, max_length=50, description="Filtrar a métrica por plataforma")
+
+    @model_validator(mode='after')
+    def validate_metric_filters(self):
+        """Validar filtros da métrica"""
+        if (self.metricCategoryId or self.metricPlatform) and self.metric is None:
+            raise ValueError("Filtros de métrica exigem uma métrica")
+        if self.metricCategoryId and self.metric in METRICAS_SEM_CATEGORIA:
+            raise ValueError("Métricas de sessão não podem ser filtradas por categoria")
+        return self
 
     @field_validator('currentValue')
     @classmethod
@@ -93,6 +119,10 @@ class MetaUpdate(BaseModel):
     targetValue: Optional[Decimal] = Field(None, gt=0)
     deadline: Optional[datetime] = None
     status: Optional[StatusMeta] = None
+    metric: Optional[MetricaMeta] = None
+    metricCategoryId: Optional[str] = None
+    metricPlatform: Optional[str] = Field(None, max_length=50)
+    version: Optional[int] = Field(None, description="Versão lida pelo cliente (409 se a meta mudou)")
 
     @field_validator('title')
     @classmethod
@@ -135,6 +165,16 @@ class MetaProgressUpdate(BaseModel):
         return None
 
 
+class MetaProgressBatchItem(MetaProgressUpdate):
+    """Item da atualização de progresso em lote"""
+    goal_id: str = Field(..., description="ID da meta")
+
+
+class MetaProgressBatch(BaseModel):
+    """Schema para atualização de progresso de várias metas"""
+    items: List[MetaProgressBatchItem] = Field(..., min_length=1, max_length=100, description="Deltas por meta")
+
+
 class MetaResponse(BaseModel):
     """Schema de resposta para meta (alinhado com frontend)"""
     id: str
@@ -147,6 +187,7 @@ class MetaResponse(BaseModel):
     status: StatusMeta
     createdAt: datetime
     updatedAt: datetime
+    version: int
 
     model_config = ConfigDict(from_attributes=True)
     
@@ -178,5 +178,6 @@ class SubscriptionResponse(BaseModel):
     current_period_end: datetime = Field(alias="periodo_fim")
     created_at: datetime = Field(alias="criado_em")
     updated_at: datetime = Field(alias="atualizado_em")
+    version: int = Field(alias="versao")
     
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
@@ -0,0 +1,18 @@
+"""
+Schemas Pydantic para configurações do usuário
+"""
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict
+
+class SettingsBulkUpdate(BaseModel):
+    """Schema para atualização em lote de configurações"""
+    configuracoes: Dict[str, Any] = Field(..., description="Mapa chave -> valor das configurações")
+
+    @field_validator('configuracoes')
+    @classmethod
+    def validar_configuracoes(cls, v):
+        if not v:
+            raise ValueError("Informe ao menos uma configuração")
+        if len(v) > 100:
+            raise ValueError("Máximo de 100 configurações por requisição")
+        return v
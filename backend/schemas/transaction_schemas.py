@@ -32,6 +32,10 @@ class TransactionCreate(BaseModel):
             raise ValueError("Valor muito alto")
         return round(v, 2)
 
+class TransactionBulkCreate(BaseModel):
+    """Schema para importação de transações em lote"""
+    transacoes: List[TransactionCreate] = Field(..., min_length=1, max_length=1000, description="Transações a importar")
+
 class TransactionUpdate(BaseModel):
     """Schema para atualização de transação"""
     id_categoria: Optional[str] = None
@@ -40,6 +44,7 @@ class TransactionUpdate(BaseModel):
     data: Optional[datetime] = None
     observacoes: Optional[str] = None
     tags: Optional[List[str]] = None
+    versao: Optional[int] = Field(None, description="Versão lida pelo cliente (409 se a transação mudou)")
 
     @field_validator('valor')
     @classmethod
@@ -64,6 +69,7 @@ class TransactionResponse(BaseModel):
     tags: Optional[str]
     criado_em: datetime
     nome_categoria: Optional[str]
+    versao: int
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,37 @@
+"""
+Script para preencher a data local das transações (transacoes.data_local)
+
+Calcula a data de cada transação no fuso do usuário (`fuso_horario`, com
+Settings.TIMEZONE como padrão). As linhas sem data local são preenchidas
+automaticamente pelo ensure_schema ao atualizar o banco; com --todas o
+script recalcula também as já preenchidas.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import SessionLocal, ensure_schema
+from services.transaction_service import TransactionService
+from config.logging_config import logger
+
+def backfill_local_dates(todas: bool = False):
+    """Preenche `data_local` das transações de todos os usuários"""
+    db = SessionLocal()
+    try:
+        ensure_schema()
+        total = TransactionService.rebuild_local_dates(db, only_missing=not todas)
+        logger.info(f"✅ Datas locais preenchidas: {total} transações")
+        return True
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Erro ao preencher datas locais: {str(e)}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    success = backfill_local_dates(todas="--todas" in sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,36 @@
+"""
+Script para vincular transações às sessões de trabalho (transacoes.id_sessao)
+
+Refaz a atribuição de todo o histórico em uma passada e regrava os totais das
+sessões. Necessário uma vez após criar a coluna; o job `atribuir_sessoes` só
+revisita periodicamente o que mudou desde a sua última execução.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import SessionLocal, ensure_schema
+from services.session_attribution_service import SessionAttributionService
+from config.logging_config import logger
+
+def backfill_sessions():
+    """Vincula as transações de todos os usuários às suas sessões"""
+    db = SessionLocal()
+    try:
+        ensure_schema()
+        alterados = SessionAttributionService.backfill(db)
+        logger.info(f"✅ Transações vinculadas às sessões: {alterados} vínculos alterados")
+        return True
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Erro ao vincular transações às sessões: {str(e)}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    success = backfill_sessions()
+    sys.exit(0 if success else 1)
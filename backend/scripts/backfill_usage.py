@@ -0,0 +1,35 @@
+"""
+Script para preencher os contadores de uso mensal (uso_mensal)
+
+Recalcula a contagem de transações por usuário e mês a partir de `transacoes`.
+Necessário uma vez após criar a tabela; pode ser repetido para corrigir desvios.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import SessionLocal, ensure_schema
+from services.usage_service import UsageService
+from config.logging_config import logger
+
+def backfill_usage():
+    """Recalcula os contadores de transações de todos os usuários"""
+    db = SessionLocal()
+    try:
+        ensure_schema()
+        linhas = UsageService.rebuild_transaction_usage(db)
+        logger.info(f"✅ Contadores de uso preenchidos: {linhas} linhas")
+        return True
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Erro ao preencher contadores de uso: {str(e)}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    success = backfill_usage()
+    sys.exit(0 if success else 1)
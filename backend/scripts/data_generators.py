@@ -78,6 +78,110 @@ class DataGenerator:
             5: {'min': 3, 'max': 7, 'weight': 0.7},  # Sábado
             6: {'min': 1, 'max': 4, 'weight': 0.4}   # Domingo
         }
+        
+        # Observações de sessão por turno e por dia da semana
+        self.period_notes = {
+            0: ["Rush matinal", "Movimento bom manhã", "Trânsito intenso"],
+            1: ["Tarde tranquila", "Almoço movimentado", "Horário comercial"],
+            2: ["Noite agitada", "Happy hour", "Volta para casa"]
+        }
+        self.day_notes = [
+            "Segunda produtiva", "Terça normal", "Quarta equilibrada",
+            "Quinta movimentada", "Sexta intensa", "Sábado bom", "Domingo calmo"
+        ]
+        
+        # Descrições realistas por categoria
+        self.description_patterns = {
+            'receita': {
+                'Uber': [
+                    "Corrida para Centro", "Viagem Aeroporto", "Corrida Zona Sul",
+                    "Trajeto Empresarial", "Corrida Shopping", "Viagem Estação",
+                    "Corrida Hospital", "Trajeto Universidade", "Corrida Evento"
+                ],
+                '99': [
+                    "Corrida 99", "Viagem 99 Pop", "99 Confort", "Corrida Zona Norte",
+                    "Trajeto 99", "Viagem Centro", "Corrida Residencial"
+                ],
+                'iFood': [
+                    "Entrega Restaurante", "Delivery Fast Food", "Entrega Centro",
+                    "Delivery Shopping", "Entrega Residencial", "Pedido Express"
+                ],
+                'InDrive': [
+                    "Viagem InDrive", "Corrida Negociada", "Trajeto InDrive",
+                    "Corrida Personalizada", "Viagem Zona Oeste"
+                ],
+                'Outros Apps': [
+                    "Corrida Cabify", "Entrega Rappi", "Viagem 99Moto",
+                    "Delivery Uber Eats", "Corrida Beat"
+                ]
+            },
+            'despesa': {
+                'Combustível': [
+                    "Abastecimento", "Gasolina Comum", "Etanol", "Gasolina Aditivada",
+                    "Combustível Shell", "Posto Ipiranga", "Combustível BR"
+                ],
+                'Manutenção': [
+                    "Troca de Óleo", "Revisão", "Alinhamento", "Pneus Novos",
+                    "Freios", "Filtro de Ar", "Velas", "Mecânico", "Lavagem"
+                ],
+                'Alimentação': [
+                    "Lanche Rápido", "Almoço", "Café", "Água", "Refrigerante",
+                    "Sanduíche", "Refeição", "Lanchonete"
+                ],
+                'Pedágio': [
+                    "Pedágio Marginal", "Pedágio Raposo", "Pedágio Castello",
+                    "Pedágio Ayrton Senna", "Pedágio Régis Bittencourt"
+                ],
+                'Limpeza': [
+                    "Lavagem Simples", "Enceramento", "Aspiração", "Lavagem Completa",
+                    "Limpeza Interna", "Cera Automotiva"
+                ]
+            }
+        }
+        
+        # Modelos de metas com faixas de valor, progresso e prazo
+        self.goal_templates = [
+            {
+                'title': 'Reserva de Emergência',
+                'description': 'Fundo para emergências e imprevistos',
+                'category': 'emergency',
+                'target_range': (3000, 8000),
+                'progress_range': (0.4, 0.8),
+                'deadline_months': (6, 12)
+            },
+            {
+                'title': 'Novo Smartphone',
+                'description': 'Trocar celular para trabalho',
+                'category': 'purchase',
+                'target_range': (1500, 3500),
+                'progress_range': (0.2, 0.6),
+                'deadline_months': (3, 8)
+            },
+            {
+                'title': 'Fundo de Investimento',
+                'description': 'Investir para o futuro',
+                'category': 'investment',
+                'target_range': (10000, 20000),
+                'progress_range': (0.1, 0.4),
+                'deadline_months': (12, 24)
+            },
+            {
+                'title': 'Troca de Carro',
+                'description': 'Upgrade do veículo de trabalho',
+                'category': 'purchase',
+                'target_range': (15000, 35000),
+                'progress_range': (0.8, 1.0),
+                'deadline_months': (8, 18)
+            },
+            {
+                'title': 'Curso de Capacitação',
+                'description': 'Investir em educação e qualificação',
+                'category': 'education',
+                'target_range': (800, 2500),
+                'progress_range': (0.5, 1.0),
+                'deadline_months': (4, 10)
+            }
+        ]
     
     def generate_transactions_timeline(self, start_date: date, end_date: date, 
                                      categories: List[Dict]) -> List[Dict]:
@@ -211,54 +315,7 @@ class DataGenerator:
     def generate_realistic_description(self, categoria_nome: str, tipo: str) -> str:
         """Gerar descrição realista para transação"""
         
-        descriptions = {
-            'receita': {
-                'Uber': [
-                    "Corrida para Centro", "Viagem Aeroporto", "Corrida Zona Sul",
-                    "Trajeto Empresarial", "Corrida Shopping", "Viagem Estação",
-                    "Corrida Hospital", "Trajeto Universidade", "Corrida Evento"
-                ],
-                '99': [
-                    "Corrida 99", "Viagem 99 Pop", "99 Confort", "Corrida Zona Norte",
-                    "Trajeto 99", "Viagem Centro", "Corrida Residencial"
-                ],
-                'iFood': [
-                    "Entrega Restaurante", "Delivery Fast Food", "Entrega Centro",
-                    "Delivery Shopping", "Entrega Residencial", "Pedido Express"
-                ],
-                'InDrive': [
-                    "Viagem InDrive", "Corrida Negociada", "Trajeto InDrive",
-                    "Corrida Personalizada", "Viagem Zona Oeste"
-                ],
-                'Outros Apps': [
-                    "Corrida Cabify", "Entrega Rappi", "Viagem 99Moto",
-                    "Delivery Uber Eats", "Corrida Beat"
-                ]
-            },
-            'despesa': {
-                'Combustível': [
-                    "Abastecimento", "Gasolina Comum", "Etanol", "Gasolina Aditivada",
-                    "Combustível Shell", "Posto Ipiranga", "Combustível BR"
-                ],
-                'Manutenção': [
-                    "Troca de Óleo", "Revisão", "Alinhamento", "Pneus Novos",
-                    "Freios", "Filtro de Ar", "Velas", "Mecânico", "Lavagem"
-                ],
-                'Alimentação': [
-                    "Lanche Rápido", "Almoço", "Café", "Água", "Refrigerante",
-                    "Sanduíche", "Refeição", "Lanchonete"
-                ],
-                'Pedágio': [
-                    "Pedágio Marginal", "Pedágio Raposo", "Pedágio Castello",
-                    "Pedágio Ayrton Senna", "Pedágio Régis Bittencourt"
-                ],
-                'Limpeza': [
-                    "Lavagem Simples", "Enceramento", "Aspiração", "Lavagem Completa",
-                    "Limpeza Interna", "Cera Automotiva"
-                ]
-            }
-        }
-        
+        descriptions = self.description_patterns
         if tipo in descriptions and categoria_nome in descriptions[tipo]:
             return random.choice(descriptions[tipo][categoria_nome])
         else:
@@ -341,21 +398,8 @@ class DataGenerator:
         """Gerar observações para sessão"""
         notes = []
         
-        # Observações do período
-        period_notes = {
-            0: ["Rush matinal", "Movimento bom manhã", "Trânsito intenso"],
-            1: ["Tarde tranquila", "Almoço movimentado", "Horário comercial"],
-            2: ["Noite agitada", "Happy hour", "Volta para casa"]
-        }
-        
-        # Observações do dia
-        day_notes = [
-            "Segunda produtiva", "Terça normal", "Quarta equilibrada",
-            "Quinta movimentada", "Sexta intensa", "Sábado bom", "Domingo calmo"
-        ]
-        
-        notes.append(day_notes[weekday])
-        notes.append(random.choice(period_notes.get(session_num, ["Turno normal"])))
+        notes.append(self.day_notes[weekday])
+        notes.append(random.choice(self.period_notes.get(session_num, ["Turno normal"])))
         
         # Observações baseadas em performance
         if corridas >= 8:
@@ -368,51 +412,8 @@ class DataGenerator:
     def generate_goals(self) -> List[Dict]:
         """Gerar metas realistas com progresso variado"""
         
-        goals_templates = [
-            {
-                'title': 'Reserva de Emergência',
-                'description': 'Fundo para emergências e imprevistos',
-                'category': 'emergency',
-                'target_range': (3000, 8000),
-                'progress_range': (0.4, 0.8),
-                'deadline_months': (6, 12)
-            },
-            {
-                'title': 'Novo Smartphone',
-                'description': 'Trocar celular para trabalho',
-                'category': 'purchase',
-                'target_range': (1500, 3500),
-                'progress_range': (0.2, 0.6),
-                'deadline_months': (3, 8)
-            },
-            {
-                'title': 'Fundo de Investimento',
-                'description': 'Investir para o futuro',
-                'category': 'investment',
-                'target_range': (10000, 20000),
-                'progress_range': (0.1, 0.4),
-                'deadline_months': (12, 24)
-            },
-            {
-                'title': 'Troca de Carro',
-                'description': 'Upgrade do veículo de trabalho',
-                'category': 'purchase',
-                'target_range': (15000, 35000),
-                'progress_range': (0.8, 1.0),
-                'deadline_months': (8, 18)
-            },
-            {
-                'title': 'Curso de Capacitação',
-                'description': 'Investir em educação e qualificação',
-                'category': 'education',
-                'target_range': (800, 2500),
-                'progress_range': (0.5, 1.0),
-                'deadline_months': (4, 10)
-            }
-        ]
-        
         goals = []
-        for template in goals_templates:
+        for template in self.goal_templates:
             # Calcular valores
             target_value = random.uniform(*template['target_range'])
             progress_ratio = random.uniform(*template['progress_range'])
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Gerador de Dataset Sintético em Larga Escala
+============================================
+
+Cria N usuários × Y anos de transações, sessões de trabalho e metas para testes
+de carga e benchmarks. Usa os mesmos padrões do DataGenerator (valores,
+horários, frequências, descrições e modelos de metas), mas sorteia tudo de uma
+vez com NumPy para blocos de usuários e insere com `executemany` do Core em
+lotes grandes, sem passar pelos serviços (um commit por lote, não por linha).
+
+Uso:
+    python scripts/generate_dataset.py --users 2700 --years 2 --seed 42
+    python scripts/generate_dataset.py --users 50 --database-url sqlite:///./carga.db
+
+Características:
+- Reprodutível: mesma semente → mesmos usuários, IDs, valores e datas
+- Transações já vinculadas às sessões (id_sessao) e sessões com totais
+  coerentes (ganhos, gastos e corridas), como após o backfill de atribuição
+- `data_local` preenchida no fuso padrão (Settings.TIMEZONE)
+- Todos os usuários usam a senha de --password (hash calculado uma vez) e têm
+  assinatura premium ativa (sem limite mensal de transações)
+
+Com os padrões atuais são ~1.730 transações por usuário por ano; 10M de
+transações correspondem a ~5.800 usuários × 1 ano ou ~2.900 × 2 anos.
+"""
+
+import sys
+import os
+import argparse
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Adicionar o diretório pai ao path para importar módulos do projeto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.engine import Engine
+
+from config.database import engine as default_engine, ensure_schema
+from config.settings import settings
+from models import Usuario, Assinatura, Categoria, Transacao, SessaoTrabalho, Meta
+from scripts.data_generators import DataGenerator
+from utils.helpers import get_zoneinfo, hash_password
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Jornada das transações (6h-22h), como em DataGenerator.generate_realistic_time
+INICIO_JORNADA_MIN = 6 * 60
+DURACAO_JORNADA_MIN = 16 * 60
+
+# Turnos por dia: dias úteis 1-3 turnos, fins de semana 1-2
+TURNOS_DIA_UTIL = ([1, 2, 3], [0.2, 0.6, 0.2])
+TURNOS_FIM_DE_SEMANA = ([1, 2], [0.7, 0.3])
+
+# Intervalo mínimo entre turnos do mesmo dia (sessões não se sobrepõem)
+INTERVALO_TURNOS_SEG = 30 * 60
+
+# Origem das receitas por app; despesas são lançamentos manuais
+ORIGENS = {"Uber": "uber", "99": "99", "iFood": "ifood", "InDrive": "indrive", "Outros Apps": "outros"}
+
+SENHA_PADRAO = "dataset123"
+
+USUARIOS_POR_BLOCO = 100
+LOTE_PADRAO = 50_000
+
+
+def email_usuario(indice: int) -> str:
+    """Email do i-ésimo usuário gerado (usado pelo harness de carga para o login)"""
+    return f"rider{indice:07d}@dataset.riderfinance.local"
+
+
+class DatasetGenerator:
+    """Sorteio vetorizado de usuários, categorias, sessões, transações e metas"""
+
+    def __init__(self, seed: int, anos: float, fim: date, senha_hash: str):
+        self.rng = np.random.default_rng(seed)
+        self.padroes = DataGenerator()
+        self.senha_hash = senha_hash
+        self.proximo_id = int(datetime.combine(fim, datetime.min.time()).timestamp() * 1000)
+        # Registros "criados" no último dia do período (não depende da hora da execução)
+        self.criado_em = datetime.combine(fim, datetime.min.time())
+
+        # Dias do período e dia da semana (1970-01-01 foi quinta-feira)
+        self.fim = fim
+        self.inicio = fim - timedelta(days=max(int(round(anos * 365)), 1) - 1)
+        self.dias = np.arange(np.datetime64(self.inicio), np.datetime64(fim) + 1)
+        dias_epoch = self.dias.astype(np.int64)
+        self.dia_semana = (dias_epoch + 3) % 7
+        self.dia_local_seg = dias_epoch * 86400
+
+        # Offset UTC de cada dia no fuso padrão (meio-dia local; sem DST no padrão)
+        fuso = get_zoneinfo(settings.TIMEZONE)
+        self.offset_seg = np.array([
+            int(datetime.combine(d, datetime.min.time().replace(hour=12), fuso).utcoffset().total_seconds())
+            for d in self.dias.astype(date)
+        ], dtype=np.int64)
+
+        frequencia = self.padroes.frequency_patterns
+        self.peso_trabalho = np.array([frequencia[w]['weight'] for w in range(7)])
+        self.min_transacoes = np.array([frequencia[w]['min'] for w in range(7)])
+        self.max_transacoes = np.array([frequencia[w]['max'] for w in range(7)])
+
+        # Categorias: receitas e depois despesas, na ordem dos padrões de valor
+        self.categorias: List[Tuple[str, str]] = [
+            (nome, tipo) for tipo in ('receita', 'despesa') for nome in self.padroes.value_patterns[tipo]
+        ]
+        self.n_receitas = len(self.padroes.value_patterns['receita'])
+        faixas = np.array([self.padroes.value_patterns[tipo][nome] for nome, tipo in self.categorias], dtype=float)
+        self.valor_min, self.valor_max = faixas[:, 0], faixas[:, 1]
+
+        descricoes = [self.padroes.description_patterns[tipo][nome] for nome, tipo in self.categorias]
+        self.descricoes = np.array([d for lista in descricoes for d in lista], dtype=object)
+        self.n_descricoes = np.array([len(lista) for lista in descricoes])
+        self.inicio_descricoes = np.concatenate(([0], np.cumsum(self.n_descricoes)[:-1]))
+        self.origens = np.array([ORIGENS.get(nome, "manual") if tipo == 'receita' else "manual"
+                                 for nome, tipo in self.categorias], dtype=object)
+
+    def ids(self, quantidade: int) -> List[str]:
+        """
+        UUIDs no formato v7: prefixo de 48 bits crescente + bits sorteados
+
+        O prefixo é um contador (não a hora real), então os IDs saem em ordem de
+        inserção e a chave primária cresce sempre à direita da árvore B, em vez
+        de inserções aleatórias como com uuid4. Reprodutíveis pela semente.
+        """
+        brutos = self.rng.integers(0, 256, size=(quantidade, 16), dtype=np.uint8)
+        contador = self.proximo_id + np.arange(quantidade, dtype=np.uint64)
+        self.proximo_id += quantidade
+        brutos[:, :6] = contador.astype('>u8').view(np.uint8).reshape(-1, 8)[:, 2:]
+        brutos[:, 6] = (brutos[:, 6] & 0x0F) | 0x70
+        brutos[:, 8] = (brutos[:, 8] & 0x3F) | 0x80
+        h = brutos.tobytes().hex()
+        return [f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+                for i in range(0, len(h), 32)]
+
+    @staticmethod
+    def datetimes(segundos: np.ndarray) -> np.ndarray:
+        """Epoch em segundos → datetime64 (convertido para o driver na inserção)"""
+        return segundos.astype('datetime64[s]')
+
+    def constante(self, valor, quantidade: int) -> np.ndarray:
+        """Coluna com o mesmo valor em todas as linhas"""
+        if isinstance(valor, datetime):
+            return np.full(quantidade, np.datetime64(valor, 's'))
+        if isinstance(valor, date):
+            return np.full(quantidade, np.datetime64(valor, 'D'))
+        return [valor] * quantidade
+
+    def usuarios(self, primeiro: int, quantidade: int) -> Tuple[Dict[str, list], List[List[str]]]:
+        """Colunas dos usuários do bloco e IDs das categorias de cada um"""
+        indices = range(primeiro, primeiro + quantidade)
+        ids = self.ids(quantidade)
+        usuarios = {
+            "id": ids,
+            "nome_usuario": [f"rider_{i:07d}" for i in indices],
+            "email": [email_usuario(i) for i in indices],
+            "senha": [self.senha_hash] * quantidade,
+            "nome_completo": [f"Motorista {i}" for i in indices],
+            "data_inicio_atividade": self.constante(self.inicio, quantidade),
+            "eh_pago": [True] * quantidade,
+            "status_pagamento": ["ativo"] * quantidade,
+            "tipo_assinatura": ["premium"] * quantidade,
+            "criado_em": self.constante(self.criado_em, quantidade),
+            "atualizado_em": self.constante(self.criado_em, quantidade),
+            "versao": [1] * quantidade,
+        }
+        id_categorias = self.ids(quantidade * len(self.categorias))
+        por_usuario = [id_categorias[u * len(self.categorias):(u + 1) * len(self.categorias)]
+                       for u in range(quantidade)]
+        return usuarios, por_usuario
+
+    def assinaturas(self, usuarios: List[str]) -> Dict[str, list]:
+        """Assinatura premium ativa por usuário (vigência longa a partir do fim do período)"""
+        n = len(usuarios)
+        return {
+            "id": self.ids(n),
+            "id_usuario": usuarios,
+            "tipo_plano": ["premium"] * n,
+            "status": ["ACTIVE"] * n,
+            "asaas_customer_id": [f"cus_dataset_{u[-12:]}" for u in usuarios],
+            "periodo_inicio": self.constante(datetime.combine(self.inicio, datetime.min.time()), n),
+            "periodo_fim": self.constante(self.criado_em + timedelta(days=3650), n),
+            "criado_em": self.constante(self.criado_em, n),
+            "atualizado_em": self.constante(self.criado_em, n),
+            "versao": [1] * n,
+        }
+
+    def categorias_colunas(self, usuarios: List[str], categorias: List[List[str]]) -> Dict[str, list]:
+        """Colunas das categorias (as mesmas 10 do seed demo para cada usuário)"""
+        n = len(self.categorias)
+        total = len(usuarios) * n
+        return {
+            "id": [c for ids in categorias for c in ids],
+            "id_usuario": [u for u in usuarios for _ in range(n)],
+            "nome": [nome for _ in usuarios for nome, _ in self.categorias],
+            "tipo": [tipo for _ in usuarios for _, tipo in self.categorias],
+            "icone": ["fas fa-circle"] * total,
+            "cor": ["#6B7280"] * total,
+            "eh_padrao": [False] * total,
+            "eh_ativa": [True] * total,
+            "criado_em": self.constante(self.criado_em, total),
+            "atualizado_em": self.constante(self.criado_em, total),
+            "versao": [1] * total,
+        }
+
+    def sessoes(self, u_dia: np.ndarray, d_dia: np.ndarray) -> Dict[str, np.ndarray]:
+        """Turnos de cada dia trabalhado (padrões manhã/tarde/noite)"""
+        rng = self.rng
+        fim_de_semana = self.dia_semana[d_dia] >= 5
+        turnos = np.where(
+            fim_de_semana,
+            rng.choice(TURNOS_FIM_DE_SEMANA[0], size=len(d_dia), p=TURNOS_FIM_DE_SEMANA[1]),
+            rng.choice(TURNOS_DIA_UTIL[0], size=len(d_dia), p=TURNOS_DIA_UTIL[1]),
+        )
+        u = np.repeat(u_dia, turnos)
+        d = np.repeat(d_dia, turnos)
+        turno = np.arange(len(u)) - np.repeat(np.cumsum(turnos) - turnos, turnos)
+
+        padroes = [self.padroes.work_patterns[p] for p in ('morning', 'afternoon', 'evening')]
+        hora_min = np.array([p['start_range'][0] for p in padroes])[turno]
+        hora_max = np.array([p['start_range'][1] for p in padroes])[turno]
+        dur_min = np.array([p['duration_range'][0] for p in padroes])[turno]
+        dur_max = np.array([p['duration_range'][1] for p in padroes])[turno]
+
+        hora = rng.integers(hora_min, hora_max + 1)
+        horas = rng.uniform(dur_min, dur_max) * np.where(self.dia_semana[d] >= 5, 0.7, 1.0)
+        inicio = self.dia_local_seg[d] + hora * 3600
+        # Turno seguinte começa depois do anterior terminar
+        for _ in range(2):
+            anterior_fim = np.concatenate(([np.iinfo(np.int64).min], (inicio + horas * 3600)[:-1]))
+            mesmo_dia = np.concatenate(([False], (u[1:] == u[:-1]) & (d[1:] == d[:-1])))
+            inicio = np.where(mesmo_dia, np.maximum(inicio, np.ceil(anterior_fim).astype(np.int64) + INTERVALO_TURNOS_SEG), inicio)
+        duracao = np.round(horas * 3600).astype(np.int64)
+
+        utc = inicio - self.offset_seg[d]
+        return {"u": u, "d": d, "turno": turno, "inicio": utc, "fim": utc + duracao, "minutos": duracao // 60}
+
+    def transacoes(self, u_dia: np.ndarray, d_dia: np.ndarray) -> Dict[str, np.ndarray]:
+        """Transações de cada dia trabalhado (80% receitas, horários 6h-22h)"""
+        rng = self.rng
+        w = self.dia_semana[d_dia]
+        por_dia = rng.integers(self.min_transacoes[w], self.max_transacoes[w] + 1)
+        u = np.repeat(u_dia, por_dia)
+        d = np.repeat(d_dia, por_dia)
+        total = np.repeat(por_dia, por_dia)
+        indice = np.arange(len(u)) - np.repeat(np.cumsum(por_dia) - por_dia, por_dia)
+        n = len(u)
+
+        # Horário distribuído ao longo da jornada com ±30 min de variação
+        base = DURACAO_JORNADA_MIN / total * indice + rng.integers(-30, 31, size=n)
+        minutos = np.where(
+            total > 1,
+            np.clip(base, 0, DURACAO_JORNADA_MIN),
+            rng.integers(0, DURACAO_JORNADA_MIN + 1, size=n),
+        ).astype(np.int64)
+        local = self.dia_local_seg[d] + (INICIO_JORNADA_MIN + minutos) * 60 + rng.integers(0, 60, size=n)
+
+        receita = rng.random(n) < 0.8
+        n_despesas = len(self.categorias) - self.n_receitas
+        categoria = np.where(receita, rng.integers(0, self.n_receitas, size=n),
+                             self.n_receitas + rng.integers(0, n_despesas, size=n))
+
+        # Normal centrada na faixa com 99.7% dentro dela, limitada às bordas
+        minimo, maximo = self.valor_min[categoria], self.valor_max[categoria]
+        valor = np.round(np.clip(rng.normal((minimo + maximo) / 2, (maximo - minimo) / 6), minimo, maximo), 2)
+
+        descricao = self.inicio_descricoes[categoria] + (rng.random(n) * self.n_descricoes[categoria]).astype(np.int64)
+        return {
+            "u": u, "d": d, "data": local - self.offset_seg[d], "receita": receita,
+            "categoria": categoria, "valor": valor, "descricao": descricao,
+        }
+
+    @staticmethod
+    def atribuir(sessoes: Dict[str, np.ndarray], transacoes: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Índice da sessão que contém cada transação (-1 se nenhuma)
+
+        Sessões já estão em ordem de (usuário, início) e não se sobrepõem: a
+        candidata é a última sessão do usuário iniciada até o momento.
+        """
+        chave_sessao = sessoes["u"] * (1 << 40) + sessoes["inicio"]
+        chave = transacoes["u"] * (1 << 40) + transacoes["data"]
+        ordem = np.argsort(chave, kind="stable")
+        candidata = np.searchsorted(chave_sessao, chave[ordem], side="right") - 1
+        valida = candidata >= 0
+        candidata = np.where(valida, candidata, 0)
+        valida &= (sessoes["u"][candidata] == transacoes["u"][ordem]) & \
+                  (transacoes["data"][ordem] <= sessoes["fim"][candidata])
+        resultado = np.full(len(chave), -1, dtype=np.int64)
+        resultado[ordem] = np.where(valida, candidata, -1)
+        return resultado
+
+    def bloco(self, primeiro: int, quantidade: int) -> Dict[str, Dict[str, list]]:
+        """Gera as linhas de um bloco de usuários, coluna a coluna"""
+        usuarios, categorias = self.usuarios(primeiro, quantidade)
+        trabalha = self.rng.random((quantidade, len(self.dias))) < self.peso_trabalho[self.dia_semana]
+        u_dia, d_dia = np.nonzero(trabalha)
+
+        sessoes = self.sessoes(u_dia, d_dia)
+        transacoes = self.transacoes(u_dia, d_dia)
+        sessao = self.atribuir(sessoes, transacoes)
+
+        # Totais das sessões, como o backfill de atribuição calcularia
+        origem = self.origens[transacoes["categoria"]]
+        vinculada = sessao >= 0
+        receita = transacoes["receita"]
+        corrida = receita & (origem != "manual")
+        n_sessoes = len(sessoes["u"])
+        ganhos = np.bincount(sessao[vinculada & receita], transacoes["valor"][vinculada & receita], n_sessoes)
+        gastos = np.bincount(sessao[vinculada & ~receita], transacoes["valor"][vinculada & ~receita], n_sessoes)
+        corridas = np.bincount(sessao[vinculada & corrida], minlength=n_sessoes)
+
+        id_usuarios = np.array(usuarios["id"], dtype=object)
+        id_categorias = np.array(categorias, dtype=object)
+        id_sessoes = np.array(self.ids(n_sessoes) + [None], dtype=object)
+
+        inicio_sessao = self.datetimes(sessoes["inicio"])
+        notas_dia = np.array(self.padroes.day_notes, dtype=object)[self.dia_semana[sessoes["d"]]]
+        notas_turno = [self.padroes.period_notes[t] for t in range(3)]
+        escolha = (self.rng.random(n_sessoes) * 3).astype(np.int64)
+        sessoes_colunas = {
+            "id": id_sessoes[:-1].tolist(),
+            "id_usuario": id_usuarios[sessoes["u"]].tolist(),
+            "inicio": inicio_sessao,
+            "fim": self.datetimes(sessoes["fim"]),
+            "total_minutos": sessoes["minutos"].tolist(),
+            "total_corridas": corridas.tolist(),
+            "total_ganhos": np.round(ganhos, 2).tolist(),
+            "total_gastos": np.round(gastos, 2).tolist(),
+            "observacoes": [f"{dia} • {notas_turno[t][e]}" for dia, t, e in
+                            zip(notas_dia, sessoes["turno"].tolist(), escolha.tolist())],
+            "eh_ativa": [False] * n_sessoes,
+            "criado_em": inicio_sessao,
+            "atualizado_em": inicio_sessao,
+        }
+
+        datas = self.datetimes(transacoes["data"])
+        n = len(datas)
+        transacoes_colunas = {
+            "id": self.ids(n),
+            "id_usuario": id_usuarios[transacoes["u"]].tolist(),
+            "id_categoria": id_categorias[transacoes["u"], transacoes["categoria"]].tolist(),
+            "valor": transacoes["valor"].tolist(),
+            "descricao": self.descricoes[transacoes["descricao"]].tolist(),
+            "tipo": np.where(receita, "receita", "despesa").tolist(),
+            "data": datas,
+            "data_local": self.dias[transacoes["d"]],
+            "origem": origem.tolist(),
+            "id_sessao": id_sessoes[sessao].tolist(),
+            "criado_em": datas,
+            "atualizado_em": datas,
+            "versao": [1] * n,
+        }
+
+        return {
+            "usuarios": usuarios,
+            "assinaturas": self.assinaturas(usuarios["id"]),
+            "categorias": self.categorias_colunas(usuarios["id"], categorias),
+            "sessoes": sessoes_colunas,
+            "transacoes": transacoes_colunas,
+            "metas": self.metas(usuarios["id"]),
+        }
+
+    def metas(self, usuarios: List[str]) -> Dict[str, list]:
+        """Metas de cada usuário a partir dos modelos, com progresso sorteado"""
+        modelos = self.padroes.goal_templates
+        n = len(usuarios) * len(modelos)
+        modelo = np.tile(np.arange(len(modelos)), len(usuarios))
+        faixa = lambda chave: np.array([m[chave] for m in modelos], dtype=float)[modelo]
+        alvo_faixa, progresso_faixa, prazo_faixa = faixa('target_range'), faixa('progress_range'), faixa('deadline_months')
+
+        alvo = np.round(self.rng.uniform(alvo_faixa[:, 0], alvo_faixa[:, 1]), 2)
+        atual = np.round(alvo * self.rng.uniform(progresso_faixa[:, 0], progresso_faixa[:, 1]), 2)
+        meses = self.rng.integers(prazo_faixa[:, 0].astype(int), prazo_faixa[:, 1].astype(int) + 1)
+        prazo = [self.criado_em + timedelta(days=30 * int(m)) for m in meses]
+        return {
+            "id": self.ids(n),
+            "id_usuario": [u for u in usuarios for _ in modelos],
+            "titulo": [modelos[m]['title'] for m in modelo],
+            "descricao": [modelos[m]['description'] for m in modelo],
+            "tipo": ["mensal"] * n,
+            "categoria": [modelos[m]['category'] for m in modelo],
+            "valor_alvo": alvo.tolist(),
+            "valor_atual": atual.tolist(),
+            "unidade": ["BRL"] * n,
+            "data_inicio": self.constante(datetime.combine(self.inicio, datetime.min.time()), n),
+            "data_fim": np.array(prazo, dtype='datetime64[s]'),
+            "eh_ativa": [True] * n,
+            "eh_concluida": (atual >= alvo).tolist(),
+            "lembrete_ativo": [False] * n,
+            "criado_em": self.constante(self.criado_em, n),
+            "atualizado_em": self.constante(self.criado_em, n),
+            "versao": [1] * n,
+        }
+
+
+TABELAS = (
+    ("usuarios", Usuario.__table__),
+    ("assinaturas", Assinatura.__table__),
+    ("categorias", Categoria.__table__),
+    ("sessoes", SessaoTrabalho.__table__),
+    ("transacoes", Transacao.__table__),
+    ("metas", Meta.__table__),
+)
+
+
+def para_driver(coluna, dialeto: str) -> list:
+    """
+    Converte uma coluna para valores aceitos pelo driver
+
+    No SQLite datas e horários são gravados como texto no mesmo formato do
+    SQLAlchemy; a formatação vetorizada evita o processamento linha a linha.
+    """
+    if not isinstance(coluna, np.ndarray):
+        return coluna
+    if np.issubdtype(coluna.dtype, np.datetime64):
+        diario = np.datetime_data(coluna.dtype)[0] == 'D'
+        if dialeto == "sqlite":
+            if diario:
+                return np.datetime_as_string(coluna, unit='D').tolist()
+            return np.char.replace(np.datetime_as_string(coluna, unit='us'), 'T', ' ').tolist()
+        return coluna.astype(date if diario else datetime).tolist()
+    return coluna.tolist()
+
+
+def inserir(engine: Engine, tabela, colunas: Dict[str, list], lote: int) -> int:
+    """
+    Insere as colunas com executemany do driver em lotes de `lote` linhas
+
+    O INSERT é compilado uma vez pelo dialeto; os parâmetros vão em tuplas
+    (paramstyle posicional) ou dicionários (nomeado) sem passar pelos
+    processadores de tipo por linha do SQLAlchemy.
+    """
+    compilado = tabela.insert().compile(dialect=engine.dialect, column_keys=list(colunas))
+    dialeto = engine.dialect.name
+    valores = {nome: para_driver(coluna, dialeto) for nome, coluna in colunas.items()}
+    if compilado.positional:
+        parametros = list(zip(*(valores[nome] for nome in compilado.positiontup)))
+    else:
+        nomes = list(valores)
+        parametros = [dict(zip(nomes, linha)) for linha in zip(*valores.values())]
+
+    for i in range(0, len(parametros), lote):
+        with engine.begin() as conn:
+            conn.exec_driver_sql(str(compilado), parametros[i:i + lote])
+    return len(parametros)
+
+
+def adiar_indices(engine: Engine) -> list:
+    """
+    Remove os índices secundários de transações e sessões em uma carga inicial
+
+    Só quando `transacoes` está vazia: montar o índice uma vez no fim é bem mais
+    rápido do que mantê-lo a cada linha. Índices únicos (regras de integridade)
+    são mantidos. Retorna os índices a recriar.
+    """
+    with engine.connect() as conn:
+        if conn.execute(select(Transacao.id).limit(1)).first() is not None:
+            return []
+    indices = [indice for tabela in (Transacao.__table__, SessaoTrabalho.__table__)
+               for indice in tabela.indexes if not indice.unique]
+    for indice in indices:
+        indice.drop(engine, checkfirst=True)
+    return indices
+
+
+def configurar_sqlite(engine: Engine) -> None:
+    """PRAGMAs de carga em massa (somente nas conexões deste script)"""
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA cache_size=-262144")  # 256 MB
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+def generate_dataset(engine: Engine, users: int, years: float, seed: int,
+                     batch_size: int = LOTE_PADRAO, password: str = SENHA_PADRAO,
+                     fim: date = None) -> Dict[str, int]:
+    """Gera e insere o dataset; retorna o total de linhas por tabela"""
+    ensure_schema(engine)
+    gerador = DatasetGenerator(seed, years, fim or date.today(), hash_password(password))
+    totais = {nome: 0 for nome, _ in TABELAS}
+    inicio = time.perf_counter()
+
+    adiados = adiar_indices(engine)
+    try:
+        for primeiro in range(0, users, USUARIOS_POR_BLOCO):
+            bloco = gerador.bloco(primeiro, min(USUARIOS_POR_BLOCO, users - primeiro))
+            for nome, tabela in TABELAS:
+                totais[nome] += inserir(engine, tabela, bloco[nome], batch_size)
+            decorrido = time.perf_counter() - inicio
+            logger.info(f"👤 {min(primeiro + USUARIOS_POR_BLOCO, users)}/{users} usuários · "
+                        f"{totais['transacoes']:,} transações · {totais['transacoes'] / decorrido:,.0f}/s")
+    finally:
+        for indice in adiados:
+            logger.info(f"🗂️ Recriando índice {indice.name}...")
+            indice.create(engine, checkfirst=True)
+
+    return totais
+
+
+def main():
+    """Função principal do script"""
+    parser = argparse.ArgumentParser(description='Gerador de dataset sintético para carga e benchmarks')
+    parser.add_argument('--users', type=int, default=10, help='Número de usuários')
+    parser.add_argument('--years', type=float, default=2, help='Anos de histórico por usuário')
+    parser.add_argument('--seed', type=int, default=42, help='Semente (mesma semente → mesmo dataset)')
+    parser.add_argument('--batch-size', type=int, default=LOTE_PADRAO, help='Linhas por executemany')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                        help='Último dia do histórico (AAAA-MM-DD, padrão: hoje)')
+    parser.add_argument('--password', default=SENHA_PADRAO, help='Senha de todos os usuários gerados')
+    parser.add_argument('--database-url', default=None, help='Banco de destino (padrão: DATABASE_URL)')
+
+    args = parser.parse_args()
+
+    destino = create_engine(args.database_url) if args.database_url else default_engine
+    if destino.dialect.name == "sqlite":
+        configurar_sqlite(destino)
+
+    inicio = time.perf_counter()
+    try:
+        totais = generate_dataset(destino, args.users, args.years, args.seed,
+                                  args.batch_size, args.password, args.end_date)
+    except Exception as e:
+        logger.error(f"💥 Falha ao gerar dataset: {e}")
+        sys.exit(1)
+
+    logger.info(f"✅ Dataset gerado em {time.perf_counter() - inicio:.1f}s: " +
+                ", ".join(f"{nome}={total:,}" for nome, total in totais.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,15 @@ import os
 # Adicionar o diretório raiz ao path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from config.database import create_tables
+from config.database import ensure_schema, SCHEMA_VERSION
 from config.logging_config import logger
 
 def init_database():
     """Inicializa o banco de dados"""
     try:
         logger.info("Criando tabelas do banco de dados...")
-        create_tables()
+        if not ensure_schema():
+            logger.info(f"Schema já está na versão {SCHEMA_VERSION}")
         logger.info("✅ Banco de dados inicializado com sucesso!")
         return True
     except Exception as e:
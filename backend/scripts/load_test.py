@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Harness de Teste de Carga da API
+================================
+
+Simula motoristas usando a API ao mesmo tempo (asyncio + httpx) e mede vazão e
+latência por rota. Cada usuário virtual faz login no início do turno, carrega
+as categorias e depois alterna cenários sorteados pelo mix escolhido, com uma
+pausa aleatória entre eles.
+
+Uso:
+    # Semeia um banco novo com 50 usuários e roda 60s contra um uvicorn local
+    python scripts/load_test.py --database-url sqlite:///./carga.db --seed-users 50 \\
+        --transport uvicorn --vus 50 --duration 60 --output resultados/base.json
+
+    # Mesmo banco, app em processo (ASGI, sem rede), comparando com a execução anterior
+    python scripts/load_test.py --database-url sqlite:///./carga.db --users 50 \\
+        --vus 50 --duration 60 --compare resultados/base.json
+
+    # Servidor já em execução (ex.: gunicorn com vários workers)
+    python scripts/load_test.py --base-url http://127.0.0.1:8000 --users 50 --vus 100
+
+Transportes:
+- asgi:    app chamado em processo via httpx.ASGITransport (sem lifespan)
+- uvicorn: servidor uvicorn real em uma thread, com lifespan, em porta livre
+- --base-url: servidor externo; o banco é o configurado nele
+
+Cenários (ver MIXES):
+- dashboard:  polling de /dashboard/stats
+- criar_lote: rajada de lançamentos de corridas e gastos
+- listar:     paginação da listagem de transações
+- resumos:    resumos por período, categoria, dia e sessão
+
+O resultado (--output) é JSON com metadados da execução (commit, mix,
+transporte) e, por rota, requisições, erros, vazão e p50/p95/p99, para comparar
+execuções entre commits.
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import logging
+import random
+import socket
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+# Adicionar o diretório pai ao path para importar módulos do projeto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Pesos dos cenários em cada mix
+MIXES: Dict[str, Dict[str, int]] = {
+    "turno": {"dashboard": 40, "criar_lote": 15, "listar": 20, "resumos": 25},
+    "leitura": {"dashboard": 45, "listar": 30, "resumos": 25},
+    "escrita": {"dashboard": 10, "criar_lote": 70, "listar": 20},
+}
+
+PERCENTIS = (50, 95, 99)
+
+
+class Metricas:
+    """Latências e status por rota (rótulo "MÉTODO /rota", sem query string)"""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.status: Dict[str, Counter] = defaultdict(Counter)
+        self.inicio = time.perf_counter()
+        self.fim: Optional[float] = None
+
+    def registrar(self, rota: str, status: int, segundos: float) -> None:
+        self.latencias[rota].append(segundos)
+        self.status[rota][status] += 1
+
+    @staticmethod
+    def resumo(latencias: List[float], status: Counter, duracao: float) -> Dict[str, Any]:
+        """Estatísticas de um conjunto de requisições (latências em ms)"""
+        ms = np.asarray(latencias) * 1000
+        erros = sum(quantidade for codigo, quantidade in status.items() if codigo == 0 or codigo >= 400)
+        resultado = {
+            "requisicoes": len(ms),
+            "erros": erros,
+            "rps": round(len(ms) / duracao, 2) if duracao else 0.0,
+            "media_ms": round(float(ms.mean()), 2),
+            "max_ms": round(float(ms.max()), 2),
+            "status": {str(codigo): quantidade for codigo, quantidade in sorted(status.items())},
+        }
+        for p, valor in zip(PERCENTIS, np.percentile(ms, PERCENTIS)):
+            resultado[f"p{p}_ms"] = round(float(valor), 2)
+        return resultado
+
+    def relatorio(self) -> Dict[str, Any]:
+        """Totais e estatísticas por rota"""
+        duracao = (self.fim or time.perf_counter()) - self.inicio
+        rotas = {rota: self.resumo(lat, self.status[rota], duracao)
+                 for rota, lat in sorted(self.latencias.items())}
+        todas = [lat for lista in self.latencias.values() for lat in lista]
+        status_total = sum(self.status.values(), Counter())
+        return {
+            "duracao_s": round(duracao, 2),
+            "total": self.resumo(todas, status_total, duracao) if todas else {"requisicoes": 0},
+            "rotas": rotas,
+        }
+
+
+class Motorista:
+    """Usuário virtual: um motorista com o app aberto durante o turno"""
+
+    def __init__(self, cliente: httpx.AsyncClient, metricas: Metricas, login: str, senha: str,
+                 rng: random.Random):
+        self.cliente = cliente
+        self.metricas = metricas
+        self.login = login
+        self.senha = senha
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+        self.receitas: List[str] = []
+        self.despesas: List[str] = []
+
+    async def requisicao(self, metodo: str, rota: str, **kwargs) -> Optional[httpx.Response]:
+        """Executa e mede uma requisição; falhas de conexão contam como status 0"""
+        inicio = time.perf_counter()
+        try:
+            resposta = await self.cliente.request(metodo, rota, headers=self.headers, **kwargs)
+            status = resposta.status_code
+        except httpx.HTTPError:
+            resposta, status = None, 0
+        self.metricas.registrar(f"{metodo} {rota}", status, time.perf_counter() - inicio)
+        return resposta
+
+    async def iniciar_turno(self) -> bool:
+        """Login e carga das categorias (início do turno)"""
+        resposta = await self.requisicao("POST", "/api/auth/login", json={"login": self.login, "senha": self.senha})
+        if resposta is None or resposta.status_code != 200:
+            return False
+        token = resposta.json()["data"]["tokens"]["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+        resposta = await self.requisicao("GET", "/api/categories/")
+        if resposta is None or resposta.status_code != 200:
+            return False
+        for categoria in resposta.json()["data"]:
+            (self.receitas if categoria["tipo"] == "receita" else self.despesas).append(categoria["id"])
+        return bool(self.receitas)
+
+    async def dashboard(self) -> None:
+        """Polling do painel (2-4 atualizações seguidas)"""
+        for _ in range(self.rng.randint(2, 4)):
+            await self.requisicao("GET", "/api/dashboard/stats")
+
+    async def criar_lote(self) -> None:
+        """Rajada de lançamentos: corridas e, às vezes, um gasto"""
+        for _ in range(self.rng.randint(3, 8)):
+            despesa = self.despesas and self.rng.random() < 0.2
+            await self.requisicao("POST", "/api/transactions/", json={
+                "id_categoria": self.rng.choice(self.despesas if despesa else self.receitas),
+                "valor": round(self.rng.uniform(8, 80), 2),
+                "tipo": "despesa" if despesa else "receita",
+                "descricao": "Carga sintética",
+                "origem": "manual" if despesa else "uber",
+            })
+
+    async def listar(self) -> None:
+        """Paginação da listagem (1-3 páginas)"""
+        for pagina in range(1, self.rng.randint(1, 3) + 1):
+            await self.requisicao("GET", "/api/transactions/", params={"page": pagina, "per_page": 50})
+
+    async def resumos(self) -> None:
+        """Resumos do mês corrente, por categoria, diário e das sessões"""
+        inicio = (datetime.now(timezone.utc) - timedelta(days=30)).replace(tzinfo=None).isoformat()
+        periodo = {"data_inicio": inicio}
+        await self.requisicao("GET", "/api/transactions/summary/overview", params=periodo)
+        await self.requisicao("GET", "/api/transactions/summary/by-category", params=periodo)
+        await self.requisicao("GET", "/api/transactions/summary/daily", params=periodo)
+        await self.requisicao("GET", "/api/sessions/summary")
+
+    async def executar(self, fim: float, mix: Dict[str, int], pausa: float) -> None:
+        """Turno completo até o fim da janela de medição"""
+        if not await self.iniciar_turno():
+            logger.warning(f"Falha no início do turno de {self.login}")
+            return
+        cenarios, pesos = list(mix), list(mix.values())
+        while time.perf_counter() < fim:
+            await getattr(self, self.rng.choices(cenarios, pesos)[0])()
+            if pausa:
+                await asyncio.sleep(self.rng.expovariate(1 / pausa))
+
+
+async def executar_carga(cliente: httpx.AsyncClient, logins: List[str], senha: str, vus: int,
+                         duracao: float, mix: str, seed: int = 0, pausa: float = 0.5,
+                         rampa: float = 0.0, metricas: Optional[Metricas] = None) -> Dict[str, Any]:
+    """
+    Roda `vus` motoristas por `duracao` segundos e retorna o relatório
+
+    Os logins são distribuídos em rodízio; com `rampa` os turnos começam
+    espaçados ao longo desse intervalo em vez de todos de uma vez. Passe
+    `metricas` para acessar as latências brutas (ex.: juntar vários processos).
+    """
+    metricas = metricas or Metricas()
+    fim = time.perf_counter() + duracao
+
+    async def motorista(indice: int) -> None:
+        if rampa:
+            await asyncio.sleep(rampa * indice / vus)
+        await Motorista(cliente, metricas, logins[indice % len(logins)], senha,
+                        random.Random(seed * 100_003 + indice)).executar(fim, MIXES[mix], pausa)
+
+    await asyncio.gather(*(motorista(i) for i in range(vus)))
+    metricas.fim = time.perf_counter()
+    return metricas.relatorio()
+
+
+@asynccontextmanager
+async def cliente_asgi(vus: int):
+    """Cliente ligado ao app em processo (sem rede e sem lifespan)"""
+    from main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://harness",
+                                 timeout=60) as cliente:
+        yield cliente
+
+
+@asynccontextmanager
+async def cliente_uvicorn(vus: int):
+    """Servidor uvicorn real em uma thread (loop próprio) e cliente HTTP com pool"""
+    import uvicorn
+    from main import app
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        porta = s.getsockname()[1]
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning"))
+    thread = threading.Thread(target=servidor.run, daemon=True)
+    thread.start()
+    while not servidor.started:
+        if not thread.is_alive():
+            raise RuntimeError("Servidor uvicorn não iniciou")
+        await asyncio.sleep(0.05)
+    try:
+        async with cliente_externo(f"http://127.0.0.1:{porta}", vus) as cliente:
+            yield cliente
+    finally:
+        servidor.should_exit = True
+        thread.join(timeout=10)
+
+
+@asynccontextmanager
+async def cliente_externo(base_url: str, vus: int):
+    """Cliente HTTP com uma conexão por usuário virtual"""
+    limites = httpx.Limits(max_connections=vus, max_keepalive_connections=vus)
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=60) as cliente:
+        yield cliente
+
+
+def commit_atual() -> Optional[str]:
+    """Commit do código medido (None fora de um repositório git)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir_relatorio(relatorio: Dict[str, Any], base: Optional[Dict[str, Any]] = None) -> None:
+    """Tabela por rota; com `base`, variação de p95 e vazão em relação a ela"""
+    colunas = f"{'rota':<44} {'req':>7} {'erros':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(colunas + ("   Δp95     Δrps" if base else ""))
+    linhas = list(relatorio["rotas"].items()) + [("TOTAL", relatorio["total"])]
+    for rota, r in linhas:
+        if not r.get("requisicoes"):
+            continue
+        linha = (f"{rota:<44} {r['requisicoes']:>7} {r['erros']:>6} {r['rps']:>8.1f} "
+                 f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+        anterior = base and (base["total"] if rota == "TOTAL" else base["rotas"].get(rota))
+        if anterior and anterior.get("requisicoes"):
+            variacao = lambda atual, antes: f"{(atual - antes) / antes * 100:+7.1f}%" if antes else "      -"
+            linha += f" {variacao(r['p95_ms'], anterior['p95_ms'])} {variacao(r['rps'], anterior['rps'])}"
+        print(linha)
+
+
+def main():
+    """Função principal do script"""
+    parser = argparse.ArgumentParser(description='Teste de carga da API com mix de cenários')
+    parser.add_argument('--transport', choices=['asgi', 'uvicorn'], default='asgi',
+                        help='App em processo (asgi) ou servidor uvicorn local')
+    parser.add_argument('--base-url', default=None, help='Servidor já em execução (ignora --transport)')
+    parser.add_argument('--database-url', default=None, help='Banco usado pelo app em processo')
+    parser.add_argument('--seed-users', type=int, default=0,
+                        help='Gera este número de usuários no banco antes de medir (generate_dataset)')
+    parser.add_argument('--years', type=float, default=1, help='Anos de histórico ao semear')
+    parser.add_argument('--users', type=int, default=None, help='Usuários do dataset disponíveis para login')
+    parser.add_argument('--password', default=None, help='Senha dos usuários do dataset')
+    parser.add_argument('--vus', type=int, default=10, help='Usuários virtuais simultâneos')
+    parser.add_argument('--duration', type=float, default=30, help='Duração da medição em segundos')
+    parser.add_argument('--ramp-up', type=float, default=0, help='Segundos para todos os turnos começarem')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Pausa média entre cenários (s)')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='turno', help='Mix de cenários')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos sorteios')
+    parser.add_argument('--output', default=None, help='Arquivo JSON com o resultado')
+    parser.add_argument('--compare', default=None, help='Resultado JSON anterior para comparação')
+    parser.add_argument('--quiet', action='store_true', help='Silencia os logs INFO do app durante a medição')
+
+    args = parser.parse_args()
+
+    # O app lê DATABASE_URL ao ser importado
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from scripts.generate_dataset import SENHA_PADRAO, email_usuario
+
+    if args.seed_users:
+        from scripts.generate_dataset import configurar_sqlite, generate_dataset
+        from config.database import engine
+        if engine.dialect.name == "sqlite":
+            configurar_sqlite(engine)
+        logger.info(f"🌱 Semeando {args.seed_users} usuários × {args.years} anos...")
+        generate_dataset(engine, args.seed_users, args.years, args.seed)
+        engine.dispose()
+
+    if args.quiet:
+        for nome in ("rider_finance", "utils.middleware", "sqlalchemy.engine", "httpx", "uvicorn.access"):
+            logging.getLogger(nome).setLevel(logging.WARNING)
+
+    usuarios = args.users or args.seed_users or args.vus
+    logins = [email_usuario(i) for i in range(usuarios)]
+    senha = args.password or SENHA_PADRAO
+
+    async def rodar():
+        if args.base_url:
+            fabrica = cliente_externo(args.base_url, args.vus)
+        else:
+            fabrica = (cliente_uvicorn if args.transport == 'uvicorn' else cliente_asgi)(args.vus)
+        async with fabrica as cliente:
+            return await executar_carga(cliente, logins, senha, args.vus, args.duration, args.mix,
+                                        args.seed, args.think_time, args.ramp_up)
+
+    logger.info(f"🚗 {args.vus} motoristas · mix '{args.mix}' · {args.duration:.0f}s")
+    relatorio = asyncio.run(rodar())
+    relatorio["execucao"] = {
+        "commit": commit_atual(),
+        "data": datetime.now(timezone.utc).isoformat(),
+        "transporte": "externo" if args.base_url else args.transport,
+        "mix": args.mix,
+        "vus": args.vus,
+        "usuarios": usuarios,
+        "think_time_s": args.think_time,
+        "seed": args.seed,
+    }
+
+    base = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+    imprimir_relatorio(relatorio, base)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        logger.info(f"📄 Resultado salvo em {args.output}")
+
+    sys.exit(1 if relatorio["total"].get("erros") else 0)
+
+
+if __name__ == "__main__":
+    main()
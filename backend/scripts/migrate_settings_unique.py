@@ -0,0 +1,55 @@
+"""
+Script para garantir chave única (id_usuario, chave) em configuracoes
+
+Necessário para o upsert em lote de configurações (INSERT ... ON CONFLICT).
+O ensure_schema já faz o mesmo ao atualizar o banco; o script fica para
+aplicar a migração manualmente sem subir a aplicação.
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from config.database import engine
+from config.logging_config import logger
+
+def migrate_settings_unique():
+    """Remove duplicatas e cria índice único em configuracoes"""
+    try:
+        with engine.connect() as conn:
+            # Manter apenas a configuração mais recente de cada (usuário, chave)
+            result = conn.execute(text("""
+                DELETE FROM configuracoes
+                WHERE id NOT IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY id_usuario, chave
+                            ORDER BY atualizado_em DESC, criado_em DESC
+                        ) AS posicao
+                        FROM configuracoes
+                    ) ranqueadas
+                    WHERE posicao = 1
+                )
+            """))
+            logger.info(f"Duplicatas removidas: {result.rowcount}")
+            
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_configuracoes_usuario_chave "
+                "ON configuracoes (id_usuario, chave)"
+            ))
+            logger.info("✅ Índice único 'uq_configuracoes_usuario_chave' garantido!")
+            
+            conn.commit()
+            
+        logger.info("✅ Migração concluída com sucesso!")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Erro durante a migração: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = migrate_settings_unique()
+    sys.exit(0 if success else 1)
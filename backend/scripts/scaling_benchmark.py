@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Escalabilidade por Número de Workers
+=================================================
+
+Sobe o gunicorn de produção (gunicorn.conf.py) com 1, 2, 4... workers contra o
+mesmo banco, dispara a mesma carga do harness (scripts/load_test.py) em cada
+configuração e mostra a vazão, as latências e o ganho em relação a 1 worker.
+
+Uso:
+    # Semeia um banco novo com 50 usuários e mede 1, 2, 4 e 8 workers
+    python scripts/scaling_benchmark.py --database-url sqlite:///./escala.db --seed-users 50 \\
+        --workers 1,2,4,8 --vus 64 --duration 30 --output resultados/escala.json
+
+    # Banco já semeado, workers de 1 até o número de núcleos
+    python scripts/scaling_benchmark.py --database-url sqlite:///./escala.db --users 50
+
+A carga é gerada por --clients processos (asyncio + httpx), cada um com
+vus/clients motoristas; as latências de todos são juntadas antes dos
+percentis. Servidor e clientes dividem a mesma máquina: para medir N workers
+deixe núcleos livres para os clientes (ou rode com taskset). Com think time 0
+(padrão) o teste mede vazão máxima, não comportamento de usuários reais.
+
+Requer Linux/macOS (gunicorn). Logs do servidor: logs/scaling_benchmark.log.
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import socket
+import subprocess
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+# Adicionar o diretório pai ao path para importar módulos do projeto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.load_test import MIXES, Metricas, cliente_externo, commit_atual, executar_carga
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def nucleos() -> int:
+    """Núcleos disponíveis para este processo"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(workers: int, porta: int, database_url: str, log) -> subprocess.Popen:
+    """Sobe o gunicorn com a configuração de produção e espera o /health"""
+    env = dict(os.environ, DATABASE_URL=database_url, DEBUG="false",
+               WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{porta}")
+    processo = subprocess.Popen([sys.executable, "-m", "gunicorn", "main:app"],
+                                cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"gunicorn encerrou (código {processo.returncode}); veja {log.name}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{porta}/health", timeout=1).status_code == 200:
+                return processo
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    parar_servidor(processo)
+    raise RuntimeError(f"gunicorn não respondeu em 60s; veja {log.name}")
+
+
+def parar_servidor(processo: subprocess.Popen) -> None:
+    """Encerramento gracioso (SIGTERM); mata após o timeout"""
+    processo.send_signal(signal.SIGTERM)
+    try:
+        processo.wait(timeout=40)
+    except subprocess.TimeoutExpired:
+        processo.kill()
+        processo.wait()
+
+
+def rodar_cliente(base_url: str, logins: List[str], senha: str, vus: int, duracao: float,
+                  mix: str, seed: int, pausa: float):
+    """Processo gerador de carga; retorna as latências brutas para juntar"""
+    async def rodar():
+        metricas = Metricas()
+        async with cliente_externo(base_url, vus) as cliente:
+            await executar_carga(cliente, logins, senha, vus, duracao, mix, seed, pausa, metricas=metricas)
+        return metricas
+
+    metricas = asyncio.run(rodar())
+    return dict(metricas.latencias), dict(metricas.status), metricas.fim - metricas.inicio
+
+
+def medir(base_url: str, logins: List[str], senha: str, vus: int, clientes: int, duracao: float,
+          mix: str, seed: int, pausa: float) -> Dict[str, Any]:
+    """Carga distribuída em `clientes` processos; relatório único"""
+    por_cliente = [vus // clientes + (1 if i < vus % clientes else 0) for i in range(clientes)]
+    with ProcessPoolExecutor(max_workers=clientes) as pool:
+        futuros = [
+            pool.submit(rodar_cliente, base_url, logins[i::clientes] or logins, senha, n,
+                        duracao, mix, seed + i * 1_000, pausa)
+            for i, n in enumerate(por_cliente) if n
+        ]
+        resultados = [f.result() for f in futuros]
+
+    juntas = Metricas()
+    juntas.latencias, juntas.status = defaultdict(list), defaultdict(Counter)
+    for latencias, status, _ in resultados:
+        for rota, valores in latencias.items():
+            juntas.latencias[rota].extend(valores)
+            juntas.status[rota].update(status[rota])
+    juntas.fim = juntas.inicio + max(segundos for _, _, segundos in resultados)
+    return juntas.relatorio()
+
+
+def imprimir_tabela(execucoes: List[Dict[str, Any]]) -> None:
+    """Vazão e latência por número de workers, com ganho sobre a primeira linha"""
+    print(f"{'workers':>7} {'req':>8} {'erros':>6} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'ganho':>7} {'eficiência':>10}")
+    base = execucoes[0]["total"].get("rps") or 0
+    for execucao in execucoes:
+        t, workers = execucao["total"], execucao["workers"]
+        if not t.get("requisicoes"):
+            print(f"{workers:>7} {'sem requisições':>8}")
+            continue
+        ganho = t["rps"] / base if base else 0.0
+        eficiencia = ganho / (workers / execucoes[0]["workers"])
+        print(f"{workers:>7} {t['requisicoes']:>8} {t['erros']:>6} {t['rps']:>9.1f} {t['p50_ms']:>8.1f} "
+              f"{t['p95_ms']:>8.1f} {t['p99_ms']:>8.1f} {ganho:>6.2f}x {eficiencia:>9.0%}")
+
+
+def main():
+    """Função principal do script"""
+    parser = argparse.ArgumentParser(description='Vazão da API por número de workers do gunicorn')
+    parser.add_argument('--database-url', default='sqlite:///./escala.db', help='Banco usado pelo servidor')
+    parser.add_argument('--seed-users', type=int, default=0,
+                        help='Gera este número de usuários no banco antes de medir (generate_dataset)')
+    parser.add_argument('--years', type=float, default=1, help='Anos de histórico ao semear')
+    parser.add_argument('--users', type=int, default=None, help='Usuários do dataset disponíveis para login')
+    parser.add_argument('--password', default=None, help='Senha dos usuários do dataset')
+    parser.add_argument('--workers', default=None,
+                        help='Números de workers separados por vírgula (padrão: 1, 2, 4... até os núcleos)')
+    parser.add_argument('--clients', type=int, default=None,
+                        help='Processos geradores de carga (padrão: metade dos núcleos, mínimo 1)')
+    parser.add_argument('--vus', type=int, default=64, help='Usuários virtuais simultâneos (total)')
+    parser.add_argument('--duration', type=float, default=20, help='Duração de cada medição em segundos')
+    parser.add_argument('--warmup', type=float, default=3, help='Aquecimento antes de cada medição (s)')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Pausa média entre cenários (s)')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='leitura', help='Mix de cenários')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos sorteios')
+    parser.add_argument('--output', default=None, help='Arquivo JSON com o resultado')
+
+    args = parser.parse_args()
+
+    from scripts.generate_dataset import SENHA_PADRAO, email_usuario
+
+    if args.seed_users:
+        from sqlalchemy import create_engine
+        from scripts.generate_dataset import configurar_sqlite, generate_dataset
+        engine = create_engine(args.database_url)
+        if engine.dialect.name == "sqlite":
+            configurar_sqlite(engine)
+        logger.info(f"🌱 Semeando {args.seed_users} usuários × {args.years} anos...")
+        generate_dataset(engine, args.seed_users, args.years, args.seed)
+        engine.dispose()
+
+    if args.workers:
+        contagens = [int(n) for n in args.workers.split(",") if n.strip()]
+    else:
+        contagens = [1]
+        while contagens[-1] * 2 <= nucleos():
+            contagens.append(contagens[-1] * 2)
+        if contagens[-1] != nucleos():
+            contagens.append(nucleos())
+    clientes = args.clients or max(1, nucleos() // 2)
+
+    usuarios = args.users or args.seed_users or args.vus
+    logins = [email_usuario(i) for i in range(usuarios)]
+    senha = args.password or SENHA_PADRAO
+
+    os.makedirs(os.path.join(BACKEND_DIR, "logs"), exist_ok=True)
+    execucoes = []
+    with open(os.path.join(BACKEND_DIR, "logs", "scaling_benchmark.log"), "a", encoding="utf-8") as log:
+        for workers in contagens:
+            porta = porta_livre()
+            logger.info(f"🚀 {workers} worker(s) · {args.vus} motoristas em {clientes} cliente(s) · "
+                        f"mix '{args.mix}' · {args.duration:.0f}s")
+            servidor = iniciar_servidor(workers, porta, args.database_url, log)
+            try:
+                base_url = f"http://127.0.0.1:{porta}"
+                if args.warmup:
+                    medir(base_url, logins, senha, args.vus, clientes, args.warmup, args.mix, args.seed,
+                          args.think_time)
+                relatorio = medir(base_url, logins, senha, args.vus, clientes, args.duration, args.mix,
+                                  args.seed, args.think_time)
+            finally:
+                parar_servidor(servidor)
+            execucoes.append({"workers": workers, "total": relatorio["total"], "rotas": relatorio["rotas"]})
+
+    imprimir_tabela(execucoes)
+
+    if args.output:
+        resultado = {
+            "execucao": {
+                "commit": commit_atual(),
+                "data": datetime.now(timezone.utc).isoformat(),
+                "nucleos": nucleos(),
+                "clientes": clientes,
+                "mix": args.mix,
+                "vus": args.vus,
+                "usuarios": usuarios,
+                "think_time_s": args.think_time,
+                "duracao_s": args.duration,
+                "seed": args.seed,
+            },
+            "workers": execucoes,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        logger.info(f"📄 Resultado salvo em {args.output}")
+
+    sys.exit(1 if any(e["total"].get("erros") for e in execucoes) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Serviço de análises vetorizadas (NumPy)
+
+O heatmap de ganhos lê as receitas e as janelas das sessões como colunas
+(epoch em segundos calculado no banco) e agrega tudo com NumPy por célula
+(dia da semana × hora) no fuso do usuário. O resultado fica em cache por versão
+dos dados do usuário: uma query de impressão digital (contagens, somas e
+último `atualizado_em`) decide se o cálculo precisa ser refeito.
+
+A comparação de períodos agrupa transações e sessões pelo início do período
+em uma única query (UNION ALL + GROUP BY), independente do número de períodos.
+
+As colunas DateTime sem fuso são tratadas como UTC.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import case, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from models import SessaoTrabalho, Transacao
+from services.session_attribution_service import CORRIDA
+from services.session_service import DIAS_SEMANA
+from services.settings_service import SettingsService
+from utils.cache import TTLCache
+from utils.helpers import get_period_dates, get_zoneinfo, now_utc, to_local
+from utils.sql import epoch_expr, period_start_expr, shift_seconds_expr
+from config.settings import settings
+
+# Granularidade da API -> tipo de período de get_period_dates
+GRANULARIDADES = {"day": "diaria", "week": "semanal", "month": "mensal"}
+
+_heatmap_cache = TTLCache(ttl_seconds=settings.ANALYTICS_CACHE_SECONDS)
+
+HORA = 3600
+DIA = 24 * HORA
+SEMANA = 7 * DIA
+CELULAS = 7 * 24
+
+# 1970-01-01 foi uma quinta-feira: somar 4 dias alinha o epoch a um domingo 00:00
+_DESLOCAMENTO_DOMINGO = 4 * DIA
+
+
+def _offset(fuso: ZoneInfo, epoch: float) -> int:
+    """Deslocamento do fuso (segundos) em um instante UTC"""
+    return int(datetime.fromtimestamp(epoch, fuso).utcoffset().total_seconds())
+
+
+def local_seconds(epochs: np.ndarray, fuso: ZoneInfo) -> np.ndarray:
+    """
+    Converte instantes UTC (epoch) para segundos no horário local
+
+    O deslocamento é consultado uma vez por dia distinto; só os dias com
+    mudança de horário (início e fim do dia com deslocamentos diferentes) são
+    resolvidos instante a instante.
+    """
+    if epochs.size == 0:
+        return epochs.astype(np.int64)
+    dias, inverso = np.unique(epochs // DIA, return_inverse=True)
+    inicio = np.array([_offset(fuso, d * DIA) for d in dias.tolist()], dtype=np.int64)
+    fim = np.array([_offset(fuso, d * DIA + DIA - 1) for d in dias.tolist()], dtype=np.int64)
+    offsets = inicio[inverso]
+
+    transicao = (inicio != fim)[inverso]
+    if transicao.any():
+        offsets[transicao] = [_offset(fuso, e) for e in epochs[transicao].tolist()]
+    return epochs.astype(np.int64) + offsets
+
+
+def _celula(locais: np.ndarray) -> np.ndarray:
+    """Índice da célula (dia 0 = domingo) * 24 + hora de cada instante local"""
+    return ((locais + _DESLOCAMENTO_DOMINGO) // HORA) % CELULAS
+
+
+def _variacao(atual: float, anterior: float) -> Dict[str, Optional[float]]:
+    """Diferença absoluta e percentual em relação ao período anterior"""
+    return {
+        "absoluta": round(atual - anterior, 2),
+        "percentual": round((atual - anterior) / abs(anterior) * 100, 1) if anterior else None
+    }
+
+
+def distribuir_horas(inicios: np.ndarray, fins: np.ndarray) -> np.ndarray:
+    """
+    Horas trabalhadas em cada célula, repartidas proporcionalmente
+
+    Para cada célula b, o tempo que um intervalo [s, e) passa nela é G_b(e) -
+    G_b(s), com G_b(t) = semanas completas * 1h + sobreposição da semana
+    corrente com a hora b. Tudo em uma matriz (sessões × 168).
+    """
+    if inicios.size == 0:
+        return np.zeros(CELULAS)
+    offsets = np.arange(CELULAS, dtype=np.int64) * HORA
+
+    def acumulado(t: np.ndarray) -> np.ndarray:
+        t = (t + _DESLOCAMENTO_DOMINGO)[:, None]
+        return (t // SEMANA) * HORA + np.clip(t % SEMANA - offsets, 0, HORA)
+
+    segundos = acumulado(fins) - acumulado(inicios)
+    return segundos.sum(axis=0) / HORA
+
+
+class AnalyticsService:
+    """Análises agregadas com NumPy"""
+
+    @staticmethod
+    def _fingerprint(
+        db: Session,
+        user_id: str,
+        data_inicio: Optional[datetime],
+        data_fim: Optional[datetime]
+    ) -> Tuple:
+        """Versão dos dados do usuário em uma única query"""
+        receitas = (Transacao.id_usuario == user_id, Transacao.tipo == 'receita')
+        sessoes = (SessaoTrabalho.id_usuario == user_id, SessaoTrabalho.eh_ativa == False)
+        # Um SELECT de subqueries escalares (sem FROM cruzado entre as tabelas)
+        versao = tuple(db.execute(select(*(
+            select(agregado).where(*filtros).scalar_subquery()
+            for agregado, filtros in (
+                (func.count(Transacao.id), receitas),
+                (func.sum(Transacao.valor), receitas),
+                (func.max(Transacao.atualizado_em), receitas),
+                (func.count(SessaoTrabalho.id), sessoes),
+                (func.sum(SessaoTrabalho.total_minutos), sessoes),
+                (func.max(SessaoTrabalho.atualizado_em), sessoes),
+            )
+        ))).one())
+        fuso = SettingsService.get_setting_value(db, user_id, "fuso_horario")
+        return (user_id, fuso, data_inicio, data_fim) + versao
+
+    @staticmethod
+    def get_earnings_heatmap(
+        db: Session,
+        user_id: str,
+        data_inicio: Optional[datetime] = None,
+        data_fim: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Heatmap de R$/hora e corridas/hora por dia da semana × hora
+
+        Ganhos e corridas vêm das receitas; horas vêm das sessões finalizadas,
+        repartidas entre as células que cada sessão atravessa.
+        """
+        chave = AnalyticsService._fingerprint(db, user_id, data_inicio, data_fim)
+        return _heatmap_cache.get_or_set(
+            chave, lambda: AnalyticsService._compute_heatmap(db, user_id, chave[1], data_inicio, data_fim)
+        )
+
+    @staticmethod
+    def _compute_heatmap(
+        db: Session,
+        user_id: str,
+        nome_fuso: Optional[str],
+        data_inicio: Optional[datetime],
+        data_fim: Optional[datetime]
+    ) -> Dict[str, Any]:
+        """Lê as colunas e agrega (sem cache)"""
+        fuso = get_zoneinfo(nome_fuso)
+
+        filtros_t = [Transacao.id_usuario == user_id, Transacao.tipo == 'receita']
+        filtros_s = [SessaoTrabalho.id_usuario == user_id, SessaoTrabalho.eh_ativa == False,
+                     SessaoTrabalho.fim.isnot(None)]
+        if data_inicio:
+            filtros_t.append(Transacao.data >= data_inicio)
+            filtros_s.append(SessaoTrabalho.inicio >= data_inicio)
+        if data_fim:
+            filtros_t.append(Transacao.data <= data_fim)
+            filtros_s.append(SessaoTrabalho.inicio <= data_fim)
+
+        receitas = np.array(db.execute(
+            select(epoch_expr(db, Transacao.data), Transacao.valor, CORRIDA).where(*filtros_t)
+        ).all(), dtype=np.float64).reshape(-1, 3)
+        sessoes = np.array(db.execute(
+            select(epoch_expr(db, SessaoTrabalho.inicio), epoch_expr(db, SessaoTrabalho.fim)).where(*filtros_s)
+        ).all(), dtype=np.float64).reshape(-1, 2)
+
+        celulas = _celula(local_seconds(np.rint(receitas[:, 0]).astype(np.int64), fuso))
+        ganhos = np.bincount(celulas, weights=receitas[:, 1], minlength=CELULAS)
+        corridas = np.bincount(celulas, weights=receitas[:, 2], minlength=CELULAS)
+
+        inicios = local_seconds(np.rint(sessoes[:, 0]).astype(np.int64), fuso)
+        fins = local_seconds(np.rint(sessoes[:, 1]).astype(np.int64), fuso)
+        horas = distribuir_horas(inicios, np.maximum(fins, inicios))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ganho_hora = np.where(horas > 0, ganhos / horas, 0.0)
+            corridas_hora = np.where(horas > 0, corridas / horas, 0.0)
+
+        # Melhores horários: só células com pelo menos 1h trabalhada no período
+        candidatas = np.flatnonzero(horas >= 1)
+        melhores = candidatas[np.argsort(-ganho_hora[candidatas], kind='stable')][:5]
+
+        def matriz(valores: np.ndarray):
+            return np.round(valores, 2).reshape(7, 24).tolist()
+
+        return {
+            "fuso_horario": str(fuso.key),
+            "periodo": {
+                "inicio": data_inicio.isoformat() if data_inicio else None,
+                "fim": data_fim.isoformat() if data_fim else None
+            },
+            "dias": DIAS_SEMANA,
+            "total_receitas": int(receitas.shape[0]),
+            "total_sessoes": int(sessoes.shape[0]),
+            "horas_totais": round(float(horas.sum()), 2),
+            "ganhos_totais": round(float(ganhos.sum()), 2),
+            "horas": matriz(horas),
+            "ganhos": matriz(ganhos),
+            "corridas": corridas.astype(np.int64).reshape(7, 24).tolist(),
+            "ganho_por_hora": matriz(ganho_hora),
+            "corridas_por_hora": matriz(corridas_hora),
+            "melhores_horarios": [
+                {
+                    "dia": DIAS_SEMANA[int(c) // 24],
+                    "hora": int(c) % 24,
+                    "ganho_por_hora": round(float(ganho_hora[c]), 2),
+                    "corridas_por_hora": round(float(corridas_hora[c]), 2),
+                    "horas": round(float(horas[c]), 2)
+                }
+                for c in melhores
+            ]
+        }
+
+    @staticmethod
+    def period_bounds(granularity: str, count: int, referencia: Optional[datetime] = None) -> List[Tuple[datetime, datetime]]:
+        """`count` períodos consecutivos terminando no atual, do mais antigo ao mais recente"""
+        tipo = GRANULARIDADES[granularity]
+        periodos = [get_period_dates(tipo, referencia or now_utc())]
+        while len(periodos) < count:
+            periodos.append(get_period_dates(tipo, periodos[-1][0] - timedelta(microseconds=1)))
+        return periodos[::-1]
+
+    @staticmethod
+    def get_period_comparison(
+        db: Session,
+        user_id: str,
+        granularity: str = "week",
+        count: int = 8,
+        referencia: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Comparação de N períodos consecutivos em uma única query
+
+        Transações e sessões são unidas (UNION ALL) e agrupadas pelo início do
+        período calculado no banco, então o custo não cresce com N além do
+        intervalo lido. Um período extra é buscado para a variação do primeiro.
+        Os períodos seguem o fuso do usuário: transações usam `data_local`
+        (range scan no índice); sessões, o início deslocado para o horário local.
+        """
+        fuso = SettingsService.get_timezone(db, user_id)
+        periodos = AnalyticsService.period_bounds(granularity, count + 1, to_local(referencia or now_utc(), fuso))
+        primeiro_dia, ultimo_dia = periodos[0][0].date(), periodos[-1][1].date()
+        inicio = periodos[0][0].replace(tzinfo=fuso).astimezone(timezone.utc).replace(tzinfo=None)
+        fim = periodos[-1][1].replace(tzinfo=fuso).astimezone(timezone.utc).replace(tzinfo=None)
+
+        # Sessões agrupadas pelo início em horário local (deslocamento do fuso na referência)
+        offset = int(periodos[-1][0].replace(tzinfo=fuso).utcoffset().total_seconds())
+
+        transacoes = select(
+            period_start_expr(db, Transacao.data_local, granularity).label("periodo"),
+            case((Transacao.tipo == 'receita', Transacao.valor), else_=0).label("receitas"),
+            case((Transacao.tipo == 'despesa', Transacao.valor), else_=0).label("despesas"),
+            CORRIDA.label("corridas"),
+            literal(0).label("minutos")
+        ).where(
+            Transacao.id_usuario == user_id,
+            Transacao.data_local >= primeiro_dia,
+            Transacao.data_local <= ultimo_dia
+        )
+        sessoes = select(
+            period_start_expr(db, shift_seconds_expr(db, SessaoTrabalho.inicio, offset), granularity).label("periodo"),
+            literal(0), literal(0), literal(0),
+            func.coalesce(SessaoTrabalho.total_minutos, 0)
+        ).where(
+            SessaoTrabalho.id_usuario == user_id,
+            SessaoTrabalho.eh_ativa == False,
+            SessaoTrabalho.inicio >= inicio,
+            SessaoTrabalho.inicio <= fim
+        )
+        linhas = union_all(transacoes, sessoes).subquery()
+        agregados = {
+            str(row.periodo)[:10]: row
+            for row in db.execute(
+                select(
+                    linhas.c.periodo,
+                    func.sum(linhas.c.receitas).label("receitas"),
+                    func.sum(linhas.c.despesas).label("despesas"),
+                    func.sum(linhas.c.corridas).label("corridas"),
+                    func.sum(linhas.c.minutos).label("minutos")
+                ).group_by(linhas.c.periodo)
+            )
+        }
+
+        resultado = []
+        anterior = None
+        for periodo_inicio, periodo_fim in periodos:
+            row = agregados.get(periodo_inicio.date().isoformat())
+            receitas = round(float(row.receitas or 0), 2) if row else 0.0
+            despesas = round(float(row.despesas or 0), 2) if row else 0.0
+            atual = {
+                "inicio": periodo_inicio.isoformat(),
+                "fim": periodo_fim.isoformat(),
+                "receitas": receitas,
+                "despesas": despesas,
+                "lucro": round(receitas - despesas, 2),
+                "corridas": int(row.corridas or 0) if row else 0,
+                "horas": round(int(row.minutos or 0) / 60.0, 2) if row else 0.0
+            }
+            if anterior is not None:
+                atual["variacao"] = {
+                    chave: _variacao(atual[chave], anterior[chave])
+                    for chave in ("receitas", "despesas", "lucro", "corridas", "horas")
+                }
+                resultado.append(atual)
+            anterior = atual
+
+        return {
+            "granularidade": granularity,
+            "quantidade": count,
+            "periodos": resultado
+        }
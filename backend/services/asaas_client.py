@@ -0,0 +1,275 @@
+"""
+Cliente HTTP compartilhado para a API do Asaas
+
+Um único `httpx.AsyncClient` por processo (aberto e fechado no `lifespan`, no
+event loop do servidor) com pool de conexões, keep-alive, HTTP/2 quando
+disponível, timeouts explícitos, retries com backoff exponencial + jitter para
+métodos idempotentes e circuit breaker. Chamadas de outro event loop (scripts,
+testes) usam um cliente avulso fechado no próprio loop: o pool nunca é trocado
+nem abandonado com conexões abertas.
+"""
+import asyncio
+import importlib.util
+import logging
+import math
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from utils.exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Métodos seguros para repetir mesmo se a requisição chegou ao servidor
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Status que indicam falha transitória do lado do Asaas
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+# Erros em que a requisição nunca chegou ao servidor (seguro repetir qualquer método)
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simples: fechado -> aberto -> meio-aberto
+
+    No estado meio-aberto só uma chamada de teste passa por vez; se ela não
+    registrar resultado em `recovery_timeout` (ex.: cancelada), outra é liberada.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """Permite a chamada se fechado, ou se for a única chamada de teste (meio-aberto)"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.OPEN:
+            return False
+        agora = time.monotonic()
+        if self.probe_started_at is not None and agora - self.probe_started_at < self.recovery_timeout:
+            return False
+        self.probe_started_at = agora
+        return True
+
+    def retry_after(self) -> int:
+        """Segundos até a próxima chamada de teste (para o cabeçalho Retry-After)"""
+        inicio = self.probe_started_at if self.probe_started_at is not None else self.opened_at
+        if inicio is None:
+            return 1
+        return max(1, math.ceil(self.recovery_timeout - (time.monotonic() - inicio)))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_started_at = None
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.state == self.HALF_OPEN:
+                logger.warning(f"Circuit breaker do Asaas aberto após {self.failures} falhas")
+            self.opened_at = time.monotonic()
+
+
+class AsaasHTTPClient:
+    """Wrapper resiliente sobre um `httpx.AsyncClient` reaproveitado"""
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        http2: bool = True
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # HTTP/2 exige o pacote `h2` (httpx[http2]); sem ele usa HTTP/1.1 com keep-alive
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _new_client(self) -> httpx.AsyncClient:
+        """Cria um `httpx.AsyncClient` com a configuração do cliente"""
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2
+        )
+
+    async def open(self) -> None:
+        """Abre o pool de conexões no event loop atual (um por lifespan)"""
+        await self.aclose()
+        self._client = self._new_client()
+        self._loop = asyncio.get_running_loop()
+
+    def _pooled_client(self) -> Optional[httpx.AsyncClient]:
+        """Pool aberto neste event loop (conexões não atravessam loops)"""
+        if self._client is None or self._client.is_closed:
+            return None
+        if self._loop is not asyncio.get_running_loop():
+            return None
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial com full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None
+    ) -> httpx.Response:
+        """Executa a requisição com retries e circuit breaker"""
+        method = method.upper()
+        if not self.breaker.allow_request():
+            raise ServiceUnavailableError(
+                "Serviço de pagamentos temporariamente indisponível",
+                retry_after=self.breaker.retry_after()
+            )
+
+        client = self._pooled_client()
+        if client is not None:
+            return await self._send(client, method, endpoint, params, json)
+        # Fora do loop do pool (scripts, testes): cliente avulso fechado neste loop
+        async with self._new_client() as client:
+            return await self._send(client, method, endpoint, params, json)
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]]
+    ) -> httpx.Response:
+        """Laço de retries com backoff sobre o cliente informado"""
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+
+        while True:
+            try:
+                response = await client.request(method, f"/{endpoint.lstrip('/')}", params=params, json=json)
+            except httpx.RequestError as e:
+                retryable = idempotent or isinstance(e, CONNECT_ERRORS)
+                if retryable and attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise
+
+            if response.status_code in RETRYABLE_STATUS or response.status_code >= 500:
+                if idempotent and attempt < self.max_retries:
+                    logger.info(f"Asaas [{method}] {endpoint} - Status {response.status_code}, nova tentativa")
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+    async def __aenter__(self) -> "AsaasHTTPClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+_http_client: Optional[AsaasHTTPClient] = None
+
+
+def create_asaas_http_client() -> AsaasHTTPClient:
+    """Cria um cliente configurado a partir de `settings`"""
+    from config.settings import settings
+
+    return AsaasHTTPClient(
+        base_url=settings.ASAAS_BASE_URL,
+        headers={
+            'access_token': settings.ASAAS_API_KEY or '',
+            'Content-Type': 'application/json',
+            'User-Agent': 'RiderFinance/1.0'
+        },
+        connect_timeout=settings.ASAAS_CONNECT_TIMEOUT,
+        read_timeout=settings.ASAAS_READ_TIMEOUT,
+        max_connections=settings.ASAAS_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.ASAAS_MAX_KEEPALIVE_CONNECTIONS,
+        max_retries=settings.ASAAS_MAX_RETRIES,
+        backoff_base=settings.ASAAS_RETRY_BACKOFF,
+        failure_threshold=settings.ASAAS_CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout=settings.ASAAS_CIRCUIT_RECOVERY_SECONDS
+    )
+
+
+def get_asaas_http_client() -> AsaasHTTPClient:
+    """Cliente compartilhado do processo (sem pool aberto fora do lifespan)"""
+    global _http_client
+    if _http_client is None:
+        _http_client = create_asaas_http_client()
+    return _http_client
+
+
+async def open_asaas_http_client() -> AsaasHTTPClient:
+    """Abre o pool do cliente compartilhado (startup do lifespan)"""
+    client = get_asaas_http_client()
+    await client.open()
+    return client
+
+
+async def close_asaas_http_client() -> None:
+    """Fecha o cliente compartilhado (shutdown do lifespan)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -8,6 +8,7 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 
 from config.payments import PaymentConfig, SUBSCRIPTION_PLANS
+from services.asaas_client import AsaasHTTPClient, get_asaas_http_client
 from schemas.payment_schemas import (
     CreateCustomerRequest,
     CreatePaymentRequest, 
@@ -24,7 +25,7 @@ logger = logging.getLogger(__name__)
 class AsaasService:
     """Serviço para integração com API do Asaas"""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[AsaasHTTPClient] = None):
         from config.settings import settings
         
         self.base_url = settings.ASAAS_BASE_URL
@@ -34,10 +35,16 @@ class AsaasService:
             'Content-Type': 'application/json',
             'User-Agent': 'RiderFinance/1.0'
         }
+        self._http_client = http_client
         
         env_type = "SANDBOX" if "sandbox" in self.base_url else "PRODUCTION"
         logger.info(f"AsaasService inicializado - Ambiente: {env_type}")
     
+    @property
+    def http(self) -> AsaasHTTPClient:
+        """Cliente HTTP em uso (compartilhado do processo por padrão)"""
+        return self._http_client or get_asaas_http_client()
+    
     async def _make_request(
         self, 
         method: str, 
@@ -45,29 +52,25 @@ class AsaasService:
         data: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """Fazer requisição para API do Asaas"""
-        url = f"{self.base_url}/{endpoint}"
+        if method.upper() not in ('GET', 'POST', 'PUT', 'DELETE'):
+            raise ValueError(f"Método HTTP não suportado: {method}")
         
         try:
-            async with httpx.AsyncClient() as client:
-                if method.upper() == 'GET':
-                    response = await client.get(url, headers=self.headers, params=data)
-                elif method.upper() == 'POST':
-                    response = await client.post(url, headers=self.headers, json=data)
-                elif method.upper() == 'PUT':
-                    response = await client.put(url, headers=self.headers, json=data)
-                elif method.upper() == 'DELETE':
-                    response = await client.delete(url, headers=self.headers)
-                else:
-                    raise ValueError(f"Método HTTP não suportado: {method}")
-                
-                logger.info(f"Asaas API [{method}] {endpoint} - Status: {response.status_code}")
-                
-                if response.status_code >= 400:
-                    error_data = response.json() if response.content else {}
-                    logger.error(f"Erro na API Asaas: {error_data}")
-                    raise Exception(f"Erro Asaas: {error_data.get('message', 'Erro desconhecido')}")
-                
-                return response.json()
+            if method.upper() == 'GET':
+                response = await self.http.request(method, endpoint, params=data)
+            elif method.upper() in ('POST', 'PUT'):
+                response = await self.http.request(method, endpoint, json=data)
+            else:
+                response = await self.http.request(method, endpoint)
+            
+            logger.info(f"Asaas API [{method}] {endpoint} - Status: {response.status_code}")
+            
+            if response.status_code >= 400:
+                error_data = response.json() if response.content else {}
+                logger.error(f"Erro na API Asaas: {error_data}")
+                raise Exception(f"Erro Asaas: {error_data.get('message', 'Erro desconhecido')}")
+            
+            return response.json()
                 
         except httpx.RequestError as e:
             logger.error(f"Erro de conexão com Asaas: {str(e)}")
@@ -198,3 +201,13 @@ class AsaasService:
                 "environment": "production" if PaymentConfig.IS_PRODUCTION else "sandbox",
                 "timestamp": datetime.now().isoformat()
             }
+
+
+_asaas_service: Optional[AsaasService] = None
+
+def get_asaas_service() -> AsaasService:
+    """Instância compartilhada do serviço (usa o cliente HTTP do processo)"""
+    global _asaas_service
+    if _asaas_service is None:
+        _asaas_service = AsaasService()
+    return _asaas_service
@@ -9,7 +9,7 @@ from sqlalchemy import or_
 from models import Usuario
 from utils.helpers import hash_password, verify_password, now_utc, calculate_trial_end_date
 from utils.auth import JWTHandler
-from utils.exceptions import UnauthorizedError, ConflictError, ValidationError, TrialExpiredError
+from utils.exceptions import UnauthorizedError, ConflictError, ValidationError
 from config.logging_config import logger
 
 class AuthService:
@@ -50,7 +50,6 @@ class AuthService:
         try:
             db.add(user)
             db.commit()
-            db.refresh(user)
             
             logger.info(f"Usuário registrado: {user.nome_usuario}")
             return user
@@ -123,21 +122,6 @@ class AuthService:
         
         return user
     
-    @staticmethod
-    def check_subscription_status(user: Usuario) -> None:
-        """Verifica status da assinatura do usuário"""
-        
-        # Se é usuário pago, pode usar
-        if user.eh_pago and user.status_pagamento == "ativo":
-            return
-        
-        # Se trial ainda está válido, pode usar
-        if user.trial_termina_em and now_utc() <= user.trial_termina_em:
-            return
-        
-        # Trial expirado e sem pagamento
-        raise TrialExpiredError()
-    
     @staticmethod
     def change_password(db: Session, user: Usuario, senha_atual: str, nova_senha: str) -> None:
         """Altera senha do usuário"""
@@ -1,11 +1,13 @@
 """
 Serviço de categorias
 """
+from datetime import date
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import and_, exists, func, or_
 
-from models import Categoria, CATEGORIAS_PADRAO
+from models import Categoria, Transacao, CATEGORIAS_PADRAO
 from utils.helpers import now_utc
 from utils.exceptions import NotFoundError, ValidationError, ConflictError
 from config.logging_config import logger
@@ -101,7 +103,6 @@ class CategoryService:
         try:
             db.add(category)
             db.commit()
-            db.refresh(category)
             logger.info(f"Categoria criada: {nome} para usuário {user_id}")
             return category
         except Exception as e:
@@ -116,11 +117,14 @@ class CategoryService:
         user_id: str,
         nome: Optional[str] = None,
         icone: Optional[str] = None,
-        cor: Optional[str] = None
+        cor: Optional[str] = None,
+        versao: Optional[int] = None
     ) -> Categoria:
-        """Atualiza categoria"""
+        """Atualiza categoria (com `versao`, só se ainda for a versão lida pelo cliente)"""
         
         category = CategoryService.get_category_by_id(db, category_id, user_id)
+        if versao is not None and category.versao != versao:
+            raise ConflictError("Categoria alterada por outra requisição. Recarregue e tente novamente.")
         
         # Verifica se pode editar (categorias padrão podem ter restrições)
         if category.eh_padrao and nome and nome != category.nome:
@@ -152,9 +156,11 @@ class CategoryService:
         
         try:
             db.commit()
-            db.refresh(category)
             logger.info(f"Categoria atualizada: {category.nome} para usuário {user_id}")
             return category
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Categoria alterada por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao atualizar categoria: {str(e)}")
@@ -166,13 +172,10 @@ class CategoryService:
         
         category = CategoryService.get_category_by_id(db, category_id, user_id)
         
-        # Verifica se categoria está em uso
-        from models import Transacao
-        transacoes_count = db.query(Transacao).filter(
-            Transacao.id_categoria == category_id
-        ).count()
+        # Verifica se categoria está em uso (basta encontrar uma transação)
+        em_uso = db.query(exists().where(Transacao.id_categoria == category_id)).scalar()
         
-        if transacoes_count > 0:
+        if em_uso:
             # Soft delete - apenas desativa
             category.eh_ativa = False
             category.atualizado_em = now_utc()
@@ -185,6 +188,9 @@ class CategoryService:
         try:
             db.commit()
             logger.info(f"Categoria {action}: {category.nome} para usuário {user_id}")
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Categoria alterada por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao remover categoria: {str(e)}")
@@ -207,29 +213,75 @@ class CategoryService:
     @staticmethod
     def get_category_usage_stats(db: Session, category_id: str, user_id: str) -> dict:
         """Obtém estatísticas de uso da categoria"""
-        from models import Transacao
-        from sqlalchemy import func, desc
-        
         category = CategoryService.get_category_by_id(db, category_id, user_id)
         
-        # Contagem total de transações
-        total_transacoes = db.query(func.count(Transacao.id)).filter(
-            Transacao.id_categoria == category_id
-        ).scalar() or 0
-        
-        # Valor total
-        valor_total = db.query(func.sum(Transacao.valor)).filter(
-            Transacao.id_categoria == category_id
-        ).scalar() or 0.0
-        
-        # Última transação
-        ultima_transacao = db.query(Transacao).filter(
-            Transacao.id_categoria == category_id
-        ).order_by(desc(Transacao.data)).first()
+        # Contagem, soma e última transação em um único agregado
+        total_transacoes, valor_total, ultima_transacao = db.query(
+            func.count(Transacao.id),
+            func.coalesce(func.sum(Transacao.valor), 0.0),
+            func.max(Transacao.data)
+        ).filter(Transacao.id_categoria == category_id).one()
         
         return {
             "categoria": category.para_dict(),
             "total_transacoes": total_transacoes,
             "valor_total": float(valor_total),
-            "ultima_transacao": ultima_transacao.data.isoformat() if ultima_transacao else None
+            "ultima_transacao": ultima_transacao.isoformat() if ultima_transacao else None
+        }
+    
+    @staticmethod
+    def get_all_usage_stats(
+        db: Session,
+        user_id: str,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        apenas_ativas: bool = True
+    ) -> dict:
+        """
+        Estatísticas de uso de todas as categorias do usuário em uma query
+        
+        LEFT JOIN categorias → transações agrupado por categoria: categorias sem
+        uso aparecem zeradas. O período (opcional) é em datas locais do usuário.
+        A participação é o percentual do total do tipo (receitas ou despesas),
+        calculado sobre todas as categorias, inclusive as desativadas.
+        """
+        juncao = [Transacao.id_categoria == Categoria.id, Transacao.id_usuario == user_id]
+        if data_inicio:
+            juncao.append(Transacao.data_local >= data_inicio)
+        if data_fim:
+            juncao.append(Transacao.data_local <= data_fim)
+        
+        linhas = db.query(
+            Categoria,
+            func.count(Transacao.id),
+            func.coalesce(func.sum(Transacao.valor), 0.0),
+            func.max(Transacao.data)
+        ).outerjoin(Transacao, and_(*juncao)).filter(
+            Categoria.id_usuario == user_id
+        ).group_by(Categoria.id).order_by(Categoria.tipo, Categoria.nome).all()
+        
+        totais = {"receita": 0.0, "despesa": 0.0}
+        for categoria, _, valor, _ in linhas:
+            totais[categoria.tipo] = totais.get(categoria.tipo, 0.0) + float(valor)
+        
+        categorias = []
+        for categoria, quantidade, valor, ultima in linhas:
+            if apenas_ativas and not categoria.eh_ativa:
+                continue
+            total_tipo = totais[categoria.tipo]
+            categorias.append({
+                "categoria": categoria.para_dict(),
+                "total_transacoes": quantidade,
+                "valor_total": round(float(valor), 2),
+                "ultima_transacao": ultima.isoformat() if ultima else None,
+                "participacao": round(float(valor) / total_tipo * 100, 2) if total_tipo else 0.0
+            })
+        
+        return {
+            "periodo": {
+                "inicio": data_inicio.isoformat() if data_inicio else None,
+                "fim": data_fim.isoformat() if data_fim else None
+            },
+            "totais": {tipo: round(valor, 2) for tipo, valor in totais.items()},
+            "categorias": categorias
         }
@@ -4,34 +4,42 @@ Serviço para cálculos de dashboard
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from models import Transacao, SessaoTrabalho, Meta
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, time, timezone, timedelta
 from typing import Optional, Dict, Any
+from zoneinfo import ZoneInfo
+from services.settings_service import SettingsService
+from utils.helpers import to_local_date
 
 class DashboardService:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_dashboard_stats(self, user_id: str) -> Dict[str, Any]:
-        """Calcula todas as estatísticas do dashboard para um usuário"""
-        now = datetime.now(timezone.utc)
-        hoje_inicio = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    def get_dashboard_stats(self, user_id: str, agora: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Calcula todas as estatísticas do dashboard para um usuário
+
+        `agora` (UTC) fixa o instante de referência (padrão: o atual), por
+        exemplo para medir sobre um dataset com datas fixas.
+        """
+        # "Hoje" e "semana" no fuso do usuário, não à meia-noite UTC
+        fuso = SettingsService.get_timezone(self.db, user_id)
+        hoje = to_local_date(agora or datetime.now(timezone.utc), fuso)
         
         # Semana atual (segunda a domingo)
-        dias_desde_segunda = now.weekday()
-        semana_inicio = hoje_inicio - timedelta(days=dias_desde_segunda)
+        semana_inicio = hoje - timedelta(days=hoje.weekday())
         
         # Semana anterior para tendências
         semana_anterior_inicio = semana_inicio - timedelta(days=7)
-        semana_anterior_fim = semana_inicio
+        semana_anterior_fim = semana_inicio - timedelta(days=1)
         
         # Calcular dados de hoje
-        stats_hoje = self._calcular_stats_periodo(user_id, hoje_inicio, now)
+        stats_hoje = self._calcular_stats_periodo(user_id, hoje, hoje, fuso)
         
         # Calcular dados da semana atual
-        stats_semana = self._calcular_stats_periodo(user_id, semana_inicio, now)
+        stats_semana = self._calcular_stats_periodo(user_id, semana_inicio, hoje, fuso)
         
         # Calcular dados da semana anterior para tendências
-        stats_semana_anterior = self._calcular_stats_periodo(user_id, semana_anterior_inicio, semana_anterior_fim)
+        stats_semana_anterior = self._calcular_stats_periodo(user_id, semana_anterior_inicio, semana_anterior_fim, fuso)
         
         # Buscar metas ativas
         metas = self._buscar_metas_ativas(user_id)
@@ -68,46 +76,41 @@ class DashboardService:
             "tendencia_corridas": tendencias["corridas"]
         }
     
-    def _calcular_stats_periodo(self, user_id: str, inicio: datetime, fim: datetime) -> Dict[str, float]:
-        """Calcula estatísticas para um período específico"""
+    def _calcular_stats_periodo(self, user_id: str, dia_inicio: date, dia_fim: date, fuso: ZoneInfo) -> Dict[str, float]:
+        """Calcula estatísticas para um intervalo de dias locais (inclusivo)"""
+        
+        # Transações filtradas pela data local (range scan no índice)
+        por_dia = [
+            Transacao.id_usuario == user_id,
+            Transacao.data_local >= dia_inicio,
+            Transacao.data_local <= dia_fim
+        ]
         
         # Ganhos (receitas)
         ganhos = self.db.query(func.coalesce(func.sum(Transacao.valor), 0)).filter(
-            and_(
-                Transacao.id_usuario == user_id,
-                Transacao.tipo == "receita",
-                Transacao.data >= inicio,
-                Transacao.data <= fim
-            )
+            and_(*por_dia, Transacao.tipo == "receita")
         ).scalar()
         
         # Gastos (despesas)
         gastos = self.db.query(func.coalesce(func.sum(Transacao.valor), 0)).filter(
-            and_(
-                Transacao.id_usuario == user_id,
-                Transacao.tipo == "despesa",
-                Transacao.data >= inicio,
-                Transacao.data <= fim
-            )
+            and_(*por_dia, Transacao.tipo == "despesa")
         ).scalar()
         
         # Contagem de corridas (transações de receita que não são manuais)
         corridas = self.db.query(func.count(Transacao.id)).filter(
-            and_(
-                Transacao.id_usuario == user_id,
-                Transacao.tipo == "receita",
-                Transacao.origem != "manual",
-                Transacao.data >= inicio,
-                Transacao.data <= fim
-            )
+            and_(*por_dia, Transacao.tipo == "receita", Transacao.origem != "manual")
         ).scalar()
         
+        # Sessões não têm data local: limites dos dias locais convertidos para UTC
+        inicio = datetime.combine(dia_inicio, time.min, fuso).astimezone(timezone.utc).replace(tzinfo=None)
+        fim = datetime.combine(dia_fim + timedelta(days=1), time.min, fuso).astimezone(timezone.utc).replace(tzinfo=None)
+        
         # Horas trabalhadas (soma das sessões do período)
         horas_query = self.db.query(func.coalesce(func.sum(SessaoTrabalho.total_minutos), 0)).filter(
             and_(
                 SessaoTrabalho.id_usuario == user_id,
                 SessaoTrabalho.inicio >= inicio,
-                SessaoTrabalho.inicio <= fim,
+                SessaoTrabalho.inicio < fim,
                 SessaoTrabalho.eh_ativa == False  # Apenas sessões finalizadas
             )
         ).scalar()
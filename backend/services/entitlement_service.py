@@ -0,0 +1,150 @@
+"""
+Direitos de acesso (entitlements) por usuário
+
+Um snapshot por usuário combina plano, status, fim do período e flags/limites de
+`SUBSCRIPTION_PLANS`. É calculado uma vez, mantido em cache e invalidado pelas
+escritas de assinatura e pelos webhooks; checagens de plano viram consulta a dict.
+
+O cache é por processo: cada snapshot guarda a versão do usuário e das suas
+assinaturas, conferida com uma query na primeira checagem de cada sessão do
+banco (uma por requisição). Um pagamento confirmado por webhook em outro worker
+libera o acesso já na requisição seguinte.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import Usuario, Assinatura
+from config.payments import SUBSCRIPTION_PLANS, TRIAL_PLAN
+from config.settings import settings
+from utils.cache import TTLCache
+from utils.helpers import now_utc
+
+# Snapshots por usuário: {user_id: (versão, snapshot)}
+_entitlement_cache = TTLCache(ttl_seconds=settings.ENTITLEMENT_CACHE_SECONDS)
+
+# Usuários cujo snapshot já foi conferido na sessão do banco (em `Session.info`)
+_VALIDADOS = "direitos_validados"
+
+
+def _utc(momento: Optional[datetime]) -> Optional[datetime]:
+    """Normaliza datetimes naive (lidos do banco) como UTC"""
+    if momento is None or momento.tzinfo is not None:
+        return momento
+    return momento.replace(tzinfo=timezone.utc)
+
+
+def _snapshot(user_id: str, plano: Optional[str], status: str, valido_ate: Optional[datetime]) -> Dict[str, Any]:
+    plan = SUBSCRIPTION_PLANS.get(plano or "", {})
+    return {
+        'user_id': user_id,
+        'plan': plano,
+        'level': plan.get('level', 0),
+        'status': status,
+        'valid_until': valido_ate,
+        'flags': dict(plan.get('flags', {})),
+        'limits': dict(plan.get('limits', {}))
+    }
+
+
+class EntitlementService:
+    """Serviço de direitos de acesso por plano"""
+
+    @staticmethod
+    def compute(db: Session, user: Usuario) -> Dict[str, Any]:
+        """
+        Calcula o snapshot do usuário (uma query na assinatura ativa)
+
+        Ordem de precedência: assinatura ativa > usuário pago > trial válido.
+        O usuário pago recebe o plano de `tipo_assinatura` quando ele é um plano
+        conhecido (ex.: "premium"); senão (ex.: "mensal") o plano do trial.
+        """
+        agora = now_utc()
+        subscription = db.query(
+            Assinatura.tipo_plano,
+            Assinatura.periodo_fim
+        ).filter(
+            Assinatura.id_usuario == user.id,
+            Assinatura.status == 'ACTIVE'
+        ).order_by(Assinatura.periodo_fim.desc()).first()
+
+        if subscription and _utc(subscription.periodo_fim) > agora:
+            return _snapshot(user.id, subscription.tipo_plano, 'ACTIVE', _utc(subscription.periodo_fim))
+
+        if user.eh_pago and user.status_pagamento == "ativo":
+            plano = user.tipo_assinatura if user.tipo_assinatura in SUBSCRIPTION_PLANS else TRIAL_PLAN
+            return _snapshot(user.id, plano, 'PAID', None)
+
+        trial_fim = _utc(user.trial_termina_em)
+        if trial_fim and agora <= trial_fim:
+            return _snapshot(user.id, TRIAL_PLAN, 'TRIAL', trial_fim)
+
+        return _snapshot(user.id, None, 'NONE', None)
+
+    @staticmethod
+    def _versao(db: Session, user_id: str) -> Tuple:
+        """Versão do usuário e das suas assinaturas em uma única query (escritas de qualquer worker)"""
+        assinaturas = Assinatura.id_usuario == user_id
+        return tuple(db.execute(select(
+            select(Usuario.versao).where(Usuario.id == user_id).scalar_subquery(),
+            select(func.count(Assinatura.id)).where(assinaturas).scalar_subquery(),
+            select(func.coalesce(func.sum(Assinatura.versao), 0)).where(assinaturas).scalar_subquery()
+        )).one())
+
+    @staticmethod
+    def get_entitlements(db: Session, user_id: str, user: Optional[Usuario] = None) -> Dict[str, Any]:
+        """Snapshot de direitos do usuário (do cache quando possível)"""
+        validados = db.info.setdefault(_VALIDADOS, set())
+        cached = _entitlement_cache.get(user_id)
+        versao = None
+        if cached is not None and user_id not in validados:
+            versao = EntitlementService._versao(db, user_id)
+            if cached[0] != versao:
+                cached = None
+        if cached is None:
+            if user is None:
+                user = db.query(Usuario).filter(Usuario.id == user_id).first()
+                if user is None:
+                    return _snapshot(user_id, None, 'NONE', None)
+            versao = versao or EntitlementService._versao(db, user_id)
+            cached = (versao, EntitlementService.compute(db, user))
+            _entitlement_cache.set(user_id, cached)
+        validados.add(user_id)
+        return cached[1]
+
+    @staticmethod
+    def is_active(snapshot: Dict[str, Any]) -> bool:
+        """Acesso liberado? (o fim do período é conferido sem ir ao banco)"""
+        if snapshot['plan'] is None:
+            return False
+        valido_ate = snapshot['valid_until']
+        return valido_ate is None or now_utc() <= valido_ate
+
+    @staticmethod
+    def plan_at_least(snapshot: Dict[str, Any], minimum_plan: str) -> bool:
+        """Verifica se o plano do snapshot atende ao plano mínimo"""
+        required = SUBSCRIPTION_PLANS.get(minimum_plan, {}).get('level', 999)
+        return EntitlementService.is_active(snapshot) and snapshot['level'] >= required
+
+    @staticmethod
+    def has_feature(snapshot: Dict[str, Any], feature: str) -> bool:
+        """Verifica se a flag de funcionalidade está liberada"""
+        return EntitlementService.is_active(snapshot) and bool(snapshot['flags'].get(feature))
+
+    @staticmethod
+    def get_limit(snapshot: Dict[str, Any], limit: str) -> Optional[int]:
+        """Limite do plano (None = ilimitado)"""
+        return snapshot['limits'].get(limit)
+
+    @staticmethod
+    def invalidate(user_id: Optional[str]) -> None:
+        """Invalida o snapshot do usuário (chamar após escrever assinatura)"""
+        if user_id:
+            _entitlement_cache.invalidate(user_id)
+
+    @staticmethod
+    def invalidate_all() -> None:
+        """Invalida todos os snapshots (ex.: expiração em lote)"""
+        _entitlement_cache.clear()
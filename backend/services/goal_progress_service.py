@@ -0,0 +1,222 @@
+"""
+Motor de progresso automático de metas
+
+Metas podem ser vinculadas a uma métrica (lucro líquido, receita, despesa, horas
+ou corridas), opcionalmente filtrada por categoria/plataforma, dentro da janela
+`data_inicio`..`data_fim`. Cada escrita de transação ou sessão aplica seu delta
+com um único UPDATE nas metas afetadas, na mesma transação da escrita; a leitura
+das metas nunca agrega transações. `recompute` recalcula tudo (backfill/correção).
+Metas pausadas ficam congeladas nos dois caminhos e são recalculadas ao reativar.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from models import Meta, Transacao, SessaoTrabalho
+from utils.helpers import now_utc
+from config.logging_config import logger
+
+# Peso de cada tipo de transação nas métricas financeiras
+METRICAS_TRANSACAO: Dict[str, Dict[str, int]] = {
+    'receita': {'receita': 1},
+    'despesa': {'despesa': 1},
+    'lucro_liquido': {'receita': 1, 'despesa': -1},
+}
+
+# Métricas alimentadas por sessões finalizadas
+METRICAS_SESSAO = ('horas', 'corridas')
+
+METRICAS = tuple(METRICAS_TRANSACAO) + METRICAS_SESSAO
+
+
+def _naive_utc(momento: Optional[datetime]) -> Optional[datetime]:
+    """As colunas são DateTime sem fuso: compara em UTC sem tzinfo"""
+    if momento is None or momento.tzinfo is None:
+        return momento
+    return momento.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _acompanhadas():
+    """Metas cujo progresso é mantido pelo motor: vinculadas a uma métrica e ativas"""
+    return (Meta.metrica.isnot(None), Meta.eh_ativa == True)
+
+
+class GoalProgressService:
+    """Atualização incremental e recálculo do progresso de metas vinculadas"""
+
+    @staticmethod
+    def _apply(
+        db: Session,
+        user_id: str,
+        deltas: Dict[str, float],
+        momento: datetime,
+        plataforma: Optional[str],
+        id_categoria: Optional[str] = None,
+        por_categoria: bool = True
+    ) -> int:
+        """Soma `deltas[metrica]` às metas ativas cuja janela e filtros cobrem o evento"""
+        deltas = {metrica: delta for metrica, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+
+        momento = _naive_utc(momento)
+        condicoes = [
+            *_acompanhadas(),
+            Meta.id_usuario == user_id,
+            Meta.metrica.in_(list(deltas)),
+            Meta.data_inicio <= momento,
+            or_(Meta.data_fim.is_(None), Meta.data_fim >= momento),
+            or_(Meta.filtro_plataforma.is_(None), Meta.filtro_plataforma == plataforma),
+        ]
+        if por_categoria:
+            condicoes.append(or_(Meta.filtro_categoria.is_(None), Meta.filtro_categoria == id_categoria))
+        else:
+            condicoes.append(Meta.filtro_categoria.is_(None))
+
+        incremento = case(*[(Meta.metrica == metrica, delta) for metrica, delta in deltas.items()], else_=0)
+        result = db.execute(
+            update(Meta)
+            .where(*condicoes)
+            .values(
+                valor_atual=func.coalesce(Meta.valor_atual, 0) + incremento,
+                atualizado_em=now_utc(),
+                versao=Meta.versao + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            GoalProgressService._mark_completed(db, user_id)
+        return result.rowcount
+
+    @staticmethod
+    def _mark_completed(db: Session, user_id: Optional[str] = None) -> None:
+        """Conclui metas que atingiram o alvo e reabre as que voltaram abaixo dele"""
+        atingiu = func.coalesce(Meta.valor_atual, 0) >= Meta.valor_alvo
+        query = update(Meta).where(
+            *_acompanhadas(),
+            or_(
+                and_(Meta.eh_concluida == False, atingiu),
+                and_(Meta.eh_concluida == True, ~atingiu)
+            )
+        )
+        if user_id:
+            query = query.where(Meta.id_usuario == user_id)
+        db.execute(
+            query.values(
+                eh_concluida=case((atingiu, True), else_=False),
+                concluida_em=case((atingiu, now_utc()), else_=None),
+                versao=Meta.versao + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def apply_transaction(db: Session, transacao: Any, sinal: int = 1) -> int:
+        """
+        Aplica (sinal=1) ou estorna (sinal=-1) uma transação nas metas vinculadas
+
+        Não faz commit: deve rodar na mesma transação da escrita.
+        """
+        valor = float(transacao.valor) * sinal
+        deltas = {
+            metrica: pesos[transacao.tipo] * valor
+            for metrica, pesos in METRICAS_TRANSACAO.items()
+            if transacao.tipo in pesos
+        }
+        return GoalProgressService._apply(
+            db, transacao.id_usuario, deltas, transacao.data or now_utc(),
+            transacao.plataforma, transacao.id_categoria
+        )
+
+    @staticmethod
+    def apply_session(db: Session, sessao: SessaoTrabalho, sinal: int = 1) -> int:
+        """Aplica ou estorna uma sessão finalizada nas metas de horas/corridas. Não faz commit."""
+        if sessao.eh_ativa:
+            return 0
+        deltas = {
+            'horas': (sessao.total_minutos or 0) / 60.0 * sinal,
+            'corridas': (sessao.total_corridas or 0) * sinal,
+        }
+        return GoalProgressService._apply(
+            db, sessao.id_usuario, deltas, sessao.inicio, sessao.plataforma, por_categoria=False
+        )
+
+    @staticmethod
+    def apply_session_rides(db: Session, sessao: Any, corridas: int) -> int:
+        """Ajusta as metas de corridas quando uma sessão finalizada ganha ou perde corridas. Não faz commit."""
+        if sessao.eh_ativa:
+            return 0
+        return GoalProgressService._apply(
+            db, sessao.id_usuario, {'corridas': corridas}, sessao.inicio, sessao.plataforma, por_categoria=False
+        )
+
+    @staticmethod
+    def _transaction_total(metrica: str):
+        """Subconsulta correlacionada: total da métrica financeira na janela da meta"""
+        pesos = METRICAS_TRANSACAO[metrica]
+        valor = case(
+            *[(Transacao.tipo == tipo, Transacao.valor * peso) for tipo, peso in pesos.items()],
+            else_=0
+        )
+        return select(func.coalesce(func.sum(valor), 0)).where(
+            Transacao.id_usuario == Meta.id_usuario,
+            Transacao.data >= Meta.data_inicio,
+            or_(Meta.data_fim.is_(None), Transacao.data <= Meta.data_fim),
+            or_(Meta.filtro_categoria.is_(None), Transacao.id_categoria == Meta.filtro_categoria),
+            or_(Meta.filtro_plataforma.is_(None), Transacao.plataforma == Meta.filtro_plataforma)
+        ).scalar_subquery()
+
+    @staticmethod
+    def _session_total(metrica: str):
+        """Subconsulta correlacionada: horas ou corridas de sessões finalizadas na janela"""
+        if metrica == 'horas':
+            valor = func.coalesce(func.sum(SessaoTrabalho.total_minutos), 0) / 60.0
+        else:
+            valor = func.coalesce(func.sum(SessaoTrabalho.total_corridas), 0)
+        return select(valor).where(
+            SessaoTrabalho.id_usuario == Meta.id_usuario,
+            SessaoTrabalho.eh_ativa == False,
+            SessaoTrabalho.inicio >= Meta.data_inicio,
+            or_(Meta.data_fim.is_(None), SessaoTrabalho.inicio <= Meta.data_fim),
+            or_(Meta.filtro_plataforma.is_(None), SessaoTrabalho.plataforma == Meta.filtro_plataforma)
+        ).scalar_subquery()
+
+    @staticmethod
+    def recompute(
+        db: Session,
+        user_id: Optional[str] = None,
+        goal_id: Optional[str] = None,
+        commit: bool = True
+    ) -> int:
+        """
+        Recalcula o progresso das metas vinculadas a partir dos dados brutos
+
+        Um UPDATE com subconsulta correlacionada por métrica, cobrindo todas as
+        metas de uma vez. Usado no job de backfill, na importação em lote e ao
+        vincular uma meta.
+        """
+        total = 0
+        for metrica in METRICAS:
+            if metrica in METRICAS_TRANSACAO:
+                subconsulta = GoalProgressService._transaction_total(metrica)
+            else:
+                subconsulta = GoalProgressService._session_total(metrica)
+
+            query = update(Meta).where(*_acompanhadas(), Meta.metrica == metrica)
+            if user_id:
+                query = query.where(Meta.id_usuario == user_id)
+            if goal_id:
+                query = query.where(Meta.id == goal_id)
+            result = db.execute(
+                query.values(valor_atual=subconsulta, atualizado_em=now_utc(), versao=Meta.versao + 1)
+                .execution_options(synchronize_session=False)
+            )
+            total += result.rowcount
+
+        GoalProgressService._mark_completed(db, user_id)
+        if commit:
+            db.commit()
+            logger.info(f"Progresso recalculado para {total} metas vinculadas")
+        return total
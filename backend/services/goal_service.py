@@ -5,11 +5,16 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import and_, case, func, update
 
-from models import Meta, Usuario
-from schemas.goal_schemas import MetaCreate, MetaUpdate, MetaProgressUpdate, TipoMeta, CategoriaMeta
-from utils.exceptions import NotFoundError, ValidationError
+from models import Meta, Usuario, Categoria
+from schemas.goal_schemas import (
+    MetaCreate, MetaUpdate, MetaProgressUpdate, MetaProgressBatchItem, TipoMeta, CategoriaMeta
+)
+from services.goal_progress_service import GoalProgressService
+from utils.exceptions import NotFoundError, ValidationError, ConflictError
+from utils.sql import supports_update_returning
 from config.logging_config import logger
 
 
@@ -26,6 +31,9 @@ class GoalService:
             if goal_data.deadline and goal_data.deadline <= datetime.now():
                 raise ValidationError("Deadline deve ser no futuro")
             
+            if goal_data.metricCategoryId:
+                GoalService._validate_metric_category(db, user_id, goal_data.metricCategoryId)
+            
             # A categoria já vem no formato correto do enum
             categoria_value = goal_data.category.value
             
@@ -38,14 +46,23 @@ class GoalService:
                 categoria=categoria_value,
                 valor_alvo=float(goal_data.targetValue),
                 valor_atual=float(goal_data.currentValue or Decimal("0.00")),
-                data_inicio=datetime.now(),
+                data_inicio=goal_data.startDate or datetime.now(),
                 data_fim=goal_data.deadline,
-                unidade="BRL"
+                unidade="BRL",
+                metrica=goal_data.metric.value if goal_data.metric else None,
+                filtro_categoria=goal_data.metricCategoryId,
+                filtro_plataforma=goal_data.metricPlatform
             )
             
             db.add(meta)
+            if meta.metrica:
+                # Meta vinculada começa com o que já aconteceu na janela
+                db.flush()
+                GoalProgressService.recompute(db, goal_id=meta.id, commit=False)
             db.commit()
-            db.refresh(meta)
+            if meta.metrica:
+                # valor_atual foi recalculado no banco
+                db.refresh(meta)
             
             logger.info(f"Meta '{meta.titulo}' criada com ID {meta.id}")
             
@@ -112,6 +129,64 @@ class GoalService:
             logger.error(f"Erro ao buscar meta {goal_id}: {e}")
             raise e
 
+    @staticmethod
+    def _apply_progress(db: Session, user_id: str, deltas: Dict[str, float]) -> List[Meta]:
+        """
+        Soma os deltas de progresso em um único UPDATE atômico
+
+        `valor_atual = valor_atual + delta` é resolvido no banco (sem
+        leitura-modificação-escrita), a conclusão é detectada na mesma instrução
+        e as metas atualizadas voltam via RETURNING. Tudo ou nada: se alguma
+        meta não puder ser atualizada a transação é desfeita. Não faz commit.
+        """
+        incremento = case(*[(Meta.id == goal_id, delta) for goal_id, delta in deltas.items()], else_=0)
+        novo_valor = func.coalesce(Meta.valor_atual, 0) + incremento
+        atingiu = and_(Meta.eh_concluida == False, novo_valor >= Meta.valor_alvo)
+        agora = datetime.now()
+
+        stmt = update(Meta).where(
+            Meta.id.in_(list(deltas)),
+            Meta.id_usuario == user_id,
+            Meta.metrica.is_(None),
+            novo_valor >= 0
+        ).values(
+            valor_atual=novo_valor,
+            eh_concluida=case((atingiu, True), else_=Meta.eh_concluida),
+            concluida_em=case((atingiu, agora), else_=Meta.concluida_em),
+            atualizado_em=agora,
+            versao=Meta.versao + 1
+        )
+
+        if supports_update_returning(db):
+            metas = db.scalars(
+                stmt.returning(Meta),
+                execution_options={"synchronize_session": False, "populate_existing": True}
+            ).all()
+        else:
+            result = db.execute(stmt.execution_options(synchronize_session=False))
+            metas = [] if result.rowcount < len(deltas) else db.query(Meta).populate_existing().filter(
+                Meta.id.in_(list(deltas))
+            ).all()
+
+        if len(metas) < len(deltas):
+            db.rollback()
+            GoalService._raise_progress_error(db, user_id, list(deltas))
+        return metas
+
+    @staticmethod
+    def _raise_progress_error(db: Session, user_id: str, goal_ids: List[str]) -> None:
+        """Explica por que o UPDATE condicional não alterou todas as metas"""
+        metricas = dict(db.query(Meta.id, Meta.metrica).filter(
+            Meta.id.in_(goal_ids),
+            Meta.id_usuario == user_id
+        ).all())
+        for goal_id in goal_ids:
+            if goal_id not in metricas:
+                raise NotFoundError(f"Meta com ID {goal_id} não encontrada")
+            if metricas[goal_id]:
+                raise ValidationError("Meta vinculada a métrica é atualizada automaticamente")
+        raise ValidationError("O valor atual não pode ficar negativo")
+
     @staticmethod
     def update_goal_progress(
         db: Session, 
@@ -119,40 +194,19 @@ class GoalService:
         goal_id: str, 
         progress_data: MetaProgressUpdate
     ) -> Dict[str, Any]:
-        """Atualizar progresso de uma meta"""
+        """Atualizar progresso de uma meta (incremento atômico no banco)"""
         try:
-            meta = db.query(Meta).filter(
-                and_(Meta.id == goal_id, Meta.id_usuario == user_id)
-            ).first()
-            
-            if not meta:
-                raise NotFoundError(f"Meta com ID {goal_id} não encontrada")
-            
-            # Calcular novo valor
-            novo_valor = meta.valor_atual + float(progress_data.valor_adicional)
-            
-            # Validar que não fica negativo
-            if novo_valor < 0:
-                raise ValidationError("O valor atual não pode ficar negativo")
-            
-            # Atualizar valores
-            meta.valor_atual = novo_valor
-            meta.atualizado_em = datetime.now()
-            
-            # Verificar se meta foi atingida
-            if meta.valor_atual >= meta.valor_alvo and not meta.eh_concluida:
-                meta.marcar_concluida()
+            metas = GoalService._apply_progress(db, user_id, {goal_id: float(progress_data.valor_adicional)})
+            resultado = GoalService._meta_to_dict(metas[0])
+            db.commit()
             
             # Log da atualização se há observações
             if progress_data.observacoes:
                 logger.info(f"Progresso da meta {goal_id}: {progress_data.observacoes}")
             
-            db.commit()
-            db.refresh(meta)
-            
             logger.info(f"Progresso da meta {goal_id} atualizado: {progress_data.valor_adicional}")
             
-            return GoalService._meta_to_dict(meta)
+            return resultado
             
         except (NotFoundError, ValidationError):
             db.rollback()
@@ -162,6 +216,35 @@ class GoalService:
             logger.error(f"Erro ao atualizar progresso da meta {goal_id}: {e}")
             raise e
 
+    @staticmethod
+    def update_goals_progress(
+        db: Session,
+        user_id: str,
+        items: List[MetaProgressBatchItem]
+    ) -> List[Dict[str, Any]]:
+        """Atualizar o progresso de várias metas em uma única transação"""
+        try:
+            # Deltas repetidos para a mesma meta são somados
+            deltas: Dict[str, float] = {}
+            for item in items:
+                deltas[item.goal_id] = deltas.get(item.goal_id, 0.0) + float(item.valor_adicional)
+            
+            metas = GoalService._apply_progress(db, user_id, deltas)
+            por_id = {meta.id: GoalService._meta_to_dict(meta) for meta in metas}
+            db.commit()
+            
+            logger.info(f"Progresso de {len(por_id)} metas atualizado em lote para usuário {user_id}")
+            
+            return [por_id[goal_id] for goal_id in deltas]
+            
+        except (NotFoundError, ValidationError):
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro ao atualizar progresso em lote: {e}")
+            raise e
+
     @staticmethod
     def update_goal(
         db: Session, 
@@ -169,7 +252,7 @@ class GoalService:
         goal_id: str, 
         goal_data: MetaUpdate
     ) -> Dict[str, Any]:
-        """Atualizar dados de uma meta"""
+        """Atualizar dados de uma meta (com `version`, só se ainda for a versão lida pelo cliente)"""
         try:
             meta = db.query(Meta).filter(
                 and_(Meta.id == goal_id, Meta.id_usuario == user_id)
@@ -177,6 +260,8 @@ class GoalService:
             
             if not meta:
                 raise NotFoundError(f"Meta com ID {goal_id} não encontrada")
+            if goal_data.version is not None and meta.versao != goal_data.version:
+                raise ConflictError("Meta alterada por outra requisição. Recarregue e tente novamente.")
             
             # Mapear campos do schema para o modelo
             if goal_data.title is not None:
@@ -189,23 +274,41 @@ class GoalService:
                 meta.valor_alvo = float(goal_data.targetValue)
             if goal_data.deadline is not None:
                 meta.data_fim = goal_data.deadline
+            if goal_data.metricCategoryId is not None:
+                GoalService._validate_metric_category(db, user_id, goal_data.metricCategoryId)
+                meta.filtro_categoria = goal_data.metricCategoryId
+            if goal_data.metricPlatform is not None:
+                meta.filtro_plataforma = goal_data.metricPlatform
+            if goal_data.metric is not None:
+                meta.metrica = goal_data.metric.value
             
             # Validações adicionais
             if meta.data_fim and meta.data_fim <= datetime.now():
                 raise ValidationError("Data limite deve ser no futuro")
+            if (meta.filtro_categoria or meta.filtro_plataforma) and not meta.metrica:
+                raise ValidationError("Filtros de métrica exigem uma métrica")
             
             meta.atualizado_em = datetime.now()
             
+            # Janela, filtros ou alvo mudaram: recalcula o progresso vinculado
+            if meta.metrica:
+                db.flush()
+                GoalProgressService.recompute(db, goal_id=meta.id, commit=False)
+            
             db.commit()
-            db.refresh(meta)
+            if meta.metrica:
+                db.refresh(meta)
             
             logger.info(f"Meta {goal_id} atualizada")
             
             return GoalService._meta_to_dict(meta)
             
-        except (NotFoundError, ValidationError):
+        except (NotFoundError, ValidationError, ConflictError):
             db.rollback()
             raise
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Meta alterada por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao atualizar meta {goal_id}: {e}")
@@ -226,7 +329,6 @@ class GoalService:
             meta.atualizado_em = datetime.now()
             
             db.commit()
-            db.refresh(meta)
             
             logger.info(f"Meta {goal_id} desativada")
             
@@ -235,6 +337,9 @@ class GoalService:
         except NotFoundError:
             db.rollback()
             raise
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Meta alterada por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao desativar meta {goal_id}: {e}")
@@ -254,8 +359,14 @@ class GoalService:
             meta.eh_ativa = True
             meta.atualizado_em = datetime.now()
             
+            # Progresso vinculado ficou congelado enquanto pausada
+            if meta.metrica:
+                db.flush()
+                GoalProgressService.recompute(db, goal_id=meta.id, commit=False)
+            
             db.commit()
-            db.refresh(meta)
+            if meta.metrica:
+                db.refresh(meta)
             
             logger.info(f"Meta {goal_id} reativada")
             
@@ -264,6 +375,9 @@ class GoalService:
         except NotFoundError:
             db.rollback()
             raise
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Meta alterada por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao reativar meta {goal_id}: {e}")
@@ -288,11 +402,24 @@ class GoalService:
         except NotFoundError:
             db.rollback()
             raise
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Meta alterada por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao deletar meta {goal_id}: {e}")
             raise e
 
+    @staticmethod
+    def _validate_metric_category(db: Session, user_id: str, category_id: str) -> None:
+        """Validar categoria usada como filtro da métrica"""
+        exists = db.query(Categoria.id).filter(
+            Categoria.id == category_id,
+            Categoria.id_usuario == user_id
+        ).first()
+        if not exists:
+            raise ValidationError(f"Categoria {category_id} não encontrada")
+
     @staticmethod
     def _meta_to_dict(meta: Meta, tipo_meta: Optional[TipoMeta] = None, categoria_meta: Optional[CategoriaMeta] = None) -> Dict[str, Any]:
         """Converter Meta para dicionário compatível com frontend"""
@@ -308,6 +435,11 @@ class GoalService:
             "isCompleted": meta.eh_concluida,
             "status": "completed" if meta.eh_concluida else ("active" if meta.eh_ativa else "paused"),
             "deadline": meta.data_fim,
+            "startDate": meta.data_inicio,
+            "metric": meta.metrica,
+            "metricCategoryId": meta.filtro_categoria,
+            "metricPlatform": meta.filtro_plataforma,
             "created_at": meta.criado_em,
-            "updated_at": meta.atualizado_em
+            "updated_at": meta.atualizado_em,
+            "version": meta.versao
         }
@@ -0,0 +1,207 @@
+"""
+Executor de jobs periódicos em processo
+
+Cada job tem intervalo próprio, estado persistente em `execucoes_job` e roda em
+um único worker por vez (lock com lease em `locks_servico`).
+"""
+import asyncio
+import inspect
+import json
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from models import ExecucaoJob
+from services.lock_service import LockService
+from utils.helpers import now_utc
+from config.logging_config import logger
+
+
+class Job:
+    """Definição de um job periódico"""
+
+    def __init__(self, nome: str, interval_seconds: float, func: Callable[[], Any], lock_ttl_seconds: Optional[float] = None):
+        self.nome = nome
+        self.interval_seconds = interval_seconds
+        self.func = func
+        # O lease precisa cobrir a duração do job; por padrão, o próprio intervalo
+        self.lock_ttl_seconds = lock_ttl_seconds or interval_seconds
+
+    @property
+    def lock_name(self) -> str:
+        return f"job:{self.nome}"
+
+
+class JobRunner:
+    """Agenda e executa jobs registrados"""
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            from config.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.jobs: Dict[str, Job] = {}
+
+    def register(self, nome: str, interval_seconds: float, func: Callable[[], Any], lock_ttl_seconds: Optional[float] = None) -> Job:
+        """Registra um job (função síncrona ou corrotina, sem argumentos)"""
+        job = Job(nome, interval_seconds, func, lock_ttl_seconds)
+        self.jobs[nome] = job
+        return job
+
+    def _is_due(self, db, job: Job) -> bool:
+        """Verifica pela última execução persistida se o job está no prazo"""
+        estado = db.get(ExecucaoJob, job.nome)
+        if estado is None or estado.ultima_execucao_em is None:
+            return True
+        ultima = estado.ultima_execucao_em.replace(tzinfo=None)
+        return ultima + timedelta(seconds=job.interval_seconds) <= now_utc().replace(tzinfo=None)
+
+    def _record(self, db, job: Job, inicio, duracao_ms: int, resultado: Any = None, erro: Optional[str] = None) -> None:
+        """Persiste o resultado da execução"""
+        estado = db.get(ExecucaoJob, job.nome)
+        if estado is None:
+            estado = ExecucaoJob(nome=job.nome, execucoes=0)
+            db.add(estado)
+        estado.ultima_execucao_em = inicio
+        estado.ultima_duracao_ms = duracao_ms
+        estado.execucoes = (estado.execucoes or 0) + 1
+        if erro is None:
+            estado.ultimo_sucesso_em = inicio
+            estado.ultimo_resultado = json.dumps(resultado, default=str)
+            estado.ultimo_erro = None
+        else:
+            estado.ultimo_erro = erro
+        db.commit()
+
+    async def run_job(self, job: Job) -> Optional[Any]:
+        """
+        Executa o job se estiver no prazo e este worker obtiver o lock
+
+        O prazo é conferido de novo depois do lock: outro worker pode ter
+        acabado de executar o job.
+        """
+        db = self.session_factory()
+        try:
+            if not self._is_due(db, job):
+                return None
+            if not LockService.acquire(db, job.lock_name, job.lock_ttl_seconds):
+                return None
+            db.expire_all()
+            if not self._is_due(db, job):
+                LockService.release(db, job.lock_name)
+                return None
+
+            inicio = now_utc()
+            started = time.perf_counter()
+            resultado, erro = None, None
+            try:
+                if inspect.iscoroutinefunction(job.func):
+                    resultado = await job.func()
+                else:
+                    resultado = await asyncio.to_thread(job.func)
+            except Exception as e:
+                erro = str(e)
+                logger.error(f"Erro no job {job.nome}: {erro}")
+
+            self._record(db, job, inicio, int((time.perf_counter() - started) * 1000), resultado, erro)
+            LockService.release(db, job.lock_name)
+            return resultado
+        finally:
+            db.close()
+
+    async def run_due(self) -> Dict[str, Any]:
+        """Executa todos os jobs no prazo. Retorna {nome: resultado} dos executados."""
+        executados = {}
+        for job in list(self.jobs.values()):
+            try:
+                resultado = await self.run_job(job)
+            except Exception as e:
+                logger.warning(f"Falha ao agendar job {job.nome}: {str(e)}")
+                continue
+            if resultado is not None:
+                executados[job.nome] = resultado
+        return executados
+
+    async def run_forever(self, tick_seconds: float) -> None:
+        """Loop do agendador (tarefa de fundo do lifespan)"""
+        while True:
+            await self.run_due()
+            await asyncio.sleep(tick_seconds)
+
+
+def _with_session(func: Callable, *args, **kwargs) -> Callable[[], Any]:
+    """Adapta uma função `func(db, ...)` para job sem argumentos"""
+    def job():
+        from config.database import SessionLocal
+        db = SessionLocal()
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.close()
+    return job
+
+
+def _since_last_success(nome: str, func: Callable) -> Callable[[], Any]:
+    """Adapta `func(db, desde)` para job: `desde` é o início da última execução bem-sucedida"""
+    def job():
+        from config.database import SessionLocal
+        db = SessionLocal()
+        try:
+            estado = db.get(ExecucaoJob, nome)
+            return func(db, estado.ultimo_sucesso_em if estado else None)
+        finally:
+            db.close()
+    return job
+
+
+def build_default_runner(asaas=None) -> JobRunner:
+    """Registra os jobs da aplicação (sem `asaas`, os de pagamento ficam de fora)"""
+    from config.settings import settings
+    from services.goal_progress_service import GoalProgressService
+    from services.payment_mirror_service import PaymentMirrorService
+    from services.session_attribution_service import SessionAttributionService
+    from services.subscription_service import SubscriptionService
+
+    runner = JobRunner()
+    runner.register(
+        "expirar_assinaturas",
+        settings.SUBSCRIPTION_EXPIRY_INTERVAL_SECONDS,
+        _with_session(SubscriptionService.expire_subscriptions)
+    )
+    runner.register(
+        "avisar_assinaturas_expirando",
+        settings.SUBSCRIPTION_EXPIRING_NOTICE_INTERVAL_SECONDS,
+        _with_session(
+            SubscriptionService.notify_expiring_subscriptions,
+            days_ahead=settings.SUBSCRIPTION_EXPIRING_NOTICE_DAYS,
+            chunk_size=settings.SUBSCRIPTION_NOTICE_CHUNK_SIZE
+        )
+    )
+    runner.register(
+        "snapshot_assinaturas",
+        settings.SUBSCRIPTION_SNAPSHOT_INTERVAL_SECONDS,
+        _with_session(SubscriptionService.take_daily_snapshot)
+    )
+    runner.register(
+        "recalcular_metas",
+        settings.GOAL_RECOMPUTE_INTERVAL_SECONDS,
+        _with_session(GoalProgressService.recompute)
+    )
+    runner.register(
+        "atribuir_sessoes",
+        settings.SESSION_ATTRIBUTION_INTERVAL_SECONDS,
+        _since_last_success("atribuir_sessoes", SessionAttributionService.attribute_pending)
+    )
+
+    if asaas is None:
+        return runner
+
+    async def reconciliar_pagamentos():
+        return await PaymentMirrorService.reconcile_stale_payments(asaas)
+
+    runner.register(
+        "reconciliar_pagamentos",
+        settings.PAYMENT_RECONCILE_INTERVAL_SECONDS,
+        reconciliar_pagamentos
+    )
+    return runner
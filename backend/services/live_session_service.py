@@ -0,0 +1,241 @@
+"""
+Transmissão ao vivo da sessão de trabalho ativa (Server-Sent Events)
+
+Cada usuário conectado tem um acumulador em memória com os totais da sessão
+ativa, semeado uma vez a partir de `sessoes_trabalho` ao conectar e atualizado
+pelos serviços depois de cada commit que altera a sessão. Os eventos são
+distribuídos para todos os dispositivos conectados do usuário; cada conexão tem
+uma fila limitada e, se o cliente não acompanhar, o snapshot mais antigo é
+descartado (cada snapshot já traz os totais completos).
+
+O estado é por processo, como o cache de direitos de acesso: com vários workers
+cada um recebe na hora apenas as escritas que ele mesmo processou. Para as
+escritas feitas em outros workers (ou outro dispositivo), cada heartbeat relê
+os totais da sessão em `sessoes_trabalho` (uma busca por chave primária) e
+publica a diferença; a defasagem máxima é LIVE_SESSION_HEARTBEAT_SECONDS.
+"""
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from models import SessaoTrabalho
+from config.settings import settings
+from config.logging_config import logger
+from utils.helpers import now_utc
+
+
+class _Assinante:
+    """Uma conexão SSE: fila limitada ligada ao event loop que a consome"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, tamanho: int):
+        self.loop = loop
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho)
+        self.descartados = 0
+
+    def oferecer(self, evento: Dict[str, Any]) -> None:
+        """Enfileira sem bloquear; com a fila cheia descarta o evento mais antigo"""
+        if self.fila.full():
+            self.fila.get_nowait()
+            self.descartados += 1
+        self.fila.put_nowait(evento)
+
+
+class LiveSessionHub:
+    """Acumuladores por usuário e fan-out dos eventos para as conexões"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estados: Dict[str, Dict[str, Any]] = {}
+        self._assinantes: Dict[str, Set[_Assinante]] = {}
+
+    def subscribe(self, user_id: str, sessao: Any = None) -> Optional[_Assinante]:
+        """
+        Registra uma conexão do usuário (deve ser chamado dentro do event loop)
+
+        `sessao` é a sessão ativa lida do banco; semeia o acumulador apenas se
+        ainda não houver um. Retorna None se o limite de conexões foi atingido.
+        """
+        assinante = _Assinante(asyncio.get_running_loop(), settings.LIVE_SESSION_QUEUE_SIZE)
+        with self._lock:
+            conexoes = self._assinantes.setdefault(user_id, set())
+            if len(conexoes) >= settings.LIVE_SESSION_MAX_CONNECTIONS:
+                return None
+            conexoes.add(assinante)
+            if user_id not in self._estados:
+                self._estados[user_id] = self._estado(sessao) if sessao is not None and sessao.eh_ativa \
+                    else {"id_sessao": None}
+        return assinante
+
+    def unsubscribe(self, user_id: str, assinante: _Assinante) -> None:
+        """Remove a conexão; o acumulador é liberado com a última conexão"""
+        with self._lock:
+            conexoes = self._assinantes.get(user_id)
+            if conexoes is None:
+                return
+            conexoes.discard(assinante)
+            if not conexoes:
+                del self._assinantes[user_id]
+                self._estados.pop(user_id, None)
+        if assinante.descartados:
+            logger.info(f"Stream de sessão encerrado com {assinante.descartados} eventos descartados")
+
+    def connections(self, user_id: str) -> int:
+        """Número de conexões abertas do usuário"""
+        with self._lock:
+            return len(self._assinantes.get(user_id, ()))
+
+    @staticmethod
+    def _estado(sessao: Any) -> Dict[str, Any]:
+        """Acumulador a partir dos totais gravados da sessão"""
+        return {
+            "id_sessao": sessao.id,
+            "inicio": sessao.inicio,
+            "fim": None if sessao.eh_ativa else sessao.fim,
+            "plataforma": sessao.plataforma,
+            "ganhos": float(sessao.total_ganhos or 0),
+            "gastos": float(sessao.total_gastos or 0),
+            "corridas": int(sessao.total_corridas or 0),
+        }
+
+    def publish(self, sessao: Any) -> None:
+        """
+        Atualiza o acumulador com os totais da sessão e notifica as conexões
+
+        Chamado pelos serviços após o commit (de qualquer thread). Sessões
+        finalizadas encerram o acumulador com um evento `fim`. Sem conexões
+        abertas para o usuário é uma operação sem custo.
+        """
+        if sessao is None:
+            return
+        with self._lock:
+            conexoes = list(self._assinantes.get(sessao.id_usuario, ()))
+            if not conexoes:
+                return
+            atual = self._estados.get(sessao.id_usuario, {})
+            if not sessao.eh_ativa and atual.get("id_sessao") != sessao.id:
+                return  # Sessão antiga editada: não é a que está sendo transmitida
+            estado = self._estado(sessao)
+            self._estados[sessao.id_usuario] = estado if sessao.eh_ativa else {"id_sessao": None}
+        self._broadcast(conexoes, "sessao" if sessao.eh_ativa else "fim", self.snapshot(estado))
+
+    def end(self, user_id: str) -> None:
+        """Encerra a sessão transmitida (sessão removida)"""
+        with self._lock:
+            conexoes = list(self._assinantes.get(user_id, ()))
+            if not conexoes:
+                return
+            self._estados[user_id] = {"id_sessao": None}
+        self._broadcast(conexoes, "fim", self.snapshot({"id_sessao": None}))
+
+    def refresh(self, user_id: str, session_factory=None) -> bool:
+        """
+        Relê do banco a sessão transmitida e publica se ela mudou em outro processo
+
+        Com sessão transmitida é uma busca por chave primária; sem ela, a busca
+        da sessão ativa pelo índice parcial. Síncrono (rodar fora do event loop).
+        Retorna True se um evento foi publicado para as conexões.
+        """
+        with self._lock:
+            if user_id not in self._estados:
+                return False
+            atual = dict(self._estados[user_id])
+
+        if session_factory is None:
+            from config.database import SessionLocal
+            session_factory = SessionLocal
+        db = session_factory()
+        try:
+            if atual.get("id_sessao"):
+                sessao = db.get(SessaoTrabalho, atual["id_sessao"])
+            else:
+                sessao = db.query(SessaoTrabalho).filter(
+                    SessaoTrabalho.id_usuario == user_id,
+                    SessaoTrabalho.eh_ativa == True
+                ).first()
+        finally:
+            db.close()
+
+        if sessao is None:
+            if not atual.get("id_sessao"):
+                return False
+            self.end(user_id)
+            return True
+        if sessao.eh_ativa and self._estado(sessao) == atual:
+            return False
+        self.publish(sessao)
+        return True
+
+    def current(self, user_id: str) -> Dict[str, Any]:
+        """Snapshot atual do usuário (tempo decorrido calculado agora)"""
+        with self._lock:
+            estado = dict(self._estados.get(user_id, {"id_sessao": None}))
+        return self.snapshot(estado)
+
+    @staticmethod
+    def snapshot(estado: Dict[str, Any], agora: Optional[datetime] = None) -> Dict[str, Any]:
+        """Totais corridos da sessão: tempo, ganhos, gastos, corridas e R$/hora"""
+        if not estado.get("id_sessao"):
+            return {"ativa": False, "id_sessao": None}
+        # Horários da sessão são UTC sem fuso (mesmo relógio de SessionService)
+        fim = estado.get("fim") or agora or now_utc().replace(tzinfo=None)
+        segundos = max(int((fim - estado["inicio"]).total_seconds()), 0)
+        horas = segundos / 3600.0
+        return {
+            "ativa": estado.get("fim") is None,
+            "id_sessao": estado["id_sessao"],
+            "inicio": estado["inicio"].isoformat(),
+            "plataforma": estado["plataforma"],
+            "tempo_decorrido_segundos": segundos,
+            "total_ganhos": round(estado["ganhos"], 2),
+            "total_gastos": round(estado["gastos"], 2),
+            "lucro": round(estado["ganhos"] - estado["gastos"], 2),
+            "total_corridas": estado["corridas"],
+            "ganho_por_hora": round(estado["ganhos"] / horas, 2) if horas else 0.0,
+        }
+
+    @staticmethod
+    def _broadcast(conexoes, tipo: str, dados: Dict[str, Any]) -> None:
+        """Entrega o evento no loop de cada conexão (seguro a partir de threads)"""
+        evento = {"evento": tipo, "dados": dados}
+        for assinante in conexoes:
+            try:
+                assinante.loop.call_soon_threadsafe(assinante.oferecer, evento)
+            except RuntimeError:
+                # Loop já encerrado: a conexão será removida pelo próprio stream
+                pass
+
+    async def stream(self, user_id: str, assinante: _Assinante, desconectado=None, session_factory=None):
+        """
+        Gera o texto SSE de uma conexão
+
+        Envia o snapshot inicial e depois cada evento; sem eventos por
+        LIVE_SESSION_HEARTBEAT_SECONDS relê a sessão no banco (`refresh`) e,
+        se nada mudou, envia um `heartbeat` com o tempo decorrido atualizado,
+        o que também detecta clientes desconectados.
+        """
+        try:
+            yield formatar_sse("sessao", self.current(user_id))
+            while True:
+                try:
+                    evento = await asyncio.wait_for(
+                        assinante.fila.get(), timeout=settings.LIVE_SESSION_HEARTBEAT_SECONDS
+                    )
+                    yield formatar_sse(evento["evento"], evento["dados"])
+                except asyncio.TimeoutError:
+                    if desconectado is not None and await desconectado():
+                        break
+                    if await asyncio.to_thread(self.refresh, user_id, session_factory):
+                        continue  # O evento publicado já está na fila
+                    yield formatar_sse("heartbeat", self.current(user_id))
+        finally:
+            self.unsubscribe(user_id, assinante)
+
+
+def formatar_sse(evento: str, dados: Dict[str, Any]) -> str:
+    """Formata um evento no protocolo text/event-stream"""
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+live_hub = LiveSessionHub()
@@ -0,0 +1,66 @@
+"""
+Locks com expiração no banco para eleição de líder entre workers
+"""
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import LockServico
+from utils.helpers import now_utc
+from config.logging_config import logger
+
+# Identificador deste processo (host:pid:sufixo aleatório)
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LockService:
+    """Serviço de locks nomeados com lease (TTL)"""
+
+    @staticmethod
+    def acquire(db: Session, nome: str, ttl_seconds: float, dono: str = PROCESS_ID) -> bool:
+        """
+        Tenta adquirir (ou renovar) o lock `nome` por `ttl_seconds`
+
+        Atômico: um UPDATE condicional toma o lock expirado ou já nosso; se não
+        houver linha, o INSERT decide a disputa pela chave primária.
+        """
+        agora = now_utc()
+        expira_em = agora + timedelta(seconds=ttl_seconds)
+
+        try:
+            result = db.execute(
+                update(LockServico)
+                .where(
+                    LockServico.nome == nome,
+                    or_(LockServico.expira_em < agora, LockServico.dono == dono)
+                )
+                .values(dono=dono, expira_em=expira_em, adquirido_em=agora)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                db.add(LockServico(nome=nome, dono=dono, expira_em=expira_em, adquirido_em=agora))
+                db.flush()
+            db.commit()
+        except IntegrityError:
+            # Outro worker detém o lock
+            db.rollback()
+            return False
+
+        logger.info(f"Lock '{nome}' adquirido por {dono}")
+        return True
+
+    @staticmethod
+    def release(db: Session, nome: str, dono: str = PROCESS_ID) -> bool:
+        """Libera o lock se pertencer a `dono`"""
+        result = db.execute(
+            delete(LockServico)
+            .where(LockServico.nome == nome, LockServico.dono == dono)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount > 0
@@ -0,0 +1,237 @@
+"""
+Espelho local do estado de cobranças do Asaas
+
+Leituras de status vêm da tabela `pagamentos`; a API do Asaas só é chamada
+em cache miss ou quando o espelho está velho demais (stale-while-revalidate).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Pagamento, Assinatura, STATUS_PAGAMENTO_FINAIS
+from utils.helpers import now_utc
+from utils.sql import build_upsert, supports_upsert
+from config.logging_config import logger
+
+# Cobranças com revalidação em segundo plano já em andamento
+_refreshing: Set[str] = set()
+
+# Colunas atualizadas quando uma cobrança já espelhada muda (o dono, id_usuario,
+# só é preenchido, nunca apagado: cobranças avulsas não têm assinatura para resolvê-lo)
+_COLUNAS_ATUALIZAVEIS = [
+    "asaas_customer_id", "asaas_subscription_id", "status", "valor",
+    "valor_liquido", "forma_pagamento", "data_vencimento", "data_pagamento",
+    "invoice_url", "sincronizado_em", "atualizado_em"
+]
+
+
+def _idade_segundos(momento: datetime) -> float:
+    """Idade de um timestamp UTC (aceita valores naive lidos do SQLite)"""
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=timezone.utc)
+    return (now_utc() - momento).total_seconds()
+
+
+def _como_dict(payment: Any) -> Dict[str, Any]:
+    """Normaliza resposta do Asaas (dict ou schema Pydantic) para dict"""
+    if hasattr(payment, "model_dump"):
+        return payment.model_dump()
+    return dict(payment)
+
+
+class PaymentMirrorService:
+    """Serviço do espelho local de pagamentos"""
+
+    @staticmethod
+    def upsert_payment(
+        db: Session,
+        payment: Any,
+        commit: bool = True,
+        user_id: Optional[str] = None
+    ) -> Optional[Pagamento]:
+        """
+        Grava/atualiza a cobrança no espelho a partir do payload do Asaas
+
+        `user_id` informa o dono quando ele é conhecido (criação da cobrança);
+        senão ele é resolvido pela assinatura. Um dono já gravado é mantido.
+        """
+        data = _como_dict(payment)
+        payment_id = data.get("id")
+        if not payment_id:
+            return None
+
+        agora = now_utc()
+        row = {
+            "id": payment_id,
+            "id_usuario": user_id or PaymentMirrorService._resolve_user_id(db, data),
+            "asaas_customer_id": data.get("customer"),
+            "asaas_subscription_id": data.get("subscription"),
+            "status": data.get("status") or ("DELETED" if data.get("deleted") else "PENDING"),
+            "valor": data.get("value"),
+            "valor_liquido": data.get("netValue"),
+            "forma_pagamento": data.get("billingType"),
+            "data_vencimento": data.get("dueDate"),
+            "data_pagamento": data.get("paymentDate"),
+            "invoice_url": data.get("invoiceUrl"),
+            "sincronizado_em": agora,
+            "criado_em": agora,
+            "atualizado_em": agora
+        }
+
+        if supports_upsert(db):
+            db.execute(build_upsert(
+                db,
+                Pagamento.__table__,
+                [row],
+                index_elements=["id"],
+                set_=lambda excluded: {
+                    "id_usuario": func.coalesce(excluded.id_usuario, Pagamento.__table__.c.id_usuario),
+                    **{col: getattr(excluded, col) for col in _COLUNAS_ATUALIZAVEIS}
+                }
+            ))
+        else:
+            pagamento = db.get(Pagamento, payment_id)
+            if pagamento:
+                pagamento.id_usuario = row["id_usuario"] or pagamento.id_usuario
+                for col in _COLUNAS_ATUALIZAVEIS:
+                    setattr(pagamento, col, row[col])
+            else:
+                db.add(Pagamento(**row))
+
+        if commit:
+            db.commit()
+            db.expire_all()
+        else:
+            # Dentro de uma unidade de trabalho maior (inbox, reconciliação): não
+            # descarta as alterações pendentes do chamador
+            db.flush()
+        # O UPSERT não passa pelo mapa de identidade: relê só a linha espelhada
+        return db.get(Pagamento, payment_id, populate_existing=True)
+
+    @staticmethod
+    def get_mirrored_payment(db: Session, payment_id: str) -> Optional[Pagamento]:
+        """Busca a cobrança no espelho local"""
+        return db.get(Pagamento, payment_id)
+
+    @staticmethod
+    def classify(pagamento: Optional[Pagamento], ttl_seconds: int, max_stale_seconds: int) -> str:
+        """
+        Classifica o registro espelhado:
+        - "fresh": pode ser servido direto
+        - "stale": serve o espelho e revalida em segundo plano
+        - "miss": precisa buscar no Asaas antes de responder
+        """
+        if pagamento is None:
+            return "miss"
+        idade = _idade_segundos(pagamento.sincronizado_em)
+        # Status finais só mudam via webhook (estorno), então o TTL é o limite máximo
+        if pagamento.status in STATUS_PAGAMENTO_FINAIS:
+            return "fresh" if idade < max_stale_seconds else "stale"
+        if idade < ttl_seconds:
+            return "fresh"
+        if idade < max_stale_seconds:
+            return "stale"
+        return "miss"
+
+    @staticmethod
+    async def get_payment_status(
+        db: Session,
+        payment_id: str,
+        asaas,
+        schedule_refresh: Optional[Callable[[str], None]] = None
+    ) -> Tuple[Pagamento, str]:
+        """
+        Lê o status de uma cobrança com semântica stale-while-revalidate
+
+        Retorna (pagamento, estado) onde estado é "fresh", "stale" ou "miss".
+        """
+        from config.settings import settings
+
+        pagamento = PaymentMirrorService.get_mirrored_payment(db, payment_id)
+        estado = PaymentMirrorService.classify(
+            pagamento,
+            settings.PAYMENT_MIRROR_TTL_SECONDS,
+            settings.PAYMENT_MIRROR_MAX_STALE_SECONDS
+        )
+
+        if estado == "miss":
+            remote = await asaas.get_payment(payment_id)
+            pagamento = PaymentMirrorService.upsert_payment(db, remote)
+        elif estado == "stale" and schedule_refresh and payment_id not in _refreshing:
+            _refreshing.add(payment_id)
+            schedule_refresh(payment_id)
+
+        return pagamento, estado
+
+    @staticmethod
+    async def refresh_payment(payment_id: str, asaas, session_factory=None) -> None:
+        """Revalida uma cobrança no Asaas (usado em segundo plano)"""
+        if session_factory is None:
+            from config.database import SessionLocal
+            session_factory = SessionLocal
+
+        db = session_factory()
+        try:
+            remote = await asaas.get_payment(payment_id)
+            PaymentMirrorService.upsert_payment(db, remote)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Falha ao revalidar pagamento {payment_id}: {str(e)}")
+        finally:
+            _refreshing.discard(payment_id)
+            db.close()
+
+    @staticmethod
+    def get_stale_pending_ids(db: Session, ttl_seconds: int, limit: int = 100) -> List[str]:
+        """IDs de cobranças não finais cujo espelho passou do TTL"""
+        limite = (now_utc() - timedelta(seconds=ttl_seconds)).replace(tzinfo=None)
+        rows = db.query(Pagamento.id).filter(
+            Pagamento.status.notin_(STATUS_PAGAMENTO_FINAIS),
+            Pagamento.sincronizado_em < limite
+        ).order_by(Pagamento.sincronizado_em).limit(limit).all()
+        return [row.id for row in rows]
+
+    @staticmethod
+    async def reconcile_stale_payments(asaas, session_factory=None, limit: int = 100) -> int:
+        """Reconciliador: atualiza cobranças pendentes com espelho expirado"""
+        from config.settings import settings
+
+        if session_factory is None:
+            from config.database import SessionLocal
+            session_factory = SessionLocal
+
+        db = session_factory()
+        try:
+            payment_ids = PaymentMirrorService.get_stale_pending_ids(
+                db, settings.PAYMENT_MIRROR_TTL_SECONDS, limit
+            )
+            updated = 0
+            for payment_id in payment_ids:
+                try:
+                    remote = await asaas.get_payment(payment_id)
+                    PaymentMirrorService.upsert_payment(db, remote)
+                    updated += 1
+                except Exception as e:
+                    db.rollback()
+                    logger.warning(f"Falha ao reconciliar pagamento {payment_id}: {str(e)}")
+            if updated:
+                logger.info(f"Reconciliação de pagamentos: {updated} atualizados")
+            return updated
+        finally:
+            db.close()
+
+    @staticmethod
+    def _resolve_user_id(db: Session, data: Dict[str, Any]) -> Optional[str]:
+        """Descobre o usuário dono da cobrança pela assinatura/cliente do Asaas"""
+        filtros = []
+        if data.get("subscription"):
+            filtros.append(Assinatura.asaas_subscription_id == data["subscription"])
+        if data.get("customer"):
+            filtros.append(Assinatura.asaas_customer_id == data["customer"])
+        for filtro in filtros:
+            row = db.query(Assinatura.id_usuario).filter(filtro).first()
+            if row:
+                return row.id_usuario
+        return None
@@ -0,0 +1,358 @@
+"""
+Atribuição de transações às sessões de trabalho
+
+Cada transação pertence à sessão do usuário cuja janela [inicio, fim] a contém
+(a sessão ativa tem janela aberta). Os totais da sessão (ganhos, gastos e
+corridas) são mantidos de forma incremental a cada escrita, com um UPDATE
+atômico, e recalculados a partir de `transacoes.id_sessao` ao finalizar a
+sessão. `backfill` refaz a atribuição de todo o histórico em uma única passada
+de merge sobre transações e sessões ordenadas; o job periódico usa
+`attribute_pending`, que só revisita o que mudou desde a última execução.
+"""
+from bisect import bisect_right
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import and_, bindparam, case, exists, func, or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import SessaoTrabalho, Transacao
+from services.goal_progress_service import GoalProgressService, _naive_utc
+from config.logging_config import logger
+
+# Corrida = receita importada de plataforma (mesmo critério do dashboard)
+CORRIDA = case((and_(Transacao.tipo == 'receita', Transacao.origem != 'manual'), 1), else_=0)
+
+
+def eh_corrida(transacao: Any) -> bool:
+    """Versão em Python de CORRIDA (origem nula não conta, como no SQL)"""
+    return transacao.tipo == 'receita' and transacao.origem is not None and transacao.origem != 'manual'
+
+
+def _deltas(transacao: Any, sinal: int) -> Dict[str, float]:
+    """Contribuição de uma transação para os totais da sessão"""
+    valor = float(transacao.valor) * sinal
+    return {
+        'ganhos': valor if transacao.tipo == 'receita' else 0.0,
+        'gastos': valor if transacao.tipo == 'despesa' else 0.0,
+        'corridas': sinal if eh_corrida(transacao) else 0,
+    }
+
+
+class SessionAttributionService:
+    """Vínculo transação ↔ sessão e totais incrementais das sessões"""
+
+    @staticmethod
+    def find_session(db: Session, user_id: str, momento: datetime) -> Optional[SessaoTrabalho]:
+        """Sessão do usuário que contém `momento` (usa ix_sessoes_trabalho_usuario_inicio)"""
+        return db.query(SessaoTrabalho).filter(
+            SessaoTrabalho.id_usuario == user_id,
+            SessaoTrabalho.inicio <= momento,
+            or_(SessaoTrabalho.eh_ativa == True, SessaoTrabalho.fim >= momento)
+        ).order_by(SessaoTrabalho.inicio.desc()).first()
+
+    @staticmethod
+    def _apply(db: Session, sessao: SessaoTrabalho, deltas: Dict[str, float], metas: bool = True) -> None:
+        """Soma os deltas nos totais da sessão com um UPDATE atômico"""
+        db.execute(
+            update(SessaoTrabalho)
+            .where(SessaoTrabalho.id == sessao.id)
+            .values(
+                total_ganhos=func.coalesce(SessaoTrabalho.total_ganhos, 0) + deltas['ganhos'],
+                total_gastos=func.coalesce(SessaoTrabalho.total_gastos, 0) + deltas['gastos'],
+                total_corridas=func.coalesce(SessaoTrabalho.total_corridas, 0) + deltas['corridas']
+            )
+            .execution_options(synchronize_session=False)
+        )
+        # Mantém o objeto carregado coerente sem reler a linha nem marcá-lo como alterado
+        set_committed_value(sessao, 'total_ganhos', round((sessao.total_ganhos or 0) + deltas['ganhos'], 2))
+        set_committed_value(sessao, 'total_gastos', round((sessao.total_gastos or 0) + deltas['gastos'], 2))
+        set_committed_value(sessao, 'total_corridas', (sessao.total_corridas or 0) + deltas['corridas'])
+        if metas and deltas['corridas']:
+            GoalProgressService.apply_session_rides(db, sessao, deltas['corridas'])
+
+    @staticmethod
+    def attach(db: Session, transacao: Transacao) -> Optional[SessaoTrabalho]:
+        """
+        Vincula a transação à sessão que a contém e atualiza os totais
+
+        Não faz commit: deve rodar na mesma transação da escrita.
+        """
+        with db.no_autoflush:
+            sessao = SessionAttributionService.find_session(db, transacao.id_usuario, _naive_utc(transacao.data))
+            transacao.id_sessao = sessao.id if sessao else None
+            if sessao:
+                SessionAttributionService._apply(db, sessao, _deltas(transacao, 1))
+        return sessao
+
+    @staticmethod
+    def attach_many(db: Session, user_id: str, transacoes: List[Transacao]) -> List[SessaoTrabalho]:
+        """
+        Vincula um lote de transações (importação) antes do INSERT
+
+        Carrega de uma vez as sessões que cobrem o intervalo do lote e aplica um
+        UPDATE por sessão afetada, que são retornadas. Não ajusta metas: o
+        chamador recalcula depois.
+        """
+        if not transacoes:
+            return []
+        momentos = [_naive_utc(t.data) for t in transacoes]
+        primeira, ultima = min(momentos), max(momentos)
+        with db.no_autoflush:
+            sessoes = db.query(SessaoTrabalho).filter(
+                SessaoTrabalho.id_usuario == user_id,
+                SessaoTrabalho.inicio <= ultima,
+                or_(SessaoTrabalho.eh_ativa == True, SessaoTrabalho.fim >= primeira)
+            ).order_by(SessaoTrabalho.inicio).all()
+            if not sessoes:
+                return []
+
+            inicios = [s.inicio for s in sessoes]
+            totais: Dict[str, Dict[str, float]] = {}
+            for transacao, momento in zip(transacoes, momentos):
+                # Última sessão iniciada até o momento da transação
+                posicao = bisect_right(inicios, momento) - 1
+                sessao = sessoes[posicao] if posicao >= 0 else None
+                if sessao is None or not (sessao.eh_ativa or (sessao.fim and sessao.fim >= momento)):
+                    continue
+                transacao.id_sessao = sessao.id
+                acumulado = totais.setdefault(sessao.id, {'ganhos': 0.0, 'gastos': 0.0, 'corridas': 0})
+                for chave, delta in _deltas(transacao, 1).items():
+                    acumulado[chave] += delta
+
+            por_id = {s.id: s for s in sessoes}
+            for id_sessao, deltas in totais.items():
+                SessionAttributionService._apply(db, por_id[id_sessao], deltas, metas=False)
+        return [por_id[id_sessao] for id_sessao in totais]
+
+    @staticmethod
+    def detach(db: Session, transacao: Transacao) -> Optional[SessaoTrabalho]:
+        """Estorna a transação dos totais da sua sessão, que é retornada. Não faz commit."""
+        if not transacao.id_sessao:
+            return None
+        with db.no_autoflush:
+            sessao = db.get(SessaoTrabalho, transacao.id_sessao)
+            if sessao:
+                SessionAttributionService._apply(db, sessao, _deltas(transacao, -1))
+            transacao.id_sessao = None
+        return sessao
+
+    @staticmethod
+    def refresh_totals(db: Session, sessao: SessaoTrabalho) -> None:
+        """Recalcula os totais da sessão a partir das transações vinculadas (uma query agregada)"""
+        row = db.query(
+            func.coalesce(func.sum(case((Transacao.tipo == 'receita', Transacao.valor), else_=0)), 0),
+            func.coalesce(func.sum(case((Transacao.tipo == 'despesa', Transacao.valor), else_=0)), 0),
+            func.coalesce(func.sum(CORRIDA), 0)
+        ).filter(Transacao.id_sessao == sessao.id).one()
+        sessao.total_ganhos = round(float(row[0]), 2)
+        sessao.total_gastos = round(float(row[1]), 2)
+        sessao.total_corridas = int(row[2])
+
+    @staticmethod
+    def reattribute(db: Session, sessao: SessaoTrabalho) -> int:
+        """
+        Reajusta as transações da sessão à sua janela atual (ao finalizar ou editar)
+
+        Solta as vinculadas que ficaram fora da janela, adota as sem sessão que
+        caem dentro dela e recalcula os totais. Retorna quantos vínculos mudaram.
+        Não faz commit.
+        """
+        fora = [Transacao.data < sessao.inicio]
+        if sessao.fim is not None:
+            fora.append(Transacao.data > sessao.fim)
+        soltas = db.execute(
+            update(Transacao)
+            .where(Transacao.id_sessao == sessao.id, or_(*fora))
+            .values(id_sessao=None, versao=Transacao.versao + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+        dentro = [
+            Transacao.id_usuario == sessao.id_usuario,
+            Transacao.id_sessao.is_(None),
+            Transacao.data >= sessao.inicio
+        ]
+        if sessao.fim is not None:
+            dentro.append(Transacao.data <= sessao.fim)
+        adotadas = db.execute(
+            update(Transacao)
+            .where(*dentro)
+            .values(id_sessao=sessao.id, versao=Transacao.versao + 1)
+            .execution_options(synchronize_session=False)
+        )
+        SessionAttributionService.refresh_totals(db, sessao)
+        return soltas.rowcount + adotadas.rowcount
+
+    @staticmethod
+    def release_session(db: Session, sessao: SessaoTrabalho) -> None:
+        """Desvincula as transações de uma sessão que será removida. Não faz commit."""
+        db.execute(
+            update(Transacao)
+            .where(Transacao.id_sessao == sessao.id)
+            .values(id_sessao=None, versao=Transacao.versao + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def backfill(db: Session, user_id: Optional[str] = None, commit: bool = True) -> int:
+        """
+        Refaz a atribuição de todas as transações em uma única passada
+
+        Transações e sessões são lidas ordenadas por (usuário, momento) e
+        percorridas em merge linear: O(T + S) em vez de uma junção T × S. Só as
+        transações cuja sessão mudou são gravadas; os totais de todas as
+        sessões percorridas são regravados e as metas recalculadas.
+        """
+        sessoes_q = db.query(
+            SessaoTrabalho.id, SessaoTrabalho.id_usuario, SessaoTrabalho.inicio,
+            SessaoTrabalho.fim, SessaoTrabalho.eh_ativa
+        )
+        transacoes_q = db.query(
+            Transacao.id, Transacao.id_usuario, Transacao.data, Transacao.valor,
+            Transacao.tipo, Transacao.origem, Transacao.id_sessao
+        )
+        if user_id:
+            sessoes_q = sessoes_q.filter(SessaoTrabalho.id_usuario == user_id)
+            transacoes_q = transacoes_q.filter(Transacao.id_usuario == user_id)
+        sessoes = sessoes_q.order_by(SessaoTrabalho.id_usuario, SessaoTrabalho.inicio).all()
+        transacoes = transacoes_q.order_by(Transacao.id_usuario, Transacao.data).all()
+
+        totais: Dict[str, Dict[str, float]] = {
+            s.id: {'ganhos': 0.0, 'gastos': 0.0, 'corridas': 0} for s in sessoes
+        }
+        alteracoes: List[Dict[str, Any]] = []
+        i = 0
+        atual = None  # Sessão mais recente iniciada antes da transação corrente
+        for t in transacoes:
+            # Avança as sessões até a última que começou antes da transação
+            while i < len(sessoes) and (sessoes[i].id_usuario, sessoes[i].inicio) <= (t.id_usuario, t.data):
+                atual = sessoes[i]
+                i += 1
+            sessao = atual if atual is not None and atual.id_usuario == t.id_usuario and (
+                atual.eh_ativa or (atual.fim is not None and atual.fim >= t.data)
+            ) else None
+
+            id_sessao = sessao.id if sessao else None
+            if sessao:
+                for chave, delta in _deltas(t, 1).items():
+                    totais[sessao.id][chave] += delta
+            if id_sessao != t.id_sessao:
+                alteracoes.append({"_id": t.id, "_sessao": id_sessao})
+
+        tabela = Transacao.__table__
+        if alteracoes:
+            db.execute(
+                tabela.update()
+                .where(tabela.c.id == bindparam("_id"))
+                .values(id_sessao=bindparam("_sessao"), versao=tabela.c.versao + 1),
+                alteracoes
+            )
+        if totais:
+            sessoes_t = SessaoTrabalho.__table__
+            db.execute(
+                sessoes_t.update()
+                .where(sessoes_t.c.id == bindparam("_id"))
+                .values(
+                    total_ganhos=bindparam("_ganhos"),
+                    total_gastos=bindparam("_gastos"),
+                    total_corridas=bindparam("_corridas")
+                ),
+                [
+                    {"_id": id_sessao, "_ganhos": round(t['ganhos'], 2), "_gastos": round(t['gastos'], 2),
+                     "_corridas": int(t['corridas'])}
+                    for id_sessao, t in totais.items()
+                ]
+            )
+        GoalProgressService.recompute(db, user_id=user_id, commit=False)
+
+        if commit:
+            db.commit()
+        logger.info(
+            f"Atribuição de sessões refeita: {len(transacoes)} transações, "
+            f"{len(sessoes)} sessões, {len(alteracoes)} vínculos alterados"
+        )
+        return len(alteracoes)
+
+    @staticmethod
+    def attribute_pending(db: Session, desde: Optional[datetime] = None, commit: bool = True) -> int:
+        """
+        Atribuição incremental (job `atribuir_sessoes`)
+
+        Revisita só as sessões alteradas desde `desde` (a janela pode ter
+        mudado) e as transações sem sessão que caem em alguma sessão ou
+        alteradas desde `desde`. Totais e metas são recalculados apenas para as
+        sessões e os usuários afetados. Sem `desde` (primeira execução) refaz
+        tudo com `backfill`. Retorna quantos vínculos mudaram.
+        """
+        if desde is None:
+            return SessionAttributionService.backfill(db, commit=commit)
+        desde = _naive_utc(desde)
+
+        usuarios: Set[str] = set()
+        alterados = 0
+        sessoes_alteradas = db.query(SessaoTrabalho).filter(SessaoTrabalho.atualizado_em >= desde).all()
+        for sessao in sessoes_alteradas:
+            alterados += SessionAttributionService.reattribute(db, sessao)
+            usuarios.add(sessao.id_usuario)
+
+        coberta = exists().where(
+            SessaoTrabalho.id_usuario == Transacao.id_usuario,
+            SessaoTrabalho.inicio <= Transacao.data,
+            or_(SessaoTrabalho.eh_ativa == True, SessaoTrabalho.fim >= Transacao.data)
+        )
+        transacoes = db.query(
+            Transacao.id, Transacao.id_usuario, Transacao.data, Transacao.id_sessao
+        ).filter(
+            or_(and_(Transacao.id_sessao.is_(None), coberta), Transacao.atualizado_em >= desde)
+        ).order_by(Transacao.id_usuario, Transacao.data).all()
+
+        alteracoes: List[Dict[str, Any]] = []
+        afetadas: Set[str] = set()
+        for user_id, grupo in groupby(transacoes, key=lambda t: t.id_usuario):
+            grupo = list(grupo)
+            # Só as sessões que cobrem o intervalo das transações do usuário
+            sessoes = db.query(
+                SessaoTrabalho.id, SessaoTrabalho.inicio, SessaoTrabalho.fim, SessaoTrabalho.eh_ativa
+            ).filter(
+                SessaoTrabalho.id_usuario == user_id,
+                SessaoTrabalho.inicio <= grupo[-1].data,
+                or_(SessaoTrabalho.eh_ativa == True, SessaoTrabalho.fim >= grupo[0].data)
+            ).order_by(SessaoTrabalho.inicio).all()
+            inicios = [s.inicio for s in sessoes]
+            for t in grupo:
+                posicao = bisect_right(inicios, t.data) - 1
+                sessao = sessoes[posicao] if posicao >= 0 else None
+                if sessao is not None and not (sessao.eh_ativa or (sessao.fim is not None and sessao.fim >= t.data)):
+                    sessao = None
+                id_sessao = sessao.id if sessao else None
+                if id_sessao != t.id_sessao:
+                    alteracoes.append({"_id": t.id, "_sessao": id_sessao})
+                    afetadas.update(i for i in (t.id_sessao, id_sessao) if i)
+                    usuarios.add(user_id)
+
+        if alteracoes:
+            tabela = Transacao.__table__
+            db.execute(
+                tabela.update()
+                .where(tabela.c.id == bindparam("_id"))
+                .values(id_sessao=bindparam("_sessao"), versao=tabela.c.versao + 1),
+                alteracoes
+            )
+            for id_sessao in afetadas:
+                sessao = db.get(SessaoTrabalho, id_sessao)
+                if sessao:
+                    SessionAttributionService.refresh_totals(db, sessao)
+        for user_id in usuarios:
+            GoalProgressService.recompute(db, user_id=user_id, commit=False)
+
+        if commit:
+            db.commit()
+        alterados += len(alteracoes)
+        logger.info(
+            f"Atribuição incremental de sessões: {len(sessoes_alteradas)} sessões e "
+            f"{len(transacoes)} transações revisitadas, {alterados} vínculos alterados"
+        )
+        return alterados
@@ -1,11 +1,21 @@
 """
 Serviço para gerenciamento de sessões de trabalho
 """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from models import SessaoTrabalho, Usuario
+from services.goal_progress_service import GoalProgressService, _naive_utc
+from services.session_attribution_service import SessionAttributionService
+from services.settings_service import SettingsService
+from services.live_session_service import live_hub
 from utils.exceptions import NotFoundError, ValidationError
+from utils.helpers import now_utc, to_local
+from utils.sql import shift_seconds_expr, weekday_expr
+
+# Índice = valor de weekday_expr (0 = domingo)
+DIAS_SEMANA = ['domingo', 'segunda', 'terca', 'quarta', 'quinta', 'sexta', 'sabado']
 
 class SessionService:
     """Serviço para operações com sessões de trabalho"""
@@ -25,13 +35,13 @@ class SessionService:
         session = SessaoTrabalho(
             id_usuario=user_id,
             observacoes=descricao,  # Usando campo correto
-            inicio=datetime.now(),
+            inicio=now_utc().replace(tzinfo=None),  # UTC sem fuso, como transacoes.data
             eh_ativa=True
         )
         
         db.add(session)
         db.commit()
-        db.refresh(session)
+        live_hub.publish(session)
         return session
     
     @staticmethod
@@ -46,14 +56,17 @@ class SessionService:
         if not session.eh_ativa:
             raise ValidationError("Sessão já foi finalizada")
         
-        session.fim = datetime.now()
+        session.fim = now_utc().replace(tzinfo=None)
         session.eh_ativa = False
         
         # Calcular duração em minutos usando método do modelo
         session.calcular_duracao()
+        # Fecha a janela: ajusta as transações vinculadas e recalcula os totais
+        SessionAttributionService.reattribute(db, session)
+        GoalProgressService.apply_session(db, session)
         
         db.commit()
-        db.refresh(session)
+        live_hub.publish(session)
         return session
     
     @staticmethod
@@ -102,12 +115,17 @@ class SessionService:
         """Atualizar dados da sessão"""
         session = SessionService.get_session_by_id(db, session_id, user_id)
         
+        # Sessão finalizada já contabilizada nas metas: estorna e reaplica
+        GoalProgressService.apply_session(db, session, -1)
+        
         for key, value in kwargs.items():
             if hasattr(session, key) and value is not None:
                 setattr(session, key, value)
         
+        SessionAttributionService.reattribute(db, session)
+        GoalProgressService.apply_session(db, session)
         db.commit()
-        db.refresh(session)
+        live_hub.publish(session)
         return session
     
     @staticmethod
@@ -119,29 +137,134 @@ class SessionService:
         """Excluir sessão"""
         session = SessionService.get_session_by_id(db, session_id, user_id)
         
+        era_ativa = session.eh_ativa
+        GoalProgressService.apply_session(db, session, -1)
+        SessionAttributionService.release_session(db, session)
         db.delete(session)
         db.commit()
+        if era_ativa:
+            live_hub.end(user_id)
         return True
     
     @staticmethod
-    def get_sessions_summary(db: Session, user_id: int) -> dict:
-        """Resumo das sessões do usuário"""
-        sessions = SessionService.get_user_sessions(db, user_id)
+    def _period_filters(user_id: str, data_inicio: Optional[datetime], data_fim: Optional[datetime]) -> list:
+        """Filtros comuns das análises (usam ix_sessoes_trabalho_usuario_inicio)"""
+        filtros = [SessaoTrabalho.id_usuario == user_id]
+        if data_inicio:
+            filtros.append(SessaoTrabalho.inicio >= _naive_utc(data_inicio))
+        if data_fim:
+            filtros.append(SessaoTrabalho.inicio <= _naive_utc(data_fim))
+        return filtros
+    
+    @staticmethod
+    def _totals(db: Session, filtros: list) -> Dict[str, Any]:
+        """Totais e médias em uma única query agregada"""
+        finalizada = SessaoTrabalho.eh_ativa == False
+        minutos = case((finalizada, SessaoTrabalho.total_minutos))
+        row = db.query(
+            func.count(SessaoTrabalho.id).label('total'),
+            func.count(minutos).label('completas'),
+            func.coalesce(func.sum(case((SessaoTrabalho.eh_ativa == True, 1), else_=0)), 0).label('ativas'),
+            func.coalesce(func.sum(minutos), 0).label('minutos'),
+            func.avg(minutos).label('media'),
+            func.coalesce(func.max(minutos), 0).label('maximo'),
+            func.coalesce(func.sum(SessaoTrabalho.total_corridas), 0).label('corridas'),
+            func.coalesce(func.sum(SessaoTrabalho.total_ganhos), 0).label('ganhos'),
+            # Ganhos só das finalizadas, pareados com `minutos` no R$/hora
+            func.coalesce(func.sum(case((finalizada, SessaoTrabalho.total_ganhos))), 0).label('ganhos_completas'),
+            func.coalesce(func.sum(SessaoTrabalho.total_gastos), 0).label('gastos')
+        ).filter(*filtros).one()
+        return row._asdict()
+    
+    @staticmethod
+    def get_sessions_summary(db: Session, user_id: str) -> dict:
+        """Resumo das sessões do usuário (histórico completo, uma query)"""
+        totais = SessionService._totals(db, [SessaoTrabalho.id_usuario == user_id])
+        
+        return {
+            "total_sessoes": totais['total'],
+            "sessoes_completas": totais['completas'],
+            "tempo_total_minutos": int(totais['minutos']),
+            "tempo_medio_minutos": round(float(totais['media'] or 0), 2),
+            "sessao_mais_longa_minutos": int(totais['maximo']),
+            "tem_sessao_ativa": totais['ativas'] > 0
+        }
+    
+    @staticmethod
+    def get_session_analytics(
+        db: Session,
+        user_id: str,
+        data_inicio: Optional[datetime] = None,
+        data_fim: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Análise das sessões em um período (ou em todo o histórico)
+        
+        Tudo é agregado no banco: totais, sessão mais longa, horas por dia da
+        semana e distribuição por plataforma. Apenas sessões finalizadas entram
+        nas somas de tempo. O dia da semana é o do início no fuso do usuário
+        (deslocamento do fuso na data de referência, como nas análises por período).
+        """
+        filtros = SessionService._period_filters(user_id, data_inicio, data_fim)
+        finalizadas = filtros + [SessaoTrabalho.eh_ativa == False]
+        totais = SessionService._totals(db, filtros)
+        
+        mais_longa = db.query(
+            SessaoTrabalho.id,
+            SessaoTrabalho.inicio,
+            SessaoTrabalho.total_minutos
+        ).filter(*finalizadas).order_by(SessaoTrabalho.total_minutos.desc()).first()
         
-        total_sessions = len(sessions)
-        completed_sessions = [s for s in sessions if not s.eh_ativa]
+        fuso = SettingsService.get_timezone(db, user_id)
+        offset = int(fuso.utcoffset(to_local(data_fim or now_utc(), fuso)).total_seconds())
+        dia_semana = weekday_expr(db, shift_seconds_expr(db, SessaoTrabalho.inicio, offset))
+        por_dia = dict(db.query(
+            dia_semana,
+            func.coalesce(func.sum(SessaoTrabalho.total_minutos), 0)
+        ).filter(*finalizadas).group_by(dia_semana).all())
         
-        total_minutes = sum(s.total_minutos or 0 for s in completed_sessions)
-        avg_minutes = total_minutes / len(completed_sessions) if completed_sessions else 0
+        plataforma = func.coalesce(SessaoTrabalho.plataforma, 'outras')
+        por_plataforma = db.query(
+            plataforma.label('plataforma'),
+            func.count(SessaoTrabalho.id).label('sessoes'),
+            func.coalesce(func.sum(SessaoTrabalho.total_minutos), 0).label('minutos'),
+            func.coalesce(func.sum(SessaoTrabalho.total_ganhos), 0).label('ganhos')
+        ).filter(*finalizadas).group_by(plataforma).order_by(func.sum(SessaoTrabalho.total_minutos).desc()).all()
         
-        # Sessão mais longa
-        longest_session = max(completed_sessions, key=lambda s: s.total_minutos or 0) if completed_sessions else None
+        minutos_total = int(totais['minutos'])
+        horas_total = minutos_total / 60.0
         
         return {
-            "total_sessoes": total_sessions,
-            "sessoes_completas": len(completed_sessions),
-            "tempo_total_minutos": total_minutes,
-            "tempo_medio_minutos": round(avg_minutes, 2),
-            "sessao_mais_longa_minutos": longest_session.total_minutos if longest_session else 0,
-            "tem_sessao_ativa": SessionService.get_active_session(db, user_id) is not None
+            "periodo": {
+                "inicio": data_inicio.isoformat() if data_inicio else None,
+                "fim": data_fim.isoformat() if data_fim else None
+            },
+            "total_sessoes": totais['total'],
+            "sessoes_completas": totais['completas'],
+            "tem_sessao_ativa": totais['ativas'] > 0,
+            "tempo_total_minutos": minutos_total,
+            "tempo_medio_minutos": round(float(totais['media'] or 0), 2),
+            "total_corridas": int(totais['corridas']),
+            "total_ganhos": round(float(totais['ganhos']), 2),
+            "total_gastos": round(float(totais['gastos']), 2),
+            "ganho_por_hora": round(float(totais['ganhos_completas']) / horas_total, 2) if horas_total else 0.0,
+            "sessao_mais_longa": {
+                "id": mais_longa.id,
+                "inicio": mais_longa.inicio.isoformat(),
+                "total_minutos": mais_longa.total_minutos
+            } if mais_longa else None,
+            "horas_por_dia_semana": [
+                {"dia": DIAS_SEMANA[dia], "horas": round(int(por_dia.get(dia, 0)) / 60.0, 2)}
+                for dia in range(7)
+            ],
+            "plataformas": [
+                {
+                    "plataforma": row.plataforma,
+                    "sessoes": row.sessoes,
+                    "horas": round(int(row.minutos) / 60.0, 2),
+                    "ganhos": round(float(row.ganhos), 2),
+                    "percentual_tempo": round(int(row.minutos) / minutos_total * 100, 1) if minutos_total else 0.0
+                }
+                for row in por_plataforma
+            ]
         }
@@ -0,0 +1,229 @@
+"""
+Serviço de configurações do usuário com leitura tipada e cache
+
+O cache é por processo. Cada entrada guarda a versão das configurações no banco
+(quantidade de linhas e maior `atualizado_em`); na primeira leitura de cada
+sessão do banco (uma por requisição) a versão é conferida com uma query
+agregada, então uma escrita feita em outro worker aparece já na requisição
+seguinte. As leituras seguintes na mesma sessão não vão ao banco.
+"""
+import json
+from typing import Any, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Configuracao, CONFIGURACOES_PADRAO_USUARIO, converter_valor_configuracao, generate_ulid
+from utils.cache import TTLCache
+from utils.helpers import now_utc, get_zoneinfo
+from utils.sql import build_upsert, supports_upsert
+from utils.exceptions import ValidationError
+from config.logging_config import logger
+
+# Configurações tipadas por usuário: {user_id: (versão, {chave: valor_tipado})}
+_settings_cache = TTLCache(ttl_seconds=300)
+
+# Usuários cujo cache já foi conferido na sessão do banco (em `Session.info`)
+_VALIDADAS = "configuracoes_validadas"
+
+# Metadados das configurações padrão: {chave: config_data}
+_PADROES = {config["chave"]: config for config in CONFIGURACOES_PADRAO_USUARIO}
+
+
+def _serializar_valor(chave: str, valor: Any) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Converte um valor Python para (texto, tipo_dado) como persistido
+
+    O tipo é None quando nem o valor nem a configuração padrão o definem (texto
+    ou None em chave personalizada): quem grava decide entre o tipo já salvo e "string".
+    """
+    if isinstance(valor, bool):
+        return ("true" if valor else "false"), "boolean"
+    if isinstance(valor, (int, float)):
+        return str(valor), "number"
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor), "json"
+    # Strings mantêm o tipo declarado da configuração padrão ("60" continua number)
+    tipo_dado = _PADROES.get(chave, {}).get("tipo_dado")
+    if valor is None:
+        return None, tipo_dado
+    return str(valor), tipo_dado
+
+
+def _normalizar_chave(chave: str) -> str:
+    """Aplica as mesmas regras do validador de `Configuracao.chave`"""
+    if not chave or len(chave.strip()) < 2:
+        raise ValidationError("Chave deve ter pelo menos 2 caracteres")
+    if len(chave) > 100:
+        raise ValidationError("Chave muito longa")
+    return chave.strip().lower()
+
+
+class SettingsService:
+    """Serviço para leitura e escrita em lote das configurações do usuário"""
+
+    @staticmethod
+    def _versao(db: Session, user_id: str) -> Tuple:
+        """Versão das configurações do usuário no banco (escritas de qualquer worker)"""
+        return tuple(db.query(
+            func.count(Configuracao.id),
+            func.max(Configuracao.atualizado_em)
+        ).filter(Configuracao.id_usuario == user_id).one())
+
+    @staticmethod
+    def get_settings(db: Session, user_id: str) -> Dict[str, Any]:
+        """Obtém todas as configurações do usuário já tipadas (uma query, com cache)"""
+        validadas = db.info.setdefault(_VALIDADAS, set())
+        cached = _settings_cache.get(user_id)
+        if cached is not None and user_id not in validadas and cached[0] != SettingsService._versao(db, user_id):
+            cached = None
+        if cached is None:
+            rows = db.query(
+                Configuracao.chave,
+                Configuracao.valor,
+                Configuracao.tipo_dado,
+                Configuracao.atualizado_em
+            ).filter(Configuracao.id_usuario == user_id).all()
+
+            versao = (len(rows), max((row.atualizado_em for row in rows), default=None))
+            cached = (versao, {
+                row.chave: converter_valor_configuracao(row.valor, row.tipo_dado)
+                for row in rows
+            })
+            _settings_cache.set(user_id, cached)
+        validadas.add(user_id)
+
+        return dict(cached[1])
+
+    @staticmethod
+    def get_setting_value(db: Session, user_id: str, chave: str, default: Any = None) -> Any:
+        """
+        Acesso tipado a uma configuração (ex.: `fuso_horario`, `lembrete_sessao`)
+
+        Usa o valor padrão de `CONFIGURACOES_PADRAO_USUARIO` quando o usuário
+        não possui a chave e nenhum `default` é informado.
+        """
+        chave = chave.lower()
+        valor = SettingsService.get_settings(db, user_id).get(chave)
+        if valor is not None:
+            return valor
+        if default is not None:
+            return default
+        padrao = _PADROES.get(chave)
+        if padrao:
+            return converter_valor_configuracao(padrao["valor"], padrao["tipo_dado"])
+        return None
+
+    @staticmethod
+    def get_timezone(db: Session, user_id: str) -> ZoneInfo:
+        """Fuso do usuário (`fuso_horario`), com Settings.TIMEZONE como fallback"""
+        return get_zoneinfo(SettingsService.get_setting_value(db, user_id, "fuso_horario"))
+
+    @staticmethod
+    def bulk_update_settings(
+        db: Session,
+        user_id: str,
+        valores: Dict[str, Any],
+        tipos: Optional[Dict[str, str]] = None,
+        categorias: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Cria/atualiza várias configurações em um único INSERT ... ON CONFLICT
+
+        `tipos`/`categorias` (por chave) sobrescrevem os metadados; sem eles, uma
+        chave existente mantém o `tipo_dado` e a `categoria` salvos quando o valor
+        não define o tipo (texto em chave personalizada).
+        """
+        if not valores:
+            raise ValidationError("Nenhuma configuração informada")
+
+        # Chaves iguais após normalizar ("Tema"/"tema") viram uma linha só (vence a
+        # última): o PostgreSQL rejeita ON CONFLICT que atualiza a mesma linha duas vezes
+        normalizados = {_normalizar_chave(chave): valor for chave, valor in valores.items()}
+        tipos = {_normalizar_chave(chave): tipo for chave, tipo in (tipos or {}).items()}
+        categorias = {_normalizar_chave(chave): cat for chave, cat in (categorias or {}).items()}
+
+        # Metadados já salvos (uma query): o ON CONFLICT grava os da linha enviada
+        existentes = {
+            chave: (tipo_dado, categoria)
+            for chave, tipo_dado, categoria in db.query(
+                Configuracao.chave, Configuracao.tipo_dado, Configuracao.categoria
+            ).filter(
+                Configuracao.id_usuario == user_id,
+                Configuracao.chave.in_(list(normalizados))
+            )
+        }
+
+        agora = now_utc()
+        rows = []
+        for chave, valor in normalizados.items():
+            texto, tipo_dado = _serializar_valor(chave, valor)
+            tipo_salvo, categoria_salva = existentes.get(chave, (None, None))
+            rows.append({
+                "id": generate_ulid(),
+                "id_usuario": user_id,
+                "chave": chave,
+                "valor": texto,
+                "tipo_dado": tipos.get(chave) or tipo_dado or tipo_salvo or "string",
+                "categoria": (
+                    categorias.get(chave)
+                    or categoria_salva
+                    or _PADROES.get(chave, {}).get("categoria", "geral")
+                ),
+                "eh_publica": False,
+                "criado_em": agora,
+                "atualizado_em": agora
+            })
+
+        try:
+            if supports_upsert(db):
+                stmt = build_upsert(
+                    db,
+                    Configuracao.__table__,
+                    rows,
+                    index_elements=["id_usuario", "chave"],
+                    set_=lambda excluded: {
+                        "valor": excluded.valor,
+                        "tipo_dado": excluded.tipo_dado,
+                        "categoria": excluded.categoria,
+                        "atualizado_em": excluded.atualizado_em
+                    }
+                )
+                db.execute(stmt)
+            else:
+                for row in rows:
+                    SettingsService._upsert_orm(db, row)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro ao atualizar configurações em lote: {str(e)}")
+            raise ValidationError("Erro ao atualizar configurações")
+        finally:
+            SettingsService.invalidate(user_id)
+
+        logger.info(f"{len(rows)} configurações atualizadas para usuário {user_id}")
+        if any(row["chave"] == "fuso_horario" for row in rows):
+            # Datas locais das transações dependem do fuso
+            from services.transaction_service import TransactionService
+            TransactionService.rebuild_local_dates(db, user_id)
+        return SettingsService.get_settings(db, user_id)
+
+    @staticmethod
+    def invalidate(user_id: str) -> None:
+        """Invalida o cache de configurações do usuário"""
+        _settings_cache.invalidate(user_id)
+
+    @staticmethod
+    def _upsert_orm(db: Session, row: Dict[str, Any]) -> None:
+        """Fallback de upsert via ORM para dialetos sem ON CONFLICT"""
+        setting = db.query(Configuracao).filter(
+            Configuracao.id_usuario == row["id_usuario"],
+            Configuracao.chave == row["chave"]
+        ).first()
+        if setting:
+            setting.valor = row["valor"]
+            setting.tipo_dado = row["tipo_dado"]
+            setting.categoria = row["categoria"]
+            setting.atualizado_em = row["atualizado_em"]
+        else:
+            db.add(Configuracao(**row))
@@ -2,12 +2,12 @@
 Serviço de gerenciamento de assinaturas
 """
 import uuid
-from datetime import datetime, timedelta
-from typing import Optional, List
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, tuple_, update
 
-from models import Usuario, Assinatura
+from models import Usuario, Assinatura, SnapshotAssinatura
 from schemas.payment_schemas import (
     SubscriptionCreate,
     SubscriptionUpdate, 
@@ -15,12 +15,20 @@ from schemas.payment_schemas import (
     PlanType,
     SubscriptionStatus
 )
-from .asaas_service import AsaasService
 from config.payments import SUBSCRIPTION_PLANS
+from config.settings import settings
+from utils.cache import TTLCache
+from utils.sql import build_upsert, supports_upsert
+from services.entitlement_service import EntitlementService
 
 import logging
 logger = logging.getLogger(__name__)
 
+# Estatísticas agregadas (consulta única, cache curto)
+_stats_cache = TTLCache(ttl_seconds=settings.SUBSCRIPTION_STATS_CACHE_SECONDS, max_entries=1)
+
+PLANOS = ['basic', 'pro', 'premium']
+
 class SubscriptionService:
     """Serviço para gerenciar assinaturas dos usuários"""
     
@@ -58,7 +66,7 @@ class SubscriptionService:
         
         db.add(subscription)
         db.commit()
-        db.refresh(subscription)
+        EntitlementService.invalidate(user_id)
         
         logger.info(f"Assinatura criada: {subscription.id} para usuário {user_id}")
         return subscription
@@ -104,7 +112,7 @@ class SubscriptionService:
         subscription.atualizado_em = datetime.now()
         
         db.commit()
-        db.refresh(subscription)
+        EntitlementService.invalidate(subscription.id_usuario)
         
         logger.info(f"Assinatura atualizada: {subscription_id}")
         return subscription
@@ -127,7 +135,7 @@ class SubscriptionService:
         subscription.atualizado_em = datetime.now()
         
         db.commit()
-        db.refresh(subscription)
+        EntitlementService.invalidate(user_id)
         
         logger.info(f"Assinatura cancelada: {subscription_id}")
         return subscription
@@ -144,10 +152,11 @@ class SubscriptionService:
             raise ValueError("Assinatura não encontrada")
         
         subscription.periodo_fim = subscription.periodo_fim + timedelta(days=days)
+        subscription.aviso_expiracao_em = None  # novo período, novo aviso
         subscription.atualizado_em = datetime.now()
         
         db.commit()
-        db.refresh(subscription)
+        EntitlementService.invalidate(subscription.id_usuario)
         
         logger.info(f"Assinatura estendida: {subscription_id} por {days} dias")
         return subscription
@@ -166,23 +175,89 @@ class SubscriptionService:
         ).all()
     
     @staticmethod
-    def expire_subscriptions(db: Session) -> int:
-        """Expirar assinaturas vencidas"""
-        expired_subscriptions = db.query(Assinatura).filter(
-            and_(
+    def iter_expiring_subscriptions(
+        db: Session,
+        days_ahead: int = 3,
+        chunk_size: int = 500
+    ) -> Iterator[List[Dict]]:
+        """
+        Percorre em lotes (keyset por periodo_fim, id) as assinaturas ativas que
+        vencem em até X dias e ainda não receberam aviso neste período
+        """
+        now = datetime.now()
+        target_date = now + timedelta(days=days_ahead)
+        cursor = None
+        
+        while True:
+            query = db.query(
+                Assinatura.id,
+                Assinatura.id_usuario,
+                Assinatura.tipo_plano,
+                Assinatura.periodo_fim
+            ).filter(
                 Assinatura.status == 'ACTIVE',
-                Assinatura.periodo_fim <= datetime.now()
+                Assinatura.periodo_fim > now,
+                Assinatura.periodo_fim <= target_date,
+                Assinatura.aviso_expiracao_em.is_(None)
             )
-        ).all()
-        
-        count = 0
-        for subscription in expired_subscriptions:
-            subscription.status = 'EXPIRED'
-            subscription.atualizado_em = datetime.now()
-            count += 1
+            if cursor is not None:
+                query = query.filter(tuple_(Assinatura.periodo_fim, Assinatura.id) > cursor)
+            
+            rows = query.order_by(Assinatura.periodo_fim, Assinatura.id).limit(chunk_size).all()
+            if not rows:
+                return
+            
+            yield [row._asdict() for row in rows]
+            cursor = (rows[-1].periodo_fim, rows[-1].id)
+    
+    @staticmethod
+    def notify_expiring_subscriptions(
+        db: Session,
+        days_ahead: int = 3,
+        chunk_size: int = 500,
+        notify: Optional[Callable[[List[Dict]], None]] = None
+    ) -> int:
+        """Gera avisos de vencimento próximo em lotes, marcando cada lote como avisado"""
+        total = 0
+        for chunk in SubscriptionService.iter_expiring_subscriptions(db, days_ahead, chunk_size):
+            if notify:
+                notify(chunk)
+            else:
+                for item in chunk:
+                    logger.info(f"Assinatura {item['id']} do usuário {item['id_usuario']} vence em {item['periodo_fim']}")
+            
+            db.execute(
+                update(Assinatura)
+                .where(Assinatura.id.in_([item['id'] for item in chunk]))
+                .values(aviso_expiracao_em=datetime.now(), versao=Assinatura.versao + 1)
+                # Mantém a versão das assinaturas já carregadas na sessão (filtro só por id)
+                .execution_options(synchronize_session="evaluate")
+            )
+            db.commit()
+            total += len(chunk)
         
+        if total:
+            logger.info(f"Avisos de vencimento gerados: {total}")
+        return total
+    
+    @staticmethod
+    def expire_subscriptions(db: Session) -> int:
+        """Expirar assinaturas vencidas (um único UPDATE em lote)"""
+        now = datetime.now()
+        result = db.execute(
+            update(Assinatura)
+            .where(
+                Assinatura.status == 'ACTIVE',
+                Assinatura.periodo_fim <= now
+            )
+            .values(status='EXPIRED', atualizado_em=now, versao=Assinatura.versao + 1)
+            .execution_options(synchronize_session=False)
+        )
         db.commit()
         
+        count = result.rowcount
+        if count:
+            EntitlementService.invalidate_all()
         logger.info(f"Expiradas {count} assinaturas")
         return count
     
@@ -196,48 +271,103 @@ class SubscriptionService:
     
     @staticmethod
     def user_has_access(db: Session, user_id: str, feature: str = None) -> bool:
-        """Verificar se usuário tem acesso a uma funcionalidade"""
-        subscription = SubscriptionService.get_active_subscription(db, user_id)
-        
-        if not subscription:
-            return False  # Sem assinatura = sem acesso
-        
-        # TODO: Implementar lógica de features por plano
-        plan_type = subscription.tipo_plano
-        
-        # Por enquanto, todos os planos pagos têm acesso total
-        return plan_type in ['basic', 'pro', 'premium']
+        """Verificar se usuário tem acesso a uma funcionalidade (snapshot em cache)"""
+        snapshot = EntitlementService.get_entitlements(db, user_id)
+        if feature is None:
+            return EntitlementService.is_active(snapshot)
+        return EntitlementService.has_feature(snapshot, feature)
+    
+    @staticmethod
+    def count_by_status_and_plan(db: Session) -> List[tuple]:
+        """Contagem de assinaturas agrupada por (status, tipo_plano) em uma query"""
+        return db.query(
+            Assinatura.status,
+            Assinatura.tipo_plano,
+            func.count(Assinatura.id)
+        ).group_by(Assinatura.status, Assinatura.tipo_plano).all()
     
     @staticmethod
     def get_subscription_stats(db: Session) -> dict:
-        """Estatísticas das assinaturas"""
-        total = db.query(Assinatura).count()
-        active = db.query(Assinatura).filter(Assinatura.status == 'ACTIVE').count()
-        expired = db.query(Assinatura).filter(Assinatura.status == 'EXPIRED').count()
-        cancelled = db.query(Assinatura).filter(Assinatura.status == 'INACTIVE').count()
+        """Estatísticas das assinaturas (um GROUP BY, cache por alguns segundos)"""
+        cached = _stats_cache.get("stats")
+        if cached is not None:
+            return cached
         
-        # Por plano
-        basic = db.query(Assinatura).filter(
-            and_(Assinatura.tipo_plano == 'basic', Assinatura.status == 'ACTIVE')
-        ).count()
-        pro = db.query(Assinatura).filter(
-            and_(Assinatura.tipo_plano == 'pro', Assinatura.status == 'ACTIVE')
-        ).count()
-        premium = db.query(Assinatura).filter(
-            and_(Assinatura.tipo_plano == 'premium', Assinatura.status == 'ACTIVE')
-        ).count()
+        por_status = {'ACTIVE': 0, 'EXPIRED': 0, 'INACTIVE': 0}
+        por_plano = {plano: 0 for plano in PLANOS}
+        total = 0
+        for status, plano, quantidade in SubscriptionService.count_by_status_and_plan(db):
+            total += quantidade
+            por_status[status] = por_status.get(status, 0) + quantidade
+            if status == 'ACTIVE':
+                por_plano[plano] = por_plano.get(plano, 0) + quantidade
         
-        return {
+        stats = {
             'total': total,
-            'active': active,
-            'expired': expired,
-            'cancelled': cancelled,
-            'by_plan': {
-                'basic': basic,
-                'pro': pro,
-                'premium': premium
-            }
+            'active': por_status['ACTIVE'],
+            'expired': por_status['EXPIRED'],
+            'cancelled': por_status['INACTIVE'],
+            'by_plan': por_plano
         }
+        _stats_cache.set("stats", stats)
+        return stats
+    
+    @staticmethod
+    def take_daily_snapshot(db: Session, dia: Optional[date] = None) -> int:
+        """
+        Grava (ou regrava) o snapshot do dia com as contagens por plano e status
+
+        As linhas do dia são apagadas antes, na mesma transação: um grupo que
+        zerou desde a última execução do dia não fica com a contagem antiga.
+        O upsert protege contra duas execuções simultâneas.
+        """
+        dia = dia or date.today()
+        rows = [
+            {
+                'id': str(uuid.uuid4()),
+                'data': dia,
+                'tipo_plano': plano,
+                'status': status,
+                'total': quantidade,
+                'criado_em': datetime.now()
+            }
+            for status, plano, quantidade in SubscriptionService.count_by_status_and_plan(db)
+        ]
+        
+        db.query(SnapshotAssinatura).filter(SnapshotAssinatura.data == dia).delete(synchronize_session=False)
+        if rows and supports_upsert(db):
+            db.execute(build_upsert(
+                db,
+                SnapshotAssinatura.__table__,
+                rows,
+                index_elements=['data', 'tipo_plano', 'status'],
+                set_=lambda excluded: {'total': excluded.total, 'criado_em': excluded.criado_em}
+            ))
+        elif rows:
+            db.add_all([SnapshotAssinatura(**row) for row in rows])
+        db.commit()
+        
+        logger.info(f"Snapshot de assinaturas gravado para {dia}: {len(rows)} grupos")
+        return len(rows)
+    
+    @staticmethod
+    def get_snapshot_history(db: Session, days: int = 30, status: str = 'ACTIVE') -> List[dict]:
+        """Série histórica diária por plano a partir dos snapshots"""
+        inicio = date.today() - timedelta(days=days - 1)
+        rows = db.query(
+            SnapshotAssinatura.data,
+            SnapshotAssinatura.tipo_plano,
+            SnapshotAssinatura.total
+        ).filter(
+            SnapshotAssinatura.data >= inicio,
+            SnapshotAssinatura.status == status
+        ).order_by(SnapshotAssinatura.data).all()
+        
+        series: Dict[date, dict] = {}
+        for dia, plano, total in rows:
+            ponto = series.setdefault(dia, {'date': dia.isoformat(), **{p: 0 for p in PLANOS}})
+            ponto[plano] = total
+        return list(series.values())
     
     @staticmethod
     def get_user_subscription(db: Session, user_id: str) -> Optional[Assinatura]:
@@ -278,7 +408,7 @@ class SubscriptionService:
         
         db.add(subscription)
         db.commit()
-        db.refresh(subscription)
+        EntitlementService.invalidate(user_id)
         
         return subscription
     
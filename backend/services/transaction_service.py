@@ -4,11 +4,17 @@ Serviço de transações
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, asc, and_, or_, extract
+from sqlalchemy import bindparam, func, desc, asc, and_, or_, extract
+from sqlalchemy.orm.exc import StaleDataError
 
 from models import Transacao, Categoria
-from utils.helpers import now_utc, get_period_dates, parse_tags, tags_to_string
-from utils.exceptions import NotFoundError, ValidationError
+from utils.helpers import now_utc, get_period_dates, parse_tags, tags_to_string, to_local_date
+from utils.exceptions import NotFoundError, ValidationError, ConflictError, QuotaExceededError
+from services.usage_service import UsageService, RECURSO_TRANSACOES, mes_de
+from services.goal_progress_service import GoalProgressService
+from services.session_attribution_service import SessionAttributionService
+from services.live_session_service import live_hub
+from services.settings_service import SettingsService
 from config.logging_config import logger
 
 class TransactionService:
@@ -45,24 +51,38 @@ class TransactionService:
         if category.tipo != tipo:
             raise ValidationError(f"Tipo da transação ({tipo}) não confere com tipo da categoria ({category.tipo})")
         
+        data = data or now_utc()
         transaction = Transacao(
             id_usuario=user_id,
             id_categoria=id_categoria,
+            categoria=category,
             valor=valor,
             tipo=tipo,
             descricao=descricao,
-            data=data or now_utc(),
+            data=data,
+            data_local=to_local_date(data, SettingsService.get_timezone(db, user_id)),
             origem=origem,
             id_externo=id_externo,
             plataforma=plataforma,
             observacoes=observacoes,
-            tags=tags_to_string(tags) if tags else None
+            tags=tags_to_string(tags) if tags else None,
+            criado_em=now_utc()
         )
         
+        # Cota mensal consumida na mesma transação do INSERT, no mês da criação
+        # (lançar com data retroativa não libera cota do mês corrente)
+        try:
+            UsageService.consume(db, user_id, RECURSO_TRANSACOES, mes_de(transaction.criado_em))
+        except QuotaExceededError:
+            db.rollback()
+            raise
+        
         try:
             db.add(transaction)
+            sessao = SessionAttributionService.attach(db, transaction)
+            GoalProgressService.apply_transaction(db, transaction)
             db.commit()
-            db.refresh(transaction)
+            live_hub.publish(sessao)
             logger.info(f"Transação criada: {valor} {tipo} para usuário {user_id}")
             return transaction
         except Exception as e:
@@ -70,6 +90,75 @@ class TransactionService:
             logger.error(f"Erro ao criar transação: {str(e)}")
             raise ValidationError("Erro ao criar transação")
     
+    @staticmethod
+    def bulk_create_transactions(db: Session, user_id: str, items: List[Dict[str, Any]]) -> List[Transacao]:
+        """
+        Importa transações em lote (tudo ou nada)
+        
+        Categorias são validadas em uma única query e a cota do mês corrente é
+        consumida uma vez para o lote, no mesmo commit dos INSERTs.
+        """
+        if not items:
+            return []
+        
+        ids_categoria = {item["id_categoria"] for item in items}
+        tipos = dict(db.query(Categoria.id, Categoria.tipo).filter(
+            Categoria.id.in_(ids_categoria),
+            Categoria.id_usuario == user_id,
+            Categoria.eh_ativa == True
+        ).all())
+        
+        agora = now_utc()
+        fuso = SettingsService.get_timezone(db, user_id)
+        transactions = []
+        for item in items:
+            tipo_categoria = tipos.get(item["id_categoria"])
+            if tipo_categoria is None:
+                raise NotFoundError("Categoria", item["id_categoria"])
+            if tipo_categoria != item["tipo"]:
+                raise ValidationError(f"Tipo da transação ({item['tipo']}) não confere com tipo da categoria ({tipo_categoria})")
+            
+            tags = item.get("tags")
+            data = item.get("data") or agora
+            transaction = Transacao(
+                id_usuario=user_id,
+                id_categoria=item["id_categoria"],
+                valor=item["valor"],
+                tipo=item["tipo"],
+                descricao=item.get("descricao"),
+                data=data,
+                data_local=to_local_date(data, fuso),
+                origem=item.get("origem"),
+                id_externo=item.get("id_externo"),
+                plataforma=item.get("plataforma"),
+                observacoes=item.get("observacoes"),
+                tags=tags_to_string(tags) if tags else None,
+                criado_em=agora
+            )
+            transactions.append(transaction)
+        
+        try:
+            UsageService.consume(db, user_id, RECURSO_TRANSACOES, mes_de(agora), len(transactions))
+        except QuotaExceededError:
+            db.rollback()
+            raise
+        
+        try:
+            sessoes = SessionAttributionService.attach_many(db, user_id, transactions)
+            db.add_all(transactions)
+            db.flush()
+            # Um recálculo por métrica em vez de um UPDATE por transação
+            GoalProgressService.recompute(db, user_id=user_id, commit=False)
+            db.commit()
+            for sessao in sessoes:
+                live_hub.publish(sessao)
+            logger.info(f"{len(transactions)} transações importadas para usuário {user_id}")
+            return transactions
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro ao importar transações: {str(e)}")
+            raise ValidationError("Erro ao importar transações")
+    
     @staticmethod
     def get_transaction_by_id(db: Session, transaction_id: str, user_id: str) -> Transacao:
         """Busca transação por ID"""
@@ -155,11 +244,17 @@ class TransactionService:
         descricao: Optional[str] = None,
         data: Optional[datetime] = None,
         observacoes: Optional[str] = None,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        versao: Optional[int] = None
     ) -> Transacao:
-        """Atualiza transação"""
+        """Atualiza transação (com `versao`, só se ainda for a versão lida pelo cliente)"""
         
         transaction = TransactionService.get_transaction_by_id(db, transaction_id, user_id)
+        if versao is not None and transaction.versao != versao:
+            raise ConflictError("Transação alterada por outra requisição. Recarregue e tente novamente.")
+        
+        # Campos que entram nas métricas das metas: estorna antes e reaplica depois
+        afeta_metas = any(campo is not None for campo in (id_categoria, valor, data))
         
         if id_categoria:
             # Verifica se nova categoria existe e pertence ao usuário
@@ -175,8 +270,19 @@ class TransactionService:
             # Verifica se tipo da categoria bate com tipo da transação
             if category.tipo != transaction.tipo:
                 raise ValidationError(f"Tipo da categoria ({category.tipo}) não confere com tipo da transação ({transaction.tipo})")
-            
+        
+        # Valor e data também movem a transação entre sessões e seus totais
+        afeta_sessao = valor is not None or data is not None
+        
+        if afeta_metas:
+            GoalProgressService.apply_transaction(db, transaction, -1)
+        sessoes = []
+        if afeta_sessao:
+            sessoes.append(SessionAttributionService.detach(db, transaction))
+        
+        if id_categoria:
             transaction.id_categoria = id_categoria
+            transaction.categoria = category
         
         if valor is not None:
             transaction.valor = valor
@@ -185,7 +291,9 @@ class TransactionService:
             transaction.descricao = descricao
         
         if data is not None:
+            # A cota fica no mês da criação: mudar a data não move o consumo
             transaction.data = data
+            transaction.data_local = to_local_date(data, SettingsService.get_timezone(db, user_id))
         
         if observacoes is not None:
             transaction.observacoes = observacoes
@@ -196,10 +304,18 @@ class TransactionService:
         transaction.atualizado_em = now_utc()
         
         try:
+            if afeta_sessao:
+                sessoes.append(SessionAttributionService.attach(db, transaction))
+            if afeta_metas:
+                GoalProgressService.apply_transaction(db, transaction)
             db.commit()
-            db.refresh(transaction)
+            for sessao in sessoes:
+                live_hub.publish(sessao)
             logger.info(f"Transação atualizada: {transaction_id} para usuário {user_id}")
             return transaction
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Transação alterada por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao atualizar transação: {str(e)}")
@@ -212,14 +328,59 @@ class TransactionService:
         transaction = TransactionService.get_transaction_by_id(db, transaction_id, user_id)
         
         try:
+            UsageService.release(db, user_id, RECURSO_TRANSACOES, mes_de(transaction.criado_em or transaction.data))
+            GoalProgressService.apply_transaction(db, transaction, -1)
+            sessao = SessionAttributionService.detach(db, transaction)
             db.delete(transaction)
             db.commit()
+            live_hub.publish(sessao)
             logger.info(f"Transação removida: {transaction_id} para usuário {user_id}")
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Transação alterada por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao remover transação: {str(e)}")
             raise ValidationError("Erro ao remover transação")
     
+    @staticmethod
+    def rebuild_local_dates(db: Session, user_id: Optional[str] = None, only_missing: bool = False) -> int:
+        """
+        Recalcula `data_local` no fuso de cada usuário (backfill ou troca de fuso)
+        
+        Lê (id, data) por usuário e grava em lote (executemany), com commit.
+        """
+        if user_id:
+            usuarios = [user_id]
+        else:
+            query = db.query(Transacao.id_usuario).distinct()
+            if only_missing:
+                query = query.filter(Transacao.data_local.is_(None))
+            usuarios = [uid for (uid,) in query.all()]
+        tabela = Transacao.__table__
+        total = 0
+        for uid in usuarios:
+            fuso = SettingsService.get_timezone(db, uid)
+            query = db.query(Transacao.id, Transacao.data).filter(Transacao.id_usuario == uid)
+            if only_missing:
+                query = query.filter(Transacao.data_local.is_(None))
+            rows = [
+                {"_id": id_, "_data_local": to_local_date(data, fuso)}
+                for id_, data in query.all()
+            ]
+            if rows:
+                db.execute(
+                    tabela.update()
+                    .where(tabela.c.id == bindparam("_id"))
+                    .values(data_local=bindparam("_data_local"), versao=tabela.c.versao + 1),
+                    rows
+                )
+            total += len(rows)
+        db.commit()
+        
+        logger.info(f"Datas locais recalculadas: {total} transações")
+        return total
+    
     @staticmethod
     def get_transactions_summary(
         db: Session,
@@ -305,23 +466,25 @@ class TransactionService:
         data_inicio: Optional[datetime] = None,
         data_fim: Optional[datetime] = None
     ) -> List[Dict[str, Any]]:
-        """Obtém transações agrupadas por dia"""
+        """Obtém transações agrupadas por dia (data local do usuário)"""
         
         query = db.query(
-            func.date(Transacao.data).label('data'),
+            Transacao.data_local.label('data'),
             Transacao.tipo,
             func.sum(Transacao.valor).label('total'),
             func.count(Transacao.id).label('count')
         ).filter(Transacao.id_usuario == user_id)
         
-        if data_inicio:
-            query = query.filter(Transacao.data >= data_inicio)
-        
-        if data_fim:
-            query = query.filter(Transacao.data <= data_fim)
+        # Filtros por dia local: range scan em ix_transacoes_usuario_data_local
+        if data_inicio or data_fim:
+            fuso = SettingsService.get_timezone(db, user_id)
+            if data_inicio:
+                query = query.filter(Transacao.data_local >= to_local_date(data_inicio, fuso))
+            if data_fim:
+                query = query.filter(Transacao.data_local <= to_local_date(data_fim, fuso))
         
         results = query.group_by(
-            func.date(Transacao.data),
+            Transacao.data_local,
             Transacao.tipo
         ).order_by(desc('data')).all()
         
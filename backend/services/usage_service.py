@@ -0,0 +1,158 @@
+"""
+Serviço de uso mensal e cotas dos planos
+
+Os contadores em `uso_mensal` são atualizados na mesma transação das escritas
+(inserção, remoção e importação em lote), então checar a cota é uma leitura por
+chave primária em vez de um COUNT(*) sobre `transacoes`. Transações contam no
+mês em que foram criadas (`criado_em`), não no mês da `data` informada: lançar
+com data retroativa ou futura consome a cota do mês corrente.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from models import UsoMensal, Transacao
+from services.entitlement_service import EntitlementService
+from utils.helpers import now_utc
+from utils.sql import build_upsert, supports_upsert
+from utils.exceptions import QuotaExceededError
+from config.logging_config import logger
+
+RECURSO_TRANSACOES = "transacoes_mes"
+
+
+def mes_de(data: Optional[datetime] = None) -> str:
+    """Chave do mês (YYYY-MM) de uma data"""
+    return (data or now_utc()).strftime("%Y-%m")
+
+
+class UsageService:
+    """Serviço de contadores de uso e verificação de cotas"""
+
+    @staticmethod
+    def _ensure_row(db: Session, user_id: str, recurso: str, mes: str) -> None:
+        """Garante a linha do contador (INSERT ... ON CONFLICT DO NOTHING)"""
+        row = {"id_usuario": user_id, "mes": mes, "recurso": recurso, "quantidade": 0, "atualizado_em": now_utc()}
+        if supports_upsert(db):
+            db.execute(build_upsert(db, UsoMensal.__table__, [row], index_elements=["id_usuario", "mes", "recurso"]))
+        elif db.get(UsoMensal, (user_id, mes, recurso)) is None:
+            db.add(UsoMensal(**row))
+            db.flush()
+
+    @staticmethod
+    def get_usage(db: Session, user_id: str, recurso: str, mes: Optional[str] = None) -> int:
+        """Uso atual (leitura por chave primária)"""
+        quantidade = db.query(UsoMensal.quantidade).filter(
+            UsoMensal.id_usuario == user_id,
+            UsoMensal.mes == (mes or mes_de()),
+            UsoMensal.recurso == recurso
+        ).scalar()
+        return quantidade or 0
+
+    @staticmethod
+    def consume(db: Session, user_id: str, recurso: str, mes: str, quantidade: int = 1) -> int:
+        """
+        Consome `quantidade` da cota do mês de forma atômica
+
+        O incremento é um UPDATE condicional (`quantidade + n <= limite`), então
+        requisições concorrentes não ultrapassam o limite. Não faz commit: deve
+        ser chamado na mesma transação da escrita que consome a cota.
+        """
+        if quantidade <= 0:
+            return 0
+        limite = EntitlementService.get_limit(EntitlementService.get_entitlements(db, user_id), recurso)
+
+        UsageService._ensure_row(db, user_id, recurso, mes)
+        stmt = update(UsoMensal).where(
+            UsoMensal.id_usuario == user_id,
+            UsoMensal.mes == mes,
+            UsoMensal.recurso == recurso
+        )
+        if limite is not None:
+            stmt = stmt.where(UsoMensal.quantidade + quantidade <= limite)
+
+        result = db.execute(
+            stmt.values(quantidade=UsoMensal.quantidade + quantidade, atualizado_em=now_utc())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            raise QuotaExceededError(recurso, limite)
+        return quantidade
+
+    @staticmethod
+    def release(db: Session, user_id: str, recurso: str, mes: str, quantidade: int = 1) -> None:
+        """Devolve cota (remoções). Não faz commit."""
+        if quantidade <= 0:
+            return
+        db.execute(
+            update(UsoMensal)
+            .where(
+                UsoMensal.id_usuario == user_id,
+                UsoMensal.mes == mes,
+                UsoMensal.recurso == recurso
+            )
+            .values(
+                quantidade=func.max(UsoMensal.quantidade - quantidade, 0)
+                if db.get_bind().dialect.name == "sqlite"
+                else func.greatest(UsoMensal.quantidade - quantidade, 0),
+                atualizado_em=now_utc()
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def get_usage_report(db: Session, user_id: str, mes: Optional[str] = None) -> Dict[str, Any]:
+        """Consumo do mês para cada limite do plano do usuário"""
+        mes = mes or mes_de()
+        entitlements = EntitlementService.get_entitlements(db, user_id)
+        usos = dict(db.query(UsoMensal.recurso, UsoMensal.quantidade).filter(
+            UsoMensal.id_usuario == user_id,
+            UsoMensal.mes == mes
+        ).all())
+
+        recursos: List[Dict[str, Any]] = []
+        for recurso, limite in entitlements['limits'].items():
+            usado = usos.get(recurso, 0)
+            recursos.append({
+                "recurso": recurso,
+                "usado": usado,
+                "limite": limite,
+                "restante": None if limite is None else max(limite - usado, 0),
+                "percentual": None if not limite else round(usado / limite * 100, 1)
+            })
+
+        return {
+            "mes": mes,
+            "plano": entitlements['plan'],
+            "status": entitlements['status'],
+            "recursos": recursos
+        }
+
+    @staticmethod
+    def rebuild_transaction_usage(db: Session, user_id: Optional[str] = None) -> int:
+        """Recalcula os contadores de transações a partir da tabela (backfill/correção)"""
+        criacao = func.coalesce(Transacao.criado_em, Transacao.data)
+        mes_expr = func.strftime("%Y-%m", criacao) if db.get_bind().dialect.name == "sqlite" \
+            else func.to_char(criacao, "YYYY-MM")
+        query = db.query(Transacao.id_usuario, mes_expr.label("mes"), func.count(Transacao.id))
+        if user_id:
+            query = query.filter(Transacao.id_usuario == user_id)
+
+        agora = now_utc()
+        rows = [
+            {"id_usuario": uid, "mes": mes, "recurso": RECURSO_TRANSACOES, "quantidade": total, "atualizado_em": agora}
+            for uid, mes, total in query.group_by(Transacao.id_usuario, mes_expr).all()
+        ]
+
+        delete = db.query(UsoMensal).filter(UsoMensal.recurso == RECURSO_TRANSACOES)
+        if user_id:
+            delete = delete.filter(UsoMensal.id_usuario == user_id)
+        delete.delete(synchronize_session=False)
+        if rows:
+            db.execute(UsoMensal.__table__.insert(), rows)
+        db.commit()
+
+        logger.info(f"Contadores de uso recalculados: {len(rows)} linhas")
+        return len(rows)
@@ -4,11 +4,14 @@ Serviço de usuários
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 from sqlalchemy import func
 
 from models import Usuario, Configuracao, CONFIGURACOES_PADRAO_USUARIO
 from utils.helpers import now_utc
 from utils.exceptions import NotFoundError, ValidationError, ConflictError
+from services.settings_service import SettingsService
+from services.entitlement_service import EntitlementService
 from config.logging_config import logger
 
 class UserService:
@@ -29,9 +32,13 @@ class UserService:
         nome_completo: Optional[str] = None,
         telefone: Optional[str] = None,
         veiculo: Optional[str] = None,
-        data_inicio_atividade: Optional[datetime] = None
+        data_inicio_atividade: Optional[datetime] = None,
+        versao: Optional[int] = None
     ) -> Usuario:
-        """Atualiza perfil do usuário"""
+        """Atualiza perfil do usuário (com `versao`, só se ainda for a versão lida pelo cliente)"""
+        
+        if versao is not None and user.versao != versao:
+            raise ConflictError("Perfil alterado por outra requisição. Recarregue e tente novamente.")
         
         if nome_completo is not None:
             user.nome_completo = nome_completo
@@ -49,9 +56,11 @@ class UserService:
         
         try:
             db.commit()
-            db.refresh(user)
             logger.info(f"Perfil atualizado para usuário: {user.nome_usuario}")
             return user
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Perfil alterado por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao atualizar perfil: {str(e)}")
@@ -73,6 +82,7 @@ class UserService:
         
         try:
             db.commit()
+            SettingsService.invalidate(user.id)
             logger.info(f"Configurações padrão criadas para usuário: {user.nome_usuario}")
         except Exception as e:
             db.rollback()
@@ -101,38 +111,29 @@ class UserService:
         categoria: Optional[str] = None,
         tipo_dado: Optional[str] = None
     ) -> Configuracao:
-        """Atualiza ou cria configuração do usuário"""
-        
-        setting = UserService.get_user_setting(db, user_id, chave)
-        
-        if setting:
-            # Atualiza existente
-            setting.valor = valor
-            if categoria:
-                setting.categoria = categoria
-            if tipo_dado:
-                setting.tipo_dado = tipo_dado
-            setting.atualizado_em = now_utc()
-        else:
-            # Cria nova
-            setting = Configuracao(
-                id_usuario=user_id,
-                chave=chave.lower(),
-                valor=valor,
-                categoria=categoria or "geral",
-                tipo_dado=tipo_dado or "string"
-            )
-            db.add(setting)
-        
-        try:
-            db.commit()
-            db.refresh(setting)
-            logger.info(f"Configuração atualizada: {chave} para usuário {user_id}")
-            return setting
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Erro ao atualizar configuração: {str(e)}")
-            raise ValidationError("Erro ao atualizar configuração")
+        """
+        Atualiza ou cria configuração do usuário
+
+        A escrita passa por `SettingsService.bulk_update_settings` (mesmo
+        upsert, invalidação de cache e recálculo das datas locais ao trocar
+        `fuso_horario`) em um único commit; sem `tipo_dado`/`categoria`
+        explícitos, uma configuração existente mantém os salvos.
+        """
+        SettingsService.bulk_update_settings(
+            db,
+            user_id,
+            {chave: valor},
+            tipos={chave: tipo_dado} if tipo_dado else None,
+            categorias={chave: categoria} if categoria else None
+        )
+        # populate_existing: a linha pode já estar na sessão com o valor antigo
+        setting = db.query(Configuracao).populate_existing().filter(
+            Configuracao.id_usuario == user_id,
+            Configuracao.chave == chave.strip().lower()
+        ).first()
+
+        logger.info(f"Configuração atualizada: {chave} para usuário {user_id}")
+        return setting
     
     @staticmethod
     def delete_user_setting(db: Session, user_id: str, chave: str) -> None:
@@ -145,6 +146,7 @@ class UserService:
         try:
             db.delete(setting)
             db.commit()
+            SettingsService.invalidate(user_id)
             logger.info(f"Configuração removida: {chave} para usuário {user_id}")
         except Exception as e:
             db.rollback()
@@ -212,9 +214,12 @@ class UserService:
         
         try:
             db.commit()
-            db.refresh(user)
+            EntitlementService.invalidate(user_id)
             logger.info(f"Status de pagamento atualizado para usuário: {user.nome_usuario}")
             return user
+        except StaleDataError:
+            db.rollback()
+            raise ConflictError("Usuário alterado por outra requisição. Recarregue e tente novamente.")
         except Exception as e:
             db.rollback()
             logger.error(f"Erro ao atualizar status de pagamento: {str(e)}")
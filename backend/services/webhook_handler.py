@@ -13,6 +13,7 @@ from fastapi import HTTPException, Request
 from config.payments import PaymentConfig
 from schemas.payment_schemas import WebhookPayload, PaymentWebhookData, PaymentStatus
 from services.subscription_service import SubscriptionService
+from services.entitlement_service import EntitlementService
 from config.database import get_db
 
 logger = logging.getLogger(__name__)
@@ -56,6 +57,14 @@ class WebhookHandler:
             
             logger.info(f"Processando webhook: {event} - Pagamento: {payment_id} - Status: {status}")
             
+            # Manter o espelho local de cobranças em dia (fonte das leituras de status)
+            try:
+                from services.payment_mirror_service import PaymentMirrorService
+                PaymentMirrorService.upsert_payment(db, payment_data)
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Falha ao espelhar pagamento {payment_id}: {str(e)}")
+            
             # Processar evento baseado no status
             if event == 'PAYMENT_RECEIVED' or event == 'PAYMENT_CONFIRMED':
                 return WebhookHandler._handle_payment_received(db, payment_data)
@@ -95,6 +104,7 @@ class WebhookHandler:
                     # Ativar/estender assinatura
                     subscription.status = 'ACTIVE'
                     db.commit()
+                    EntitlementService.invalidate(subscription.id_usuario)
                     logger.info(f"Assinatura ativada: {subscription.id}")
                     
             return result
@@ -123,6 +133,7 @@ class WebhookHandler:
                     # Marcar como inativa por falha de pagamento
                     subscription.status = 'INACTIVE'
                     db.commit()
+                    EntitlementService.invalidate(subscription.id_usuario)
                     logger.warning(f"Assinatura suspensa por falha de pagamento: {subscription.id}")
                     
             return result
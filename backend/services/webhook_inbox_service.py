@@ -0,0 +1,218 @@
+"""
+Inbox durável de webhooks do Asaas
+
+O endpoint só verifica a assinatura, grava o evento e responde 200; um pool de
+workers drena o inbox em lotes com idempotência (ID único do evento), ordem por
+assinatura, retries com backoff exponencial e estado DEAD (dead-letter).
+"""
+import asyncio
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, exists, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from models import WebhookInbox, generate_ulid
+from services.webhook_handler import WebhookHandler
+from utils.helpers import now_utc
+from utils.sql import build_upsert, supports_upsert
+from config.logging_config import logger
+
+
+def _evento_id(payload: Dict[str, Any], raw_body: bytes) -> str:
+    """ID do evento no Asaas; sem ele, o hash do corpo (retries reenviam o mesmo corpo)"""
+    if payload.get("id"):
+        return str(payload["id"])
+    return "sha256:" + hashlib.sha256(raw_body).hexdigest()
+
+
+def _chave_ordenacao(tipo: str, payload: Dict[str, Any]) -> str:
+    """Eventos da mesma assinatura são processados em ordem de chegada"""
+    data = payload.get(tipo) or {}
+    if tipo == "payment":
+        return data.get("subscription") or data.get("id") or "-"
+    return data.get("id") or "-"
+
+
+class WebhookInboxService:
+    """Serviço do inbox de webhooks"""
+
+    @staticmethod
+    def enqueue(db: Session, tipo: str, payload: Dict[str, Any], raw_body: bytes) -> bool:
+        """Grava o evento no inbox. Retorna False se já havia sido recebido."""
+        agora = now_utc()
+        row = {
+            "id": generate_ulid(),
+            "evento_id": _evento_id(payload, raw_body),
+            "tipo": tipo,
+            "evento": payload.get("event"),
+            "chave_ordenacao": _chave_ordenacao(tipo, payload),
+            "payload": raw_body.decode("utf-8"),
+            "status": "PENDING",
+            "tentativas": 0,
+            "proxima_tentativa_em": agora,
+            "recebido_em": agora
+        }
+
+        try:
+            if supports_upsert(db):
+                result = db.execute(build_upsert(db, WebhookInbox.__table__, [row], index_elements=["evento_id"]))
+                inserted = result.rowcount > 0
+            else:
+                db.add(WebhookInbox(**row))
+                db.flush()
+                inserted = True
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            inserted = False
+
+        if not inserted:
+            logger.info(f"Webhook duplicado ignorado: {row['evento_id']}")
+        return inserted
+
+    @staticmethod
+    def recover_stuck(db: Session, timeout_seconds: int) -> int:
+        """Devolve ao inbox itens presos em PROCESSING (worker que morreu no meio)"""
+        limite = now_utc() - timedelta(seconds=timeout_seconds)
+        result = db.execute(
+            update(WebhookInbox)
+            .where(WebhookInbox.status == 'PROCESSING', WebhookInbox.processando_desde < limite)
+            .values(status='PENDING', processando_desde=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
+
+    @staticmethod
+    def claim_batch(db: Session, limit: int) -> List[WebhookInbox]:
+        """
+        Reserva um lote de eventos prontos para processamento
+
+        Só o evento mais antigo não finalizado de cada chave de ordenação é
+        elegível, e só quando o backoff já venceu. A elegibilidade é filtrada
+        no banco antes do LIMIT, para que eventos em backoff ou bloqueados no
+        início da fila não escondam os mais novos. A reserva é um UPDATE
+        condicional, seguro entre workers.
+        """
+        agora = now_utc()
+        anterior = aliased(WebhookInbox)
+        candidatos = db.query(WebhookInbox.id).filter(
+            WebhookInbox.status == 'PENDING',
+            WebhookInbox.proxima_tentativa_em <= agora,
+            ~exists().where(
+                anterior.chave_ordenacao == WebhookInbox.chave_ordenacao,
+                anterior.status.in_(['PENDING', 'PROCESSING']),
+                or_(
+                    anterior.recebido_em < WebhookInbox.recebido_em,
+                    and_(anterior.recebido_em == WebhookInbox.recebido_em, anterior.id < WebhookInbox.id)
+                )
+            )
+        ).order_by(WebhookInbox.recebido_em, WebhookInbox.id).limit(limit).all()
+
+        reservados = []
+        for item in candidatos:
+            result = db.execute(
+                update(WebhookInbox)
+                .where(WebhookInbox.id == item.id, WebhookInbox.status == 'PENDING')
+                .values(status='PROCESSING', processando_desde=agora)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                reservados.append(item.id)
+        db.commit()
+
+        if not reservados:
+            return []
+        return db.query(WebhookInbox).filter(
+            WebhookInbox.id.in_(reservados)
+        ).order_by(WebhookInbox.recebido_em, WebhookInbox.id).all()
+
+    @staticmethod
+    def process_item(db: Session, item: WebhookInbox, max_attempts: int,
+                     backoff_seconds: float, backoff_max_seconds: float) -> bool:
+        """Processa um evento reservado e registra o resultado"""
+        payload = json.loads(item.payload)
+        erro = None
+        try:
+            if item.tipo == "subscription":
+                success = WebhookHandler.process_subscription_webhook(db, payload)
+            else:
+                success = WebhookHandler.process_payment_webhook(db, payload)
+            if not success:
+                erro = "Handler retornou falha"
+        except Exception as e:
+            success = False
+            erro = str(e)
+        if not success:
+            # Descarta alterações parciais do handler antes de registrar a falha
+            db.rollback()
+
+        WebhookHandler.log_webhook(payload, success)
+
+        agora = now_utc()
+        item.tentativas += 1
+        item.processando_desde = None
+        if success:
+            item.status = 'DONE'
+            item.processado_em = agora
+            item.ultimo_erro = None
+        elif item.tentativas >= max_attempts:
+            item.status = 'DEAD'
+            item.ultimo_erro = erro
+            logger.error(f"Webhook {item.evento_id} movido para DEAD após {item.tentativas} tentativas: {erro}")
+        else:
+            atraso = min(backoff_max_seconds, backoff_seconds * (2 ** (item.tentativas - 1)))
+            item.status = 'PENDING'
+            item.proxima_tentativa_em = agora + timedelta(seconds=atraso)
+            item.ultimo_erro = erro
+        db.commit()
+        return success
+
+    @staticmethod
+    def drain_batch(session_factory=None, batch_size: Optional[int] = None) -> int:
+        """Drena um lote do inbox. Retorna quantos eventos foram tratados."""
+        from config.settings import settings
+
+        if session_factory is None:
+            from config.database import SessionLocal
+            session_factory = SessionLocal
+
+        db = session_factory()
+        try:
+            WebhookInboxService.recover_stuck(db, settings.WEBHOOK_INBOX_PROCESSING_TIMEOUT_SECONDS)
+            itens = WebhookInboxService.claim_batch(db, batch_size or settings.WEBHOOK_INBOX_BATCH_SIZE)
+            for item in itens:
+                WebhookInboxService.process_item(
+                    db,
+                    item,
+                    settings.WEBHOOK_INBOX_MAX_ATTEMPTS,
+                    settings.WEBHOOK_INBOX_RETRY_BACKOFF_SECONDS,
+                    settings.WEBHOOK_INBOX_RETRY_BACKOFF_MAX_SECONDS
+                )
+            return len(itens)
+        finally:
+            db.close()
+
+    @staticmethod
+    async def run_worker(poll_seconds: float, session_factory=None) -> None:
+        """Worker do pool: drena lotes em thread e dorme quando o inbox está vazio"""
+        while True:
+            try:
+                processed = await asyncio.to_thread(WebhookInboxService.drain_batch, session_factory)
+            except Exception as e:
+                logger.warning(f"Erro no worker do inbox de webhooks: {str(e)}")
+                processed = 0
+            if not processed:
+                await asyncio.sleep(poll_seconds)
+
+    @staticmethod
+    def start_workers(count: int, poll_seconds: float) -> List[asyncio.Task]:
+        """Inicia o pool de workers no event loop atual"""
+        return [
+            asyncio.create_task(WebhookInboxService.run_worker(poll_seconds))
+            for _ in range(count)
+        ]
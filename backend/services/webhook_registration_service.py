@@ -0,0 +1,84 @@
+"""
+Registro dos webhooks do Asaas fora do caminho crítico do startup
+"""
+import asyncio
+from typing import Optional
+
+from services.lock_service import LockService
+from config.logging_config import logger
+
+# Lock compartilhado entre workers: só um registra os webhooks por janela de TTL
+WEBHOOK_REGISTRATION_LOCK = "asaas_webhook_registration"
+
+WEBHOOK_EVENTS = [
+    "PAYMENT_CREATED",
+    "PAYMENT_UPDATED",
+    "PAYMENT_RECEIVED",
+    "PAYMENT_OVERDUE",
+    "PAYMENT_DELETED",
+    "PAYMENT_RESTORED"
+]
+
+
+class WebhookRegistrationService:
+    """Reconciliação dos webhooks configurados no Asaas"""
+
+    @staticmethod
+    async def ensure_webhooks(asaas) -> bool:
+        """Cria o webhook de pagamentos se ainda não existir. Retorna True se criou."""
+        from config.payments import PaymentConfig
+
+        webhook_url = PaymentConfig.get_webhook_url("asaas/payment")
+        existing_webhooks = await asaas.get_webhooks()
+        if any(w.get('url') == webhook_url for w in existing_webhooks):
+            logger.info("Webhooks já configurados")
+            return False
+
+        await asaas.create_webhook(webhook_url, WEBHOOK_EVENTS)
+        logger.info(f"Webhook criado: {webhook_url}")
+        return True
+
+    @staticmethod
+    async def reconcile(
+        asaas,
+        timeout_seconds: float,
+        lock_ttl_seconds: float,
+        session_factory=None
+    ) -> Optional[bool]:
+        """
+        Executa `ensure_webhooks` com timeout, apenas no worker que obtiver o lock
+
+        Retorna None se outro worker já fez a reconciliação, False em falha/timeout
+        e True em sucesso. O lock não é liberado ao final: os demais workers de um
+        mesmo deploy pulam a chamada remota até o TTL expirar.
+        """
+        if session_factory is None:
+            from config.database import SessionLocal
+            session_factory = SessionLocal
+
+        db = session_factory()
+        try:
+            if not LockService.acquire(db, WEBHOOK_REGISTRATION_LOCK, lock_ttl_seconds):
+                logger.info("Registro de webhooks feito por outro worker")
+                return None
+        except Exception as e:
+            logger.warning(f"Erro ao adquirir lock de webhooks: {str(e)}")
+            return False
+        finally:
+            db.close()
+
+        try:
+            await asyncio.wait_for(WebhookRegistrationService.ensure_webhooks(asaas), timeout_seconds)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout ({timeout_seconds}s) ao configurar webhooks do Asaas")
+        except Exception as e:
+            logger.warning(f"Erro ao configurar webhooks: {str(e)}")
+
+        # Libera para que outro worker tente novamente
+        db = session_factory()
+        try:
+            LockService.release(db, WEBHOOK_REGISTRATION_LOCK)
+        finally:
+            db.close()
+        return False
@@ -20,6 +20,8 @@ Configuração base para testes
 import pytest
 import tempfile
 import os
+import math
+import time
 from datetime import date, timedelta
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -53,6 +55,7 @@ def setup_test_db():
     TestingSessionLocal = sessionmaker(
         autocommit=False,
         autoflush=False,
+        expire_on_commit=False,
         bind=test_engine
     )
     
@@ -121,3 +124,82 @@ def sample_transaction_data():
         "tipo": "receita",
         "descricao": "Corrida de teste"
     }
+
+
+@pytest.fixture
+def host_fora_de_utc(monkeypatch):
+    """Processo com hora local diferente de UTC (TZ=America/Sao_Paulo, UTC-3)"""
+    monkeypatch.setenv("TZ", "America/Sao_Paulo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+# Datasets dos benchmarks: número aproximado de transações na tabela
+BENCHMARK_SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BENCHMARK_END_DATE = date(2024, 6, 30)
+BENCHMARK_YEARS = 2
+
+
+def pytest_addoption(parser):
+    """Opções dos benchmarks de serviços"""
+    parser.addoption(
+        "--bench-sizes",
+        default="10k",
+        help="Datasets dos benchmarks, separados por vírgula: " + ", ".join(BENCHMARK_SIZES)
+    )
+
+
+def pytest_generate_tests(metafunc):
+    """Parametriza os benchmarks com os tamanhos de --bench-sizes"""
+    if "benchmark_dataset" in metafunc.fixturenames:
+        tamanhos = [t.strip().lower() for t in metafunc.config.getoption("--bench-sizes").split(",") if t.strip()]
+        desconhecidos = set(tamanhos) - set(BENCHMARK_SIZES)
+        if desconhecidos:
+            raise pytest.UsageError(f"--bench-sizes inválido: {', '.join(sorted(desconhecidos))}")
+        metafunc.parametrize("benchmark_dataset", tamanhos, indirect=True, scope="session")
+
+
+@pytest.fixture(scope="session")
+def benchmark_dataset(request, tmp_path_factory):
+    """
+    Banco SQLite em arquivo com ~N transações para os benchmarks
+
+    Gerado uma vez por scripts/generate_dataset.py (semente e datas fixas, então
+    execuções diferentes medem os mesmos dados) e reaproveitado do cache do
+    pytest; com o cache desativado (-p no:cacheprovider) é gerado num diretório
+    temporário da sessão. A versão do schema faz parte do nome do arquivo.
+    """
+    from config.database import SCHEMA_VERSION
+    from scripts.generate_dataset import generate_dataset, email_usuario
+    from models import Transacao, Usuario
+
+    tamanho = request.param
+    cache = getattr(request.config, "cache", None)
+    pasta = cache.mkdir("benchmark_datasets") if cache is not None else tmp_path_factory.mktemp("benchmark_datasets")
+    caminho = pasta / f"transacoes_{tamanho}_v{SCHEMA_VERSION}.db"
+    if not caminho.exists():
+        temporario = caminho.with_suffix(".tmp")
+        temporario.unlink(missing_ok=True)
+        engine = create_engine(f"sqlite:///{temporario}")
+        # ~1.700 transações por usuário por ano com os padrões do gerador
+        usuarios = math.ceil(BENCHMARK_SIZES[tamanho] / (1_700 * BENCHMARK_YEARS))
+        generate_dataset(engine, usuarios, BENCHMARK_YEARS, seed=2024, fim=BENCHMARK_END_DATE)
+        engine.dispose()
+        temporario.replace(caminho)
+
+    engine = create_engine(f"sqlite:///{caminho}", connect_args={"check_same_thread": False})
+    db = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)()
+    try:
+        user_id = db.query(Usuario.id).filter(Usuario.email == email_usuario(0)).scalar()
+        yield {
+            "tamanho": tamanho,
+            "db": db,
+            "user_id": user_id,
+            "transacoes": db.query(Transacao).count(),
+            "transacoes_usuario": db.query(Transacao).filter(Transacao.id_usuario == user_id).count(),
+        }
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,195 @@
+"""
+Testes das análises (heatmap de ganhos e comparação de períodos)
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import event
+
+from models import SessaoTrabalho
+from services.analytics_service import AnalyticsService, distribuir_horas, local_seconds
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+from services.session_service import SessionService
+from services.settings_service import SettingsService
+from services.transaction_service import TransactionService
+
+# Queries das análises não podem gerar avisos do SQLAlchemy (ex.: produto cartesiano)
+pytestmark = pytest.mark.filterwarnings("error::sqlalchemy.exc.SAWarning")
+
+
+def epoch(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+class TestHeatmapMath:
+    """Testes das funções de bucketização"""
+
+    def test_hours_split_across_cells(self):
+        """Teste de sessão atravessando a meia-noite de domingo para segunda"""
+        inicio = epoch(2024, 1, 7, 23, 30)  # domingo
+        horas = distribuir_horas(np.array([inicio]), np.array([inicio + 2 * 3600]))
+
+        assert horas[23] == 0.5          # domingo 23h
+        assert horas[24] == 1.0          # segunda 0h
+        assert horas[25] == 0.5          # segunda 1h
+        assert horas.sum() == 2.0
+
+    def test_full_week_fills_every_cell(self):
+        """Teste de intervalo de uma semana e meia: cada célula recebe 1h ou 2h"""
+        inicio = epoch(2024, 1, 3, 10)
+        horas = distribuir_horas(np.array([inicio]), np.array([inicio + 7 * 86400 + 84 * 3600]))
+
+        assert horas.min() == 1.0 and horas.max() == 2.0
+        assert horas.sum() == 7 * 24 + 84
+
+    def test_local_seconds_handles_dst(self):
+        """Teste de conversão de fuso no dia de mudança de horário"""
+        fuso = ZoneInfo("America/New_York")
+        antes, depois = epoch(2024, 3, 10, 6, 30), epoch(2024, 3, 10, 7, 30)
+        locais = local_seconds(np.array([antes, depois]), fuso)
+
+        assert locais.tolist() == [antes - 5 * 3600, depois - 4 * 3600]
+
+
+class TestEarningsHeatmap:
+    """Testes do heatmap por usuário"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.corridas = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+        SettingsService.bulk_update_settings(test_db, self.user.id, {"fuso_horario": "America/Sao_Paulo"})
+
+        # Segunda 2024-01-08, 10h-12h em São Paulo (13h-15h UTC)
+        inicio = datetime(2024, 1, 8, 13, 0)
+        test_db.add(SessaoTrabalho(
+            id_usuario=self.user.id, inicio=inicio, fim=inicio + timedelta(hours=2),
+            total_minutos=120, eh_ativa=False
+        ))
+        test_db.commit()
+        for minutos, valor in ((10, 30.0), (50, 20.0), (70, 40.0)):
+            TransactionService.create_transaction(
+                test_db, self.user.id, self.corridas.id, valor, "receita",
+                origem="uber", data=inicio + timedelta(minutes=minutos)
+            )
+
+    def test_heatmap_in_user_timezone(self, test_db):
+        """Teste de ganhos e horas na célula local correta"""
+        heatmap = AnalyticsService.get_earnings_heatmap(test_db, self.user.id)
+
+        assert heatmap["fuso_horario"] == "America/Sao_Paulo"
+        assert heatmap["horas"][1][10] == 1.0
+        assert heatmap["ganhos"][1][10] == 50.0
+        assert heatmap["corridas"][1][11] == 1
+        assert heatmap["ganho_por_hora"][1][11] == 40.0
+        assert heatmap["horas_totais"] == 2.0
+        assert heatmap["melhores_horarios"][0] == {
+            "dia": "segunda", "hora": 10, "ganho_por_hora": 50.0, "corridas_por_hora": 2.0, "horas": 1.0
+        }
+
+    def test_cached_by_data_version(self, test_db):
+        """Teste de cache: sem mudanças só a query de versão roda; uma escrita invalida"""
+        AnalyticsService.get_earnings_heatmap(test_db, self.user.id)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+        try:
+            AnalyticsService.get_earnings_heatmap(test_db, self.user.id)
+        finally:
+            event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+        assert len(statements) == 1
+
+        TransactionService.create_transaction(
+            test_db, self.user.id, self.corridas.id, 10.0, "receita",
+            origem="uber", data=datetime(2024, 1, 8, 13, 30)
+        )
+        heatmap = AnalyticsService.get_earnings_heatmap(test_db, self.user.id)
+        assert heatmap["ganhos"][1][10] == 60.0
+
+
+    def test_service_sessions_on_non_utc_host(self, test_db, host_fora_de_utc, monkeypatch):
+        """Teste de sessão gravada pelo SessionService em host fora de UTC: horas na célula local certa"""
+        relogio = iter([datetime(2024, 1, 8, 16, 0, tzinfo=timezone.utc), datetime(2024, 1, 8, 17, 0, tzinfo=timezone.utc)])
+        monkeypatch.setattr("services.session_service.now_utc", lambda: next(relogio))
+        sessao = SessionService.start_session(test_db, self.user.id)
+        TransactionService.create_transaction(
+            test_db, self.user.id, self.corridas.id, 25.0, "receita",
+            origem="uber", data=datetime(2024, 1, 8, 16, 30)
+        )
+        SessionService.end_session(test_db, sessao.id, self.user.id)
+
+        heatmap = AnalyticsService.get_earnings_heatmap(test_db, self.user.id)
+
+        # Segunda, 13h em São Paulo
+        assert heatmap["horas"][1][13] == 1.0
+        assert heatmap["ganho_por_hora"][1][13] == 25.0
+
+
+class TestPeriodComparison:
+    """Testes da comparação de períodos consecutivos"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.corridas = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+        self.combustivel = CategoryService.create_category(test_db, self.user.id, "Combustível", "despesa")
+        self.referencia = datetime(2024, 1, 24, 12, 0, tzinfo=timezone.utc)  # quarta-feira
+
+    def transacao(self, db, categoria, valor, data, **kwargs):
+        return TransactionService.create_transaction(
+            db, self.user.id, categoria.id, valor, categoria.tipo, data=data, **kwargs
+        )
+
+    def test_weekly_periods_with_deltas(self, test_db):
+        """Teste de semanas consecutivas (segunda a domingo) e variação entre elas"""
+        self.transacao(test_db, self.corridas, 100.0, datetime(2024, 1, 14, 23, 0))   # semana de 08/01
+        self.transacao(test_db, self.corridas, 150.0, datetime(2024, 1, 15, 8, 0), origem="uber")
+        self.transacao(test_db, self.combustivel, 30.0, datetime(2024, 1, 17, 9, 0))
+        self.transacao(test_db, self.corridas, 75.0, datetime(2024, 1, 22, 12, 0), origem="99")
+        test_db.add(SessaoTrabalho(
+            id_usuario=self.user.id, inicio=datetime(2024, 1, 16, 8, 0), fim=datetime(2024, 1, 16, 11, 0),
+            total_minutos=180, eh_ativa=False
+        ))
+        test_db.commit()
+
+        resultado = AnalyticsService.get_period_comparison(test_db, self.user.id, "week", 2, self.referencia)
+        anterior, atual = resultado["periodos"]
+
+        assert anterior["inicio"].startswith("2024-01-15") and atual["inicio"].startswith("2024-01-22")
+        assert (anterior["receitas"], anterior["despesas"], anterior["lucro"]) == (150.0, 30.0, 120.0)
+        assert (anterior["corridas"], anterior["horas"]) == (1, 3.0)
+        assert anterior["variacao"]["receitas"] == {"absoluta": 50.0, "percentual": 50.0}
+        assert atual["variacao"]["lucro"] == {"absoluta": -45.0, "percentual": -37.5}
+        assert atual["variacao"]["horas"] == {"absoluta": -3.0, "percentual": -100.0}
+
+    def test_monthly_boundaries(self, test_db):
+        """Teste de meses no fuso do usuário: 31/01 23:59 local fica em janeiro"""
+        self.transacao(test_db, self.corridas, 10.0, datetime(2023, 12, 1, 12, 0))
+        self.transacao(test_db, self.corridas, 20.0, datetime(2024, 2, 1, 2, 59))  # 31/01 23:59 em São Paulo
+
+        resultado = AnalyticsService.get_period_comparison(test_db, self.user.id, "month", 2, self.referencia)
+
+        assert [p["receitas"] for p in resultado["periodos"]] == [10.0, 20.0]
+        assert resultado["periodos"][0]["variacao"]["receitas"]["percentual"] is None
+
+    def test_single_query_regardless_of_count(self, test_db):
+        """Teste de custo: uma query para 3 ou 300 períodos"""
+        self.transacao(test_db, self.corridas, 10.0, datetime(2024, 1, 23, 10, 0))
+
+        for count in (3, 300):
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+            try:
+                resultado = AnalyticsService.get_period_comparison(test_db, self.user.id, "day", count, self.referencia)
+            finally:
+                event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+            assert len(statements) == 1
+            assert len(resultado["periodos"]) == count
+            assert resultado["periodos"][-2]["receitas"] == 10.0
@@ -0,0 +1,242 @@
+"""
+Testes do cliente HTTP do Asaas contra um servidor stub local
+"""
+import asyncio
+import json
+import threading
+import time
+import pytest
+import httpx
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.asaas_client import AsaasHTTPClient, CircuitBreaker
+from services.asaas_service import AsaasService
+from utils.exceptions import ServiceUnavailableError
+
+
+class StubAsaasServer:
+    """Servidor HTTP/1.1 local que responde uma fila de respostas programadas"""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                stub.requests.append((self.command, self.path))
+                stub.connections.add(self.client_address)
+
+                status, body, delay = stub.responses.pop(0) if stub.responses else (200, {"ok": True}, 0)
+                if delay:
+                    time.sleep(delay)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v3"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    with StubAsaasServer() as server:
+        yield server
+
+
+def make_client(stub, **kwargs):
+    options = dict(
+        base_url=stub.url,
+        headers={"access_token": "test"},
+        connect_timeout=1.0,
+        read_timeout=0.5,
+        max_retries=2,
+        backoff_base=0.01,
+        failure_threshold=3,
+        recovery_timeout=60
+    )
+    options.update(kwargs)
+    return AsaasHTTPClient(**options)
+
+
+class TestAsaasHTTPClient:
+    """Testes do cliente compartilhado"""
+
+    @pytest.mark.asyncio
+    async def test_reuses_connection(self, stub):
+        """Teste de keep-alive: várias chamadas usam a mesma conexão"""
+        client = make_client(stub)
+        await client.open()
+        try:
+            for _ in range(5):
+                response = await client.request("GET", "webhooks")
+                assert response.status_code == 200
+        finally:
+            await client.aclose()
+
+        assert len(stub.requests) == 5
+        assert len(stub.connections) == 1
+
+    @pytest.mark.asyncio
+    async def test_other_event_loop_keeps_pool(self, stub):
+        """Teste de chamada de outro event loop: cliente avulso fechado lá, pool intacto"""
+        client = make_client(stub)
+        await client.open()
+        pool = client._client
+        avulsos = []
+        original = client._new_client
+
+        def new_client():
+            avulsos.append(original())
+            return avulsos[-1]
+
+        client._new_client = new_client
+        try:
+            response = await asyncio.to_thread(asyncio.run, client.request("GET", "webhooks"))
+            assert response.json() == {"ok": True}
+            await client.request("GET", "webhooks")
+        finally:
+            await client.aclose()
+
+        assert len(avulsos) == 1 and avulsos[0].is_closed
+        assert pool.is_closed
+        assert len(stub.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_retries_idempotent_on_5xx(self, stub):
+        """Teste de retry para GET após 503"""
+        stub.responses = [(503, {}, 0), (503, {}, 0), (200, {"id": "pay_1"}, 0)]
+        client = make_client(stub)
+        try:
+            response = await client.request("GET", "payments/pay_1")
+        finally:
+            await client.aclose()
+
+        assert response.status_code == 200
+        assert response.json() == {"id": "pay_1"}
+        assert len(stub.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_does_not_retry_post(self, stub):
+        """Teste de que POST não é repetido após resposta 5xx"""
+        stub.responses = [(503, {}, 0), (200, {}, 0)]
+        client = make_client(stub)
+        try:
+            response = await client.request("POST", "payments", json={"value": 10})
+        finally:
+            await client.aclose()
+
+        assert response.status_code == 503
+        assert len(stub.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_read_timeout(self, stub):
+        """Teste de timeout de leitura explícito"""
+        stub.responses = [(200, {}, 1.0)]
+        client = make_client(stub, max_retries=0)
+        try:
+            with pytest.raises(httpx.ReadTimeout):
+                await client.request("GET", "webhooks")
+        finally:
+            await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_circuit_breaker_fails_fast(self, stub):
+        """Teste de abertura do circuito após falhas consecutivas"""
+        stub.responses = [(500, {}, 0)] * 3
+        client = make_client(stub, max_retries=0)
+        try:
+            for _ in range(3):
+                await client.request("GET", "webhooks")
+
+            with pytest.raises(ServiceUnavailableError):
+                await client.request("GET", "webhooks")
+        finally:
+            await client.aclose()
+
+        assert len(stub.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_asaas_service_uses_shared_client(self, stub):
+        """Teste do AsaasService sobre o cliente injetado"""
+        stub.responses = [(200, {"data": [{"url": "http://x/webhooks"}]}, 0)]
+        client = make_client(stub)
+        service = AsaasService(http_client=client)
+        try:
+            webhooks = await service.get_webhooks()
+        finally:
+            await client.aclose()
+
+        assert webhooks == [{"url": "http://x/webhooks"}]
+
+
+class TestCircuitBreaker:
+    """Testes da máquina de estados do circuit breaker"""
+
+    def test_half_open_after_recovery(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+
+        time.sleep(0.06)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        assert not breaker.allow_request()
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.retry_after() == 1
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_maps_to_503_with_retry_after(self):
+        """Teste do handler global: circuito aberto vira 503 com Retry-After"""
+        from main import rider_finance_exception_handler
+
+        response = await rider_finance_exception_handler(None, ServiceUnavailableError(retry_after=12))
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "12"
+        assert json.loads(response.body)["code"] == "SERVICE_UNAVAILABLE"
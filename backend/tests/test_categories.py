@@ -2,8 +2,13 @@
 Testes para categorias
 """
 import pytest
+from datetime import date, datetime
+from sqlalchemy import event
+
+from models import Categoria
 from services.auth_service import AuthService
 from services.category_service import CategoryService
+from services.transaction_service import TransactionService
 
 class TestCategoryService:
     """Testes do serviço de categorias"""
@@ -92,3 +97,64 @@ class TestCategoryService:
                 user_id=user.id,
                 **sample_category_data
             )
+    
+    def test_all_usage_stats_in_one_query(self, test_db, sample_user_data):
+        """Teste de estatísticas de todas as categorias com uma única query"""
+        user = AuthService.register_user(db=test_db, **sample_user_data)
+        CategoryService.create_default_categories(test_db, user.id)
+        categorias = {c.nome: c for c in CategoryService.get_user_categories(test_db, user.id)}
+        uber, nove, combustivel = categorias["Uber"], categorias["99"], categorias["Combustível"]
+        
+        for categoria, valor, data in (
+            (uber, 60.0, datetime(2024, 1, 10, 15, 0)),
+            (uber, 15.0, datetime(2024, 2, 5, 15, 0)),
+            (nove, 25.0, datetime(2024, 1, 12, 15, 0)),
+            (combustivel, 40.0, datetime(2024, 1, 11, 15, 0)),
+        ):
+            TransactionService.create_transaction(test_db, user.id, categoria.id, valor, categoria.tipo, data=data)
+        
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+        try:
+            stats = CategoryService.get_all_usage_stats(
+                test_db, user.id, data_inicio=date(2024, 1, 1), data_fim=date(2024, 1, 31)
+            )
+        finally:
+            event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+        
+        assert len(statements) == 1
+        assert len(stats["categorias"]) == 12
+        assert stats["totais"] == {"receita": 85.0, "despesa": 40.0}
+        por_nome = {item["categoria"]["nome"]: item for item in stats["categorias"]}
+        assert (por_nome["Uber"]["total_transacoes"], por_nome["Uber"]["valor_total"]) == (1, 60.0)
+        assert por_nome["Uber"]["participacao"] == 70.59
+        assert por_nome["Combustível"]["participacao"] == 100.0
+        assert por_nome["Outros"]["total_transacoes"] == 0 and por_nome["Outros"]["ultima_transacao"] is None
+        
+        # Sem período: ultima_transacao é a mais recente de todas
+        uber_total = next(i for i in CategoryService.get_all_usage_stats(test_db, user.id)["categorias"]
+                          if i["categoria"]["id"] == uber.id)
+        assert uber_total["ultima_transacao"].startswith("2024-02-05")
+        assert CategoryService.get_category_usage_stats(test_db, uber.id, user.id)["valor_total"] == 75.0
+    
+    def test_delete_category_in_use_is_deactivated(self, test_db, sample_user_data, sample_category_data):
+        """Teste de remoção: categoria em uso é desativada, sem uso é removida"""
+        user = AuthService.register_user(db=test_db, **sample_user_data)
+        usada = CategoryService.create_category(db=test_db, user_id=user.id, **sample_category_data)
+        livre = CategoryService.create_category(test_db, user.id, "Gorjetas", "receita")
+        TransactionService.create_transaction(test_db, user.id, usada.id, 10.0, "receita")
+        
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+        try:
+            CategoryService.delete_category(test_db, usada.id, user.id)
+        finally:
+            event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+        CategoryService.delete_category(test_db, livre.id, user.id)
+        
+        assert any("EXISTS" in sql for sql in statements)
+        assert not any("count(" in sql.lower() for sql in statements)
+        assert test_db.get(Categoria, usada.id).eh_ativa is False
+        assert test_db.get(Categoria, livre.id) is None
@@ -0,0 +1,184 @@
+"""
+Testes do snapshot de direitos de acesso (entitlements)
+"""
+import pytest
+from datetime import datetime, timedelta
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlalchemy.orm import sessionmaker
+
+from api.dependencies import get_current_user, require_plan, require_feature
+from config.database import get_db
+from models import Usuario
+from schemas.payment_schemas import PlanType
+from services.auth_service import AuthService
+from services.entitlement_service import EntitlementService, _entitlement_cache
+from services.subscription_service import SubscriptionService
+from services.user_service import UserService
+from services.webhook_handler import WebhookHandler
+from utils.helpers import now_utc
+
+
+@pytest.fixture(autouse=True)
+def limpar_cache():
+    _entitlement_cache.clear()
+    yield
+    _entitlement_cache.clear()
+
+
+def contar_queries(db, func):
+    statements = []
+    engine = db.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, statements
+
+
+class TestEntitlementService:
+    """Testes do serviço de entitlements"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+
+    def test_trial_snapshot(self, test_db):
+        """Teste de usuário em trial"""
+        snapshot = EntitlementService.get_entitlements(test_db, self.user.id, self.user)
+
+        assert snapshot["status"] == "TRIAL"
+        assert snapshot["plan"] == "basic"
+        assert snapshot["limits"]["transacoes_mes"] == 500
+        assert EntitlementService.is_active(snapshot)
+        assert not EntitlementService.has_feature(snapshot, "relatorios_detalhados")
+
+    def test_expired_trial(self, test_db):
+        """Teste de trial expirado sem assinatura"""
+        self.user.trial_termina_em = now_utc() - timedelta(days=1)
+        test_db.commit()
+
+        snapshot = EntitlementService.get_entitlements(test_db, self.user.id, self.user)
+
+        assert snapshot["status"] == "NONE"
+        assert not EntitlementService.is_active(snapshot)
+
+    def test_cached_lookup_without_queries(self, test_db):
+        """Teste de checagens repetidas sem ir ao banco"""
+        SubscriptionService.create_subscription(test_db, self.user.id, PlanType.PRO, "cus_1")
+
+        EntitlementService.get_entitlements(test_db, self.user.id)
+        results, statements = contar_queries(test_db, lambda: [
+            SubscriptionService.user_has_access(test_db, self.user.id, "relatorios_detalhados")
+            for _ in range(10)
+        ])
+
+        assert all(results)
+        assert statements == []
+
+    def test_subscription_write_invalidates(self, test_db):
+        """Teste de invalidação ao criar e cancelar assinatura"""
+        assert EntitlementService.get_entitlements(test_db, self.user.id)["status"] == "TRIAL"
+
+        subscription = SubscriptionService.create_subscription(test_db, self.user.id, PlanType.PREMIUM, "cus_1")
+        snapshot = EntitlementService.get_entitlements(test_db, self.user.id)
+        assert snapshot["plan"] == "premium"
+        assert EntitlementService.plan_at_least(snapshot, "pro")
+
+        SubscriptionService.cancel_subscription(test_db, subscription.id, self.user.id)
+        assert EntitlementService.get_entitlements(test_db, self.user.id)["status"] == "TRIAL"
+
+    def test_webhook_invalidates(self, test_db):
+        """Teste de invalidação por webhook de falha de pagamento"""
+        SubscriptionService.create_subscription(test_db, self.user.id, PlanType.PRO, "cus_1", "sub_1")
+        assert EntitlementService.get_entitlements(test_db, self.user.id)["plan"] == "pro"
+
+        WebhookHandler.process_payment_webhook(test_db, {
+            "event": "PAYMENT_FAILED",
+            "payment": {"id": "pay_1", "subscription": "sub_1", "status": "OVERDUE"}
+        })
+
+        assert EntitlementService.get_entitlements(test_db, self.user.id)["status"] == "TRIAL"
+
+    def test_payment_status_invalidates_and_sets_plan(self, test_db):
+        """Teste de usuário pago: snapshot invalidado e plano de tipo_assinatura"""
+        self.user.trial_termina_em = now_utc() - timedelta(days=1)
+        test_db.commit()
+        assert EntitlementService.get_entitlements(test_db, self.user.id)["status"] == "NONE"
+
+        UserService.update_payment_status(test_db, self.user.id, "ativo", tipo_assinatura="premium")
+        snapshot = EntitlementService.get_entitlements(test_db, self.user.id)
+        assert (snapshot["status"], snapshot["plan"]) == ("PAID", "premium")
+
+        UserService.update_payment_status(test_db, self.user.id, "ativo", tipo_assinatura="mensal")
+        assert EntitlementService.get_entitlements(test_db, self.user.id)["plan"] == "basic"
+
+        UserService.update_payment_status(test_db, self.user.id, "cancelado")
+        assert EntitlementService.get_entitlements(test_db, self.user.id)["status"] == "NONE"
+
+    def test_payment_from_other_worker_seen_next_request(self, test_db):
+        """Teste de pagamento gravado por outro worker (sem invalidar este cache): acesso liberado na próxima sessão"""
+        self.user.trial_termina_em = now_utc() - timedelta(days=1)
+        test_db.commit()
+        assert EntitlementService.get_entitlements(test_db, self.user.id)["status"] == "NONE"
+
+        test_db.execute(
+            update(Usuario).where(Usuario.id == self.user.id)
+            .values(eh_pago=True, status_pagamento="ativo", tipo_assinatura="premium", versao=Usuario.versao + 1)
+        )
+        test_db.commit()
+
+        db = sessionmaker(bind=test_db.get_bind())()
+        try:
+            snapshot = EntitlementService.get_entitlements(db, self.user.id)
+            _, statements = contar_queries(db, lambda: EntitlementService.get_entitlements(db, self.user.id))
+        finally:
+            db.close()
+        assert (snapshot["status"], snapshot["plan"]) == ("PAID", "premium")
+        assert statements == []
+
+    def test_period_end_checked_without_query(self, test_db):
+        """Teste de snapshot em cache que vence junto com o período"""
+        subscription = SubscriptionService.create_subscription(test_db, self.user.id, PlanType.PRO, "cus_1")
+        snapshot = EntitlementService.get_entitlements(test_db, self.user.id)
+        snapshot["valid_until"] = now_utc() - timedelta(seconds=1)
+
+        assert not EntitlementService.plan_at_least(snapshot, "basic")
+
+
+class TestPlanDependencies:
+    """Testes das dependências de plano"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.app = FastAPI()
+
+        @self.app.get("/pro")
+        def pro_only(user=Depends(require_plan("pro"))):
+            return {"ok": True}
+
+        @self.app.get("/relatorios")
+        def relatorios(user=Depends(require_feature("relatorios_detalhados"))):
+            return {"ok": True}
+
+        self.app.dependency_overrides[get_current_user] = lambda: self.user
+        self.app.dependency_overrides[get_db] = lambda: test_db
+        self.client = TestClient(self.app)
+
+    def test_trial_blocked_from_plan(self):
+        """Teste de trial sem acesso a rotas de plano pago"""
+        assert self.client.get("/pro").status_code == 402
+        assert self.client.get("/relatorios").status_code == 403
+
+    def test_plan_access(self, test_db):
+        """Teste de acesso com plano suficiente"""
+        SubscriptionService.create_subscription(test_db, self.user.id, PlanType.PRO, "cus_1")
+
+        assert self.client.get("/pro").status_code == 200
+        assert self.client.get("/relatorios").status_code == 200
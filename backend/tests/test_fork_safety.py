@@ -0,0 +1,49 @@
+"""
+Testes do estado por processo após fork (workers do gunicorn com preload_app)
+"""
+import os
+import pytest
+
+from utils.cache import TTLCache
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requer os.fork")
+
+
+def no_filho(func):
+    """Executa func em um processo filho e retorna o texto que ela devolver"""
+    leitura, escrita = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.write(escrita, str(func()).encode())
+        finally:
+            os._exit(0)
+    os.close(escrita)
+    os.waitpid(pid, 0)
+    with os.fdopen(leitura) as arquivo:
+        return arquivo.read()
+
+
+class TestForkSafety:
+    """Testes dos hooks de fork"""
+
+    def test_cache_starts_empty_in_child(self):
+        """Teste de cache: o filho não herda entradas nem o lock do pai"""
+        cache = TTLCache()
+        cache.set("chave", "valor")
+        cache._lock.acquire()  # como se outra thread estivesse no meio de um set()
+        try:
+            assert no_filho(lambda: (cache.get("chave"), len(cache))) == "(None, 0)"
+        finally:
+            cache._lock.release()
+        assert cache.get("chave") == "valor"
+
+    def test_engine_pool_disposed_in_child(self):
+        """Teste de banco: o filho abre conexões próprias em vez de usar as do pai"""
+        from config.database import engine
+
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+        assert engine.pool.checkedin() >= 1
+        assert no_filho(lambda: engine.pool.checkedin()) == "0"
+        assert engine.pool.checkedin() >= 1
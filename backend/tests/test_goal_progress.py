@@ -0,0 +1,257 @@
+"""
+Testes do progresso automático de metas vinculadas a métricas
+"""
+import pytest
+from decimal import Decimal
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from models import Meta
+from schemas.goal_schemas import MetaCreate, MetaProgressUpdate, CategoriaMeta, MetricaMeta
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+from services.goal_progress_service import GoalProgressService
+from services.goal_service import GoalService
+from services.session_service import SessionService
+from services.transaction_service import TransactionService
+from utils.exceptions import ValidationError
+
+
+class TestGoalProgress:
+    """Testes do motor de progresso de metas"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.corridas = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+        self.gorjetas = CategoryService.create_category(test_db, self.user.id, "Gorjetas", "receita")
+        self.combustivel = CategoryService.create_category(test_db, self.user.id, "Combustível", "despesa")
+        self.inicio = datetime.now() - timedelta(days=1)
+
+    def criar_meta(self, db, metric, target="100.00", **filtros):
+        return GoalService.create_goal(db, self.user.id, MetaCreate(
+            title="Meta vinculada",
+            category=CategoriaMeta.OTHER,
+            targetValue=Decimal(target),
+            deadline=datetime.now() + timedelta(days=30),
+            startDate=self.inicio,
+            metric=metric,
+            **filtros
+        ))
+
+    def transacao(self, db, categoria, valor, **kwargs):
+        return TransactionService.create_transaction(
+            db, self.user.id, categoria.id, valor, categoria.tipo, **kwargs
+        )
+
+    def valor(self, db, meta):
+        db.expire_all()
+        return db.get(Meta, meta["id"]).valor_atual
+
+    def test_incremental_net_profit(self, test_db):
+        """Teste de lucro líquido atualizado a cada escrita"""
+        meta = self.criar_meta(test_db, MetricaMeta.LUCRO_LIQUIDO)
+
+        receita = self.transacao(test_db, self.corridas, 80.0)
+        despesa = self.transacao(test_db, self.combustivel, 30.0)
+        assert self.valor(test_db, meta) == pytest.approx(50.0)
+
+        TransactionService.update_transaction(test_db, receita.id, self.user.id, valor=100.0)
+        assert self.valor(test_db, meta) == pytest.approx(70.0)
+
+        TransactionService.delete_transaction(test_db, despesa.id, self.user.id)
+        assert self.valor(test_db, meta) == pytest.approx(100.0)
+        assert test_db.get(Meta, meta["id"]).eh_concluida
+
+    def test_filters_and_window(self, test_db):
+        """Teste de filtros de categoria/plataforma e janela da meta"""
+        por_categoria = self.criar_meta(test_db, MetricaMeta.RECEITA, metricCategoryId=self.gorjetas.id)
+        por_plataforma = self.criar_meta(test_db, MetricaMeta.RECEITA, metricPlatform="uber")
+
+        self.transacao(test_db, self.corridas, 40.0, plataforma="uber")
+        self.transacao(test_db, self.gorjetas, 5.0, plataforma="99")
+        self.transacao(test_db, self.corridas, 99.0, data=self.inicio - timedelta(days=2))
+
+        assert self.valor(test_db, por_categoria) == pytest.approx(5.0)
+        assert self.valor(test_db, por_plataforma) == pytest.approx(40.0)
+
+    def test_sessions_feed_hours(self, test_db):
+        """Teste de metas de horas alimentadas por sessões"""
+        meta = self.criar_meta(test_db, MetricaMeta.HORAS, target="10")
+
+        session = SessionService.start_session(test_db, self.user.id)
+        session.inicio = datetime.now() - timedelta(hours=2)
+        test_db.commit()
+        SessionService.end_session(test_db, session.id, self.user.id)
+        assert self.valor(test_db, meta) == pytest.approx(2.0, abs=0.05)
+
+        SessionService.delete_session(test_db, session.id, self.user.id)
+        assert self.valor(test_db, meta) == pytest.approx(0.0, abs=0.05)
+
+    def test_binding_backfills_and_recompute(self, test_db):
+        """Teste de backfill ao vincular e de recálculo completo"""
+        self.transacao(test_db, self.corridas, 60.0)
+        meta = self.criar_meta(test_db, MetricaMeta.RECEITA)
+        assert meta["currentValue"] == Decimal("60.0")
+
+        test_db.query(Meta).update({"valor_atual": 0})
+        test_db.commit()
+        GoalProgressService.recompute(test_db)
+
+        assert self.valor(test_db, meta) == pytest.approx(60.0)
+
+    def test_paused_goal_frozen_on_both_paths(self, test_db):
+        """Teste de meta pausada: nem o incremento nem o recálculo a alteram; reativar recalcula"""
+        meta = self.criar_meta(test_db, MetricaMeta.RECEITA)
+        GoalService.deactivate_goal(test_db, self.user.id, meta["id"])
+
+        self.transacao(test_db, self.corridas, 40.0)
+        assert self.valor(test_db, meta) == pytest.approx(0.0)
+        GoalProgressService.recompute(test_db, self.user.id)
+        assert self.valor(test_db, meta) == pytest.approx(0.0)
+
+        reativada = GoalService.reactivate_goal(test_db, self.user.id, meta["id"])
+        assert reativada["currentValue"] == pytest.approx(40.0)
+
+    def test_goal_falls_back_below_target(self, test_db):
+        """Teste de meta concluída que volta abaixo do alvo: deixa de estar concluída"""
+        meta = self.criar_meta(test_db, MetricaMeta.RECEITA)
+        receita = self.transacao(test_db, self.corridas, 120.0)
+        test_db.expire_all()
+        assert test_db.get(Meta, meta["id"]).eh_concluida
+
+        TransactionService.update_transaction(test_db, receita.id, self.user.id, valor=70.0)
+        test_db.expire_all()
+        reaberta = test_db.get(Meta, meta["id"])
+        assert not reaberta.eh_concluida
+        assert reaberta.concluida_em is None
+
+        self.transacao(test_db, self.corridas, 30.0)
+        test_db.expire_all()
+        assert test_db.get(Meta, meta["id"]).eh_concluida
+        assert test_db.get(Meta, meta["id"]).concluida_em is not None
+
+    def test_bound_goal_rejects_manual_progress(self, test_db):
+        """Teste de meta vinculada sem atualização manual"""
+        meta = self.criar_meta(test_db, MetricaMeta.RECEITA)
+
+        with pytest.raises(ValidationError):
+            GoalService.update_goal_progress(
+                test_db, self.user.id, meta["id"], MetaProgressUpdate(valor_adicional=Decimal("10"))
+            )
+
+    def test_goal_reads_do_not_aggregate(self, test_db):
+        """Teste de leitura de metas sem agregar transações"""
+        self.criar_meta(test_db, MetricaMeta.LUCRO_LIQUIDO)
+        self.transacao(test_db, self.corridas, 10.0)
+
+        statements = []
+        engine = test_db.get_bind()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            GoalService.get_user_goals(test_db, self.user.id)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert not any("transacoes" in sql for sql in statements)
+
+
+class TestAtomicProgress:
+    """Testes do incremento atômico e em lote de progresso"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.metas = [
+            GoalService.create_goal(test_db, self.user.id, MetaCreate(
+                title=f"Meta {indice}",
+                category=CategoriaMeta.OTHER,
+                targetValue=Decimal("100.00")
+            ))
+            for indice in range(2)
+        ]
+
+    def test_single_statement_increment(self, test_db):
+        """Teste de incremento em uma única instrução UPDATE ... RETURNING"""
+        user_id = self.user.id
+        statements = []
+        engine = test_db.get_bind()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            meta = GoalService.update_goal_progress(
+                test_db, user_id, self.metas[0]["id"], MetaProgressUpdate(valor_adicional=Decimal("100"))
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        assert statements[0].startswith("UPDATE metas") and "RETURNING" in statements[0]
+        assert meta["currentValue"] == Decimal("100.0")
+        assert meta["isCompleted"] is True
+
+    def test_no_lost_updates_with_stale_objects(self, test_db):
+        """Teste de incrementos concorrentes sem perda (sessão com objeto desatualizado)"""
+        from sqlalchemy.orm import sessionmaker
+
+        outra = sessionmaker(bind=test_db.get_bind())()
+        outra.get(Meta, self.metas[0]["id"])  # carrega valor_atual = 0
+
+        GoalService.update_goal_progress(
+            test_db, self.user.id, self.metas[0]["id"], MetaProgressUpdate(valor_adicional=Decimal("10"))
+        )
+        meta = GoalService.update_goal_progress(
+            outra, self.user.id, self.metas[0]["id"], MetaProgressUpdate(valor_adicional=Decimal("15"))
+        )
+        outra.close()
+
+        assert meta["currentValue"] == Decimal("25.0")
+
+    def test_batch_all_or_nothing(self, test_db):
+        """Teste de lote aplicado em uma transação"""
+        from schemas.goal_schemas import MetaProgressBatchItem
+
+        primeira, segunda = (meta["id"] for meta in self.metas)
+        metas = GoalService.update_goals_progress(test_db, self.user.id, [
+            MetaProgressBatchItem(goal_id=primeira, valor_adicional=Decimal("30")),
+            MetaProgressBatchItem(goal_id=segunda, valor_adicional=Decimal("5")),
+            MetaProgressBatchItem(goal_id=primeira, valor_adicional=Decimal("20")),
+        ])
+        assert [meta["currentValue"] for meta in metas] == [Decimal("50.0"), Decimal("5.0")]
+
+        with pytest.raises(ValidationError):
+            GoalService.update_goals_progress(test_db, self.user.id, [
+                MetaProgressBatchItem(goal_id=primeira, valor_adicional=Decimal("10")),
+                MetaProgressBatchItem(goal_id=segunda, valor_adicional=Decimal("-6")),
+            ])
+
+        test_db.expire_all()
+        assert test_db.get(Meta, primeira).valor_atual == 50.0
+        assert test_db.get(Meta, segunda).valor_atual == 5.0
+
+    def test_batch_endpoint(self, test_db):
+        """Teste do endpoint PATCH /api/goals/progress"""
+        from fastapi.testclient import TestClient
+        from main import app
+        from api.dependencies import get_current_user
+
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        try:
+            client = TestClient(app)
+            response = client.patch("/api/goals/progress", json={"items": [
+                {"goal_id": self.metas[0]["id"], "valor_adicional": "12.5"},
+                {"goal_id": "inexistente", "valor_adicional": "1"},
+            ]})
+            assert response.status_code == 404
+
+            response = client.patch("/api/goals/progress", json={"items": [
+                {"goal_id": self.metas[1]["id"], "valor_adicional": "12.5"},
+            ]})
+        finally:
+            app.dependency_overrides.pop(get_current_user, None)
+
+        assert response.status_code == 200
+        assert response.json()["data"][0]["currentValue"] == "12.5"
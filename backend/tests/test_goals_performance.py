@@ -0,0 +1,25 @@
+"""
+Benchmark da listagem de metas (GoalService.get_user_goals)
+
+Usa os mesmos datasets e orçamentos de queries de test_service_benchmarks.py;
+o progresso de cada meta é calculado sobre as transações do usuário.
+"""
+import pytest
+
+from services.goal_service import GoalService
+from tests.test_service_benchmarks import run_benchmark
+
+pytest.importorskip("pytest_benchmark")
+
+
+class TestGoalServiceBenchmarks:
+    """Benchmarks do GoalService"""
+
+    def test_list_goals(self, benchmark, benchmark_dataset):
+        """Listagem das metas ativas com progresso"""
+        db, user_id = benchmark_dataset["db"], benchmark_dataset["user_id"]
+        resultado = run_benchmark(
+            benchmark, benchmark_dataset, "goals_list",
+            lambda: GoalService.get_user_goals(db, user_id)
+        )
+        assert resultado
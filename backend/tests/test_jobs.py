@@ -0,0 +1,165 @@
+"""
+Testes do agendador de jobs e do ciclo de vida das assinaturas
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config.database import ensure_schema
+from models import Assinatura, ExecucaoJob
+from services.auth_service import AuthService
+from services.job_runner import JobRunner
+from services.lock_service import LockService
+from services.subscription_service import SubscriptionService
+
+
+def criar_assinatura(db, user_id, periodo_fim, status="ACTIVE"):
+    subscription = Assinatura(
+        id_usuario=user_id,
+        tipo_plano="pro",
+        status=status,
+        asaas_customer_id="cus_1",
+        periodo_inicio=datetime.now() - timedelta(days=30),
+        periodo_fim=periodo_fim
+    )
+    db.add(subscription)
+    db.commit()
+    return subscription
+
+
+class TestSubscriptionLifecycle:
+    """Testes da expiração e dos avisos de vencimento"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+
+    def test_expire_single_update(self, test_db):
+        """Teste de expiração em um único UPDATE"""
+        for days in (-2, -1, 5):
+            criar_assinatura(test_db, self.user.id, datetime.now() + timedelta(days=days))
+
+        statements = []
+        engine = test_db.get_bind()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            assert SubscriptionService.expire_subscriptions(test_db) == 2
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        assert statements[0].startswith("UPDATE assinaturas")
+        statuses = sorted(s for (s,) in test_db.query(Assinatura.status).all())
+        assert statuses == ["ACTIVE", "EXPIRED", "EXPIRED"]
+
+    def test_notify_expiring_in_chunks(self, test_db):
+        """Teste de avisos em lotes, sem repetir avisos"""
+        for hours in (1, 2, 3, 4, 5):
+            criar_assinatura(test_db, self.user.id, datetime.now() + timedelta(hours=hours))
+        criar_assinatura(test_db, self.user.id, datetime.now() + timedelta(days=10))
+
+        chunks = []
+        total = SubscriptionService.notify_expiring_subscriptions(
+            test_db, days_ahead=3, chunk_size=2, notify=chunks.append
+        )
+
+        assert total == 5
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        fins = [item["periodo_fim"] for chunk in chunks for item in chunk]
+        assert fins == sorted(fins)
+
+        assert SubscriptionService.notify_expiring_subscriptions(test_db, days_ahead=3, notify=chunks.append) == 0
+
+    def test_extend_resets_notice(self, test_db):
+        """Teste de novo aviso após renovação"""
+        subscription = criar_assinatura(test_db, self.user.id, datetime.now() + timedelta(hours=1))
+        SubscriptionService.notify_expiring_subscriptions(test_db, notify=lambda chunk: None)
+
+        SubscriptionService.extend_subscription(test_db, subscription.id, days=1)
+
+        assert SubscriptionService.notify_expiring_subscriptions(test_db, notify=lambda chunk: None) == 1
+
+    def test_expiry_index(self, test_db):
+        """Teste do índice (status, periodo_fim)"""
+        indexes = inspect(test_db.get_bind()).get_indexes("assinaturas")
+        assert any(index["column_names"] == ["status", "periodo_fim"] for index in indexes)
+
+
+class TestJobRunner:
+    """Testes do executor de jobs"""
+
+    @pytest.fixture
+    def session_factory(self, test_db):
+        return sessionmaker(bind=test_db.get_bind())
+
+    @pytest.mark.asyncio
+    async def test_runs_once_per_interval(self, test_db, session_factory):
+        """Teste de estado persistente: job não roda de novo antes do intervalo"""
+        calls = []
+        runner = JobRunner(session_factory)
+        runner.register("contar", 60, lambda: calls.append(1) or len(calls))
+
+        assert await runner.run_due() == {"contar": 1}
+        assert await runner.run_due() == {}
+
+        # Outro processo com o mesmo banco também respeita a última execução
+        other = JobRunner(session_factory)
+        other.register("contar", 60, lambda: calls.append(1))
+        assert await other.run_due() == {}
+
+        estado = test_db.get(ExecucaoJob, "contar")
+        assert estado.execucoes == 1
+        assert estado.ultimo_resultado == "1"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_skips_when_locked(self, test_db, session_factory):
+        """Teste de eleição: job não roda se outro worker detém o lock"""
+        calls = []
+        runner = JobRunner(session_factory)
+        job = runner.register("contar", 60, lambda: calls.append(1))
+        LockService.acquire(test_db, job.lock_name, 60, dono="outro-worker")
+
+        assert await runner.run_due() == {}
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_records_errors_and_async_jobs(self, test_db, session_factory):
+        """Teste de erro persistido e de jobs assíncronos"""
+        def falhar():
+            raise RuntimeError("falhou")
+
+        async def assincrono():
+            return {"ok": True}
+
+        runner = JobRunner(session_factory)
+        runner.register("falhar", 60, falhar)
+        runner.register("assincrono", 60, assincrono)
+
+        assert await runner.run_due() == {"assincrono": {"ok": True}}
+
+        estado = test_db.get(ExecucaoJob, "falhar")
+        assert estado.ultimo_erro == "falhou"
+        assert estado.ultimo_sucesso_em is None
+
+
+class TestSchemaMigration:
+    """Testes da atualização de tabelas existentes"""
+
+    def test_adds_missing_columns(self):
+        """Teste de coluna nova adicionada em tabela existente"""
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        ensure_schema(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE assinaturas DROP COLUMN aviso_expiracao_em"))
+            conn.execute(text("UPDATE versao_schema SET versao = 0"))
+
+        assert ensure_schema(engine) is True
+
+        columns = {col["name"] for col in inspect(engine).get_columns("assinaturas")}
+        assert "aviso_expiracao_em" in columns
+        engine.dispose()
@@ -0,0 +1,132 @@
+"""
+Testes do stream ao vivo da sessão ativa (SSE)
+"""
+import asyncio
+import json
+import pytest
+from datetime import timedelta
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import settings
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+from services.live_session_service import LiveSessionHub, live_hub
+from services.session_service import SessionService
+from services.transaction_service import TransactionService
+
+
+def ler_evento(texto):
+    """Converte um bloco SSE em (evento, dados)"""
+    linhas = dict(linha.split(": ", 1) for linha in texto.strip().split("\n"))
+    return linhas["event"], json.loads(linhas["data"])
+
+
+class TestLiveSession:
+    """Testes do acumulador em memória e do fan-out de eventos"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.corridas = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+        self.combustivel = CategoryService.create_category(test_db, self.user.id, "Combustível", "despesa")
+
+    @pytest.mark.asyncio
+    async def test_fan_out_to_every_device(self, test_db):
+        """Teste de escrita refletida em todas as conexões do usuário"""
+        sessao = SessionService.start_session(test_db, self.user.id)
+        celular = live_hub.subscribe(self.user.id, sessao)
+        tablet = live_hub.subscribe(self.user.id, sessao)
+        try:
+            TransactionService.create_transaction(test_db, self.user.id, self.corridas.id, 42.0, "receita", origem="uber")
+            TransactionService.create_transaction(test_db, self.user.id, self.combustivel.id, 12.0, "despesa")
+            await asyncio.sleep(0)
+
+            for conexao in (celular, tablet):
+                assert conexao.fila.qsize() == 2
+                conexao.fila.get_nowait()
+                evento = conexao.fila.get_nowait()
+                assert evento["evento"] == "sessao"
+                assert evento["dados"]["total_ganhos"] == 42.0
+                assert evento["dados"]["lucro"] == 30.0
+                assert evento["dados"]["total_corridas"] == 1
+        finally:
+            live_hub.unsubscribe(self.user.id, celular)
+            live_hub.unsubscribe(self.user.id, tablet)
+        assert live_hub.connections(self.user.id) == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_client_keeps_latest_snapshot(self, test_db, monkeypatch):
+        """Teste de backpressure: fila cheia descarta o snapshot mais antigo"""
+        monkeypatch.setattr(settings, "LIVE_SESSION_QUEUE_SIZE", 2)
+        hub = LiveSessionHub()
+        sessao = SessionService.start_session(test_db, self.user.id)
+        conexao = hub.subscribe(self.user.id, sessao)
+
+        for ganhos in (10.0, 20.0, 30.0, 40.0):
+            sessao.total_ganhos = ganhos
+            hub.publish(sessao)
+        await asyncio.sleep(0)
+
+        assert conexao.descartados == 2
+        assert [conexao.fila.get_nowait()["dados"]["total_ganhos"] for _ in range(2)] == [30.0, 40.0]
+
+    @pytest.mark.asyncio
+    async def test_stream_heartbeat_and_end(self, test_db, monkeypatch):
+        """Teste do stream: snapshot inicial, heartbeat e evento de fim"""
+        monkeypatch.setattr(settings, "LIVE_SESSION_HEARTBEAT_SECONDS", 0.01)
+        sessao = SessionService.start_session(test_db, self.user.id)
+        sessao.inicio = sessao.inicio - timedelta(minutes=30)
+        test_db.commit()
+        conexao = live_hub.subscribe(self.user.id, sessao)
+        stream = live_hub.stream(self.user.id, conexao, session_factory=sessionmaker(bind=test_db.get_bind()))
+
+        assert ler_evento(await stream.__anext__())[0] == "sessao"
+        evento, dados = ler_evento(await stream.__anext__())
+        assert evento == "heartbeat" and dados["tempo_decorrido_segundos"] >= 1800
+
+        SessionService.end_session(test_db, sessao.id, self.user.id)
+        evento, dados = ler_evento(await stream.__anext__())
+        assert evento == "fim" and dados["ativa"] is False and dados["id_sessao"] == sessao.id
+
+        await stream.aclose()
+        assert live_hub.connections(self.user.id) == 0
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_picks_up_writes_from_other_workers(self, test_db, monkeypatch):
+        """Teste de escrita feita em outro processo: o heartbeat relê os totais do banco"""
+        monkeypatch.setattr(settings, "LIVE_SESSION_HEARTBEAT_SECONDS", 0.01)
+        outro_worker = LiveSessionHub()
+        sessao = SessionService.start_session(test_db, self.user.id)
+        conexao = outro_worker.subscribe(self.user.id, sessao)
+        stream = outro_worker.stream(self.user.id, conexao, session_factory=sessionmaker(bind=test_db.get_bind()))
+        assert ler_evento(await stream.__anext__())[1]["total_ganhos"] == 0.0
+
+        # Escrita publicada só no hub deste processo (live_hub), não no do outro worker
+        TransactionService.create_transaction(test_db, self.user.id, self.corridas.id, 42.0, "receita", origem="uber")
+
+        evento, dados = ler_evento(await stream.__anext__())
+        assert evento == "sessao" and dados["total_ganhos"] == 42.0
+        assert ler_evento(await stream.__anext__())[0] == "heartbeat"
+
+        SessionService.end_session(test_db, sessao.id, self.user.id)
+        assert ler_evento(await stream.__anext__())[0] == "fim"
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_connection_limit(self, test_db, monkeypatch):
+        """Teste do limite de conexões simultâneas por usuário"""
+        monkeypatch.setattr(settings, "LIVE_SESSION_MAX_CONNECTIONS", 1)
+        hub = LiveSessionHub()
+        assert hub.subscribe(self.user.id) is not None
+        assert hub.subscribe(self.user.id) is None
+
+    def test_elapsed_time_on_non_utc_host(self, test_db, host_fora_de_utc):
+        """Teste do tempo decorrido com o relógio UTC da sessão em host fora de UTC"""
+        sessao = SessionService.start_session(test_db, self.user.id)
+        estado = LiveSessionHub._estado(sessao)
+        estado["inicio"] -= timedelta(minutes=10)
+
+        snapshot = LiveSessionHub.snapshot(estado)
+
+        assert 600 <= snapshot["tempo_decorrido_segundos"] < 660
@@ -0,0 +1,45 @@
+"""
+Testes do harness de carga (scripts/load_test.py)
+"""
+import pytest
+
+from scripts.load_test import Metricas, cliente_asgi, executar_carga
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+
+
+class TestLoadHarness:
+    """Testes do relatório e de uma execução curta em processo"""
+
+    def test_report_percentiles_and_errors(self):
+        """Teste de percentis por rota e contagem de erros (status 0 e >= 400)"""
+        metricas = Metricas()
+        for ms in range(1, 101):
+            metricas.registrar("GET /api/dashboard/stats", 200, ms / 1000)
+        metricas.registrar("POST /api/transactions/", 422, 0.005)
+        metricas.registrar("POST /api/transactions/", 0, 0.010)
+
+        relatorio = metricas.relatorio()
+
+        dashboard = relatorio["rotas"]["GET /api/dashboard/stats"]
+        assert (dashboard["requisicoes"], dashboard["erros"]) == (100, 0)
+        assert (dashboard["p50_ms"], dashboard["p95_ms"], dashboard["p99_ms"]) == (50.5, 95.05, 99.01)
+        assert relatorio["rotas"]["POST /api/transactions/"]["status"] == {"0": 1, "422": 1}
+        assert relatorio["total"]["erros"] == 2
+
+    @pytest.mark.asyncio
+    async def test_shift_mix_against_asgi_app(self, test_db, sample_user_data):
+        """Teste de um turno curto pelo app em processo: todas as rotas do mix respondem"""
+        user = AuthService.register_user(db=test_db, **sample_user_data)
+        CategoryService.create_default_categories(test_db, user.id)
+
+        async with cliente_asgi(1) as cliente:
+            relatorio = await executar_carga(
+                cliente, [sample_user_data["email"]], sample_user_data["senha"],
+                vus=1, duracao=1.5, mix="turno", seed=3, pausa=0
+            )
+
+        assert relatorio["total"]["erros"] == 0
+        assert relatorio["rotas"]["POST /api/auth/login"]["requisicoes"] == 1
+        assert {"GET /api/dashboard/stats", "POST /api/transactions/", "GET /api/transactions/",
+                "GET /api/transactions/summary/overview"} <= set(relatorio["rotas"])
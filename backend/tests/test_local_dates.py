@@ -0,0 +1,110 @@
+"""
+Testes da data local das transações (fuso do usuário)
+"""
+import pytest
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import text
+
+from config.database import ensure_schema
+from models import Transacao
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+from services.dashboard_service import DashboardService
+from services.session_service import SessionService
+from services.settings_service import SettingsService
+from services.transaction_service import TransactionService
+from services.user_service import UserService
+
+
+class TestLocalDates:
+    """Testes de agrupamento e filtros pela data local"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.corridas = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+        SettingsService.bulk_update_settings(test_db, self.user.id, {"fuso_horario": "America/Sao_Paulo"})
+
+    def transacao(self, db, valor, data):
+        return TransactionService.create_transaction(
+            db, self.user.id, self.corridas.id, valor, "receita", origem="uber", data=data
+        )
+
+    def test_late_rides_stay_on_local_day(self, test_db):
+        """Teste de corrida depois das 21h em São Paulo (já é outro dia em UTC)"""
+        self.transacao(test_db, 30.0, datetime(2024, 1, 10, 15, 0))
+        noite = self.transacao(test_db, 45.0, datetime(2024, 1, 11, 1, 30))  # 22h30 local
+
+        assert noite.data_local == date(2024, 1, 10)
+        diario = TransactionService.get_daily_transactions(
+            test_db, self.user.id,
+            data_inicio=datetime(2024, 1, 10, 12, 0), data_fim=datetime(2024, 1, 11, 2, 0)
+        )
+        assert [(d["data"], d["receitas"], d["count_receitas"]) for d in diario] == [("2024-01-10", 75.0, 2)]
+
+    def test_timezone_change_rebuilds_local_dates(self, test_db):
+        """Teste de troca de fuso recalculando as datas já gravadas"""
+        noite = self.transacao(test_db, 45.0, datetime(2024, 1, 11, 1, 30))
+
+        SettingsService.bulk_update_settings(test_db, self.user.id, {"fuso_horario": "UTC"})
+
+        test_db.expire_all()
+        assert test_db.get(Transacao, noite.id).data_local == date(2024, 1, 11)
+
+    def test_daily_filter_uses_local_date_index(self, test_db):
+        """Teste de plano: filtro por dia local é range scan no índice"""
+        plan = test_db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT data_local, tipo, sum(valor) FROM transacoes "
+            "WHERE id_usuario = :u AND data_local >= :i AND data_local <= :f GROUP BY data_local, tipo"
+        ), {"u": self.user.id, "i": "2024-01-01", "f": "2024-01-31"}).fetchall()
+
+        assert any("ix_transacoes_usuario_data_local" in row[-1] for row in plan)
+
+    def test_dashboard_today_in_user_timezone(self, test_db):
+        """Teste do "hoje" do dashboard a partir da meia-noite local"""
+        fuso = ZoneInfo("America/Sao_Paulo")
+        hoje_local = datetime.now(fuso).date()
+        meia_noite = datetime.combine(hoje_local, time(0, 30), fuso).astimezone(timezone.utc)
+        self.transacao(test_db, 20.0, meia_noite)
+        self.transacao(test_db, 99.0, meia_noite - timedelta(hours=1))  # ontem, 23h30 local
+
+        stats = DashboardService(test_db).get_dashboard_stats(self.user.id)
+
+        assert stats["ganhos_hoje"] == 20.0
+        assert stats["corridas_hoje"] == 1
+
+    def test_dashboard_session_hours_on_non_utc_host(self, test_db, host_fora_de_utc, monkeypatch):
+        """Teste de horas do dia no dashboard com a sessão gravada pelo SessionService em host fora de UTC"""
+        relogio = iter([datetime(2024, 1, 11, 12, 0, tzinfo=timezone.utc), datetime(2024, 1, 11, 13, 0, tzinfo=timezone.utc)])
+        monkeypatch.setattr("services.session_service.now_utc", lambda: next(relogio))
+        sessao = SessionService.start_session(test_db, self.user.id)
+        SessionService.end_session(test_db, sessao.id, self.user.id)
+
+        stats = DashboardService(test_db).get_dashboard_stats(
+            self.user.id, agora=datetime(2024, 1, 11, 20, 0, tzinfo=timezone.utc)
+        )
+
+        assert stats["horas_hoje"] == 1.0
+
+    def test_schema_upgrade_fills_missing_local_dates(self, test_db):
+        """Teste de atualização do banco: transações antigas sem data local são preenchidas"""
+        noite = self.transacao(test_db, 45.0, datetime(2024, 1, 11, 1, 30))
+        test_db.execute(text("UPDATE transacoes SET data_local = NULL"))
+        test_db.execute(text("UPDATE versao_schema SET versao = 0"))
+        test_db.commit()
+
+        assert ensure_schema(test_db.get_bind()) is True
+
+        test_db.expire_all()
+        assert test_db.get(Transacao, noite.id).data_local == date(2024, 1, 10)
+
+    def test_update_user_setting_rebuilds_local_dates(self, test_db):
+        """Teste de troca de fuso pelo UserService recalculando as datas"""
+        noite = self.transacao(test_db, 45.0, datetime(2024, 1, 11, 1, 30))
+
+        UserService.update_user_setting(test_db, self.user.id, "fuso_horario", "UTC")
+
+        test_db.expire_all()
+        assert test_db.get(Transacao, noite.id).data_local == date(2024, 1, 11)
@@ -0,0 +1,179 @@
+"""
+Testes do espelho local de pagamentos do Asaas
+"""
+import pytest
+from datetime import timedelta
+from sqlalchemy.orm import sessionmaker
+
+from models import Pagamento, Assinatura, Usuario
+from services.auth_service import AuthService
+from services.payment_mirror_service import PaymentMirrorService
+from services.webhook_handler import WebhookHandler
+from utils.helpers import now_utc
+
+
+class FakeAsaas:
+    """Asaas em memória que conta chamadas de `get_payment`"""
+
+    def __init__(self, status="PENDING"):
+        self.status = status
+        self.calls = 0
+
+    async def get_payment(self, payment_id):
+        self.calls += 1
+        return {
+            "id": payment_id,
+            "customer": "cus_1",
+            "subscription": "sub_1",
+            "value": 19.9,
+            "netValue": 18.5,
+            "billingType": "PIX",
+            "status": self.status,
+            "dueDate": "2024-01-10",
+            "paymentDate": None,
+            "invoiceUrl": "https://asaas/i/1"
+        }
+
+
+def envelhecer(db, payment_id, seconds):
+    """Recua o `sincronizado_em` da cobrança espelhada"""
+    pagamento = db.get(Pagamento, payment_id)
+    pagamento.sincronizado_em = now_utc() - timedelta(seconds=seconds)
+    db.commit()
+
+
+class TestPaymentMirrorService:
+    """Testes do serviço de espelho"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        test_db.add(Assinatura(
+            id_usuario=self.user.id,
+            tipo_plano="pro",
+            status="ACTIVE",
+            asaas_customer_id="cus_1",
+            asaas_subscription_id="sub_1",
+            periodo_inicio=now_utc(),
+            periodo_fim=now_utc() + timedelta(days=30)
+        ))
+        test_db.commit()
+
+    @pytest.mark.asyncio
+    async def test_miss_fetches_and_mirrors(self, test_db):
+        """Teste de cache miss: busca no Asaas e grava o espelho"""
+        asaas = FakeAsaas()
+        pagamento, estado = await PaymentMirrorService.get_payment_status(test_db, "pay_1", asaas)
+
+        assert estado == "miss"
+        assert asaas.calls == 1
+        assert pagamento.status == "PENDING"
+        assert pagamento.id_usuario == self.user.id
+
+    @pytest.mark.asyncio
+    async def test_fresh_served_without_remote_call(self, test_db):
+        """Teste de leitura local sem chamar o Asaas"""
+        asaas = FakeAsaas()
+        await PaymentMirrorService.get_payment_status(test_db, "pay_1", asaas)
+
+        for _ in range(5):
+            _, estado = await PaymentMirrorService.get_payment_status(test_db, "pay_1", asaas)
+            assert estado == "fresh"
+
+        assert asaas.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_schedules_single_refresh(self, test_db):
+        """Teste de stale-while-revalidate com uma única revalidação em voo"""
+        asaas = FakeAsaas()
+        await PaymentMirrorService.get_payment_status(test_db, "pay_1", asaas)
+        envelhecer(test_db, "pay_1", 120)
+
+        scheduled = []
+        for _ in range(3):
+            pagamento, estado = await PaymentMirrorService.get_payment_status(
+                test_db, "pay_1", asaas, schedule_refresh=scheduled.append
+            )
+            assert estado == "stale"
+            assert pagamento.status == "PENDING"
+
+        assert scheduled == ["pay_1"]
+
+        asaas.status = "RECEIVED"
+        await PaymentMirrorService.refresh_payment("pay_1", asaas, session_factory=sessionmaker(bind=test_db.get_bind()))
+
+        test_db.expire_all()
+        assert test_db.get(Pagamento, "pay_1").status == "RECEIVED"
+        assert asaas.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_too_stale_fetches_synchronously(self, test_db):
+        """Teste de espelho além do limite máximo de idade"""
+        asaas = FakeAsaas()
+        await PaymentMirrorService.get_payment_status(test_db, "pay_1", asaas)
+        envelhecer(test_db, "pay_1", 7200)
+
+        _, estado = await PaymentMirrorService.get_payment_status(test_db, "pay_1", asaas)
+
+        assert estado == "miss"
+        assert asaas.calls == 2
+
+    def test_webhook_updates_mirror(self, test_db):
+        """Teste de atualização do espelho por webhook"""
+        WebhookHandler.process_payment_webhook(test_db, {
+            "event": "PAYMENT_OVERDUE",
+            "payment": {"id": "pay_2", "customer": "cus_1", "subscription": "sub_1",
+                        "status": "OVERDUE", "value": 19.9, "dueDate": "2024-01-10"}
+        })
+
+        pagamento = test_db.get(Pagamento, "pay_2")
+        assert pagamento.status == "OVERDUE"
+        assert pagamento.id_usuario == self.user.id
+
+    @pytest.mark.asyncio
+    async def test_reconcile_only_stale_pending(self, test_db):
+        """Teste do reconciliador: só revisita pendentes expirados"""
+        asaas = FakeAsaas()
+        PaymentMirrorService.upsert_payment(test_db, {"id": "pay_a", "status": "PENDING"})
+        PaymentMirrorService.upsert_payment(test_db, {"id": "pay_b", "status": "PENDING"})
+        PaymentMirrorService.upsert_payment(test_db, {"id": "pay_c", "status": "RECEIVED"})
+        envelhecer(test_db, "pay_a", 120)
+        envelhecer(test_db, "pay_c", 120)
+
+        updated = await PaymentMirrorService.reconcile_stale_payments(
+            asaas, session_factory=sessionmaker(bind=test_db.get_bind())
+        )
+
+        assert updated == 1
+        assert asaas.calls == 1
+
+    def test_owner_kept_on_later_updates(self, test_db):
+        """Teste de cobrança avulsa: webhook sem assinatura não apaga o dono"""
+        PaymentMirrorService.upsert_payment(
+            test_db, {"id": "pay_avulsa", "customer": "cus_x", "status": "PENDING"}, user_id=self.user.id
+        )
+
+        WebhookHandler.process_payment_webhook(test_db, {
+            "event": "PAYMENT_RECEIVED",
+            "payment": {"id": "pay_avulsa", "customer": "cus_x", "status": "RECEIVED", "value": 9.9}
+        })
+
+        pagamento = test_db.get(Pagamento, "pay_avulsa")
+        assert pagamento.status == "RECEIVED"
+        assert pagamento.id_usuario == self.user.id
+
+    def test_upsert_without_commit_keeps_pending_changes(self, test_db):
+        """Teste de upsert dentro de uma unidade de trabalho maior: alterações do chamador são mantidas"""
+        PaymentMirrorService.upsert_payment(test_db, {"id": "pay_1", "customer": "cus_1", "status": "PENDING"})
+        self.user.status_pagamento = "ativo"  # alteração pendente do chamador (autoflush desligado)
+
+        pagamento = PaymentMirrorService.upsert_payment(
+            test_db, {"id": "pay_1", "customer": "cus_1", "status": "RECEIVED"}, commit=False
+        )
+        assert pagamento.status == "RECEIVED"
+        assert self.user.status_pagamento == "ativo"
+
+        test_db.commit()
+        test_db.expire_all()
+        assert test_db.get(Usuario, self.user.id).status_pagamento == "ativo"
@@ -0,0 +1,184 @@
+"""
+Guarda de planos de execução das queries quentes
+
+Cada método de serviço do caminho crítico é executado contra um banco
+populado; as SELECTs emitidas são capturadas e passadas por EXPLAIN QUERY PLAN
+(SQLite) ou EXPLAIN (Postgres). O teste falha se alguma delas varrer uma
+tabela grande inteira, ou se o índice usado não for seletivo por usuário/chave
+(ex.: assinaturas buscadas só por status).
+"""
+import re
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models import Assinatura, Meta, SessaoTrabalho, Transacao
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+from services.dashboard_service import DashboardService
+from services.entitlement_service import EntitlementService
+from services.goal_service import GoalService
+from services.session_service import SessionService
+from services.subscription_service import SubscriptionService
+from services.transaction_service import TransactionService
+
+# Tabelas que crescem com o número de usuários (nunca devem ser varridas)
+GUARDED_TABLES = {"transacoes", "sessoes_trabalho", "assinaturas", "usuarios", "metas", "categorias"}
+
+# Primeira coluna do índice que torna a busca seletiva
+SELECTIVE_KEYS = {"id", "id_usuario", "email", "nome_usuario", "id_categoria", "id_sessao"}
+
+SQLITE_PLAN = re.compile(r"^(?P<op>SCAN|SEARCH) (?P<tabela>\w+)(?:.*?\((?P<chave>\w+)[=><])?")
+POSTGRES_SEQ_SCAN = re.compile(r"Seq Scan on (?P<tabela>\w+)")
+
+
+@contextmanager
+def capture_selects(db):
+    """Captura (statement, parâmetros) de cada SELECT executada no bloco"""
+    capturadas = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            capturadas.append((statement, parameters))
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        yield capturadas
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+def explain(db, statement, parameters):
+    """Linhas do plano de execução da query no dialeto atual"""
+    conn = db.connection()
+    if conn.dialect.name == "sqlite":
+        return [linha[3] for linha in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    return [linha[0] for linha in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+
+
+def plan_violations(linhas):
+    """Linhas do plano que varrem uma tabela vigiada ou buscam por chave não seletiva"""
+    violacoes = []
+    for linha in linhas:
+        postgres = POSTGRES_SEQ_SCAN.search(linha)
+        if postgres:
+            if postgres.group("tabela") in GUARDED_TABLES:
+                violacoes.append(linha)
+            continue
+        sqlite = SQLITE_PLAN.match(linha.strip())
+        # Aliases gerados pelo SQLAlchemy: transacoes_1
+        if not sqlite or re.sub(r"_\d+$", "", sqlite.group("tabela")) not in GUARDED_TABLES:
+            continue
+        if sqlite.group("op") == "SCAN" or sqlite.group("chave") not in SELECTIVE_KEYS:
+            violacoes.append(linha)
+    return violacoes
+
+
+def assert_indexed(db, func):
+    """Executa func e confere o plano de cada SELECT emitida"""
+    with capture_selects(db) as capturadas:
+        func()
+    assert capturadas, "nenhuma query capturada"
+
+    problemas = []
+    for statement, parameters in capturadas:
+        violacoes = plan_violations(explain(db, statement, parameters))
+        if violacoes:
+            problemas.append(f"{' | '.join(violacoes)}\n  {' '.join(statement.split())}")
+    assert not problemas, "queries sem índice seletivo:\n" + "\n".join(problemas)
+
+
+HOT_PATHS = {
+    "transactions_list": lambda db, ctx: TransactionService.get_user_transactions(db, ctx["user"].id),
+    "transactions_summary": lambda db, ctx: TransactionService.get_transactions_summary(
+        db, ctx["user"].id, ctx["inicio"], ctx["fim"]
+    ),
+    "transactions_by_category": lambda db, ctx: TransactionService.get_transactions_by_category(
+        db, ctx["user"].id, ctx["inicio"], ctx["fim"]
+    ),
+    "transactions_daily": lambda db, ctx: TransactionService.get_daily_transactions(
+        db, ctx["user"].id, ctx["inicio"], ctx["fim"]
+    ),
+    "transactions_search": lambda db, ctx: TransactionService.search_transactions(db, ctx["user"].id, "corrida"),
+    "dashboard_stats": lambda db, ctx: DashboardService(db).get_dashboard_stats(ctx["user"].id),
+    "goals_list": lambda db, ctx: GoalService.get_user_goals(db, ctx["user"].id),
+    "auth_login": lambda db, ctx: AuthService.authenticate_user(db, ctx["user"].email, "senha123"),
+    "auth_current_user": lambda db, ctx: AuthService.get_current_user(db, ctx["token"]),
+    "active_session": lambda db, ctx: SessionService.get_active_session(db, ctx["user"].id),
+    "sessions_summary": lambda db, ctx: SessionService.get_sessions_summary(db, ctx["user"].id),
+    "active_subscription": lambda db, ctx: SubscriptionService.get_active_subscription(db, ctx["user"].id),
+    "entitlements": lambda db, ctx: EntitlementService.compute(db, ctx["user"]),
+}
+
+
+class TestQueryPlans:
+    """Testes de cobertura de índices das queries quentes"""
+
+    @pytest.fixture
+    def contexto(self, test_db, sample_user_data):
+        """Usuário com transações, sessões, meta e assinatura"""
+        user = AuthService.register_user(db=test_db, **sample_user_data)
+        corridas = CategoryService.create_category(test_db, user.id, "Corridas", "receita")
+        combustivel = CategoryService.create_category(test_db, user.id, "Combustível", "despesa")
+        fim = datetime(2024, 6, 30)
+
+        for dia in range(20):
+            data = fim - timedelta(days=dia, hours=3)
+            test_db.add(SessaoTrabalho(
+                id_usuario=user.id, inicio=data, fim=data + timedelta(hours=4),
+                total_minutos=240, eh_ativa=False
+            ))
+            TransactionService.create_transaction(
+                test_db, user.id, corridas.id, 25.0, "receita", descricao="Corrida", data=data
+            )
+            TransactionService.create_transaction(
+                test_db, user.id, combustivel.id, 8.0, "despesa", descricao="Posto", data=data
+            )
+        test_db.add(SessaoTrabalho(id_usuario=user.id, inicio=fim, eh_ativa=True))
+        test_db.add(Meta(
+            id_usuario=user.id, titulo="Faturamento", tipo="mensal", categoria="other", metrica="receita",
+            valor_alvo=3000.0, data_inicio=fim.replace(day=1), data_fim=fim
+        ))
+        test_db.add(Assinatura(
+            id_usuario=user.id, tipo_plano="premium", status="ACTIVE", asaas_customer_id="cus_1",
+            periodo_inicio=fim - timedelta(days=30), periodo_fim=datetime.now() + timedelta(days=30)
+        ))
+        test_db.commit()
+
+        token, _ = AuthService.create_tokens(user)
+        return {"user": user, "token": token, "inicio": fim - timedelta(days=30), "fim": fim}
+
+    @pytest.mark.parametrize("nome", list(HOT_PATHS))
+    def test_hot_path_uses_index(self, test_db, contexto, nome):
+        """Teste de plano: nenhuma query do caminho quente varre tabela vigiada"""
+        assert_indexed(test_db, lambda: HOT_PATHS[nome](test_db, contexto))
+
+    def test_detects_full_scan(self, test_db, contexto):
+        """Teste do próprio guarda: filtro sem índice é reportado"""
+        with pytest.raises(AssertionError, match="SCAN transacoes"):
+            assert_indexed(test_db, lambda: test_db.query(Transacao).filter(Transacao.descricao == "Posto").all())
+
+        with pytest.raises(AssertionError, match="status="):
+            assert_indexed(test_db, lambda: test_db.query(Assinatura).filter(Assinatura.status == "ACTIVE").all())
+
+    def test_plan_line_parsing(self):
+        """Teste de classificação das linhas de plano (SQLite e Postgres)"""
+        assert plan_violations([
+            "SEARCH transacoes USING INDEX ix_transacoes_usuario_data (id_usuario=? AND data>?)",
+            "SEARCH usuarios USING INDEX sqlite_autoindex_usuarios_1 (id=?)",
+            "SCAN versao_schema",
+            "Index Scan using ix_transacoes_usuario_data on transacoes",
+        ]) == []
+        assert plan_violations([
+            "SCAN transacoes",
+            "SCAN transacoes_1 USING COVERING INDEX ix_transacoes_categoria_data",
+            "SEARCH assinaturas USING INDEX ix_assinaturas_status_periodo_fim (status=?)",
+            "Seq Scan on sessoes_trabalho  (cost=0.00..35.50 rows=10 width=4)",
+        ]) == [
+            "SCAN transacoes",
+            "SCAN transacoes_1 USING COVERING INDEX ix_transacoes_categoria_data",
+            "SEARCH assinaturas USING INDEX ix_assinaturas_status_periodo_fim (status=?)",
+            "Seq Scan on sessoes_trabalho  (cost=0.00..35.50 rows=10 width=4)",
+        ]
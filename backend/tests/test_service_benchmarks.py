@@ -0,0 +1,157 @@
+"""
+Benchmarks da camada de serviços sobre datasets de 10k, 100k e 1M transações
+
+Os datasets são gerados por scripts/generate_dataset.py na primeira execução e
+reaproveitados do cache do pytest (.pytest_cache/d/benchmark_datasets). As
+datas são fixas (fim em BENCHMARK_END_DATE), inclusive o "agora" do dashboard.
+
+Uso:
+    pytest tests/test_service_benchmarks.py tests/test_goals_performance.py \\
+        --bench-sizes=10k,100k --benchmark-autosave
+
+Cada benchmark registra em extra_info o número de queries executadas e falha
+se ultrapassar QUERY_BUDGETS. Para falhar em regressões de tempo, compare com
+uma execução salva:
+    pytest ... --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Sem pytest-benchmark instalado os testes são ignorados; com --benchmark-disable
+cada função roda uma vez (útil só para checar as queries).
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from services.dashboard_service import DashboardService
+from services.session_service import SessionService
+from services.transaction_service import TransactionService
+from tests.conftest import BENCHMARK_END_DATE
+
+pytest.importorskip("pytest_benchmark")
+
+# Número máximo de queries por chamada (independente do tamanho do dataset)
+QUERY_BUDGETS = {
+    "transactions_list": 2,
+    "transactions_summary": 4,
+    "transactions_by_category": 1,
+    "transactions_daily": 1,
+    "transactions_search": 1,
+    "dashboard_stats": 13,
+    "goals_list": 1,
+    "sessions_summary": 1,
+}
+
+FIM = datetime.combine(BENCHMARK_END_DATE, datetime.min.time()) + timedelta(days=1)
+INICIO_MES = FIM - timedelta(days=30)
+# "Agora" do dashboard: fim do último dia do dataset (hoje/semana com dados)
+AGORA = FIM.replace(tzinfo=timezone.utc) - timedelta(hours=4)
+
+
+def count_queries(db, func):
+    """Executa func uma vez e retorna o número de statements SQL emitidos"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        func()
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    return len(statements)
+
+
+def run_benchmark(benchmark, dataset, nome, func):
+    """
+    Mede func com pytest-benchmark e confere o orçamento de queries
+
+    A primeira chamada (fora da medição) aquece caches do SQLite e do
+    SQLAlchemy; a contagem de queries é feita numa chamada separada.
+    """
+    db = dataset["db"]
+    func()
+    queries = count_queries(db, func)
+
+    benchmark.group = f"{nome} [{dataset['tamanho']}]"
+    benchmark.extra_info.update({
+        "queries": queries,
+        "dataset": dataset["tamanho"],
+        "transacoes": dataset["transacoes"],
+        "transacoes_usuario": dataset["transacoes_usuario"],
+    })
+    resultado = benchmark(func)
+
+    assert queries <= QUERY_BUDGETS[nome], f"{nome}: {queries} queries (orçamento {QUERY_BUDGETS[nome]})"
+    return resultado
+
+
+class TestTransactionServiceBenchmarks:
+    """Benchmarks do TransactionService"""
+
+    def test_list(self, benchmark, benchmark_dataset):
+        """Listagem paginada (primeira página)"""
+        db, user_id = benchmark_dataset["db"], benchmark_dataset["user_id"]
+        transacoes, total = run_benchmark(
+            benchmark, benchmark_dataset, "transactions_list",
+            lambda: TransactionService.get_user_transactions(db, user_id, page=1, per_page=50)
+        )
+        assert len(transacoes) == 50 and total == benchmark_dataset["transacoes_usuario"]
+
+    def test_summary(self, benchmark, benchmark_dataset):
+        """Resumo do último mês"""
+        db, user_id = benchmark_dataset["db"], benchmark_dataset["user_id"]
+        resultado = run_benchmark(
+            benchmark, benchmark_dataset, "transactions_summary",
+            lambda: TransactionService.get_transactions_summary(db, user_id, INICIO_MES, FIM)
+        )
+        assert resultado["total_receitas"] > 0
+
+    def test_by_category(self, benchmark, benchmark_dataset):
+        """Totais por categoria do último mês"""
+        db, user_id = benchmark_dataset["db"], benchmark_dataset["user_id"]
+        resultado = run_benchmark(
+            benchmark, benchmark_dataset, "transactions_by_category",
+            lambda: TransactionService.get_transactions_by_category(db, user_id, INICIO_MES, FIM)
+        )
+        assert resultado
+
+    def test_daily(self, benchmark, benchmark_dataset):
+        """Série diária do último mês"""
+        db, user_id = benchmark_dataset["db"], benchmark_dataset["user_id"]
+        resultado = run_benchmark(
+            benchmark, benchmark_dataset, "transactions_daily",
+            lambda: TransactionService.get_daily_transactions(db, user_id, INICIO_MES, FIM)
+        )
+        assert resultado
+
+    def test_search(self, benchmark, benchmark_dataset):
+        """Busca textual na descrição"""
+        db, user_id = benchmark_dataset["db"], benchmark_dataset["user_id"]
+        run_benchmark(
+            benchmark, benchmark_dataset, "transactions_search",
+            lambda: TransactionService.search_transactions(db, user_id, "corrida", limit=20)
+        )
+
+
+class TestDashboardServiceBenchmarks:
+    """Benchmarks do DashboardService"""
+
+    def test_dashboard_stats(self, benchmark, benchmark_dataset):
+        """Estatísticas completas do dashboard"""
+        db, user_id = benchmark_dataset["db"], benchmark_dataset["user_id"]
+        resultado = run_benchmark(
+            benchmark, benchmark_dataset, "dashboard_stats",
+            lambda: DashboardService(db).get_dashboard_stats(user_id, agora=AGORA)
+        )
+        assert resultado["ganhos_semana"] > 0
+
+
+class TestSessionServiceBenchmarks:
+    """Benchmarks do SessionService"""
+
+    def test_sessions_summary(self, benchmark, benchmark_dataset):
+        """Resumo do histórico completo de sessões"""
+        db, user_id = benchmark_dataset["db"], benchmark_dataset["user_id"]
+        resultado = run_benchmark(
+            benchmark, benchmark_dataset, "sessions_summary",
+            lambda: SessionService.get_sessions_summary(db, user_id)
+        )
+        assert resultado
@@ -0,0 +1,185 @@
+"""
+Testes da atribuição de transações às sessões de trabalho
+"""
+import pytest
+from decimal import Decimal
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, update
+
+from config.database import ensure_schema
+
+from models import Meta, SessaoTrabalho, Transacao
+from schemas.goal_schemas import MetaCreate, CategoriaMeta, MetricaMeta
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+from services.goal_service import GoalService
+from services.session_attribution_service import SessionAttributionService
+from services.session_service import SessionService
+from services.transaction_service import TransactionService
+from utils.helpers import now_utc
+
+
+class TestSessionAttribution:
+    """Testes do vínculo transação ↔ sessão e dos totais das sessões"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.corridas = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+        self.combustivel = CategoryService.create_category(test_db, self.user.id, "Combustível", "despesa")
+
+    def transacao(self, db, categoria, valor, **kwargs):
+        return TransactionService.create_transaction(
+            db, self.user.id, categoria.id, valor, categoria.tipo, **kwargs
+        )
+
+    def sessao(self, db, inicio, horas):
+        sessao = SessaoTrabalho(
+            id_usuario=self.user.id, inicio=inicio, fim=inicio + timedelta(hours=horas),
+            total_minutos=horas * 60, eh_ativa=False
+        )
+        db.add(sessao)
+        db.commit()
+        return sessao
+
+    def recarregar(self, db, modelo, id_):
+        db.expire_all()
+        return db.get(modelo, id_)
+
+    def test_active_session_totals_follow_writes(self, test_db):
+        """Teste de totais incrementais da sessão ativa a cada escrita"""
+        sessao = SessionService.start_session(test_db, self.user.id)
+        corrida = self.transacao(test_db, self.corridas, 30.0, origem="uber")
+        self.transacao(test_db, self.corridas, 10.0, origem="manual")
+        gasto = self.transacao(test_db, self.combustivel, 12.5)
+
+        assert corrida.id_sessao == sessao.id
+        assert corrida.versao == 1
+        sessao = self.recarregar(test_db, SessaoTrabalho, sessao.id)
+        assert (sessao.total_ganhos, sessao.total_gastos, sessao.total_corridas) == (40.0, 12.5, 1)
+
+        TransactionService.update_transaction(test_db, corrida.id, self.user.id, valor=50.0)
+        TransactionService.delete_transaction(test_db, gasto.id, self.user.id)
+        sessao = self.recarregar(test_db, SessaoTrabalho, sessao.id)
+        assert (sessao.total_ganhos, sessao.total_gastos, sessao.total_corridas) == (60.0, 0.0, 1)
+
+    def test_end_session_closes_window_and_feeds_ride_goals(self, test_db):
+        """Teste de finalização: transações fora da janela saem e metas de corridas recebem o total"""
+        meta = GoalService.create_goal(test_db, self.user.id, MetaCreate(
+            title="Corridas da semana",
+            category=CategoriaMeta.OTHER,
+            targetValue=Decimal("10"),
+            deadline=datetime.now() + timedelta(days=7),
+            startDate=datetime.now() - timedelta(days=1),
+            metric=MetricaMeta.CORRIDAS
+        ))
+        sessao = SessionService.start_session(test_db, self.user.id)
+        self.transacao(test_db, self.corridas, 20.0, origem="uber")
+        self.transacao(test_db, self.corridas, 25.0, origem="99")
+        futura = self.transacao(test_db, self.corridas, 5.0, origem="uber", data=datetime.now() + timedelta(days=2))
+        assert futura.id_sessao == sessao.id
+
+        SessionService.end_session(test_db, sessao.id, self.user.id)
+
+        assert self.recarregar(test_db, Transacao, futura.id).id_sessao is None
+        sessao = self.recarregar(test_db, SessaoTrabalho, sessao.id)
+        assert (sessao.total_ganhos, sessao.total_corridas) == (45.0, 2)
+        assert test_db.get(Meta, meta["id"]).valor_atual == 2
+
+        # Corrida lançada depois, mas dentro da janela da sessão finalizada
+        meio = sessao.inicio + (sessao.fim - sessao.inicio) / 2
+        self.transacao(test_db, self.corridas, 15.0, origem="uber", data=meio)
+        assert self.recarregar(test_db, SessaoTrabalho, sessao.id).total_corridas == 3
+        assert test_db.get(Meta, meta["id"]).valor_atual == 3
+
+    def test_bulk_import_attaches_in_one_pass(self, test_db):
+        """Teste de importação em lote vinculando cada transação à sua sessão"""
+        base = datetime(2024, 3, 4, 8, 0)
+        manha = self.sessao(test_db, base, 4)
+        tarde = self.sessao(test_db, base + timedelta(hours=6), 4)
+
+        itens = [
+            {"id_categoria": self.corridas.id, "valor": 20.0, "tipo": "receita", "origem": "uber",
+             "data": base + timedelta(hours=h)}
+            for h in (1, 2, 5, 7, 11)
+        ]
+        transacoes = TransactionService.bulk_create_transactions(test_db, self.user.id, itens)
+
+        assert [t.id_sessao for t in transacoes] == [manha.id, manha.id, None, tarde.id, None]
+        assert self.recarregar(test_db, SessaoTrabalho, manha.id).total_corridas == 2
+        assert self.recarregar(test_db, SessaoTrabalho, tarde.id).total_ganhos == 20.0
+
+    def test_backfill_merge_pass(self, test_db):
+        """Teste do backfill refazendo vínculos e totais do histórico"""
+        base = datetime(2024, 3, 4, 8, 0)
+        antigas = [
+            self.transacao(test_db, self.corridas, 10.0, origem="uber", data=base + timedelta(hours=h))
+            for h in (1, 3, 5, 9)
+        ]
+        # Sessões criadas depois das transações (importação antiga): nada vinculado ainda
+        primeira = self.sessao(test_db, base, 2)
+        segunda = self.sessao(test_db, base + timedelta(hours=4), 2)
+        assert all(t.id_sessao is None for t in antigas)
+
+        alterados = SessionAttributionService.backfill(test_db)
+
+        assert alterados == 2
+        vinculos = [self.recarregar(test_db, Transacao, t.id).id_sessao for t in antigas]
+        assert vinculos == [primeira.id, None, segunda.id, None]
+        assert test_db.get(SessaoTrabalho, primeira.id).total_ganhos == 10.0
+        assert test_db.get(SessaoTrabalho, segunda.id).total_corridas == 1
+        assert SessionAttributionService.backfill(test_db) == 0
+
+    def test_pending_only_revisits_changes(self, test_db):
+        """Teste do job incremental: só sessões/transações alteradas e transações soltas cobertas"""
+        base = datetime(2024, 3, 4, 8, 0)
+        antigas = [
+            self.transacao(test_db, self.corridas, 10.0, origem="uber", data=base + timedelta(hours=h))
+            for h in (1, 5, 9)
+        ]
+        primeira = self.sessao(test_db, base, 2)
+        SessionAttributionService.backfill(test_db)
+        desde = now_utc()
+
+        # Vínculo antigo inconsistente e não alterado desde a última execução: fica como está
+        test_db.execute(
+            update(Transacao).where(Transacao.id == antigas[2].id)
+            .values(id_sessao=primeira.id, atualizado_em=desde - timedelta(days=1))
+        )
+        test_db.commit()
+        # Sessão nova cobrindo uma transação solta
+        segunda = self.sessao(test_db, base + timedelta(hours=4), 2)
+
+        assert SessionAttributionService.attribute_pending(test_db, desde) == 1
+        vinculos = [self.recarregar(test_db, Transacao, t.id).id_sessao for t in antigas]
+        assert vinculos == [primeira.id, segunda.id, primeira.id]
+        assert test_db.get(SessaoTrabalho, segunda.id).total_corridas == 1
+
+        assert SessionAttributionService.attribute_pending(test_db, now_utc()) == 0
+
+    def test_session_clock_is_utc_on_non_utc_host(self, test_db, host_fora_de_utc):
+        """Teste em host fora de UTC: a corrida continua na sessão depois de finalizá-la"""
+        sessao = SessionService.start_session(test_db, self.user.id)
+        corrida = self.transacao(test_db, self.corridas, 30.0, origem="uber")
+        SessionService.end_session(test_db, sessao.id, self.user.id)
+
+        assert abs(sessao.inicio - now_utc().replace(tzinfo=None)) < timedelta(minutes=1)
+        assert self.recarregar(test_db, Transacao, corrida.id).id_sessao == sessao.id
+        assert self.recarregar(test_db, SessaoTrabalho, sessao.id).total_corridas == 1
+
+    def test_schema_upgrade_converts_local_session_times(self, test_db, host_fora_de_utc):
+        """Teste de atualização do banco: sessões gravadas na hora local viram UTC e são religadas"""
+        base = datetime(2024, 3, 4, 8, 0)  # 08h em São Paulo = 11h UTC
+        corrida = self.transacao(test_db, self.corridas, 10.0, origem="uber", data=base + timedelta(hours=4))
+        sessao = self.sessao(test_db, base, 2)  # 08h-10h local, como o código antigo gravava
+        test_db.execute(text("UPDATE versao_schema SET versao = 15"))
+        test_db.commit()
+
+        assert ensure_schema(test_db.get_bind()) is True
+
+        sessao = self.recarregar(test_db, SessaoTrabalho, sessao.id)
+        assert (sessao.inicio, sessao.fim) == (base + timedelta(hours=3), base + timedelta(hours=5))
+        assert test_db.get(Transacao, corrida.id).id_sessao == sessao.id
+        assert sessao.total_ganhos == 10.0
@@ -153,3 +153,147 @@ class TestSessionService:
         )
         
         assert updated_session.observacoes == "Nova descrição"
+
+
+class TestSessionAnalytics:
+    """Testes das análises de sessões agregadas no banco"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        from models import SessaoTrabalho
+
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        # 2024-01-07 é domingo
+        base = datetime(2024, 1, 7, 8, 0)
+        sessoes = []
+        for i in range(60):
+            inicio = base + timedelta(days=i)
+            minutos = 60 if i % 7 == 1 else 30  # segundas mais longas
+            sessoes.append(SessaoTrabalho(
+                id_usuario=self.user.id,
+                inicio=inicio,
+                fim=inicio + timedelta(minutes=minutos),
+                total_minutos=minutos,
+                total_corridas=2,
+                total_ganhos=50.0,
+                plataforma="uber" if i % 2 == 0 else "99",
+                eh_ativa=False
+            ))
+        sessoes.append(SessaoTrabalho(id_usuario=self.user.id, inicio=datetime.now(), eh_ativa=True))
+        test_db.add_all(sessoes)
+        test_db.commit()
+
+    def test_summary_covers_full_history_in_one_query(self, test_db):
+        """Teste de resumo sobre todo o histórico com uma única query"""
+        from sqlalchemy import event
+
+        user_id = self.user.id
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+        try:
+            summary = SessionService.get_sessions_summary(test_db, user_id)
+        finally:
+            event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        assert summary["total_sessoes"] == 61
+        assert summary["sessoes_completas"] == 60
+        assert summary["tempo_total_minutos"] == 9 * 60 + 51 * 30
+        assert summary["sessao_mais_longa_minutos"] == 60
+        assert summary["tem_sessao_ativa"] is True
+
+    def test_analytics_breakdowns(self, test_db):
+        """Teste de horas por dia da semana, plataformas e sessão mais longa"""
+        analytics = SessionService.get_session_analytics(
+            test_db, self.user.id,
+            data_inicio=datetime(2024, 1, 7), data_fim=datetime(2024, 1, 20, 23, 59)
+        )
+
+        assert analytics["sessoes_completas"] == 14
+        assert analytics["horas_por_dia_semana"][1] == {"dia": "segunda", "horas": 2.0}
+        assert analytics["horas_por_dia_semana"][0] == {"dia": "domingo", "horas": 1.0}
+        assert analytics["sessao_mais_longa"]["total_minutos"] == 60
+        assert {p["plataforma"]: p["sessoes"] for p in analytics["plataformas"]} == {"uber": 7, "99": 7}
+        assert analytics["ganho_por_hora"] == 87.5  # R$ 700 em 8 horas
+
+    def test_weekday_hours_in_user_timezone(self, test_db):
+        """Teste de horas por dia da semana no fuso do usuário (segunda 01h UTC = domingo 22h em São Paulo)"""
+        from models import SessaoTrabalho
+
+        inicio = datetime(2024, 4, 1, 1, 0)
+        test_db.add(SessaoTrabalho(
+            id_usuario=self.user.id, inicio=inicio, fim=inicio + timedelta(hours=3),
+            total_minutos=180, eh_ativa=False
+        ))
+        test_db.commit()
+
+        analytics = SessionService.get_session_analytics(
+            test_db, self.user.id, data_inicio=datetime(2024, 3, 31), data_fim=datetime(2024, 4, 2)
+        )
+
+        assert analytics["horas_por_dia_semana"][0] == {"dia": "domingo", "horas": 3.0}
+        assert analytics["horas_por_dia_semana"][1] == {"dia": "segunda", "horas": 0.0}
+
+    def test_active_lookup_uses_partial_index(self, test_db):
+        """Teste do índice parcial na busca da sessão ativa"""
+        from sqlalchemy import text
+
+        plan = test_db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM sessoes_trabalho WHERE id_usuario = :u AND eh_ativa = 1"
+        ), {"u": self.user.id}).fetchall()
+
+        assert any("ix_sessoes_trabalho_ativa" in row[-1] for row in plan)
+        assert SessionService.get_active_session(test_db, self.user.id) is not None
+
+    def test_analytics_endpoint(self, test_db):
+        """Teste do endpoint de análise de sessões"""
+        from fastapi.testclient import TestClient
+        from main import app
+        from api.dependencies import get_current_active_user
+
+        app.dependency_overrides[get_current_active_user] = lambda: self.user
+        try:
+            client = TestClient(app)
+            response = client.get("/api/sessions/analytics")
+            invalid = client.get("/api/sessions/analytics", params={
+                "data_inicio": "2024-02-01T00:00:00", "data_fim": "2024-01-01T00:00:00"
+            })
+        finally:
+            app.dependency_overrides.pop(get_current_active_user, None)
+
+        assert response.status_code == 200
+        assert response.json()["data"]["total_sessoes"] == 61
+        assert invalid.status_code == 400
+
+    def test_hourly_rate_ignores_open_session(self, test_db):
+        """Teste de R$/hora só com sessões finalizadas (ganhos do turno aberto não inflam a taxa)"""
+        ativa = SessionService.get_active_session(test_db, self.user.id)
+        ativa.total_ganhos = 500.0
+        test_db.commit()
+
+        analytics = SessionService.get_session_analytics(test_db, self.user.id)
+
+        assert analytics["total_ganhos"] == 3500.0
+        assert analytics["ganho_por_hora"] == round(3000.0 / ((9 * 60 + 51 * 30) / 60.0), 2)
+
+    def test_schema_upgrade_closes_duplicate_active_sessions(self, test_db):
+        """Teste de banco antigo com duas sessões ativas: a mais recente é mantida e o índice criado"""
+        from sqlalchemy import inspect, text
+        from config.database import ensure_schema
+        from models import SessaoTrabalho
+
+        test_db.execute(text("DROP INDEX ix_sessoes_trabalho_ativa"))
+        test_db.add(SessaoTrabalho(id_usuario=self.user.id, inicio=datetime.now() - timedelta(hours=5), eh_ativa=True))
+        test_db.execute(text("UPDATE versao_schema SET versao = 0"))
+        test_db.commit()
+
+        assert ensure_schema(test_db.get_bind()) is True
+
+        indices = {index["name"] for index in inspect(test_db.get_bind()).get_indexes("sessoes_trabalho")}
+        assert "ix_sessoes_trabalho_ativa" in indices
+        ativas = test_db.query(SessaoTrabalho).filter(
+            SessaoTrabalho.id_usuario == self.user.id, SessaoTrabalho.eh_ativa == True
+        ).all()
+        assert len(ativas) == 1 and ativas[0].inicio > datetime.now() - timedelta(hours=1)
@@ -0,0 +1,210 @@
+"""
+Testes para configurações do usuário
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect, text, update
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from config.database import ensure_schema
+from api.dependencies import get_current_active_user
+from models import Configuracao
+from services.auth_service import AuthService
+from services.user_service import UserService
+from services.settings_service import SettingsService
+from utils.helpers import now_utc
+
+client = TestClient(app)
+
+
+def contar(db, func):
+    """Executa `func` registrando os comandos SQL enviados ao banco"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        return func(), statements
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+class TestSettingsService:
+    """Testes do serviço de configurações"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        UserService.create_default_settings(test_db, self.user)
+
+    def test_get_settings_typed(self, test_db):
+        """Teste de leitura tipada de todas as configurações"""
+        settings_data = SettingsService.get_settings(test_db, self.user.id)
+
+        assert settings_data["notificacoes_ativas"] is True
+        assert settings_data["relatorios_email"] is False
+        assert settings_data["lembrete_sessao"] == 60
+        assert settings_data["fuso_horario"] == "America/Sao_Paulo"
+
+    def test_get_settings_uses_cache(self, test_db):
+        """Teste de que leituras repetidas não consultam o banco"""
+        SettingsService.get_settings(test_db, self.user.id)
+
+        statements = []
+        engine = test_db.get_bind()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            for _ in range(5):
+                SettingsService.get_setting_value(test_db, self.user.id, "lembrete_sessao")
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert statements == []
+
+    def test_write_from_other_worker_seen_next_request(self, test_db):
+        """Teste de escrita feita por outro worker (sem invalidar este cache): conferida pela versão na próxima sessão"""
+        SettingsService.get_settings(test_db, self.user.id)
+        outra_requisicao = sessionmaker(bind=test_db.get_bind())
+
+        db = outra_requisicao()
+        try:
+            _, statements = contar(db, lambda: SettingsService.get_settings(db, self.user.id))
+            assert len(statements) == 1  # só a versão; o cache continua válido
+        finally:
+            db.close()
+
+        test_db.execute(
+            update(Configuracao)
+            .where(Configuracao.id_usuario == self.user.id, Configuracao.chave == "fuso_horario")
+            .values(valor="America/Manaus", atualizado_em=now_utc())
+        )
+        test_db.commit()
+
+        db = outra_requisicao()
+        try:
+            assert SettingsService.get_setting_value(db, self.user.id, "fuso_horario") == "America/Manaus"
+        finally:
+            db.close()
+
+    def test_get_setting_value_default(self, test_db):
+        """Teste de valor padrão para chave inexistente"""
+        UserService.delete_user_setting(test_db, self.user.id, "lembrete_sessao")
+
+        assert SettingsService.get_setting_value(test_db, self.user.id, "lembrete_sessao") == 60
+        assert SettingsService.get_setting_value(test_db, self.user.id, "inexistente", "x") == "x"
+
+    def test_bulk_update_settings(self, test_db):
+        """Teste de upsert em lote com invalidação do cache"""
+        SettingsService.get_settings(test_db, self.user.id)
+
+        updated = SettingsService.bulk_update_settings(test_db, self.user.id, {
+            "lembrete_sessao": 90,
+            "tema": "escuro",
+            "notificacoes_ativas": False,
+            "atalhos": {"inicio": "dashboard"}
+        })
+
+        assert updated["lembrete_sessao"] == 90
+        assert updated["tema"] == "escuro"
+        assert updated["notificacoes_ativas"] is False
+        assert updated["atalhos"] == {"inicio": "dashboard"}
+
+        # Sem duplicar linhas existentes
+        total = test_db.query(Configuracao).filter(Configuracao.id_usuario == self.user.id).count()
+        assert total == 9
+
+    def test_bulk_update_keeps_declared_type(self, test_db):
+        """Teste de que strings mantêm o tipo da configuração padrão"""
+        updated = SettingsService.bulk_update_settings(test_db, self.user.id, {"lembrete_sessao": "45"})
+
+        assert updated["lembrete_sessao"] == 45
+
+    def test_bulk_update_collapses_case_variants(self, test_db):
+        """Teste de chaves iguais após normalizar numa única linha do upsert"""
+        updated = SettingsService.bulk_update_settings(test_db, self.user.id, {"Tema": "claro", "tema ": "escuro"})
+
+        assert updated["tema"] == "escuro"
+        assert test_db.query(Configuracao).filter(
+            Configuracao.id_usuario == self.user.id, Configuracao.chave == "tema"
+        ).count() == 1
+
+    def test_schema_upgrade_creates_unique_index(self, test_db):
+        """Teste de banco antigo: duplicatas removidas e índice único criado pelo ensure_schema"""
+        test_db.execute(text("DROP INDEX uq_configuracoes_usuario_chave"))
+        test_db.execute(text(
+            "INSERT INTO configuracoes (id, id_usuario, chave, valor, tipo_dado, criado_em, atualizado_em) "
+            "VALUES ('dup', :u, 'tema', 'antigo', 'string', '2020-01-01', '2020-01-01')"
+        ), {"u": self.user.id})
+        test_db.execute(text("UPDATE versao_schema SET versao = 0"))
+        test_db.commit()
+
+        assert ensure_schema(test_db.get_bind()) is True
+
+        indices = {index["name"] for index in inspect(test_db.get_bind()).get_indexes("configuracoes")}
+        assert "uq_configuracoes_usuario_chave" in indices
+        assert test_db.get(Configuracao, "dup") is None
+
+        updated = SettingsService.bulk_update_settings(test_db, self.user.id, {"tema": "escuro"})
+        assert updated["tema"] == "escuro"
+
+    def test_update_user_setting_invalidates_cache(self, test_db):
+        """Teste de invalidação ao atualizar via UserService"""
+        SettingsService.get_settings(test_db, self.user.id)
+        UserService.update_user_setting(test_db, self.user.id, "tema", "escuro")
+
+        assert SettingsService.get_setting_value(test_db, self.user.id, "tema") == "escuro"
+
+    def test_update_user_setting_keeps_stored_type(self, test_db):
+        """Teste de chave personalizada: tipo explícito salvo e mantido quando o chamador não informa, num só commit"""
+        UserService.update_user_setting(
+            test_db, self.user.id, "meta_diaria", "8", categoria="produtividade", tipo_dado="number"
+        )
+
+        commits = []
+        listener = lambda conn: commits.append(conn)
+        event.listen(test_db.get_bind(), "commit", listener)
+        try:
+            setting = UserService.update_user_setting(test_db, self.user.id, "meta_diaria", "6")
+        finally:
+            event.remove(test_db.get_bind(), "commit", listener)
+
+        assert len(commits) == 1
+        assert setting.valor == "6"
+        assert setting.tipo_dado == "number"
+        assert setting.categoria == "produtividade"
+        assert SettingsService.get_setting_value(test_db, self.user.id, "meta_diaria") == 6
+
+
+class TestSettingsAPI:
+    """Testes dos endpoints de configurações"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        UserService.create_default_settings(test_db, self.user)
+        app.dependency_overrides[get_current_active_user] = lambda: self.user
+        yield
+        app.dependency_overrides.pop(get_current_active_user, None)
+
+    def test_patch_settings(self):
+        """Teste do PATCH em lote"""
+        response = client.patch("/api/settings/", json={
+            "configuracoes": {"tema": "escuro", "lembrete_sessao": 30}
+        })
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["tema"] == "escuro"
+        assert data["lembrete_sessao"] == 30
+
+        response = client.get("/api/settings/")
+        assert response.json()["data"]["lembrete_sessao"] == 30
+
+    def test_patch_settings_empty(self):
+        """Teste de validação com payload vazio"""
+        response = client.patch("/api/settings/", json={"configuracoes": {}})
+
+        assert response.status_code == 422
@@ -0,0 +1,204 @@
+"""
+Testes do startup: checagem de schema, eleição de líder, tempo de import e até a primeira requisição
+"""
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+import pytest
+from datetime import timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi.testclient import TestClient
+
+import config.database
+import services.asaas_service
+from config.database import ensure_schema, get_schema_version, SCHEMA_VERSION
+from models import LockServico
+from services.lock_service import LockService
+from services.webhook_registration_service import WebhookRegistrationService, WEBHOOK_REGISTRATION_LOCK
+from utils.helpers import now_utc
+
+
+class SlowAsaas:
+    """Asaas em memória com latência configurável em `get_webhooks`"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.created = []
+        self.calls = 0
+
+    async def get_webhooks(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return []
+
+    async def create_webhook(self, url, events):
+        self.created.append(url)
+        return {"url": url}
+
+
+@pytest.fixture
+def session_factory(test_db):
+    return sessionmaker(bind=test_db.get_bind())
+
+
+class TestSchemaVersion:
+    """Testes da checagem de versão do schema"""
+
+    def test_ensure_schema_creates_once(self):
+        """Teste de criação no banco vazio e checagem com uma query depois"""
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+        assert get_schema_version(engine) is None
+        assert ensure_schema(engine) is True
+        assert get_schema_version(engine) == SCHEMA_VERSION
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        assert ensure_schema(engine) is False
+        assert len(statements) == 1
+        engine.dispose()
+
+
+class TestLockService:
+    """Testes do lock com lease"""
+
+    def test_single_owner(self, test_db):
+        """Teste de exclusão mútua entre workers"""
+        assert LockService.acquire(test_db, "job", 60, dono="worker-a")
+        assert not LockService.acquire(test_db, "job", 60, dono="worker-b")
+        # Renovação pelo próprio dono
+        assert LockService.acquire(test_db, "job", 60, dono="worker-a")
+
+    def test_expired_lock_is_taken(self, test_db):
+        """Teste de tomada do lock expirado"""
+        assert LockService.acquire(test_db, "job", 60, dono="worker-a")
+        lock = test_db.get(LockServico, "job")
+        lock.expira_em = now_utc() - timedelta(seconds=1)
+        test_db.commit()
+
+        assert LockService.acquire(test_db, "job", 60, dono="worker-b")
+
+    def test_release(self, test_db):
+        """Teste de liberação apenas pelo dono"""
+        LockService.acquire(test_db, "job", 60, dono="worker-a")
+
+        assert not LockService.release(test_db, "job", dono="worker-b")
+        assert LockService.release(test_db, "job", dono="worker-a")
+        assert LockService.acquire(test_db, "job", 60, dono="worker-b")
+
+
+class TestWebhookRegistration:
+    """Testes do registro de webhooks em segundo plano"""
+
+    @pytest.mark.asyncio
+    async def test_only_leader_registers(self, session_factory):
+        """Teste de que apenas um worker chama o Asaas"""
+        asaas = SlowAsaas()
+
+        assert await WebhookRegistrationService.reconcile(asaas, 1.0, 300, session_factory) is True
+
+        db = session_factory()
+        lock = db.get(LockServico, WEBHOOK_REGISTRATION_LOCK)
+        lock.dono = "outro-worker"
+        db.commit()
+        db.close()
+
+        assert await WebhookRegistrationService.reconcile(asaas, 1.0, 300, session_factory) is None
+        assert asaas.calls == 1
+        assert len(asaas.created) == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_releases_lock(self, session_factory):
+        """Teste de timeout: desiste rápido e libera o lock para nova tentativa"""
+        asaas = SlowAsaas(delay=5)
+
+        start = time.perf_counter()
+        assert await WebhookRegistrationService.reconcile(asaas, 0.1, 300, session_factory) is False
+        assert time.perf_counter() - start < 1.0
+
+        db = session_factory()
+        assert db.get(LockServico, WEBHOOK_REGISTRATION_LOCK) is None
+        db.close()
+
+
+class TestStartupTime:
+    """Benchmark do tempo até a primeira requisição"""
+
+    def test_first_request_not_blocked_by_asaas(self, test_db, monkeypatch):
+        """Teste de que um Asaas lento não atrasa a prontidão da aplicação"""
+        from main import app
+
+        engine = test_db.get_bind()
+        monkeypatch.setattr("main.ensure_schema", lambda: ensure_schema(engine))
+        monkeypatch.setattr(config.database, "SessionLocal", sessionmaker(bind=engine))
+        monkeypatch.setattr(services.asaas_service, "get_asaas_service", lambda: SlowAsaas(delay=3))
+
+        start = time.perf_counter()
+        with TestClient(app) as startup_client:
+            response = startup_client.get("/health")
+            elapsed = time.perf_counter() - start
+
+        assert response.status_code == 200
+        assert elapsed < 1.0
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importado antes do app para medir só o custo próprio dele (o framework é fixo)
+FRAMEWORK_IMPORTS = "import fastapi, sqlalchemy.orm, pydantic, starlette.applications"
+
+# Orçamento do import do app além do framework (medido ~650ms; IMPORT_TIME_BUDGET_MS sobrescreve)
+IMPORT_TIME_BUDGET_MS = int(os.environ.get("IMPORT_TIME_BUDGET_MS", 1500))
+
+# Carregados só no primeiro uso (ou nem isso, conforme as settings)
+LAZY_MODULES = {
+    "api.demo", "utils.demo_helpers", "scripts",
+    "services.asaas_service", "services.asaas_client", "httpx",
+    "services.analytics_service", "numpy",
+    "passlib",
+}
+
+
+def import_profile(codigo: str, **env) -> dict:
+    """Roda `codigo` com -X importtime em um processo novo: {módulo: µs acumulados}"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=BACKEND_DIR, env=dict(os.environ, **env), capture_output=True, text=True, check=True
+    )
+    tempos = {}
+    for linha in resultado.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", linha)
+        if match:
+            tempos[match.group(2)] = int(match.group(1))
+    return tempos
+
+
+class TestImportTime:
+    """Cold start: o que `import main` carrega e quanto custa"""
+
+    def test_optional_subsystems_not_imported(self):
+        """Teste de lazy loading: demo, Asaas/httpx, numpy e passlib ficam fora do import"""
+        tempos = import_profile("import main", DEBUG="false")
+
+        assert "main" in tempos
+        assert LAZY_MODULES.isdisjoint(tempos), sorted(LAZY_MODULES & set(tempos))
+
+    def test_payments_disabled_by_settings(self):
+        """Teste de PAYMENTS_ENABLED=false: rotas de pagamento nem são importadas"""
+        tempos = import_profile("import main", DEBUG="false", PAYMENTS_ENABLED="false")
+
+        assert {"api.payments", "api.webhooks", "services.webhook_handler"}.isdisjoint(tempos)
+
+    def test_import_time_budget(self):
+        """Teste de orçamento: melhor de 3 imports do app (sem o framework) dentro do limite"""
+        melhor = min(
+            import_profile(f"{FRAMEWORK_IMPORTS}; import main", DEBUG="false")["main"]
+            for _ in range(3)
+        ) / 1000
+
+        assert melhor <= IMPORT_TIME_BUDGET_MS, f"import main: {melhor:.0f}ms (orçamento {IMPORT_TIME_BUDGET_MS}ms)"
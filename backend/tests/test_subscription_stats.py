@@ -0,0 +1,131 @@
+"""
+Testes das estatísticas e do histórico de assinaturas
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from main import app
+from api.dependencies import get_current_user
+from config.settings import settings
+from models import Assinatura, SnapshotAssinatura
+from services.auth_service import AuthService
+from services.subscription_service import SubscriptionService, _stats_cache
+
+client = TestClient(app)
+
+
+def criar_assinaturas(db, user_id):
+    fim = datetime.now() + timedelta(days=10)
+    for plano, status in [("basic", "ACTIVE"), ("pro", "ACTIVE"), ("pro", "ACTIVE"),
+                          ("premium", "EXPIRED"), ("basic", "INACTIVE")]:
+        db.add(Assinatura(id_usuario=user_id, tipo_plano=plano, status=status,
+                          asaas_customer_id="cus_1", periodo_fim=fim))
+    db.commit()
+
+
+class TestSubscriptionStats:
+    """Testes do serviço de estatísticas"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        _stats_cache.clear()
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        criar_assinaturas(test_db, self.user.id)
+        yield
+        _stats_cache.clear()
+
+    def test_stats_single_query_and_cache(self, test_db):
+        """Teste de agregação em um único GROUP BY, com cache"""
+        statements = []
+        engine = test_db.get_bind()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            stats = SubscriptionService.get_subscription_stats(test_db)
+            SubscriptionService.get_subscription_stats(test_db)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        assert "GROUP BY" in statements[0]
+        assert stats == {
+            "total": 5,
+            "active": 3,
+            "expired": 1,
+            "cancelled": 1,
+            "by_plan": {"basic": 1, "pro": 2, "premium": 0}
+        }
+
+    def test_snapshot_upsert_and_history(self, test_db):
+        """Teste de snapshot diário idempotente e série histórica"""
+        ontem = date.today() - timedelta(days=1)
+        SubscriptionService.take_daily_snapshot(test_db, ontem)
+        test_db.query(Assinatura).filter(Assinatura.tipo_plano == "basic").update({"status": "ACTIVE"})
+        test_db.commit()
+        SubscriptionService.take_daily_snapshot(test_db)
+        SubscriptionService.take_daily_snapshot(test_db)
+
+        assert test_db.query(SnapshotAssinatura).filter(SnapshotAssinatura.data == date.today()).count() == 3
+
+        history = SubscriptionService.get_snapshot_history(test_db, days=7)
+        assert history == [
+            {"date": ontem.isoformat(), "basic": 1, "pro": 2, "premium": 0},
+            {"date": date.today().isoformat(), "basic": 2, "pro": 2, "premium": 0}
+        ]
+
+
+    def test_snapshot_rerun_drops_emptied_groups(self, test_db):
+        """Teste de grupo que zerou durante o dia: a contagem antiga não fica no snapshot"""
+        SubscriptionService.take_daily_snapshot(test_db)
+        test_db.query(Assinatura).filter(Assinatura.tipo_plano == "premium").update({"status": "ACTIVE"})
+        test_db.commit()
+
+        SubscriptionService.take_daily_snapshot(test_db)
+
+        grupos = {
+            (row.tipo_plano, row.status): row.total
+            for row in test_db.query(SnapshotAssinatura).filter(SnapshotAssinatura.data == date.today())
+        }
+        assert ("premium", "EXPIRED") not in grupos
+        assert grupos[("premium", "ACTIVE")] == 1
+
+class TestAdminAPI:
+    """Testes dos endpoints administrativos"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data, monkeypatch):
+        """Setup para cada teste"""
+        _stats_cache.clear()
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        criar_assinaturas(test_db, self.user.id)
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        self.monkeypatch = monkeypatch
+        yield
+        app.dependency_overrides.pop(get_current_user, None)
+        _stats_cache.clear()
+
+    def test_requires_admin(self):
+        """Teste de acesso negado para não administradores"""
+        self.monkeypatch.setattr(settings, "ADMIN_EMAILS", [])
+
+        response = client.get("/api/admin/subscriptions/stats")
+
+        assert response.status_code == 403
+
+    def test_stats_and_history(self, test_db):
+        """Teste dos endpoints de estatísticas e histórico"""
+        self.monkeypatch.setattr(settings, "ADMIN_EMAILS", [self.user.email.upper()])
+        SubscriptionService.take_daily_snapshot(test_db)
+
+        response = client.get("/api/admin/subscriptions/stats")
+        assert response.status_code == 200
+        assert response.json()["data"]["active"] == 3
+
+        response = client.get("/api/admin/subscriptions/history", params={"days": 7})
+        assert response.status_code == 200
+        assert response.json()["data"] == [
+            {"date": date.today().isoformat(), "basic": 1, "pro": 2, "premium": 0}
+        ]
@@ -0,0 +1,172 @@
+"""
+Testes das cotas mensais do plano
+"""
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from main import app
+from api.dependencies import get_current_user
+from models import UsoMensal
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+from services.entitlement_service import _entitlement_cache
+from services.transaction_service import TransactionService
+from services.usage_service import UsageService, RECURSO_TRANSACOES, mes_de
+from utils.exceptions import QuotaExceededError
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def limpar_cache():
+    _entitlement_cache.clear()
+    yield
+    _entitlement_cache.clear()
+
+
+def limitar(monkeypatch, limite):
+    from config.payments import SUBSCRIPTION_PLANS
+    monkeypatch.setitem(SUBSCRIPTION_PLANS["basic"], "limits", {RECURSO_TRANSACOES: limite})
+
+
+class TestUsageService:
+    """Testes dos contadores de uso"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.category = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+
+    def criar(self, db, data=None):
+        return TransactionService.create_transaction(
+            db, self.user.id, self.category.id, 10.0, "receita", data=data
+        )
+
+    def test_counter_follows_insert_and_delete(self, test_db):
+        """Teste de contador atualizado na inserção e na remoção"""
+        t1 = self.criar(test_db)
+        self.criar(test_db)
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 2
+
+        TransactionService.delete_transaction(test_db, t1.id, self.user.id)
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 1
+
+    def test_quota_enforced(self, test_db, monkeypatch):
+        """Teste de bloqueio ao atingir o limite do plano"""
+        limitar(monkeypatch, 2)
+        self.criar(test_db)
+        self.criar(test_db)
+
+        with pytest.raises(QuotaExceededError):
+            self.criar(test_db)
+
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 2
+
+    def test_backdating_does_not_bypass_quota(self, test_db, monkeypatch):
+        """Teste de data retroativa: a cota é a do mês da criação, não a do mês da data"""
+        limitar(monkeypatch, 2)
+        mes_passado = datetime.now() - timedelta(days=40)
+        self.criar(test_db, mes_passado)
+        self.criar(test_db)
+
+        with pytest.raises(QuotaExceededError):
+            self.criar(test_db, mes_passado)
+        with pytest.raises(QuotaExceededError):
+            TransactionService.bulk_create_transactions(test_db, self.user.id, [
+                {"id_categoria": self.category.id, "valor": 5.0, "tipo": "receita", "data": mes_passado}
+            ])
+
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 2
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES, mes_de(mes_passado)) == 0
+
+    def test_quota_check_without_count(self, test_db):
+        """Teste de checagem de cota sem COUNT sobre transações"""
+        self.criar(test_db)
+
+        statements = []
+        engine = test_db.get_bind()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            self.criar(test_db)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert not any("count(" in sql.lower() for sql in statements)
+
+    def test_bulk_is_all_or_nothing(self, test_db, monkeypatch):
+        """Teste de importação em lote respeitando a cota"""
+        limitar(monkeypatch, 3)
+        item = {"id_categoria": self.category.id, "valor": 5.0, "tipo": "receita"}
+
+        with pytest.raises(QuotaExceededError):
+            TransactionService.bulk_create_transactions(test_db, self.user.id, [item] * 4)
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 0
+
+        created = TransactionService.bulk_create_transactions(test_db, self.user.id, [item] * 3)
+        assert len(created) == 3
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 3
+
+    def test_update_keeps_creation_month(self, test_db):
+        """Teste de mudança de data sem mover o consumo (nem devolvê-lo ao remover)"""
+        transaction = self.criar(test_db)
+        mes_passado = datetime.now() - timedelta(days=40)
+
+        TransactionService.update_transaction(test_db, transaction.id, self.user.id, data=mes_passado)
+
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 1
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES, mes_de(mes_passado)) == 0
+
+        TransactionService.delete_transaction(test_db, transaction.id, self.user.id)
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 0
+
+    def test_rebuild(self, test_db):
+        """Teste de recálculo dos contadores a partir das transações (mês da criação)"""
+        self.criar(test_db)
+        self.criar(test_db, datetime.now() - timedelta(days=40))
+        test_db.query(UsoMensal).update({"quantidade": 99})
+        test_db.commit()
+
+        UsageService.rebuild_transaction_usage(test_db, self.user.id)
+
+        assert UsageService.get_usage(test_db, self.user.id, RECURSO_TRANSACOES) == 2
+
+
+class TestUsageAPI:
+    """Testes dos endpoints de uso e importação"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.category = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        yield
+        app.dependency_overrides.pop(get_current_user, None)
+
+    def test_usage_report_and_quota_response(self, monkeypatch):
+        """Teste do relatório de uso e da resposta 402 ao exceder a cota"""
+        limitar(monkeypatch, 2)
+        item = {"id_categoria": self.category.id, "valor": 5.0, "tipo": "receita"}
+
+        response = client.post("/api/transactions/bulk", json={"transacoes": [item, item]})
+        assert response.status_code == 200
+        assert response.json()["data"]["importadas"] == 2
+
+        response = client.post("/api/transactions/", json=item)
+        assert response.status_code == 402
+
+        response = client.get("/api/usage/")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["plano"] == "basic"
+        assert data["recursos"] == [{
+            "recurso": RECURSO_TRANSACOES,
+            "usado": 2,
+            "limite": 2,
+            "restante": 0,
+            "percentual": 100.0
+        }]
@@ -0,0 +1,125 @@
+"""
+Testes do inbox durável de webhooks
+"""
+import json
+import pytest
+from datetime import timedelta
+from sqlalchemy.orm import sessionmaker
+
+from models import WebhookInbox, Pagamento
+from services.webhook_inbox_service import WebhookInboxService
+from utils.helpers import now_utc
+
+
+def evento(event_id, payment_id, subscription="sub_1", status="PENDING", event="PAYMENT_UPDATED"):
+    payload = {
+        "id": event_id,
+        "event": event,
+        "payment": {"id": payment_id, "subscription": subscription, "status": status, "value": 19.9}
+    }
+    return payload, json.dumps(payload).encode()
+
+
+class TestWebhookInboxService:
+    """Testes do serviço do inbox"""
+
+    @pytest.fixture
+    def session_factory(self, test_db):
+        return sessionmaker(bind=test_db.get_bind())
+
+    def test_enqueue_is_idempotent(self, test_db):
+        """Teste de deduplicação pelo ID do evento"""
+        payload, raw = evento("evt_1", "pay_1")
+
+        assert WebhookInboxService.enqueue(test_db, "payment", payload, raw) is True
+        assert WebhookInboxService.enqueue(test_db, "payment", payload, raw) is False
+        assert test_db.query(WebhookInbox).count() == 1
+
+    def test_enqueue_without_event_id_uses_body_hash(self, test_db):
+        """Teste de deduplicação pelo hash do corpo quando não há ID"""
+        payload = {"event": "PAYMENT_UPDATED", "payment": {"id": "pay_1", "status": "PENDING"}}
+        raw = json.dumps(payload).encode()
+
+        WebhookInboxService.enqueue(test_db, "payment", payload, raw)
+        WebhookInboxService.enqueue(test_db, "payment", payload, raw)
+
+        item = test_db.query(WebhookInbox).one()
+        assert item.evento_id.startswith("sha256:")
+
+    def test_drain_processes_and_marks_done(self, test_db, session_factory):
+        """Teste de processamento assíncrono atualizando o espelho"""
+        WebhookInboxService.enqueue(test_db, "payment", *evento("evt_1", "pay_1", status="OVERDUE"))
+
+        assert WebhookInboxService.drain_batch(session_factory) == 1
+
+        test_db.expire_all()
+        assert test_db.query(WebhookInbox).one().status == "DONE"
+        assert test_db.get(Pagamento, "pay_1").status == "OVERDUE"
+        assert WebhookInboxService.drain_batch(session_factory) == 0
+
+    def test_claim_preserves_order_per_subscription(self, test_db):
+        """Teste de ordem: só o evento mais antigo de cada assinatura é reservado"""
+        WebhookInboxService.enqueue(test_db, "payment", *evento("evt_1", "pay_1", subscription="sub_1"))
+        WebhookInboxService.enqueue(test_db, "payment", *evento("evt_2", "pay_2", subscription="sub_1"))
+        WebhookInboxService.enqueue(test_db, "payment", *evento("evt_3", "pay_3", subscription="sub_2"))
+
+        claimed = WebhookInboxService.claim_batch(test_db, 10)
+        assert [item.evento_id for item in claimed] == ["evt_1", "evt_3"]
+
+        # Enquanto evt_1 está em processamento, evt_2 continua bloqueado
+        assert WebhookInboxService.claim_batch(test_db, 10) == []
+
+    def test_claim_skips_backoff_head_in_sql(self, test_db):
+        """Teste de fila com muitos eventos em backoff na frente de um evento novo"""
+        for i in range(10):
+            WebhookInboxService.enqueue(test_db, "payment", *evento(f"evt_{i}", f"pay_{i}", subscription=f"sub_{i}"))
+        test_db.query(WebhookInbox).update({"proxima_tentativa_em": now_utc() + timedelta(hours=1)})
+        test_db.commit()
+        WebhookInboxService.enqueue(test_db, "payment", *evento("evt_novo", "pay_novo", subscription="sub_novo"))
+
+        claimed = WebhookInboxService.claim_batch(test_db, 2)
+        assert [item.evento_id for item in claimed] == ["evt_novo"]
+
+    def test_failure_retries_then_dead(self, test_db, session_factory):
+        """Teste de retry com backoff e dead-letter"""
+        payload = {"id": "evt_bad", "event": "PAYMENT_UPDATED", "payment": {}}
+        WebhookInboxService.enqueue(test_db, "payment", payload, json.dumps(payload).encode())
+
+        db = session_factory()
+        item = WebhookInboxService.claim_batch(db, 10)[0]
+        assert WebhookInboxService.process_item(db, item, 2, 5, 60) is False
+        db.close()
+
+        test_db.expire_all()
+        item = test_db.query(WebhookInbox).one()
+        assert item.status == "PENDING"
+        assert item.tentativas == 1
+        assert item.proxima_tentativa_em > now_utc().replace(tzinfo=None)
+
+        # Em backoff: não é reservado
+        assert WebhookInboxService.claim_batch(test_db, 10) == []
+
+        item.proxima_tentativa_em = now_utc() - timedelta(seconds=1)
+        test_db.commit()
+
+        db = session_factory()
+        item = WebhookInboxService.claim_batch(db, 10)[0]
+        WebhookInboxService.process_item(db, item, 2, 5, 60)
+        db.close()
+
+        test_db.expire_all()
+        item = test_db.query(WebhookInbox).one()
+        assert item.status == "DEAD"
+        assert item.ultimo_erro
+
+    def test_recover_stuck_processing(self, test_db):
+        """Teste de recuperação de itens presos em PROCESSING"""
+        WebhookInboxService.enqueue(test_db, "payment", *evento("evt_1", "pay_1"))
+        WebhookInboxService.claim_batch(test_db, 10)
+
+        item = test_db.query(WebhookInbox).one()
+        item.processando_desde = now_utc() - timedelta(seconds=600)
+        test_db.commit()
+
+        assert WebhookInboxService.recover_stuck(test_db, 300) == 1
+        assert [i.evento_id for i in WebhookInboxService.claim_batch(test_db, 10)] == ["evt_1"]
@@ -0,0 +1,140 @@
+"""
+Testes dos caminhos de escrita sem recarga pós-commit e da concorrência otimista
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event, update
+
+from models import Assinatura, Transacao
+from services.auth_service import AuthService
+from services.category_service import CategoryService
+from services.subscription_service import SubscriptionService
+from services.transaction_service import TransactionService
+from utils.exceptions import ConflictError
+
+
+def capturar(db):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    return statements, lambda: event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+class TestWritePaths:
+    """Testes das escritas serializadas a partir do estado em memória"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, test_db, sample_user_data):
+        """Setup para cada teste"""
+        self.user = AuthService.register_user(db=test_db, **sample_user_data)
+        self.category = CategoryService.create_category(test_db, self.user.id, "Corridas", "receita")
+
+    def test_create_serializes_without_reload(self, test_db):
+        """Teste de criação sem SELECT de recarga nem lazy load ao serializar"""
+        transaction = TransactionService.create_transaction(
+            test_db, self.user.id, self.category.id, 25.0, "receita"
+        )
+
+        statements, parar = capturar(test_db)
+        try:
+            data = transaction.para_dict()
+        finally:
+            parar()
+
+        assert statements == []
+        assert data["nome_categoria"] == "Corridas"
+        assert transaction.versao == 1
+
+    def test_update_serializes_without_reload(self, test_db):
+        """Teste de atualização sem recarga após o commit"""
+        transaction = TransactionService.create_transaction(
+            test_db, self.user.id, self.category.id, 25.0, "receita"
+        )
+
+        statements, parar = capturar(test_db)
+        try:
+            TransactionService.update_transaction(test_db, transaction.id, self.user.id, descricao="Corrida longa")
+            transaction.para_dict()
+        finally:
+            parar()
+
+        # Apenas a leitura inicial; nada de SELECT após o UPDATE
+        selects = [sql for sql in statements if "FROM transacoes" in sql]
+        assert len(selects) == 1
+        assert statements.index(selects[0]) < next(
+            i for i, sql in enumerate(statements) if sql.startswith("UPDATE transacoes")
+        )
+        assert transaction.versao == 2
+
+    def test_server_defaults_come_back_with_insert(self, test_db):
+        """Teste de defaults do banco lidos via RETURNING no próprio INSERT"""
+        subscription = Assinatura(
+            id_usuario=self.user.id,
+            tipo_plano="pro",
+            asaas_customer_id="cus_1",
+            periodo_fim=datetime.now() + timedelta(days=30)
+        )
+        statements, parar = capturar(test_db)
+        try:
+            test_db.add(subscription)
+            test_db.commit()
+            assert subscription.periodo_inicio is not None
+            assert subscription.criado_em is not None
+        finally:
+            parar()
+
+        assert len(statements) == 1
+        assert statements[0].startswith("INSERT INTO assinaturas") and "RETURNING" in statements[0]
+
+    def test_concurrent_update_conflicts(self, test_db):
+        """Teste de conflito de versão com escrita concorrente"""
+        transaction = TransactionService.create_transaction(
+            test_db, self.user.id, self.category.id, 25.0, "receita"
+        )
+        # Outro processo grava a mesma linha depois que esta sessão a leu
+        test_db.execute(
+            update(Transacao)
+            .where(Transacao.id == transaction.id)
+            .values(descricao="Outro dispositivo", versao=Transacao.versao + 1)
+            .execution_options(synchronize_session=False)
+        )
+        test_db.commit()
+
+        with pytest.raises(ConflictError):
+            TransactionService.update_transaction(test_db, transaction.id, self.user.id, descricao="Stale")
+
+        test_db.expire_all()
+        assert test_db.get(Transacao, transaction.id).descricao == "Outro dispositivo"
+
+    def test_client_version_prevents_lost_update(self, test_db):
+        """Teste de edição com a versão lida pelo cliente: a gravação de outro cliente não é sobrescrita"""
+        transaction = TransactionService.create_transaction(
+            test_db, self.user.id, self.category.id, 25.0, "receita"
+        )
+        lida = transaction.para_dict()["versao"]
+
+        # Outro cliente edita primeiro, a partir da mesma versão
+        TransactionService.update_transaction(test_db, transaction.id, self.user.id, descricao="Celular", versao=lida)
+
+        with pytest.raises(ConflictError):
+            TransactionService.update_transaction(test_db, transaction.id, self.user.id, descricao="Web", versao=lida)
+        assert test_db.get(Transacao, transaction.id).descricao == "Celular"
+
+    def test_set_based_updates_bump_version(self, test_db):
+        """Teste de UPDATEs em lote incrementando a versão"""
+        transaction = TransactionService.create_transaction(
+            test_db, self.user.id, self.category.id, 25.0, "receita"
+        )
+        subscription = Assinatura(
+            id_usuario=self.user.id, tipo_plano="pro", asaas_customer_id="cus_1",
+            status="ACTIVE", periodo_fim=datetime.now() - timedelta(days=1)
+        )
+        test_db.add(subscription)
+        test_db.commit()
+
+        assert SubscriptionService.expire_subscriptions(test_db) == 1
+        assert TransactionService.rebuild_local_dates(test_db, user_id=self.user.id) == 1
+
+        test_db.expire_all()
+        assert test_db.get(Assinatura, subscription.id).versao == 2
+        assert test_db.get(Transacao, transaction.id).versao == 2
@@ -4,15 +4,12 @@ Utilitários de autenticação JWT
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 import jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from config.settings import settings
 from config.database import get_db
-
-# Context para hash de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from utils.helpers import get_pwd_context
 
 # Security scheme for JWT
 security = HTTPBearer()
@@ -71,12 +68,12 @@ class PasswordHandler:
     @staticmethod
     def hash_password(password: str) -> str:
         """Gerar hash da senha"""
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verificar se a senha está correta"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_current_user_id(token: str) -> Optional[str]:
     """Extrair ID do usuário do token JWT"""
@@ -6,6 +6,9 @@ from typing import Optional, Any
 class RiderFinanceException(Exception):
     """Exceção base da aplicação"""
     
+    # Status HTTP usado pelo handler global (main.py)
+    status_code = 400
+    
     def __init__(self, message: str, code: str = "GENERIC_ERROR", details: Any = None):
         self.message = message
         self.code = code
@@ -63,8 +66,29 @@ class TrialExpiredError(PaymentRequiredError):
     def __init__(self):
         super().__init__("Período de trial expirado. Assine para continuar usando.")
 
+class QuotaExceededError(PaymentRequiredError):
+    """Cota do plano excedida"""
+    
+    def __init__(self, recurso: str, limite: int):
+        super().__init__(f"Limite do plano atingido: {limite} ({recurso}). Faça upgrade para continuar.")
+        self.code = "QUOTA_EXCEEDED"
+        self.details = {"recurso": recurso, "limite": limite}
+
 class RateLimitError(RiderFinanceException):
     """Limite de taxa excedido"""
     
     def __init__(self, message: str = "Muitas requisições. Tente novamente em alguns minutos."):
         super().__init__(message, "RATE_LIMIT_EXCEEDED")
+
+class ServiceUnavailableError(RiderFinanceException):
+    """Serviço externo indisponível (503, com Retry-After quando conhecido)"""
+    
+    status_code = 503
+    
+    def __init__(
+        self,
+        message: str = "Serviço temporariamente indisponível. Tente novamente em instantes.",
+        retry_after: Optional[int] = None
+    ):
+        super().__init__(message, "SERVICE_UNAVAILABLE")
+        self.retry_after = retry_after
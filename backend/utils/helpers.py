@@ -3,14 +3,18 @@ Utilitários gerais da aplicação
 """
 import hashlib
 import secrets
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from typing import Optional, Any, Dict
 import ulid
 import json
-from passlib.context import CryptContext
+from functools import lru_cache
 
-# Contexto para hash de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """Contexto para hash de senhas (passlib/bcrypt carregados no primeiro uso)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def generate_ulid() -> str:
     """Gera um novo ULID como string"""
@@ -18,11 +22,11 @@ def generate_ulid() -> str:
 
 def hash_password(password: str) -> str:
     """Gera hash da senha"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha está correta"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def generate_random_token(length: int = 32) -> str:
     """Gera token aleatório"""
@@ -76,6 +80,28 @@ def calculate_percentage(current: float, target: float) -> float:
         return 0
     return min(100, (current / target) * 100)
 
+def get_zoneinfo(nome: Optional[str]) -> ZoneInfo:
+    """Fuso pelo nome IANA; nomes vazios ou inválidos usam Settings.TIMEZONE"""
+    from config.settings import settings
+    for candidato in (nome, settings.TIMEZONE):
+        if not candidato:
+            continue
+        try:
+            return ZoneInfo(candidato)
+        except (ZoneInfoNotFoundError, ValueError):
+            continue
+    return ZoneInfo("UTC")
+
+def to_local(momento: datetime, fuso: ZoneInfo) -> datetime:
+    """Horário local (sem tzinfo) de um instante; datetimes sem fuso são UTC"""
+    if momento.tzinfo is None:
+        momento = momento.replace(tzinfo=timezone.utc)
+    return momento.astimezone(fuso).replace(tzinfo=None)
+
+def to_local_date(momento: datetime, fuso: ZoneInfo) -> date:
+    """Data local de um instante (base de `transacoes.data_local`)"""
+    return to_local(momento, fuso).date()
+
 def get_period_dates(period_type: str, date: Optional[datetime] = None) -> tuple[datetime, datetime]:
     """
     Retorna data de início e fim para um período
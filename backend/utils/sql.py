@@ -0,0 +1,85 @@
+"""
+Utilitários de SQL dependentes do dialeto do banco
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import Date, Integer, String, Table, cast, extract, func
+from sqlalchemy.orm import Session
+
+
+def supports_upsert(db: Session) -> bool:
+    """Indica se o dialeto suporta INSERT ... ON CONFLICT"""
+    return db.get_bind().dialect.name in ("sqlite", "postgresql")
+
+
+def supports_update_returning(db: Session) -> bool:
+    """Indica se o dialeto suporta UPDATE ... RETURNING"""
+    return bool(getattr(db.get_bind().dialect, "update_returning", False))
+
+
+def weekday_expr(db: Session, column):
+    """Dia da semana (0 = domingo ... 6 = sábado) calculado no banco"""
+    if db.get_bind().dialect.name == "sqlite":
+        return cast(func.strftime('%w', column), Integer)
+    return cast(extract('dow', column), Integer)
+
+
+def epoch_expr(db: Session, column):
+    """Segundos desde 1970-01-01 (UTC) calculados no banco, para leitura colunar"""
+    if db.get_bind().dialect.name == "sqlite":
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    return extract('epoch', column)
+
+
+def shift_seconds_expr(db: Session, column, seconds: int):
+    """Desloca um DateTime em `seconds` no banco (ex.: UTC -> horário local)"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.datetime(column, f"{int(seconds):+d} seconds")
+    return column + func.make_interval(0, 0, 0, 0, 0, 0, int(seconds))
+
+
+def period_start_expr(db: Session, column, granularity: str):
+    """
+    Início do período (dia, semana iniciando na segunda ou mês) de cada linha
+
+    Retorna a data no formato YYYY-MM-DD (texto no SQLite, date no PostgreSQL),
+    com a mesma semântica de `utils.helpers.get_period_dates`.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        if granularity == "day":
+            return func.date(column)
+        if granularity == "week":
+            dias_desde_segunda = (cast(func.strftime('%w', column), Integer) + 6) % 7
+            return func.date(column, '-' + cast(dias_desde_segunda, String) + ' days')
+        if granularity == "month":
+            return func.strftime('%Y-%m-01', column)
+    elif granularity in ("day", "week", "month"):
+        return cast(func.date_trunc(granularity, column), Date)
+    raise ValueError(f"Granularidade inválida: {granularity}")
+
+
+def build_upsert(
+    db: Session,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    index_elements: List[str],
+    set_: Optional[Callable[[Any], Dict[str, Any]]] = None
+):
+    """
+    Monta um INSERT ... ON CONFLICT para SQLite/PostgreSQL
+
+    `set_` recebe o pseudo-registro `excluded` e retorna as colunas a atualizar
+    em caso de conflito; sem `set_` o conflito é ignorado (DO NOTHING).
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert não suportado para o dialeto: {dialect}")
+
+    stmt = insert(table).values(rows)
+    if set_ is None:
+        return stmt.on_conflict_do_nothing(index_elements=index_elements)
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded))